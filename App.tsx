@@ -33,6 +33,7 @@ const TallerView = React.lazy(() => import('./views/ManagementModules').then(mod
 const CashReconciliationView = React.lazy(() => import('./views/CashReconciliationView').then(module => ({ default: module.CashReconciliationView })));
 const AliasDictionaryView = React.lazy(() => import('./views/AliasDictionaryView').then(module => ({ default: module.AliasDictionaryView })));
 import { supabase } from './services/supabase';
+import { loadTravelTimeModel } from './services/autoAssignment';
 import { ViewState, Language } from './types';
 import { Session } from '@supabase/supabase-js';
 
@@ -255,6 +256,13 @@ export default function App() {
     };
   }, []);
 
+  // Learned travel and wait times for driver assignment, once per session (staff only)
+  useEffect(() => {
+    if (session && roleReady && userRole && userRole !== 'client' && userRole !== 'driver') {
+      loadTravelTimeModel();
+    }
+  }, [session, roleReady, userRole]);
+
   // Listen for AI Assistant events that require view changes
   useEffect(() => {
     const handleAiBooking = (e: any) => {
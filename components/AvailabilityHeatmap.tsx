@@ -0,0 +1,88 @@
+import React, { useEffect, useState } from 'react';
+import { capacityEngine, DayAvailability } from '../services/capacityEngine';
+
+interface AvailabilityHeatmapProps {
+    startDate: string;
+    origin: string;
+    days?: number;
+    selectedDate?: string;
+    selectedTime?: string;
+    onSelect?: (date: string, time: string) => void;
+    language?: string;
+    excludeBookingId?: string; // a booking being changed: not counted against its own slot
+}
+
+const HOUR_MARKS = [0, 6, 12, 18];
+
+const cellColor = (free: number, capacity: number) => {
+    if (free <= 0) return 'bg-red-500/40';
+    if (free === 1) return 'bg-amber-400/60';
+    return free / capacity > 0.5 ? 'bg-emerald-400/70' : 'bg-emerald-400/40';
+};
+
+/**
+ * Week of availability at 15-minute granularity (one capacityEngine.week call per
+ * range / origin). Clicking a free slot selects it.
+ */
+export const AvailabilityHeatmap: React.FC<AvailabilityHeatmapProps> = ({
+    startDate, origin, days = 7, selectedDate, selectedTime, onSelect, language = 'es', excludeBookingId
+}) => {
+    const [week, setWeek] = useState<DayAvailability[] | null>(null);
+    const [anchor, setAnchor] = useState(startDate);
+
+    // Picking a day inside the shown range keeps the range where it is
+    useEffect(() => {
+        if (!week || !week.some(d => d.date === startDate)) setAnchor(startDate);
+    }, [startDate]);
+
+    useEffect(() => {
+        if (!anchor) return;
+        let cancelled = false;
+        setWeek(null);
+        capacityEngine.week(anchor, origin, days, 15, excludeBookingId)
+            .then(result => { if (!cancelled) setWeek(result); })
+            .catch(err => console.error('Error loading availability', err));
+        return () => { cancelled = true; };
+    }, [anchor, origin, days, excludeBookingId]);
+
+    if (!anchor) return null;
+    if (!week) {
+        return <div className="text-[10px] text-brand-platinum/40 uppercase tracking-widest animate-pulse py-2">
+            {language === 'es' ? 'Cargando disponibilidad...' : 'Loading availability...'}
+        </div>;
+    }
+
+    const selectedSlot = selectedTime ? selectedTime.slice(0, 5) : '';
+
+    return (
+        <div className="space-y-1">
+            <div className="flex items-center gap-2 pl-16 text-[9px] text-brand-platinum/40">
+                {HOUR_MARKS.map(h => (
+                    <span key={h} className="flex-1">{String(h).padStart(2, '0')}:00</span>
+                ))}
+            </div>
+            {week.map(day => (
+                <div key={day.date} className="flex items-center gap-2">
+                    <span className="w-14 shrink-0 text-[9px] font-bold text-brand-platinum/60 uppercase">
+                        {new Date(`${day.date}T12:00:00`).toLocaleDateString(language === 'es' ? 'es-ES' : 'en-GB', { weekday: 'short', day: '2-digit' })}
+                    </span>
+                    <div className="flex-1 grid gap-px" style={{ gridTemplateColumns: `repeat(${day.slots.length}, minmax(0, 1fr))` }}>
+                        {day.slots.map(slot => {
+                            const isSelected = day.date === selectedDate && slot.time === selectedSlot;
+                            return (
+                                <button
+                                    key={slot.time}
+                                    type="button"
+                                    title={`${day.date} ${slot.time} · ${slot.free}/${day.capacity}`}
+                                    disabled={slot.free <= 0 || !onSelect}
+                                    onClick={() => onSelect?.(day.date, slot.time)}
+                                    className={`h-4 rounded-[1px] ${cellColor(slot.free, day.capacity)} ${isSelected ? 'ring-2 ring-white' : ''} disabled:cursor-not-allowed`}
+                                />
+                            );
+                        })}
+                    </div>
+                </div>
+            ))}
+        </div>
+    );
+};
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Logo } from './ui/Logo';
 import { supabase } from '../services/supabase';
 import { useBooking } from '../hooks/useBooking';
+import { AvailabilityHeatmap } from './AvailabilityHeatmap';
 import { Language } from '../types';
 
 interface BookingFormProps {
@@ -330,6 +331,22 @@ export const BookingForm: React.FC<BookingFormProps> = ({ language = 'es', onSte
                         </div>
                     </div>
 
+                    {formData.date && formData.origin && (
+                        <div className="space-y-2">
+                            <span className="text-[9px] uppercase font-black text-slate-300 ml-1 tracking-[0.2em]">
+                                {language === 'es' ? 'Disponibilidad (7 días)' : 'Availability (7 days)'}
+                            </span>
+                            <AvailabilityHeatmap
+                                startDate={formData.date}
+                                origin={formData.origin}
+                                selectedDate={formData.date}
+                                selectedTime={formData.time}
+                                onSelect={(date, time) => setFormData(prev => ({ ...prev, date, time }))}
+                                language={language}
+                            />
+                        </div>
+                    )}
+
                     {formData.tripType === 'Round Trip' && (
                         <div className="grid grid-cols-2 gap-4 animate-in fade-in zoom-in duration-300">
                             <div className="space-y-2">
@@ -0,0 +1,88 @@
+import React, { useEffect, useState } from 'react';
+import type { FleetSource, FleetVehicle, LayerStats } from './FleetMap';
+
+// Dev-only load test of FleetMap (`?fleetLoadTest=500`): simulated vehicles reporting
+// positions as the realtime channel would, and a frame-rate overlay. FleetMap imports this
+// module dynamically behind import.meta.env.DEV, so production builds do not contain it.
+
+// Pickup hotspots the simulated vehicles start around (airport, Benidorm, Alicante, Dénia...)
+const LOAD_TEST_HOTSPOTS: [number, number][] = [
+    [38.2822, -0.5582], [38.5411, -0.1225], [38.3452, -0.4810], [38.5990, -0.0510],
+    [38.6447, 0.0445], [38.2699, -0.6983], [37.9787, -0.6822], [38.8391, 0.1057],
+];
+const LOAD_TEST_STATUSES = ['Working', 'Working', 'En Route', 'In Progress', 'Paused', 'Off'];
+const LOAD_TEST_TICK_MS = 100;
+const LOAD_TEST_REPORT_S = 3; // each vehicle reports once every 3 s, spread over the ticks
+
+export const loadTestSource = (count: number): FleetSource => {
+    const current = new Map<string, FleetVehicle>();
+    const headings = new Map<string, number>();
+    for (let i = 0; i < count; i++) {
+        const [lat, lng] = LOAD_TEST_HOTSPOTS[i % LOAD_TEST_HOTSPOTS.length];
+        const id = `sim-${i}`;
+        current.set(id, {
+            id,
+            lat: lat + (Math.random() - 0.5) * 0.2,
+            lng: lng + (Math.random() - 0.5) * 0.2,
+            status: LOAD_TEST_STATUSES[i % LOAD_TEST_STATUSES.length],
+            name: `V${i}`,
+            updatedAt: new Date().toISOString(),
+        });
+        headings.set(id, Math.random() * 2 * Math.PI);
+    }
+
+    return {
+        start(onChange) {
+            const ids = [...current.keys()];
+            const perTick = Math.max(1, Math.round(count * LOAD_TEST_TICK_MS / (LOAD_TEST_REPORT_S * 1000)));
+            let next = 0;
+            const timer = setInterval(() => {
+                // A batch of position reports, as the realtime channel delivers them
+                for (let n = 0; n < perTick; n++) {
+                    const id = ids[next++ % ids.length];
+                    const v = current.get(id)!;
+                    const heading = headings.get(id)! + (Math.random() - 0.5) * 0.6;
+                    headings.set(id, heading);
+                    const step = v.status === 'Paused' || v.status === 'Off' ? 0 : 0.0012; // ~130 m per report
+                    current.set(id, {
+                        ...v,
+                        lat: v.lat + Math.cos(heading) * step,
+                        lng: v.lng + Math.sin(heading) * step,
+                        updatedAt: new Date().toISOString(),
+                    });
+                }
+                onChange(current);
+            }, LOAD_TEST_TICK_MS);
+            onChange(current);
+            return () => clearInterval(timer);
+        },
+        popup(id) {
+            const v = current.get(id);
+            return v ? `<p class="font-bold text-slate-800">${v.name}</p><p class="text-xs text-slate-500">${v.status}</p>` : '';
+        },
+    };
+};
+
+/** Frame rate and layer counts while the load test runs; re-renders itself once a second. */
+export const LoadTestOverlay = ({ size, stats }: { size: number; stats: React.MutableRefObject<LayerStats | null> }) => {
+    const [fps, setFps] = useState(0);
+    useEffect(() => {
+        let frames = 0;
+        let since = performance.now();
+        let id = requestAnimationFrame(function tick(now) {
+            frames++;
+            if (now - since >= 1000) {
+                setFps(Math.round(frames * 1000 / (now - since)));
+                frames = 0;
+                since = now;
+            }
+            id = requestAnimationFrame(tick);
+        });
+        return () => cancelAnimationFrame(id);
+    }, []);
+    return (
+        <div className="absolute top-4 right-4 text-[10px] text-amber-300 bg-slate-900/80 border border-amber-500/30 backdrop-blur px-2 py-1 rounded font-bold font-mono pointer-events-none z-[400]">
+            LOAD TEST {size} • {fps} FPS • {stats.current?.markers ?? 0} markers • {stats.current?.clusters ?? 0} clusters
+        </div>
+    );
+};
@@ -1,9 +1,20 @@
-import React, { useEffect } from 'react';
-import { useSupabaseData } from '../hooks/useSupabaseData';
+import React, { useEffect, useRef, useState } from 'react';
+import { entityStore } from '../services/entityStore';
 import { MapContainer, TileLayer, Marker, Popup, useMap } from 'react-leaflet';
 import L from 'leaflet';
 import 'leaflet/dist/leaflet.css';
 
+type LoadTestModule = typeof import('./FleetLoadTest');
+
+// Driver markers are not React children: FleetLayer keeps one Leaflet marker per driver in a
+// layer group and reads the store collections directly, so a realtime location moves its
+// marker with setLatLng instead of re-rendering the MapContainer. Only drivers inside the
+// (padded) viewport are on the map; below CLUSTER_MAX_ZOOM nearby drivers are drawn as one
+// count marker. Icons are cached per status and initials, so a marker's DOM is replaced only
+// when either changes. In dev builds `?fleetLoadTest=500` swaps the store for 500 simulated
+// vehicles and shows the frame rate (components/FleetLoadTest.tsx, imported on demand and
+// left out of production builds); scripts/fleet_map_load.py models the same load.
+
 // Fix Leaflet's default icon path issues
 delete (L.Icon.Default.prototype as any)._getIconUrl;
 L.Icon.Default.mergeOptions({
@@ -12,15 +23,30 @@ L.Icon.Default.mergeOptions({
     shadowUrl: 'https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.7.1/images/marker-shadow.png',
 });
 
-// Custom Icon generator based on driver status
-const createDriverIcon = (status: string, name: string) => {
-    let color = '#64748b'; // Off
-    if (status === 'Working') color = '#10b981';
-    if (status === 'Paused') color = '#f59e0b';
-    if (status === 'En Route' || status === 'In Progress') color = '#3b82f6';
+const CLUSTER_MAX_ZOOM = 13;  // from this zoom up every driver has its own marker
+const CLUSTER_CELL_PX = 64;   // drivers in the same square of screen pixels share a marker
+const VIEWPORT_PAD = 0.25;    // fraction of the view kept drawn around it, so a short pan shows markers at once
+
+const statusColor = (status: string) => {
+    if (status === 'Working') return '#10b981';
+    if (status === 'Paused') return '#f59e0b';
+    if (status === 'En Route' || status === 'In Progress') return '#3b82f6';
+    return '#64748b'; // Off
+};
+
+const escapeHtml = (value: any) =>
+    String(value ?? '').replace(/[&<>"']/g, c => `&#${c.charCodeAt(0)};`);
+
+const iconCache = new Map<string, L.DivIcon>();
 
+// Custom Icon generator based on driver status
+const driverIcon = (status: string, name: string) => {
     const shortName = name ? name.substring(0, 2).toUpperCase() : '?';
+    const key = `${status}|${shortName}`;
+    const cached = iconCache.get(key);
+    if (cached) return cached;
 
+    const color = statusColor(status);
     // Create an SVG string for a custom marker
     const svgIcon = `
     <svg width="40" height="40" viewBox="0 0 40 40" xmlns="http://www.w3.org/2000/svg">
@@ -28,16 +54,235 @@ const createDriverIcon = (status: string, name: string) => {
         ${status === 'Working' ? '<animate attributeName="r" values="12;16;12" dur="2s" repeatCount="indefinite" />' : ''}
       </circle>
       <circle cx="20" cy="20" r="8" fill="${color}" />
-      <text x="20" y="20" font-family="sans-serif" font-size="7" font-weight="bold" fill="white" text-anchor="middle" dominant-baseline="central">${shortName}</text>
+      <text x="20" y="20" font-family="sans-serif" font-size="7" font-weight="bold" fill="white" text-anchor="middle" dominant-baseline="central">${escapeHtml(shortName)}</text>
     </svg>`;
 
-    return L.divIcon({
+    const icon = L.divIcon({
         className: 'custom-driver-marker',
         html: svgIcon,
         iconSize: [40, 40],
         iconAnchor: [20, 20],
         popupAnchor: [0, -20]
     });
+    iconCache.set(key, icon);
+    return icon;
+};
+
+const clusterIcon = (count: number) => {
+    const key = `cluster|${count}`;
+    const cached = iconCache.get(key);
+    if (cached) return cached;
+    const size = count < 10 ? 34 : count < 50 ? 42 : 50;
+    const icon = L.divIcon({
+        className: 'fleet-cluster-marker',
+        html: `<div style="width:${size}px;height:${size}px">${count}</div>`,
+        iconSize: [size, size],
+        iconAnchor: [size / 2, size / 2]
+    });
+    iconCache.set(key, icon);
+    return icon;
+};
+
+const airportIcon = L.divIcon({
+    className: 'landmark-icon',
+    html: `<div class="bg-blue-500/20 border border-blue-500/50 p-2 rounded-full flex items-center justify-center backdrop-blur text-blue-400">
+             <span class="material-icons-round text-sm">flight</span>
+           </div>`,
+    iconSize: [32, 32],
+    iconAnchor: [16, 16]
+});
+
+export interface FleetVehicle {
+    id: string;          // driver id
+    lat: number;
+    lng: number;
+    status: string;
+    name: string;
+    updatedAt: string | null;
+}
+
+export interface LayerStats {
+    vehicles: number;
+    markers: number;
+    clusters: number;
+}
+
+/** Where the layer's vehicles come from: the store, or the load test's simulation. */
+export interface FleetSource {
+    start(onChange: (vehicles: Map<string, FleetVehicle>) => void): () => void;
+    popup(id: string): string;
+}
+
+const storeSource = (): FleetSource => {
+    const drivers = entityStore.collection('drivers');
+    const locations = entityStore.collection('driver_locations', { orderBy: 'updated_at' });
+    const shifts = entityStore.collection('shifts');
+    const vehicles = entityStore.collection('vehicles');
+    const current = new Map<string, FleetVehicle>();
+
+    return {
+        start(onChange) {
+            const rebuild = () => {
+                const byId = new Map<string, any>(drivers.getSnapshot().data.map((d: any) => [d.id, d]));
+                current.clear();
+                // Newest position first (orderBy updated_at): the first row per driver wins
+                for (const loc of locations.getSnapshot().data) {
+                    const d = byId.get(loc.driver_id);
+                    if (!d || !loc.lat || !loc.lng || current.has(d.id)) continue;
+                    current.set(d.id, {
+                        id: d.id,
+                        lat: loc.lat,
+                        lng: loc.lng,
+                        status: d.current_status || 'Off',
+                        name: d.name || '',
+                        updatedAt: loc.updated_at,
+                    });
+                }
+                onChange(current);
+            };
+            const releases = [
+                entityStore.acquire(drivers, rebuild, true),
+                entityStore.acquire(locations, rebuild, true),
+                // Read when a popup opens
+                entityStore.acquire(shifts, () => {}),
+                entityStore.acquire(vehicles, () => {}),
+            ];
+            rebuild();
+            return () => releases.forEach(release => release());
+        },
+        popup(id) {
+            const v = current.get(id);
+            if (!v) return '';
+            // Find assigned vehicle for today
+            const todayStr = new Date().toISOString().split('T')[0];
+            const shift = shifts.index('shiftsByDriverDate').get(`${id}|${todayStr}`)?.[0];
+            const assignedVehicle = shift ? vehicles.getSnapshot().data.find((x: any) => x.id === shift.vehicle_id) : null;
+            return `<div class="bg-white p-1 rounded min-w-[140px]">
+                <p class="font-bold text-slate-800 mb-0.5">${escapeHtml(v.name)}</p>
+                ${assignedVehicle ? `<p class="text-xs font-bold text-slate-600 mb-1 flex items-center gap-1">
+                    <span class="material-icons-round text-[10px]">directions_car</span>
+                    ${escapeHtml(assignedVehicle.plate)} <span class="text-[10px] text-slate-400 font-normal">(${escapeHtml(assignedVehicle.model)})</span>
+                </p>` : ''}
+                <div class="w-full h-px bg-slate-100 mb-1"></div>
+                <p class="text-xs text-slate-500 mb-0.5">Estado: <span class="font-semibold">${escapeHtml(v.status)}</span></p>
+                <p class="text-[10px] text-slate-400">Última señal: ${v.updatedAt ? new Date(v.updatedAt).toLocaleTimeString() : '—'}</p>
+            </div>`;
+        },
+    };
+};
+
+const FleetLayer = ({ source, onStats }: { source: FleetSource; onStats?: (stats: LayerStats) => void }) => {
+    const map = useMap();
+
+    useEffect(() => {
+        const layer = L.layerGroup().addTo(map);
+        const markers = new Map<string, L.Marker>(); // driver id -> marker, created on first draw
+        let shown = new Set<string>();                // driver markers on the layer
+        const clusters: L.Marker[] = [];              // reused from draw to draw
+        const clusterMembers = new Map<L.Marker, FleetVehicle[]>();
+        let vehicles = new Map<string, FleetVehicle>();
+        let frame: number | null = null;
+
+        const place = (v: FleetVehicle) => {
+            let marker = markers.get(v.id);
+            const icon = driverIcon(v.status, v.name);
+            if (!marker) {
+                marker = L.marker([v.lat, v.lng], { icon });
+                marker.bindPopup(() => source.popup(v.id), { className: 'custom-popup' });
+                markers.set(v.id, marker);
+                return marker;
+            }
+            const at = marker.getLatLng();
+            if (at.lat !== v.lat || at.lng !== v.lng) marker.setLatLng([v.lat, v.lng]);
+            if (marker.options.icon !== icon) marker.setIcon(icon);
+            return marker;
+        };
+
+        const draw = () => {
+            frame = null;
+            const bounds = map.getBounds().pad(VIEWPORT_PAD);
+            const zoom = map.getZoom();
+            const singles: FleetVehicle[] = [];
+            const groups: FleetVehicle[][] = [];
+
+            if (zoom >= CLUSTER_MAX_ZOOM) {
+                vehicles.forEach(v => { if (bounds.contains([v.lat, v.lng])) singles.push(v); });
+            } else {
+                const cells = new Map<string, FleetVehicle[]>();
+                vehicles.forEach(v => {
+                    if (!bounds.contains([v.lat, v.lng])) return;
+                    const p = map.project([v.lat, v.lng], zoom);
+                    const key = `${Math.floor(p.x / CLUSTER_CELL_PX)}:${Math.floor(p.y / CLUSTER_CELL_PX)}`;
+                    const cell = cells.get(key);
+                    if (cell) cell.push(v); else cells.set(key, [v]);
+                });
+                cells.forEach(cell => (cell.length === 1 ? singles.push(cell[0]) : groups.push(cell)));
+            }
+
+            const next = new Set<string>();
+            for (const v of singles) {
+                const marker = place(v);
+                if (!shown.has(v.id)) layer.addLayer(marker);
+                next.add(v.id);
+            }
+            shown.forEach(id => { if (!next.has(id)) layer.removeLayer(markers.get(id)!); });
+            shown = next;
+
+            groups.forEach((members, i) => {
+                const lat = members.reduce((sum, v) => sum + v.lat, 0) / members.length;
+                const lng = members.reduce((sum, v) => sum + v.lng, 0) / members.length;
+                const icon = clusterIcon(members.length);
+                let cluster = clusters[i];
+                if (!cluster) {
+                    cluster = L.marker([lat, lng], { icon });
+                    cluster.on('click', () => {
+                        const inside = clusterMembers.get(cluster!) || [];
+                        map.fitBounds(L.latLngBounds(inside.map(v => [v.lat, v.lng] as [number, number])), { padding: [40, 40], maxZoom: CLUSTER_MAX_ZOOM });
+                    });
+                    clusters.push(cluster);
+                } else {
+                    cluster.setLatLng([lat, lng]);
+                    if (cluster.options.icon !== icon) cluster.setIcon(icon);
+                }
+                if (!layer.hasLayer(cluster)) layer.addLayer(cluster);
+                clusterMembers.set(cluster, members);
+            });
+            for (let i = groups.length; i < clusters.length; i++) {
+                if (layer.hasLayer(clusters[i])) layer.removeLayer(clusters[i]);
+                clusterMembers.delete(clusters[i]);
+            }
+
+            // Drivers no longer on the map at all
+            markers.forEach((marker, id) => {
+                if (!vehicles.has(id)) {
+                    layer.removeLayer(marker);
+                    markers.delete(id);
+                }
+            });
+
+            onStats?.({ vehicles: vehicles.size, markers: shown.size, clusters: groups.length });
+        };
+
+        // Store flushes and map moves in the same frame draw once
+        const scheduleDraw = () => {
+            if (frame === null) frame = requestAnimationFrame(draw);
+        };
+
+        const stop = source.start(next => {
+            vehicles = next;
+            scheduleDraw();
+        });
+        map.on('moveend zoomend', scheduleDraw);
+
+        return () => {
+            stop();
+            map.off('moveend zoomend', scheduleDraw);
+            if (frame !== null) cancelAnimationFrame(frame);
+            layer.remove();
+        };
+    }, [map, source, onStats]);
+
+    return null;
 };
 
 const RecenterControls = ({ center }: { center: [number, number] }) => {
@@ -59,11 +304,29 @@ const RecenterControls = ({ center }: { center: [number, number] }) => {
 const defaultCenter: [number, number] = [38.2822, -0.5582];
 const zoomLevel = 11;
 
-export const FleetMap: React.FC = () => {
-    const { data: drivers } = useSupabaseData('drivers');
-    const { data: locations } = useSupabaseData('driver_locations', { orderBy: 'updated_at' });
-    const { data: shifts } = useSupabaseData('shifts');
-    const { data: vehicles } = useSupabaseData('vehicles');
+const loadTestSize = () => {
+    if (!import.meta.env.DEV || typeof window === 'undefined') return 0;
+    const value = Number(new URLSearchParams(window.location.search).get('fleetLoadTest'));
+    return Number.isFinite(value) && value > 0 ? Math.floor(value) : 0;
+};
+
+// Memoized: nothing the parent view re-renders for reaches the map
+export const FleetMap = React.memo(() => {
+    const [loadTest] = useState(loadTestSize);
+    const [source, setSource] = useState<FleetSource | null>(() => (loadTest ? null : storeSource()));
+    const [LoadTestOverlay, setLoadTestOverlay] = useState<LoadTestModule['LoadTestOverlay'] | null>(null);
+    const stats = useRef<LayerStats | null>(null);
+    const [onStats] = useState(() => (loadTest ? (next: LayerStats) => { stats.current = next; } : undefined));
+
+    useEffect(() => {
+        // import.meta.env.DEV is false in production builds, so the chunk is never emitted
+        if (import.meta.env.DEV && loadTest) {
+            import('./FleetLoadTest').then(module => {
+                setSource(module.loadTestSource(loadTest));
+                setLoadTestOverlay(() => module.LoadTestOverlay);
+            });
+        }
+    }, [loadTest]);
 
     return (
         <div className="w-full h-full relative overflow-hidden rounded-2xl isolate">
@@ -81,53 +344,14 @@ export const FleetMap: React.FC = () => {
                 <RecenterControls center={defaultCenter} />
 
                 {/* Alicante Airport Landmark */}
-                <Marker position={[defaultCenter[0], defaultCenter[1]]} icon={L.divIcon({
-                    className: 'landmark-icon',
-                    html: `<div class="bg-blue-500/20 border border-blue-500/50 p-2 rounded-full flex items-center justify-center backdrop-blur text-blue-400">
-                             <span class="material-icons-round text-sm">flight</span>
-                           </div>`,
-                    iconSize: [32, 32],
-                    iconAnchor: [16, 16]
-                })}>
+                <Marker position={defaultCenter} icon={airportIcon}>
                     <Popup className="custom-popup">
                         <div className="font-bold text-slate-800">Alicante Airport (ALC)</div>
                     </Popup>
                 </Marker>
 
                 {/* Driver Markers from Real Geolocation */}
-                {drivers?.map((d: any) => {
-                    const loc = locations?.find((l: any) => l.driver_id === d.id);
-
-                    if (loc && loc.lat && loc.lng) {
-                        const position: [number, number] = [loc.lat, loc.lng];
-                        const icon = createDriverIcon(d.current_status || 'Off', d.name || '');
-
-                        // Find assigned vehicle for today
-                        const todayStr = new Date().toISOString().split('T')[0];
-                        const shift = shifts?.find((s: any) => s.driver_id === d.id && s.date === todayStr);
-                        const assignedVehicle = shift ? vehicles?.find((v: any) => v.id === shift.vehicle_id) : null;
-
-                        return (
-                            <Marker key={d.id} position={position} icon={icon}>
-                                <Popup className="custom-popup">
-                                    <div className="bg-white p-1 rounded min-w-[140px]">
-                                        <p className="font-bold text-slate-800 mb-0.5">{d.name}</p>
-                                        {assignedVehicle && (
-                                            <p className="text-xs font-bold text-slate-600 mb-1 flex items-center gap-1">
-                                                <span className="material-icons-round text-[10px]">directions_car</span>
-                                                {assignedVehicle.plate} <span className="text-[10px] text-slate-400 font-normal">({assignedVehicle.model})</span>
-                                            </p>
-                                        )}
-                                        <div className="w-full h-px bg-slate-100 mb-1"></div>
-                                        <p className="text-xs text-slate-500 mb-0.5">Estado: <span className="font-semibold">{d.current_status}</span></p>
-                                        <p className="text-[10px] text-slate-400">Última señal: {new Date(loc.updated_at).toLocaleTimeString()}</p>
-                                    </div>
-                                </Popup>
-                            </Marker>
-                        );
-                    }
-                    return null;
-                })}
+                {source && <FleetLayer source={source} onStats={onStats} />}
             </MapContainer>
 
             {/* Map Controls Overlay over the map wrapper */}
@@ -137,6 +361,8 @@ export const FleetMap: React.FC = () => {
                 </button>
             </div>
 
+            {LoadTestOverlay && <LoadTestOverlay size={loadTest} stats={stats} />}
+
             <div className="absolute bottom-4 right-4 text-[10px] text-blue-400 bg-blue-900/30 border border-blue-500/30 backdrop-blur px-2 py-1 rounded font-bold uppercase tracking-widest pointer-events-none z-[400]">
                 LIVE GPS DATA • LEAFLET MAPS
             </div>
@@ -154,7 +380,19 @@ export const FleetMap: React.FC = () => {
                 .custom-driver-marker svg {
                     filter: drop-shadow(0 4px 6px rgba(0,0,0,0.3));
                 }
+                .fleet-cluster-marker div {
+                    display: flex;
+                    align-items: center;
+                    justify-content: center;
+                    border-radius: 9999px;
+                    background: rgba(59, 130, 246, 0.85);
+                    border: 3px solid rgba(191, 219, 254, 0.6);
+                    color: white;
+                    font: bold 12px sans-serif;
+                    box-shadow: 0 4px 6px rgba(0,0,0,0.3);
+                    cursor: pointer;
+                }
             `}</style>
         </div>
     );
-};
+});
@@ -1,6 +1,7 @@
 import React from 'react';
 import { ViewState, Language } from '../types';
 import { supabase } from '../services/supabase';
+import { clearLocalCache } from '../services/localCache';
 import { Logo } from './ui/Logo';
 
 interface SidebarProps {
@@ -102,6 +103,7 @@ export const Sidebar: React.FC<SidebarProps> = ({ currentView, onChangeView, lan
 
   const handleLogout = async () => {
     try {
+      await clearLocalCache(); // cached table snapshots of this user
       await supabase.auth.signOut();
       window.location.href = '/'; // Force redirect to root
     } catch (error) {
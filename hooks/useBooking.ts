@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { supabase } from '../services/supabase';
 import { jsPDF } from 'jspdf';
 import { useToast } from '../components/ui/Toast';
-import { calculateAvailableAt, estimateTravelTime } from '../services/autoAssignment';
+import { capacityEngine } from '../services/capacityEngine';
 import { generateVoucherPDF } from '../utils/generateVoucherPDF';
 
 const LOGO_BASE64 = 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAZgAAAJkCAYAAAAsgzeqAAAQAElEQVR4AeydB2AUxffHt1zvufQGoffepYWqFEV/CogIYgMbSG8qCXaKgKAo2FD+NrCjgIqCIr2X0FsIJKRfv9v+fxuMRkhCcmmX5IWbbJt58+bzZuc7O5sEisAvJIAEkAASQAIVQAAFpgKgokkkgASQABIgCBQY7AVIwF8CWA4JIIFiCaDAFIsHLyIBJIAEkIC/BFBg/CWH5ZAAEkACSKBYAsUITLHl8CISQAJIAAkggWIJoMAUiwcvIgEkgASQgL8EUGD8JYflkEAxBPASEkAC+FNk2AeQABJAAkigggjgE0wFgUWzSAAJIIHaTsA/gant1LD9SAAJIAEkcEsCKDC3RIQZkAASQAJIwB8CKDD+UMMySMB/AlgSCdQaAigwtSbU2FAkgASQQOUSQIGpXN5YGxJAAkig1hAod4GpNeSwoUgACSABJFAsARSYYvHgRSSABJAAEvCXAAqMv+SwHBIodwJoEAnULAIoMDUrntgaJIAEkEDAEECBCZhQoCNIAAkggZpFoDIFpmaRw9YgASSABJBAsQRQYIrFgxeRABJAAkjAXwIoMP6Sw3JIoDIJYF1IoBoSQIGphkFDl5EAEkAC1YEACkx1iBL6iASQABKohgQCRGCqITl0GQkgASSABIolgAJTLB68iASQABJAAv4SQIHxlxyWQwIBQgDdQAKBSgAFJlAjg34hASSABKo5ARSYah5AdB8JIAEkEKgEAl9gApUc+oUEkAASQALFEkCBKRYPXkQCSAAJIAF/CaDA+EsOyyGBwCeAHiKBKiWAAlOl+LFyJIAEkEDNJYACU3Njiy1DAkgACVQpgWotMFVKDitHAkgACSCBYgmgwBSLBy8iASSABJCAvwRQYPwlh+WQQLUmgM4jgYongAJT8YyxBiSABJBArSSAAlMrw46NRgJIAAlUPIGaKjAVTw5rQAJIAAkggWIJoMAUiwcvIgEkgASQgL8EUGD8JYflkEBNJYDtQgLlRAAFppxAohkkgASQABL4LwEUmP/ywCMkgASQABIoJwK1UGDKiRyaQQJIAAkggWIJoMAUiwcvIgEkgASQgL8EUGD8JYflkEAtJIBNRgKlIYACUxpamBcJIAEkgARKTAAFpsSoMCMSQAJIAAmUhgAKTEFauI8EkAASQALlRgAFptxQoiEkgASQABIoSAAFpiAN3EcCSMBfAlgOCdxEAAXmJiR4AgkgASSABMqDAApMeVBEG0gACSABJHATARSYm5AUfgLPIgEkgASQQOkIoIoMCUjhfmRgJIAAkggRISQIEpISjMhgSQgL8EsFxtJYACU1sjj+1GAkgACVQwARSYCgaM5pEAEkACtZUACkzZI48WkAASQAJIoBACKDCFQMFTSAAJIAEkUHYCKDBlZ4gWkAAS8JcAlqvRBFBganR4sXFIAAkggaojgAJTdeyxZiSABJBAjSaAAlOh4UXjSAAJIIHaSwAFpvbGHluOBJAAEqhQAigwFYoXjSMBJOAvASxX/QmgwFT/GGILkAASQAIBSQAFJiDDgk4hASSABKo/ARSYqooh1osEkAASqOEEUGBqeICxeUgACSCBqiKAAlNV5LFeJIAE/CWA5aoJARSYahIodBMJIAEkUN0IoMBUt4ihv0gACSCBakIABSYAA4UuIQEkgARqAgEUmJoQRWwDEkACSCAACaDABGBQ0CUkgAT8JYDlAokACkwgRQN9QQJIAAnUIAIoMDUomNgUJIAEkEAgEUCBCaRo3NoXzIEEkAASqDYEUGCqTajQUSSABJBA9SKAAlO94oXeIgEk4C8BLFfpBFBgKh05VogEkAASqB0EUGBqR5yxlUgACSCBSieAAlPpyCuqQrSLBJAAEggsAigwgRUP9AYJIAEkUGMIoMDUmFBiQ5AAEvCXAJarGAIoMBXDFa0iASSABGo9ARSYWt8FEAASQAJIoGIIoMBUDNfAsoreIAEkgASqgAAKTBVAxyqRABJAArWBAApMbYgythEJIAF/CWC5MhBAgSkDPCyKBJAAEkACRRNAgSmaDV5BAkgACSCBMhBAgSkDvJpQFNuABJAAEqgoAigwFUUW7SIBJIAEajkBFJha3gGw+UgACfhLAMvdigAKzK0I4XUkgASQABLwiwAKjF/YsBASQAJIAAncigAKzK0I1d7r2HIkgASQQJkIoMCUCR8WRgJIAAkggaIIoMAURQbPIwEkgAT8JYDl8gigwORhwG9IAAkgASRQ3gRQYMqbKNpDAkgACSCBPAIoMHkY8FvpCGBuJIAEkMCtCaDA3JoR5kACSAAJIAE/CKDA+AENiyABJIAE/CVQm8qhwNSmaGNbkQASQAKVSAAFphJhY1VIAAkggdpEAAWmNkW7MtqKdSABJIAE/iaAAvM3CNwgASSABJBA+RJAgSlfnmgNCSABJOAvgRpXDgWmxoUUG4QEkAASCAwCKDCBEQf0AgkgASRQ4wigwNS4kAZug9AzJIAEahcBFJjaFW9sLRJAAkig0gigwFQaaqwICSABJOAvgepZDgWmesYNvUYCSAAJBDwBFJiADxE6iASQABKongRQYKpn3Gqa19geJIAEaiABFJgaGFRsEhJAAkggEAigwARCFNAHJIAEkIC/BAK4HApMAAcHXUMCSAAJVGcCKDDVOXroOxJAAkgggAmgwARwcNA1mQAmJIAEqisBFJjqGjn0GwkgASQQ4ARQYAI8QOgeEkACSMBfAlVdDgWmqiOA9SMBJIAEaigBFJgaGlhsFhJAAkigqgmgwFR1BLB+/wlgSSSABAKaAApMQIcHnUMCSAAJVF8CKDDVN3boORJAAkjAXwKVUg4FplIwYyVIAAkggdpHAAWm9sUcW4wEkAASqBQCKDCVghkrqWwCWB8SQAJVTwAFpupjgB4gASSABGokARSYGhlWbBQSQAJIwF8C5VcOBab8WKIlJIAEkAASKEAABaYADNxFAkgACSCB8iOAAlN+LNFS9SCAXiIBJFBJBFBgKgk0VoMEkAASqG0EUGBqW8SxvUgACSABfwmUshwKTCmBYXYkgASQABIoGQEUmJJxwlxIAAkgASRQSgIoMKUEhtlrMgFsGxJAAuVJAAWmPGmiLSSABJAAEviHAArMPyhwBwkgASSABPwlUFg5FJjCqOA5JIAEkAASKDMBFJgyI0QDSAAJIAEkUBgBFJjCqOA5JHAjATxGAkig1ARQYEqNDAsgASSABJBASQigwJSEEuZBAkgACSCBUhP4W2BKXQ4LIAEkgASQABIolgAKTLF48CISQAJIAAn4SwAFxl9yWA4J/E0AN0gACRROAAWmcC54FgkgASSABMpIAAWmjACxOBJAAkgACRRO4NYCU3g5PIsEkAASQAJIoFgCKDDF4sGLSAAJIAEk4C8BFBh/yWE5JHBrApgDCdRqAigwtTr82HgkgASQQMURQIGpOLZoGQkgASRQqwmUSWBqNTlsPBJAAkgACRRLAAWmWDx4EQkgASSABPwlgALjLzkshwTKRAALI4GaTwAFpubHGFuIBJAAEqgSAigwVYIdK0UCSAAJ1HwCFSUwNZ8cthAJIAEkgASKJYACUywevIgEkAASQAL+EkCB8ZcclkMCFUUA7SKBGkIABaaGBBKbgQSQABIINAIoMIEWEfQHCSABJFBDCFSBwNQQctgMJIAEkAASKJYACkyxePAiEkACSAAJ+EsABcZfclgOCVQBAawSCVQnAigw1Sla6CsSQAJIoBoRQIGpRsFCV5EAEkAC1YlAYAlMdSKHviIBJIAEkECxBFBgisWDF5EAEkACSMBfAigw/pLDckggsAigN0gg4AigwARcSNAhJIAEkEDNIIACUzPiiK1AAkgACQQcgWojMAFHDh1CAkgACSCBYgmgwBSLBy8iASSABJCAvwRQYPwlh+WQQLUhgI4igaohgAJTNdyxViSABJBAjSeAAlPjQ4wNRAJIAAlUDYGaIDBVQw5rRQJIAAkggWIJoMAUiwcvIgEkgASQgL8EUGD8JYflkEBNIIBtQAIVSAAFpgLhomkkgASQQG0mgAJTm6OPbUcCSAAJVCCBGi4wFUgOTSMBJIAEkECxBFBgisWDF5EAEkACSMBfAigw/pLDckighhPA5iGBshJAgSkrQSyPBJAAEkAChRJAgSkUC55EAkgACSCBshKovQJTVnJYHgkgASSABIolgAJTLB68iASQABJAAv4SQIHxlxyWQwK1lwC2HAmUiAAKTIkwYSYkgASQABIoLQEUmNISw/xIAAkgASRQIgIoMIVgwlNIAAkgASRQdgIoMGVniBaQABJAAkigEAIoMIVAwVNIAAn4SwDLIYF/CaDA/MsC95AAEkACSKAcCaDAlCNMNIUEkAASQAL/EkCB+ZdFSfYwDxJAAkgACZSQAApMCUFhNiSABJAAEigdARSY0vHC3EgACfhLAMvVOgIoMLUu5NhgJIAEkEDlEECBqRzOWAsSQAJIoNYRQIEpt5CjISSABJAAEihIAAWmIA3cRwJIAAkggXIjgAJTbijREBJAAv4SwHI1kwAKTM2MK7YKCSABJFDlBFBgqjwE6AASQAJIoGYSQIGpjLhiHUgACSCBWkgABaYWBh2bjASQABKoDAIoMJVBGetAAkjAXwJYrhoTQIGpxsFD15EAEkACgUwABSaQo4O+IQEkgASqMQEUmCoOHlaPBJAAEqipBFBgampksV1IAAkggSomgAJTxQHA6pEAEvCXAJYLdAIoMIEeIfQPCSABJFBNCaDAVNPAodtIAAkggUAngAITuBFCz5AAEkAC1ZoACky1Dh86jwSQABIIXAIoMIEbG/QMCSABfwlguUoggAJTCZCxCiSABJBAbSSAAlMbo45tRgJIAAlUAgEUmEqAXBVVYJ1IAAkggaomgAJT1RHA+pEAEkACNZQACkwNDSw2CwkgAX8JYLnyIoACU14k0Q4SQAJIAAn8hwAKzH9w4AESQAJIAAmUFwEUmPIiWX3soKdIAAkggUohgAJTKZixEiSABJBA7SOAAlP7Yo4tRgJIwF8CWK5UBFBgSoULMyMBJIAEkEBJCaDAlJQU5kMCSAAJIIFSEUCBKRWump4Z24cEkAASKD8CKDDlxxItIQEkgASQQAECKDAFYOAuEkACSMBfAljuZgIoMDczwTNIAAkgASRQDgRQYMoBIppAAkgACSCBmwmgwNzMBM8gASSABPwlgOUKEECBKQADd5EAEkACSKD8CKDAlB9LtIQEkAASQAIFCKDAFICBu7cmgDmQABJAAiUlgAJTUlKYDwkgASSABEpFAAWmVLgwMxJAAkjAXwK1rxwKTO2LObYYCSABJFApBFBgKgUzVoIEkAASqH0EUGBqX8wrqsVoFwkgASTwHwIoMP/BgQdIAAkgASRQXgRQYMqLJNpBAkgACfhLoIaWQ4GpoYHFZiEBJIAEqpoACkxVRwDrRwJIAAnUUAIoMDU0sIHVLPQGCSCB2kgABaY2Rh3bjASQABKoBAIoMJUAGatAAkgACfhLoDqXQ4GpztFD35EAEkACAUwABSaAg4OuIQEkgASqMwEUmOocvZrgO7YBCSCBGksABabGhhYbhgSQABKoWgIoMFXLH2tHAkgACfhLIODLocAEfIjQQSSABJBA9SSAAlM944ZeIwEkgAQCngAKTMCHqPY6iC1HAkigehNAgane8UPvkQASQAIBSwAFJmBDg44hASSABPwlEBjlUGACIw7oBRJAAkigxhFAgalxIcUGIQEkgAQCgwAKTGDEAb0oHQHMjQSQQDUggAJTDYKELiIBJIAEqiMBFJjqGDX0GQkgASTgL4FKLIcCU4mwsSokgASQQG0igAJTm6KNbUUCSAAJVCIBFJhKhI1VVQYBrAMJIIFAIYACEyiRQD+QABJAAjWMAApMDQsoNgcJIAEk4C+B8i6HAlPeRNEeEkACSAAJ5BFAgcnDgN+QABJAAkigvAmgwJQ3UbQXuATQMySABCqVAApMpeLGypAAEkACtYcACkztiTW2FAkgASTgLwG/yqHA+IUNCyEBJIAEkMCtCKDA3IoQXkcCSAAJIAG/CKDA+IUNC9U0AtgeJIAEyp8ACkz5M0WLSAAJIAEkAARQYAACfpAAEkACSMBfAkWXQ4Epmg1eQQJIAAkggTIQQIEpAzwsigSQABJAAkUTQIEpmg1eQQIyAUxIAAn4SQAFxk9wWAwJIAEkgASKJ4ACUzwfvIoEkAASQAJ+EqD8LIfFkAASQAJIAAkUSwCfYIrFgxeRABJAAkjAXwIoMP6Sw3JIgEAESAAJFEcABaY4OngNCSABJIAE/CaAAuM3OiyIBJAAEkACxRH4fwAAAP//XLvycQAAAAZJREFUAwD3RIprwUyofQAAAABJRU5ErkJggg==';
@@ -295,96 +295,10 @@ export const useBooking = (language: string = 'es') => {
             const { data: { session } } = await supabase.auth.getSession();
             const userId = session?.user?.id || null;
 
-            // 1. Fetch total fleet size
-            let TOTAL_FLEET = 12;
-            const { data: vehicles } = await supabase.from('vehicles')
-                .select('id, status')
-                .eq('status', 'Operativo');
-            if (vehicles && vehicles.length > 0) {
-                TOTAL_FLEET = vehicles.length;
-            }
-
-            // Date setup
-            const todayStr = formData.date;
-            const yesterdayDate = new Date(`${todayStr}T12:00:00Z`); // use midday safely
-            yesterdayDate.setDate(yesterdayDate.getDate() - 1);
-            const yesterdayStr = yesterdayDate.toISOString().split('T')[0];
-
-            // Setup common helpers
-            const parseShiftDateTime = (d: string, t: string) => {
-                const dateStr = typeof d === 'string' ? d.split('T')[0] : new Date(d).toISOString().split('T')[0];
-                return new Date(`${dateStr}T${t}`).getTime();
-            };
-
-            const validateAvailabilityForTime = async (checkDate: string, checkTime: string, requestedOrigin: string): Promise<boolean> => {
-                const checkTimeMs = parseShiftDateTime(checkDate, checkTime);
-                let dynamicCapacity = TOTAL_FLEET;
-
-                // 2. Fetch Shifts (Today + Yesterday)
-                const { data: activeShifts } = await supabase
-                    .from('shifts')
-                    .select('*')
-                    .in('date', [checkDate, yesterdayStr])
-                    .neq('type', 'Libre')
-                    .neq('type', 'OFF');
-
-                // If shifts exist for the targeted date, override TOTAL_FLEET
-                const hasShiftsToday = activeShifts?.some(s => s.date === checkDate);
-                if (hasShiftsToday && activeShifts) {
-                    const shiftsThisDay = activeShifts.filter((s: any) => s.date === checkDate);
-                    const uniqueVehicles = new Set(shiftsThisDay.map((s: any) => s.vehicle_id).filter(Boolean));
-                    const uniqueDrivers = new Set(shiftsThisDay.map((s: any) => s.driver_id).filter(Boolean));
-                    const calculatedCapacity = Math.max(uniqueVehicles.size, uniqueDrivers.size, 1);
-                    dynamicCapacity = Math.min(calculatedCapacity, TOTAL_FLEET);
-                }
-
-                if (dynamicCapacity === 0) {
-                    return false; // Automatically reject if shift capacity is strictly zero but we have shifts
-                }
-
-                // 3. Fetch Overlapping Bookings
-                const { data: bookingsAtDate } = await supabase
-                    .from('bookings')
-                    .select('*')
-                    .in('pickup_date', [checkDate, yesterdayStr])
-                    .neq('status', 'Cancelled')
-                    .neq('status', 'Completed');
-
-                let overlappingCount = 0;
-                if (bookingsAtDate) {
-                    bookingsAtDate.forEach((b: any) => {
-                        if (!b.pickup_time) return;
-                        const bStartStr = typeof b.pickup_date === 'string' ? b.pickup_date.split('T')[0] : new Date(b.pickup_date).toISOString().split('T')[0];
-                        const bStartMs = new Date(`${bStartStr}T${b.pickup_time}`).getTime();
-                        
-                        try {
-                            const bDropoffMs = calculateAvailableAt(b).getTime();
-                            
-                            let deadheadMs = 0;
-                            if (requestedOrigin && b.destination) {
-                                const deadheadMinutes = estimateTravelTime(b.destination, requestedOrigin);
-                                deadheadMs = deadheadMinutes * 60000;
-                            }
-                            
-                            const bEndMs = bDropoffMs + deadheadMs;
-
-                            if (checkTimeMs >= bStartMs && checkTimeMs < bEndMs) {
-                                console.log(`Overlap found: ${b.id} ${b.pickup_time} -> End: ${new Date(bEndMs).toISOString()}`);
-                                overlappingCount++;
-                            }
-                        } catch (e) {
-                            console.error('Error calculating end time', e);
-                            // Safe fallback
-                            if (checkTimeMs >= bStartMs && checkTimeMs < bStartMs + 60*60*1000) {
-                                overlappingCount++;
-                            }
-                        }
-                    });
-                }
-
-                console.log(`validate: checkDate=${checkDate} checkTime=${checkTime} | dynCap=${dynamicCapacity} | overlappingCount=${overlappingCount}`);
-                return overlappingCount < dynamicCapacity;
-            };
+            // Availability comes from the shared occupancy timeline (loaded once per day,
+            // kept current by realtime), not from a query + scan per check
+            const validateAvailabilityForTime = (checkDate: string, checkTime: string, requestedOrigin: string) =>
+                capacityEngine.isAvailable(checkDate, checkTime, requestedOrigin);
 
             // Run outbound validation
             const isOutboundAvailable = await validateAvailabilityForTime(formData.date, formData.time, formData.origin);
@@ -587,6 +501,9 @@ export const useBooking = (language: string = 'es') => {
         }
     };
 
+    // Free start times of a day for a service from `origin` (HH:MM every 15 min)
+    const getFreeSlots = (date: string, origin: string) => capacityEngine.freeSlots(date, origin);
+
     return {
         step, setStep,
         loading,
@@ -597,6 +514,7 @@ export const useBooking = (language: string = 'es') => {
         maxCapacity,
         handleChange,
         submitBooking,
+        getFreeSlots,
         isLoggedIn
     };
 };
@@ -222,19 +222,14 @@ export function useEfectivo() {
                 setUploadHistory(history);
             }
 
-            const [
-                { data: ibData },
-                { data: uberData },
-                { data: vgdData },
-                { data: entregaData },
-                { data: expenseData }
-            ] = await Promise.all([
-                supabase.from('efectivo_initial_balances').select('*').eq('cycle_id', cycleId),
-                supabase.from('efectivo_uber_records').select('*').eq('cycle_id', cycleId),
-                supabase.from('efectivo_vgd_records').select('*').eq('cycle_id', cycleId),
-                supabase.from('efectivo_entrega_records').select('*').eq('cycle_id', cycleId),
-                supabase.from('efectivo_expense_records').select('*').eq('cycle_id', cycleId),
-            ]);
+            // Running totals are maintained per (cycle, driver) by database triggers
+            // (see migration efectivo_driver_totals), so this is one row per driver
+            // no matter how many uploads the cycle has accumulated.
+            const { data: totalsData, error: totalsError } = await supabase
+                .from('efectivo_driver_totals')
+                .select('*')
+                .eq('cycle_id', cycleId);
+            if (totalsError) throw totalsError;
 
             const drivers = new Set<string>();
             const initialBalances: Record<string, number> = {};
@@ -243,20 +238,17 @@ export function useEfectivo() {
             const entregaTotals: Record<string, number> = {};
             const expenseTotals: Record<string, number> = {};
 
-            const mapData = (data: any[], totalsMap: Record<string, number>, valueKey: string) => {
-                if (!data) return;
-                data.forEach(item => {
-                    const dName = resolveName(item.driver_name, aliasesData);
-                    drivers.add(dName);
-                    totalsMap[dName] = (totalsMap[dName] || 0) + (Number(item[valueKey]) || 0);
-                });
-            };
-
-            mapData(ibData || [], initialBalances, 'balance');
-            mapData(uberData || [], uberTotals, 'cash_collected');
-            mapData(vgdData || [], vgdTotals, 'cash_collected');
-            mapData(entregaData || [], entregaTotals, 'amount');
-            mapData(expenseData || [], expenseTotals, 'amount');
+            // Aliases are resolved here rather than in the database so that renaming
+            // an alias never requires rewriting the stored totals.
+            (totalsData || []).forEach((row: any) => {
+                const dName = resolveName(row.driver_name, aliasesData);
+                drivers.add(dName);
+                initialBalances[dName] = (initialBalances[dName] || 0) + (Number(row.saldo_inicial) || 0);
+                uberTotals[dName] = (uberTotals[dName] || 0) + (Number(row.uber_cash_collected) || 0);
+                vgdTotals[dName] = (vgdTotals[dName] || 0) + (Number(row.vgd_cash_collected) || 0);
+                entregaTotals[dName] = (entregaTotals[dName] || 0) + (Number(row.cash_delivered) || 0);
+                expenseTotals[dName] = (expenseTotals[dName] || 0) + (Number(row.gastos) || 0);
+            });
 
             const results: EfectivoReconciliation[] = Array.from(drivers).sort().map(d => {
                 const ib = initialBalances[d] || 0;
@@ -1,73 +1,28 @@
-import { useState, useEffect } from 'react';
+import { useCallback, useSyncExternalStore } from 'react';
 import { supabase } from '../services/supabase';
-
+import { entityStore, IndexName, WindowOptions } from '../services/entityStore';
+
+// Views read from the shared entity store (services/entityStore.ts): every instance of the
+// same query sees the same rows, loaded once. With `realtime` the table's channel stays open
+// while the view is mounted (one per table, however many views ask); without it the rows
+// are revalidated when a view mounts.
+// With `window`, only a day range / status subset is loaded, one keyset page at a time
+// (`loadMore`, `hasMore`).
 export function useSupabaseData<T>(tableName: string, options: {
     select?: string,
     orderBy?: string,
     ascending?: boolean,
     limit?: number,
-    realtime?: boolean
+    realtime?: boolean,
+    window?: WindowOptions
 } = {}) {
-    const { select = '*', orderBy = 'created_at', ascending = false, limit, realtime = false } = options;
-    const [data, setData] = useState<T[]>([]);
-    const [loading, setLoading] = useState(true);
-    const [error, setError] = useState<string | null>(null);
-
-    useEffect(() => {
-        fetchData();
-
-        let subscription: any;
-        if (realtime) {
-            subscription = supabase
-                .channel(`public:${tableName}`)
-                .on('postgres_changes', { event: '*', schema: 'public', table: tableName }, (payload) => {
-                    console.log(`Realtime update for ${tableName}:`, payload);
-                    if (payload.eventType === 'INSERT') {
-                        setData((prev) => [payload.new as T, ...prev]);
-                    } else if (payload.eventType === 'UPDATE') {
-                        setData((prev) => prev.map((item: any) => (item.id === payload.new.id ? payload.new : item)));
-                    } else if (payload.eventType === 'DELETE') {
-                        setData((prev) => prev.filter((item: any) => item.id !== payload.old.id));
-                    }
-                })
-                .subscribe();
-        }
-
-        const handleGlobalRefresh = () => {
-            fetchData();
-        };
-        window.addEventListener('app:refresh', handleGlobalRefresh);
-
-        return () => {
-            if (subscription) {
-                supabase.removeChannel(subscription);
-            }
-            window.removeEventListener('app:refresh', handleGlobalRefresh);
-        };
-    }, [tableName, select, orderBy, ascending, limit, realtime]);
+    const { select = '*', orderBy = 'created_at', ascending = false, limit, realtime = false, window: windowOptions } = options;
+    const collection = entityStore.collection(tableName, { select, orderBy, ascending, limit, window: windowOptions });
+    const subscribe = useCallback((listener: () => void) => entityStore.acquire(collection, listener, realtime), [collection, realtime]);
+    const { data, loading, error, hasMore } = useSyncExternalStore(subscribe, collection.getSnapshot);
 
     async function fetchData() {
-        try {
-            setLoading(true);
-            let query = supabase
-                .from(tableName)
-                .select(select)
-                .order(orderBy, { ascending });
-
-            if (limit) {
-                query = query.limit(limit);
-            }
-
-            const { data, error } = await query;
-
-            if (error) throw error;
-            setData(data as T[]);
-        } catch (err: any) {
-            console.error(`Error fetching ${tableName}:`, err);
-            setError(err.message);
-        } finally {
-            setLoading(false);
-        }
+        await collection.fetch();
     }
 
     async function addItem(item: any) {
@@ -80,10 +35,8 @@ export function useSupabaseData<T>(tableName: string, options: {
                 .single();
 
             if (error) throw error;
-            // State update is handled by realtime subscription if enabled
-            if (!realtime) {
-                setData((prev) => [newItem as T, ...prev]);
-            }
+            // Every view of the table sees it now; the realtime echo is a no-op
+            entityStore.applyLocal(tableName, { upsert: newItem });
             return newItem;
         } catch (err: any) {
             console.error(`Error adding to ${tableName}:`, err);
@@ -101,10 +54,7 @@ export function useSupabaseData<T>(tableName: string, options: {
                 .single();
 
             if (error) throw error;
-            // State update is handled by realtime subscription if enabled
-            if (!realtime) {
-                setData((prev) => prev.map((item: any) => (item.id === id ? updatedItem : item)));
-            }
+            entityStore.applyLocal(tableName, { upsert: updatedItem });
             return updatedItem;
         } catch (err: any) {
             console.error(`Error updating ${tableName}:`, err);
@@ -120,15 +70,28 @@ export function useSupabaseData<T>(tableName: string, options: {
                 .eq('id', id);
 
             if (error) throw error;
-            // State update is handled by realtime subscription if enabled
-            if (!realtime) {
-                setData((prev) => prev.filter((item: any) => item.id !== id));
-            }
+            entityStore.applyLocal(tableName, { removeId: id });
         } catch (err: any) {
             console.error(`Error deleting from ${tableName}:`, err);
             throw err;
         }
     }
 
-    return { data, loading, error, refresh: fetchData, addItem, updateItem, deleteItem };
+    async function loadMore() {
+        await collection.loadMore();
+    }
+
+    return { data: data as T[], loading, error, refresh: fetchData, addItem, updateItem, deleteItem, loadMore, hasMore };
+}
+
+/**
+ * A derived index of the shared store, e.g. useEntityIndex('bookingsByDate').get('2026-10-19').
+ * Loads the underlying table like useSupabaseData and returns a new Map after each change.
+ */
+export function useEntityIndex(name: IndexName, options: { realtime?: boolean } = {}): Map<string, any[]> {
+    const { realtime = false } = options;
+    const collection = entityStore.indexCollection(name);
+    const subscribe = useCallback((listener: () => void) => entityStore.acquire(collection, listener, realtime), [collection, realtime]);
+    const getIndex = useCallback(() => collection.index(name), [collection, name]);
+    return useSyncExternalStore(subscribe, getIndex);
 }
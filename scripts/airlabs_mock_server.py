@@ -0,0 +1,124 @@
+"""Local stand-in for the AirLabs v9 API (flights + schedules).
+
+    python scripts/airlabs_mock_server.py                     # http://127.0.0.1:8090/api/v9
+    python scripts/airlabs_mock_server.py --latency 250 --jitter 150 --radar-rate 0.6
+
+Point sync-flights at it with AIRLABS_BASE_URL, e.g. `supabase functions serve` with
+AIRLABS_BASE_URL=http://host.docker.internal:8090/api/v9, or drive it directly with
+scripts/flight_sync_bench.py.
+
+Answers GET /api/v9/flights (radar) and /api/v9/schedules for any flight_iata with
+data derived from the flight number, so every run sees the same flights: arrival at
+arr_iata (ALC by default) within the next 12 hours, some delayed, some early. Only
+--radar-rate of the flights are airborne and returned by the radar, and half of those
+come without arrival times, which makes the caller fall back to /schedules like the
+real API does for flights that have not been tracked yet. The api_key is not checked.
+"""
+import argparse
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ORIGINS = ['MAN', 'LGW', 'STN', 'BHX', 'DUB', 'AMS', 'BRU', 'CRL', 'OSL', 'ARN', 'CPH', 'HAM', 'DUS', 'BCN', 'MAD']
+stats = {'requests': 0, 'flights': 0, 'schedules': 0}
+
+
+def flight_profile(flight_iata, arr_iata, radar_rate):
+    """Deterministic arrival for a flight number, anchored to the current hour."""
+    seed = int(hashlib.sha1(flight_iata.encode('utf-8')).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    scheduled = hour + timedelta(minutes=rng.randrange(-60, 12 * 60, 5))
+    delay = rng.choice([0, 0, 0, 0, 5, 15, 35, 70, -10])
+    airborne = rng.random() < radar_rate and scheduled - datetime.now(timezone.utc) < timedelta(hours=4)
+    fmt = '%Y-%m-%d %H:%M'
+    return {
+        'flight_iata': flight_iata,
+        'airline_iata': flight_iata[:2],
+        'dep_iata': rng.choice(ORIGINS),
+        'arr_iata': arr_iata,
+        'arr_time_utc': scheduled.strftime(fmt),
+        'arr_estimated_utc': (scheduled + timedelta(minutes=delay)).strftime(fmt),
+        'delayed': delay if delay > 0 else None,
+        'status': 'landed' if scheduled + timedelta(minutes=delay) < datetime.now(timezone.utc) else ('en-route' if airborne else 'scheduled'),
+        'airborne': airborne,
+        'radar_has_times': rng.random() < 0.5,
+    }
+
+
+def radar_record(p):
+    record = {'flight_iata': p['flight_iata'], 'dep_iata': p['dep_iata'], 'arr_iata': p['arr_iata'],
+              'status': p['status'], 'delayed': p['delayed'], 'lat': 38.28, 'lng': -0.55, 'alt': 9000, 'speed': 780}
+    if p['radar_has_times']:
+        record.update(arr_time_utc=p['arr_time_utc'], arr_estimated_utc=p['arr_estimated_utc'])
+    return record
+
+
+def schedule_record(p):
+    return {'flight_iata': p['flight_iata'], 'airline_iata': p['airline_iata'], 'dep_iata': p['dep_iata'],
+            'arr_iata': p['arr_iata'], 'arr_time_utc': p['arr_time_utc'], 'arr_estimated_utc': p['arr_estimated_utc'],
+            'status': 'landed' if p['status'] == 'landed' else 'scheduled', 'delayed': p['delayed']}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        endpoint = url.path.rstrip('/').rsplit('/', 1)[-1]
+        stats['requests'] += 1
+
+        delay = self.config.latency + random.uniform(0, self.config.jitter)
+        time.sleep(delay / 1000)
+
+        flight_iata = (query.get('flight_iata') or '').upper()
+        if endpoint not in ('flights', 'schedules') or not flight_iata:
+            return self.reply(404, {'error': {'message': 'Unknown method or missing flight_iata'}})
+        stats[endpoint] += 1
+
+        profile = flight_profile(flight_iata, query.get('arr_iata', 'ALC').upper(), self.config.radar_rate)
+        if endpoint == 'flights':
+            response = [radar_record(profile)] if profile['airborne'] else []
+        else:
+            response = [schedule_record(profile)]
+        self.reply(200, {'request': {'method': endpoint, 'params': {'flight_iata': flight_iata}}, 'response': response})
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        if not self.config.quiet:
+            super().log_message(fmt, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=200, help='Base response latency in ms')
+    parser.add_argument('--jitter', type=float, default=100, help='Extra random latency in ms')
+    parser.add_argument('--radar-rate', type=float, default=0.5, help='Fraction of flights visible on the radar')
+    parser.add_argument('--quiet', action='store_true')
+    Handler.config = parser.parse_args()
+
+    server = ThreadingHTTPServer((Handler.config.host, Handler.config.port), Handler)
+    print(f'AirLabs stand-in on http://{Handler.config.host}:{Handler.config.port}/api/v9')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f'\n{stats["requests"]} requests ({stats["flights"]} flights, {stats["schedules"]} schedules)')
+
+
+if __name__ == '__main__':
+    main()
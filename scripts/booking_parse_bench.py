@@ -0,0 +1,364 @@
+"""Booking intake benchmark: one request per message vs batched, cached parsing.
+
+    python scripts/gemini_mock_server.py --quiet &
+    python scripts/booking_parse_bench.py --stand-in                  # built-in municipalities
+    python scripts/booking_parse_bench.py --messages 300 --resend-rate 0.2
+    python scripts/booking_parse_bench.py --url https://generativelanguage.googleapis.com --key $GEMINI_API_KEY
+
+Writes an inbox of synthetic agency messages (English and Spanish, relative and absolute
+dates, some resent with different spacing or case) and parses it three ways:
+
+  single   the old parseBookingDetails: one request per message with the hard-coded origin
+           list, the JSON cut out of the answer with a greedy regex
+  batch    parseBookingBatch in services/geminiService.ts, mirrored here: messages keyed by a
+           SHA-256 of the day and the normalized text, each new one sent once, BATCH_SIZE per
+           request (or BATCH_MAX_CHARS), BATCH_CONCURRENCY requests at a time, then origins
+           and destinations matched against the municipalities index
+  resend   the same inbox again: everything comes from the cache
+
+For each: requests, wall time, bookings per second, tokens and the cost per 1000 bookings at
+--price-in/--price-out (USD per million tokens; gemini-2.5-flash list prices by default).
+The batch results are checked against what each message says; exit code 1 if a field is
+wrong, or a place the index knows is left unmatched.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import time
+import unicodedata
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from municipality_index import MunicipalityIndex
+
+BATCH_SIZE = 20
+BATCH_MAX_CHARS = 20000
+BATCH_CONCURRENCY = 2
+AIRPORT_NAME = 'ALICANTE AEROPUERTO (ALC)'
+AIRPORT = re.compile(r'AEROPUERTO|AEROPORT|AIRPORT|\bALC\b|ALTET')
+FIELDS = ['passenger', 'phone', 'email', 'pickup_date', 'pickup_time', 'origin', 'destination', 'pax_count',
+          'flight_number', 'notes']
+
+STAND_IN_MUNICIPALITIES = [
+    ('Alacant/Alicante', '03', '014'), ("Alfàs del Pi, l'", '03', '011'), ('Altea', '03', '018'),
+    ('Benidorm', '03', '031'), ('Benissa', '03', '029'), ('Calp', '03', '047'), ('Campello, el', '03', '050'),
+    ('Dénia', '03', '063'), ('Elx/Elche', '03', '065'), ('Finestrat', '03', '069'), ('Xàbia/Jávea', '03', '082'),
+    ('Orihuela', '03', '099'), ('Santa Pola', '03', '121'), ('Teulada', '03', '128'), ('Torrevieja', '03', '133'),
+    ('Vila Joiosa, la/Villajoyosa', '03', '139'), ('València', '46', '250'), ('Murcia', '30', '030'),
+]
+
+# Place as an agency writes it -> the name parseBookingBatch should settle on (None: flagged)
+PLACES = [
+    ('Alicante airport', AIRPORT_NAME), ('ALC', AIRPORT_NAME), ('aeropuerto de Alicante', AIRPORT_NAME),
+    ('Benidorm', 'Benidorm'), ('Hotel Melia Benidorm', 'Benidorm'), ('Altea', 'Altea'), ('Alicante', 'Alacant/Alicante'),
+    ('Alfas del Pi', "Alfàs del Pi, l'"), ('Javea', 'Xàbia/Jávea'), ('Denia', 'Dénia'), ('Torrevieja', 'Torrevieja'),
+    ('Villajoyosa', 'Vila Joiosa, la/Villajoyosa'), ('Finestrat', 'Finestrat'), ('Elche', 'Elx/Elche'),
+    ('Albir', None), ('Calpe', None), ('La Zenia', None),
+]
+NAMES = ['John Smith', 'Emma Wilson', 'Lars Nielsen', 'Sophie Martin', 'Carlos Ruiz', 'Anna Kowalska', 'Pieter de Vries',
+         'María López', 'James Taylor', 'Ingrid Berg']
+WEEKDAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+DIAS = ['lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo']
+
+
+# --- parseBookingBatch ---------------------------------------------------------------------
+
+def batch_prompt(today, messages):
+    return f'''
+Extract the booking details of each message below. Current Date: {today}
+The messages come from travel agencies by email or WhatsApp, in any language. Return one object
+per message with its index; use null for anything the message does not say.
+- pickup_date: YYYY-MM-DD, infer from text like "tomorrow", "next friday"
+- pickup_time: HH:MM, 24-hour clock
+- origin, destination: the place as written (town, hotel, "airport"); do not translate or correct it
+- pax_count: number of passengers, 1 if not given
+- notes: luggage, child seats and other requests
+Messages (JSON):
+{json.dumps(messages, ensure_ascii=False, separators=(',', ':'))}'''
+
+
+def single_prompt(today, text):
+    """The prompt of the old parseBookingDetails."""
+    return f'''
+      Extract booking details from the following text and return a JSON object.
+      Current Date: {today}
+
+      Text: "{text}"
+
+      Return ONLY JSON with these fields (use null if not found):
+      - passenger (string)
+      - phone (string)
+      - email (string)
+      - pickup_date (YYYY-MM-DD, infer from text like "tomorrow", "next friday")
+      - pickup_time (HH:MM)
+      - origin (string, strictly map to one of: "ALICANTE AEROPUERTO (ALC)", "Alacant/Alicante", "Alfàs del Pi, l'", "Altea", "Benidorm", "Calp")
+      - destination (string, strictly map to one of: "ALICANTE AEROPUERTO (ALC)", "Alacant/Alicante", "Alfàs del Pi, l'", "Altea", "Benidorm", "Calp")
+      - pax_count (number, default 1)
+      - notes (string)
+
+      Example JSON:
+      {{
+        "passenger": "John Doe",
+        "pickup_date": "2024-05-20",
+        "origin": "Benidorm"
+      }}
+    '''
+
+
+def normalize_message(text):
+    return ' '.join(unicodedata.normalize('NFKC', text).lower().split())
+
+
+def message_key(today, text):
+    return hashlib.sha256(f'{today}\n{normalize_message(text)}'.encode('utf-8')).hexdigest()
+
+
+def fold_accents(text):
+    return ''.join(ch for ch in unicodedata.normalize('NFD', text) if not unicodedata.combining(ch))
+
+
+class Places:
+    """loadPlaceIndex + matchPlace."""
+
+    def __init__(self, municipalities):
+        self.index = MunicipalityIndex(municipalities)
+        self.folded = MunicipalityIndex([dict(m, name=fold_accents(m['name']), row=m) for m in municipalities])
+
+    def match(self, text):
+        if AIRPORT.search(text.upper()):
+            return AIRPORT_NAME
+        match = self.index.match(text)
+        if not match:
+            folded = self.folded.match(fold_accents(text))
+            match = folded['row'] if folded else None
+        return match['name'] if match else None
+
+
+class Model:
+    def __init__(self, url, key):
+        self.url = f'{url.rstrip("/")}/v1beta/models/gemini-2.5-flash:generateContent?key={key}'
+        self.requests = self.prompt_tokens = self.output_tokens = self.errors = 0
+
+    def generate(self, prompt, schema=False):
+        body = {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+        if schema:
+            body['generationConfig'] = {'responseMimeType': 'application/json'}
+        request = urllib.request.Request(self.url, json.dumps(body).encode('utf-8'),
+                                         {'Content-Type': 'application/json'}, method='POST')
+        self.requests += 1
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError:
+            self.errors += 1
+            return None
+        usage = payload.get('usageMetadata', {})
+        self.prompt_tokens += usage.get('promptTokenCount', 0)
+        self.output_tokens += usage.get('candidatesTokenCount', 0)
+        return payload['candidates'][0]['content']['parts'][0]['text']
+
+
+def parse_single(model, today, messages):
+    def one(text):
+        answer = model.generate(single_prompt(today, text))
+        match = re.search(r'\{[\s\S]*\}', answer or '')
+        try:
+            return json.loads(match.group(0) if match else answer or 'null')
+        except ValueError:
+            return None
+    with ThreadPoolExecutor(BATCH_CONCURRENCY) as pool:
+        return list(pool.map(one, messages))
+
+
+def parse_batch(model, today, messages, cache, places):
+    """parseBookingBatch: items of (booking, cached, unmatched fields)."""
+    keys = [message_key(today, text) for text in messages]
+    bookings, cached, pending, seen = {}, [False] * len(messages), [], set()
+    for i, key in enumerate(keys):
+        if key in cache:
+            bookings[key] = cache[key]
+            cached[i] = True
+        elif key not in seen and messages[i].strip():
+            seen.add(key)
+            pending.append((key, messages[i]))
+
+    chunks, chars = [], 0
+    for key, text in pending:
+        if not chunks or len(chunks[-1]) >= BATCH_SIZE or chars + len(text) > BATCH_MAX_CHARS:
+            chunks.append([(key, text)])
+            chars = len(text)
+        else:
+            chunks[-1].append((key, text))
+            chars += len(text)
+
+    def send(chunk):
+        answer = model.generate(batch_prompt(today, [{'index': i, 'text': t} for i, (_, t) in enumerate(chunk)]), schema=True)
+        rows = json.loads(answer) if answer else []
+        for row in rows if isinstance(rows, list) else []:
+            index = row.get('index')
+            if isinstance(index, int) and 0 <= index < len(chunk):
+                booking = {f: (None if row.get(f) in (None, '') else row.get(f)) for f in FIELDS}
+                bookings[chunk[index][0]] = booking
+                cache[chunk[index][0]] = booking
+
+    with ThreadPoolExecutor(BATCH_CONCURRENCY) as pool:
+        list(pool.map(send, chunks))
+
+    items = []
+    for i, key in enumerate(keys):
+        raw = bookings.get(key)
+        if raw is None:
+            items.append((None, cached[i], []))
+            continue
+        booking, unmatched = dict(raw), []
+        for field in ('origin', 'destination'):
+            if not booking[field]:
+                continue
+            name = places.match(booking[field])
+            if name:
+                booking[field] = name
+            else:
+                unmatched.append(field)
+        items.append((booking, cached[i], unmatched))
+    return items
+
+
+# --- the inbox -----------------------------------------------------------------------------
+
+def write_message(rng, today, i):
+    name = rng.choice(NAMES)
+    (origin, want_origin), (destination, want_destination) = rng.sample(PLACES, 2)
+    hour, minute = rng.randrange(0, 24), rng.choice((0, 10, 15, 30, 45, 50))
+    pax = rng.randint(1, 8)
+    offset = rng.randint(1, 14)
+    day = today + timedelta(days=offset)
+    phone = f'+44 7{rng.randrange(10**8, 10**9)}'
+    email = f'{fold_accents(name.split()[0]).lower()}.{i}@agency-mail.com'
+    flight = f'{rng.choice(["FR", "U2", "LS", "VY", "W6"])}{rng.randrange(100, 9999)}'
+    spanish = rng.random() < 0.4
+    if offset == 1:
+        when = 'mañana' if spanish else 'tomorrow'
+    elif offset <= 7 and rng.random() < 0.5:
+        when = (DIAS if spanish else WEEKDAY_NAMES)[day.weekday()]
+    else:
+        when = f'{day.day}/{day.month}/{day.year}' if rng.random() < 0.5 else day.isoformat()
+    if spanish:
+        text = (f'Hola, reserva a nombre de {name} para {pax} personas, {when} a las {hour:02d}:{minute:02d}, '
+                f'desde {origin} hasta {destination}. Vuelo {flight}. Tel {phone}, {email}.')
+        note = 'Nota: silla de bebé' if rng.random() < 0.2 else None
+    else:
+        text = (f'Hi team,\nplease book a transfer for {name}, {pax} passengers, {when} at {hour:02d}:{minute:02d} '
+                f'from {origin} to {destination}. Flight {flight}.\nContact: {phone} / {email}')
+        note = 'Notes: 2 golf bags' if rng.random() < 0.2 else None
+    if note:
+        text += '\n' + note
+    truth = {'passenger': name, 'pickup_date': day.isoformat(), 'pickup_time': f'{hour:02d}:{minute:02d}',
+             'origin': want_origin, 'destination': want_destination, 'pax_count': pax, 'flight_number': flight,
+             'email': email}
+    return text, truth
+
+
+def resend(rng, text):
+    """The same booking forwarded again: other spacing, other case."""
+    text = re.sub(r' ', lambda _: rng.choice((' ', '  ', ' ')), text)
+    return text.upper() if rng.random() < 0.3 else '\n' + text + '\n'
+
+
+def inbox(rng, today, count, resend_rate):
+    messages, truths = [], []
+    for i in range(count):
+        if messages and rng.random() < resend_rate:
+            j = rng.randrange(len(messages))
+            messages.append(resend(rng, messages[j]))
+            truths.append(truths[j])
+        else:
+            text, truth = write_message(rng, today, i)
+            messages.append(text)
+            truths.append(truth)
+    return messages, truths
+
+
+def check(items, truths):
+    """Wrong fields, and places the index knows that were left unmatched."""
+    wrong, flagged_known = 0, 0
+    for (booking, _, unmatched), truth in zip(items, truths):
+        if booking is None:
+            wrong += 1
+            continue
+        for field, want in truth.items():
+            if want is None:  # a place no municipality matches: must be flagged
+                wrong += field not in unmatched
+            elif booking.get(field) != want:
+                wrong += 1
+                flagged_known += field in unmatched
+    return wrong, flagged_known
+
+
+def run(model, label, parse, count, price_in, price_out):
+    before = (model.requests, model.prompt_tokens, model.output_tokens)
+    started = time.perf_counter()
+    result = parse()
+    seconds = time.perf_counter() - started
+    requests = model.requests - before[0]
+    prompt_tokens, output_tokens = model.prompt_tokens - before[1], model.output_tokens - before[2]
+    cost = (prompt_tokens * price_in + output_tokens * price_out) / 1e6
+    print(f'{label:>7} {requests:>8} {seconds:>8.1f} s {count / seconds:>9.1f} {prompt_tokens:>10} {output_tokens:>9} '
+          f'{cost / count * 1000:>10.3f}')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8093', help='Model API base (scripts/gemini_mock_server.py)')
+    parser.add_argument('--key', default='mock')
+    parser.add_argument('--stand-in', action='store_true', help='Built-in municipalities instead of the table')
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--resend-rate', type=float, default=0.15, help='Fraction of messages that repeat an earlier one')
+    parser.add_argument('--price-in', type=float, default=0.30, help='USD per million prompt tokens')
+    parser.add_argument('--price-out', type=float, default=2.50, help='USD per million output tokens')
+    parser.add_argument('--skip-single', action='store_true', help='Only the batch runs')
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    if args.stand_in:
+        municipalities = [{'name': n, 'cod_prov': p, 'cod_mun': c} for n, p, c in STAND_IN_MUNICIPALITIES]
+    else:
+        from supabase_rest import SupabaseRest
+        municipalities = SupabaseRest().select('municipalities', 'name,cod_prov,cod_mun')
+    places = Places(municipalities)
+
+    rng = random.Random(args.seed)
+    today = date.today()
+    messages, truths = inbox(rng, today, args.messages, args.resend_rate)
+    model = Model(args.url, args.key)
+
+    print(f'{len(messages)} messages, {len(set(message_key(today.isoformat(), m) for m in messages))} distinct')
+    print(f'{"":>7} {"requests":>8} {"time":>10} {"booking/s":>9} {"in tokens":>10} {"out tokens":>9} {"$/1000":>10}')
+    if not args.skip_single:
+        run(model, 'single', lambda: parse_single(model, today.isoformat(), messages), len(messages),
+            args.price_in, args.price_out)
+    cache = {}
+    items = run(model, 'batch', lambda: parse_batch(model, today.isoformat(), messages, cache, places), len(messages),
+                args.price_in, args.price_out)
+    again = run(model, 'resend', lambda: parse_batch(model, today.isoformat(), messages, cache, places), len(messages),
+                args.price_in, args.price_out)
+
+    cached = sum(1 for _, was_cached, _ in again if was_cached)
+    unmatched = sum(len(u) for _, _, u in items)
+    wrong, flagged_known = check(items, truths)
+    print(f'resend served {cached}/{len(messages)} from the cache; {unmatched} places left for the dispatcher')
+    if model.errors:
+        print(f'{model.errors} requests failed')
+    if wrong or cached != len(messages):
+        print(f'{wrong} wrong fields ({flagged_known} known places unmatched)')
+        sys.exit(1)
+    print('OK: every batch field as written in the message, unknown places flagged')
+
+
+if __name__ == '__main__':
+    main()
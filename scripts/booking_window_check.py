@@ -0,0 +1,140 @@
+"""Windowed booking queries: transfer size and keyset paging correctness.
+
+    python scripts/booking_window_check.py                       # 20k bookings over 3 years
+    python scripts/booking_window_check.py --bookings 50000 --days 1460 --page-size 200
+
+Starts scripts/postgrest_mock_server.py in-process and compares what ReservasView
+transfers when it opens: the whole bookings table (as before) against the windowed
+collection of services/entityStore.ts (default filters: yesterday to tomorrow, hide
+cancelled). Then pages through wider windows, including an open-ended one, with the
+same keyset cursor on (pickup_date, pickup_time, id) the store builds, and checks that
+the concatenated pages equal the filtered, sorted table: no row missing, none twice,
+ties and NULL pickup times included. Exit code 1 on mismatch.
+"""
+import argparse
+import json
+import sys
+import urllib.request
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+from postgrest_mock_server import Database, serve
+
+KEYSET = ['pickup_date', 'pickup_time', 'id']
+
+
+def literal(value):
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def keyset_after(keyset, last):
+    """Python mirror of keysetAfter() in services/entityStore.ts."""
+    terms = []
+    for i, column in enumerate(keyset):
+        value = last.get(column)
+        if value is None:
+            continue
+        equal = [f'{k}.is.null' if last.get(k) is None else f'{k}.eq.{literal(last[k])}' for k in keyset[:i]]
+        after = (f'{column}.gt.{literal(value)}' if i == len(keyset) - 1
+                 else f'or({column}.gt.{literal(value)},{column}.is.null)')
+        terms.append(f'and({",".join(equal + [after])})' if equal else after)
+    return f'({",".join(terms)})'
+
+
+def get(base_url, params):
+    with urllib.request.urlopen(f'{base_url}/rest/v1/bookings?{urlencode(params)}', timeout=120) as resp:
+        body = resp.read()
+    return json.loads(body), len(body)
+
+
+def window_params(window):
+    params = [('select', '*')]
+    if window.get('from'):
+        params.append(('pickup_date', f'gte.{window["from"]}'))
+    if window.get('to'):
+        params.append(('pickup_date', f'lt.{date.fromisoformat(window["to"]) + timedelta(days=1)}'))
+    if window.get('not_in'):
+        params.append(('status', f'not.in.({",".join(literal(s) for s in window["not_in"])})'))
+    params.append(('order', ','.join(f'{c}.asc' for c in KEYSET)))
+    return params
+
+
+def page_through(base_url, window, page_size):
+    rows, pages, size = [], 0, 0
+    last = None
+    while True:
+        params = window_params(window)
+        if last is not None:
+            params.append(('or', keyset_after(KEYSET, last)))
+        page, n = get(base_url, params + [('limit', str(page_size))])
+        rows += page
+        pages += 1
+        size += n
+        if len(page) < page_size:
+            return rows, pages, size
+        last = page[-1]
+
+
+def expected(db, window):
+    def key(r):
+        # ascending, NULLS LAST per column
+        return tuple((r[c] is None, r[c] or '') for c in KEYSET)
+    nxt = str(date.fromisoformat(window['to']) + timedelta(days=1)) if window.get('to') else None
+    rows = [r for r in db.tables['bookings']
+            if (not window.get('from') or r['pickup_date'] >= window['from'])
+            and (not nxt or r['pickup_date'] < nxt)
+            and (not window.get('not_in') or (r['status'] is not None and r['status'] not in window['not_in']))]
+    return sorted(rows, key=key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=3 * 365, help='Days of booking history')
+    parser.add_argument('--page-size', type=int, default=500, help='pageSize of the ReservasView window')
+    parser.add_argument('--port', type=int, default=8092)
+    args = parser.parse_args()
+
+    db = Database(bookings=args.bookings, days=args.days)
+    server = serve(db, args.port)
+    base_url = f'http://127.0.0.1:{args.port}'
+    today = date.today()
+    problems = []
+    try:
+        full, full_size = get(base_url, [('select', '*'), ('order', 'created_at.desc')])
+        opening = {'from': str(today - timedelta(days=1)), 'to': str(today + timedelta(days=1)), 'not_in': ['Cancelled']}
+        first, first_size = get(base_url, window_params(opening) + [('limit', str(args.page_size))])
+        print(f'{args.bookings} bookings over {args.days} days')
+        print(f'  open ReservasView, whole table:   {len(full):>7} rows {full_size / 1e6:>8.2f} MB')
+        print(f'  open ReservasView, window:        {len(first):>7} rows {first_size / 1e6:>8.2f} MB'
+              f'  ({1 - first_size / full_size:.1%} less)')
+
+        windows = {
+            'default window': opening,
+            'last 90 days': {'from': str(today - timedelta(days=90)), 'to': str(today + timedelta(days=7))},
+            'everything from a year ago': {'from': str(today - timedelta(days=365)), 'not_in': ['Cancelled', 'Completed']},
+            'open-ended': {},
+        }
+        for name, window in windows.items():
+            rows, pages, size = page_through(base_url, window, args.page_size)
+            want = expected(db, window)
+            ids = [r['id'] for r in rows]
+            ok = ids == [r['id'] for r in want]
+            if not ok:
+                missing = len({r['id'] for r in want} - set(ids))
+                problems.append(f'{name}: {len(rows)} rows paged, {len(want)} expected, '
+                                f'{missing} missing, {len(ids) - len(set(ids))} duplicated')
+            print(f'  {name:<28} {len(rows):>7} rows in {pages:>3} pages {size / 1e6:>8.2f} MB  {"OK" if ok else "MISMATCH"}')
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    for p in problems:
+        print(f'  {p}')
+    if problems:
+        sys.exit(1)
+    print('OK: keyset pages match the filtered, sorted table')
+
+
+if __name__ == '__main__':
+    main()
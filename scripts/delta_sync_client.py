@@ -0,0 +1,193 @@
+"""Reference delta-sync client: SQLite snapshots + updated_at high-water marks.
+
+    python scripts/delta_sync_client.py --db sync.sqlite                 # sync the project's tables
+    python scripts/delta_sync_client.py --db sync.sqlite --tables bookings,drivers
+    python scripts/delta_sync_client.py --stand-in --bookings 20000 --rounds 5
+
+Same protocol as the entity store (services/entityStore.ts), with SQLite where the app
+uses IndexedDB: the first sync of a table loads it in full and stores max(updated_at);
+later syncs fetch rows with updated_at >= mark - 60 s and the sync_tombstones of that
+table since its own mark, upsert/delete them locally and advance both marks. A snapshot
+older than 25 days is reloaded in full (tombstones are kept 30 days).
+
+--stand-in runs the protocol against scripts/postgrest_mock_server.py: a cold sync of
+the driver app tables, then --rounds of server-side writes (updates, inserts and deletes
+of bookings, --interval simulated minutes apart), each followed by a delta sync and a restart from the SQLite file. Every
+round compares the local copy with the server and reports the bytes and round trips of
+the delta against a full reload, as the app did before. Exit code 1 on any difference.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from supabase_rest import SupabaseRest
+
+OVERLAP = timedelta(seconds=60)
+SNAPSHOT_MAX_AGE = 25 * 86400
+DRIVER_APP_TABLES = ['drivers', 'bookings', 'shifts', 'vehicles', 'municipalities', 'system_settings',
+                     'driver_logs', 'time_correction_requests']
+
+
+def parse_ts(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+
+def latest(a, b):
+    if not b:
+        return a
+    return b if not a or parse_ts(b) > parse_ts(a) else a
+
+
+def since(mark):
+    return (parse_ts(mark) - OVERLAP).isoformat(timespec='microseconds')
+
+
+class DeltaSyncClient:
+    def __init__(self, rest, path):
+        self.rest = rest
+        self.db = sqlite3.connect(path)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS rows (tbl TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (tbl, id));
+            CREATE TABLE IF NOT EXISTS sync_state (tbl TEXT PRIMARY KEY, hwm TEXT, tombstone_hwm TEXT, synced_at REAL);
+        ''')
+
+    def state(self, table):
+        row = self.db.execute('SELECT hwm, tombstone_hwm, synced_at FROM sync_state WHERE tbl = ?', (table,)).fetchone()
+        return row or (None, None, 0)
+
+    def sync(self, table):
+        hwm, tombstone_hwm, synced_at = self.state(table)
+        with self.db:
+            if not hwm or time.time() - synced_at > SNAPSHOT_MAX_AGE:
+                rows = self.rest.select(table)
+                self.db.execute('DELETE FROM rows WHERE tbl = ?', (table,))
+                self.db.executemany('INSERT INTO rows (tbl, id, data) VALUES (?, ?, ?)',
+                                    [(table, str(r['id']), json.dumps(r)) for r in rows])
+                hwm = tombstone_hwm = None
+                for r in rows:
+                    hwm = latest(hwm, r.get('updated_at'))
+                tombstone_hwm = hwm
+                result = {'mode': 'full', 'changed': len(rows), 'deleted': 0}
+            else:
+                changed = self.rest.select(table, '*', updated_at=f'gte.{since(hwm)}', order='updated_at.asc')
+                deleted = self.rest.select('sync_tombstones', 'row_id,deleted_at', key='row_id', table_name=f'eq.{table}',
+                                           deleted_at=f'gte.{since(tombstone_hwm or hwm)}', order='deleted_at.asc')
+                self.db.executemany('DELETE FROM rows WHERE tbl = ? AND id = ?', [(table, t['row_id']) for t in deleted])
+                self.db.executemany('INSERT OR REPLACE INTO rows (tbl, id, data) VALUES (?, ?, ?)',
+                                    [(table, str(r['id']), json.dumps(r)) for r in changed])
+                for r in changed:
+                    hwm = latest(hwm, r.get('updated_at'))
+                for t in deleted:
+                    tombstone_hwm = latest(tombstone_hwm, t['deleted_at'])
+                result = {'mode': 'delta', 'changed': len(changed), 'deleted': len(deleted)}
+            self.db.execute('INSERT OR REPLACE INTO sync_state (tbl, hwm, tombstone_hwm, synced_at) VALUES (?, ?, ?, ?)',
+                            (table, hwm, tombstone_hwm, time.time()))
+        return result
+
+    def rows(self, table):
+        return {row_id: json.loads(data) for row_id, data in
+                self.db.execute('SELECT id, data FROM rows WHERE tbl = ?', (table,))}
+
+    def close(self):
+        self.db.close()
+
+
+def measure(rest, action):
+    trips, size = rest.round_trips, rest.bytes_received
+    result = action()
+    return result, rest.round_trips - trips, rest.bytes_received - size
+
+
+def compare(client, db, tables):
+    problems = []
+    for table in tables:
+        local = client.rows(table)
+        server = {str(r['id']): r for r in db.tables[table]}
+        missing = server.keys() - local.keys()
+        extra = local.keys() - server.keys()
+        stale = [k for k in server.keys() & local.keys() if local[k] != server[k]]
+        if missing or extra or stale:
+            problems.append(f'{table}: {len(missing)} missing, {len(extra)} not deleted, {len(stale)} stale')
+    return problems
+
+
+def run_stand_in(args):
+    from postgrest_mock_server import Database, serve
+
+    db = Database(bookings=args.bookings)
+    server = serve(db, args.port)
+    rest = SupabaseRest(url=f'http://127.0.0.1:{args.port}', key='local')
+    full_rest = SupabaseRest(url=f'http://127.0.0.1:{args.port}', key='local')
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'delta_sync.sqlite')
+    tables = DRIVER_APP_TABLES
+    problems = []
+    try:
+        client = DeltaSyncClient(rest, path)
+        _, trips, size = measure(rest, lambda: [client.sync(t) for t in tables])
+        print(f'{args.bookings} bookings, tables: {", ".join(tables)}')
+        print(f'  cold sync (full)           {trips:>4} round trips {size / 1e6:>9.3f} MB')
+        problems += compare(client, db, tables)
+        for round_no in range(1, args.rounds + 1):
+            db.clock_offset += timedelta(minutes=args.interval)
+            db.mutate('bookings', updates=args.updates, inserts=args.inserts, deletes=args.deletes)
+            results, trips, size = measure(rest, lambda: [client.sync(t) for t in tables])
+            _, full_trips, full_size = measure(full_rest, lambda: [full_rest.select(t) for t in tables])
+            changed = sum(r['changed'] for r in results)
+            deleted = sum(r['deleted'] for r in results)
+            print(f'  round {round_no}: delta {changed:>5} rows {deleted:>3} deletes '
+                  f'{trips:>4} round trips {size / 1e6:>9.3f} MB   full reload {full_trips:>4} / {full_size / 1e6:>7.3f} MB')
+            problems += [f'round {round_no}: {p}' for p in compare(client, db, tables)]
+            # Cold start from the SQLite file: only the deltas since the last run
+            client.close()
+            client = DeltaSyncClient(rest, path)
+            results, trips, size = measure(rest, lambda: [client.sync(t) for t in tables])
+            if any(r['mode'] != 'delta' for r in results):
+                problems.append(f'round {round_no}: restart did a full load')
+            problems += [f'round {round_no} restart: {p}' for p in compare(client, db, tables)]
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    for p in problems:
+        print(f'  {p}')
+    if problems:
+        sys.exit(1)
+    print('OK: local snapshot matches the server after every round and restart')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help='SQLite file (a temporary one with --stand-in)')
+    parser.add_argument('--tables', default=','.join(DRIVER_APP_TABLES))
+    parser.add_argument('--stand-in', action='store_true', help='Simulate against the local PostgREST stand-in')
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--updates', type=int, default=40, help='Bookings updated per round')
+    parser.add_argument('--inserts', type=int, default=15, help='Bookings created per round')
+    parser.add_argument('--deletes', type=int, default=3, help='Bookings deleted per round')
+    parser.add_argument('--interval', type=float, default=5, help='Simulated minutes between rounds')
+    parser.add_argument('--port', type=int, default=8092)
+    args = parser.parse_args()
+
+    if args.stand_in:
+        run_stand_in(args)
+        return
+    if not args.db:
+        parser.error('--db is required without --stand-in')
+    rest = SupabaseRest()
+    client = DeltaSyncClient(rest, args.db)
+    for table in [t.strip() for t in args.tables.split(',') if t.strip()]:
+        result, trips, size = measure(rest, lambda: client.sync(table))
+        print(f'{table:<26} {result["mode"]:<6} {result["changed"]:>7} rows {result["deleted"]:>5} deletes '
+              f'{trips:>3} round trips {size / 1e6:>8.3f} MB')
+    client.close()
+
+
+if __name__ == '__main__':
+    main()
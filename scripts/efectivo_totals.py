@@ -0,0 +1,83 @@
+"""Build and verify efectivo_driver_totals.
+
+    python scripts/efectivo_totals.py --cycle 12            # verify one cycle
+    python scripts/efectivo_totals.py --rebuild             # rebuild all cycles, then verify
+    python scripts/efectivo_totals.py --rebuild --cycle 12
+
+Verification recomputes every (cycle, driver) total from the raw record tables
+and compares it with the incrementally maintained row. Exit code 1 on mismatch.
+"""
+import argparse
+import sys
+from collections import defaultdict
+
+from supabase_rest import SupabaseRest
+
+SOURCES = [
+    ('efectivo_initial_balances', 'balance', 'saldo_inicial'),
+    ('efectivo_uber_records', 'cash_collected', 'uber_cash_collected'),
+    ('efectivo_vgd_records', 'cash_collected', 'vgd_cash_collected'),
+    ('efectivo_entrega_records', 'amount', 'cash_delivered'),
+    ('efectivo_expense_records', 'amount', 'gastos'),
+]
+TOTAL_COLUMNS = [totals_col for _, _, totals_col in SOURCES]
+TOLERANCE = 0.005
+
+
+def recompute(db, cycle_id=None):
+    filters = {'cycle_id': f'eq.{cycle_id}'} if cycle_id is not None else {'cycle_id': 'not.is.null'}
+    totals = defaultdict(lambda: dict.fromkeys(TOTAL_COLUMNS, 0.0))
+    for table, value_col, totals_col in SOURCES:
+        for row in db.select(table, f'cycle_id,driver_name,{value_col}', **filters):
+            totals[(row['cycle_id'], row['driver_name'])][totals_col] += float(row[value_col] or 0)
+    return totals
+
+
+def load_materialized(db, cycle_id=None):
+    filters = {'cycle_id': f'eq.{cycle_id}'} if cycle_id is not None else {}
+    return {
+        (row['cycle_id'], row['driver_name']): {c: float(row[c] or 0) for c in TOTAL_COLUMNS}
+        for row in db.select('efectivo_driver_totals', key='cycle_id,driver_name', **filters)
+    }
+
+
+def verify(db, cycle_id=None):
+    expected = recompute(db, cycle_id)
+    actual = load_materialized(db, cycle_id)
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        exp = expected.get(key, dict.fromkeys(TOTAL_COLUMNS, 0.0))
+        act = actual.get(key)
+        if act is None:
+            if any(abs(v) > TOLERANCE for v in exp.values()):
+                mismatches.append((key, 'missing', exp, None))
+            continue
+        for col in TOTAL_COLUMNS:
+            if abs(exp[col] - act[col]) > TOLERANCE:
+                mismatches.append((key, col, exp[col], act[col]))
+    return expected, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cycle', type=int, help='Limit to a single efectivo cycle id')
+    parser.add_argument('--rebuild', action='store_true', help='Recompute the table server-side before verifying')
+    args = parser.parse_args()
+
+    db = SupabaseRest()
+    if args.rebuild:
+        rows = db.rpc('efectivo_rebuild_driver_totals', p_cycle_id=args.cycle)
+        print(f'Rebuilt {rows} (cycle, driver) rows')
+
+    expected, mismatches = verify(db, args.cycle)
+    print(f'Checked {len(expected)} (cycle, driver) pairs in {db.round_trips} requests')
+    for key, col, exp, act in mismatches:
+        print(f'  MISMATCH cycle={key[0]} driver={key[1]!r} {col}: expected {exp} got {act}')
+    if mismatches:
+        print(f'{len(mismatches)} mismatches. Run with --rebuild to repair.')
+        sys.exit(1)
+    print('OK: running totals match a full recompute')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Load generator: per-view full-table fetches vs the shared entity store.
+
+    python scripts/entity_store_load.py                          # 1k..50k bookings
+    python scripts/entity_store_load.py --sizes 2000,20000 --latency 60 --think 20
+    python scripts/entity_store_load.py --session ReservasView,DispatchConsole,ReservasView
+
+Replays a back-office session (a sequence of views, each mounting the useSupabaseData
+hooks it has in the code) against scripts/postgrest_mock_server.py, started in-process
+for each bookings table size. Two ways:
+
+  per-view  every hook instance fetches its table on every mount, as before
+  store     services/entityStore.ts: one fetch per distinct query. Channels are opened
+            only for hooks with `realtime`; a table's copy stays current while its channel
+            is open (closed CHANNEL_IDLE seconds after its last live view), otherwise a
+            mount refetches it once it is older than REVALIDATE seconds (a full fetch
+            here; synced tables only fetch a delta, so this is an upper bound)
+
+The hooks of one view fire their requests together, so "wall" is the sum over views of
+the slowest request of each mount. Reports requests, response bytes and channel joins.
+"""
+import argparse
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from postgrest_mock_server import Database, serve
+
+CHANNEL_IDLE = 300  # seconds, CHANNEL_IDLE_MS in services/entityStore.ts
+REVALIDATE = 30    # seconds, REVALIDATE_MS
+
+DEFAULT = {}
+BY_CLOCK_IN = {'orderBy': 'clock_in'}
+LIVE_BY_UPDATED_AT = {'orderBy': 'updated_at', 'realtime': True}
+LIVE = {'realtime': True}
+
+# useSupabaseData instances per view, in the order they appear in the code
+VIEWS = {
+    'ReservasView': [('bookings', DEFAULT), ('drivers', DEFAULT), ('tariffs', DEFAULT), ('vehicles', DEFAULT),
+                     ('shifts', DEFAULT), ('clients', DEFAULT), ('municipalities', DEFAULT), ('system_settings', DEFAULT)],
+    'DispatchConsole': [('bookings', DEFAULT), ('drivers', DEFAULT), ('vehicles', DEFAULT), ('shifts', DEFAULT)],
+    'OperationsHub': [('flights', {'realtime': True}), ('drivers', DEFAULT), ('bookings', DEFAULT), ('vehicles', DEFAULT),
+                      ('vehicle_maintenance', DEFAULT), ('shifts', DEFAULT),
+                      # FleetMap
+                      ('drivers', LIVE), ('driver_locations', LIVE_BY_UPDATED_AT), ('shifts', DEFAULT), ('vehicles', DEFAULT)],
+    'ConductoresView': [('drivers', DEFAULT), ('profiles', DEFAULT), ('vehicle_expenses', DEFAULT)],
+    'VehiculosView': [('vehicles', DEFAULT)],
+    'ClientesView': [('clients', DEFAULT), ('bookings', DEFAULT)],
+    'TarifasView': [('tariffs', DEFAULT), ('clients', DEFAULT)],
+    'UsuariosView': [('profiles', DEFAULT)],
+    'FacturasView': [('clients', DEFAULT)],
+    'ExtrasView': [('service_extras', DEFAULT)],
+    'TallerView': [('vehicle_maintenance', DEFAULT), ('vehicles', DEFAULT)],
+    'TurnosView': [('drivers', DEFAULT), ('vehicles', DEFAULT), ('shifts', DEFAULT), ('shift_types', DEFAULT),
+                   ('vehicle_maintenance', DEFAULT)],
+    'FichajesView': [('driver_logs', BY_CLOCK_IN), ('drivers', DEFAULT), ('time_correction_requests', DEFAULT)],
+}
+
+DEFAULT_SESSION = ['ReservasView', 'DispatchConsole', 'OperationsHub', 'ConductoresView', 'VehiculosView',
+                   'ClientesView', 'TarifasView', 'UsuariosView', 'FacturasView', 'ExtrasView', 'TallerView',
+                   'ReservasView', 'TurnosView', 'FichajesView', 'DispatchConsole', 'ReservasView']
+
+
+def query_key(table, options):
+    return (table, options.get('select', '*'), options.get('orderBy', 'created_at'), options.get('ascending', False))
+
+
+def query_path(table, options):
+    _, select, order, ascending = query_key(table, options)
+    return f'/rest/v1/{table}?select={select}&order={order}.{"asc" if ascending else "desc"}'
+
+
+def fetch(base_url, path):
+    start = time.perf_counter()
+    with urllib.request.urlopen(base_url + path, timeout=120) as resp:
+        size = len(resp.read())
+    return size, time.perf_counter() - start
+
+
+def run_session(base_url, session, mode, think):
+    totals = {'requests': 0, 'bytes': 0, 'wall': 0.0, 'channels': 0}
+    fetched_at = {}   # store: query key -> session time of its last fetch
+    last_used = {}    # store: table -> session time its last live view unmounted
+    open_channels = set()
+    clock = 0.0
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        for view in session:
+            hooks = VIEWS[view]
+            if mode == 'per-view':
+                paths = [query_path(t, o) for t, o in hooks]
+                totals['channels'] += sum(1 for _, o in hooks if o.get('realtime'))
+            else:
+                live_tables = {t for t, o in hooks if o.get('realtime')}
+                for table in list(open_channels):
+                    if table not in live_tables and clock - last_used[table] >= CHANNEL_IDLE:
+                        open_channels.discard(table)
+                        # stale: revalidated on next mount
+                        fetched_at = {k: v for k, v in fetched_at.items() if k[0] != table}
+                for table in live_tables - open_channels:
+                    open_channels.add(table)
+                    totals['channels'] += 1
+                paths = []
+                for table, options in hooks:
+                    key = query_key(table, options)
+                    if key in fetched_at and (table in open_channels or clock - fetched_at[key] <= REVALIDATE):
+                        continue
+                    fetched_at[key] = clock
+                    paths.append(query_path(table, options))
+            results = list(pool.map(lambda p: fetch(base_url, p), paths))
+            totals['requests'] += len(results)
+            totals['bytes'] += sum(size for size, _ in results)
+            totals['wall'] += max((elapsed for _, elapsed in results), default=0.0)
+            clock += think
+            for table, options in hooks:
+                if options.get('realtime'):
+                    last_used[table] = clock
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,5000,20000,50000', help='Bookings table sizes to test')
+    parser.add_argument('--session', default=','.join(DEFAULT_SESSION), help='Comma-separated views, in order')
+    parser.add_argument('--think', type=float, default=30, help='Seconds spent on each view (session time)')
+    parser.add_argument('--latency', type=float, default=30, help='Stand-in latency per request, ms')
+    parser.add_argument('--jitter', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8092)
+    args = parser.parse_args()
+
+    session = [v.strip() for v in args.session.split(',') if v.strip()]
+    unknown = [v for v in session if v not in VIEWS]
+    if unknown:
+        parser.error(f'unknown views: {", ".join(unknown)} (known: {", ".join(VIEWS)})')
+
+    print(f'{len(session)} view mounts, {sum(len(VIEWS[v]) for v in session)} hook instances, think {args.think:g} s')
+    print(f'{"bookings":>9} {"mode":<9} {"requests":>9} {"MB":>9} {"wall s":>8} {"channels":>9}')
+    summary = []
+    for size in [int(s) for s in args.sizes.split(',')]:
+        db = Database(bookings=size)
+        server = serve(db, args.port, args.latency, args.jitter)
+        base_url = f'http://127.0.0.1:{args.port}'
+        try:
+            results = {mode: run_session(base_url, session, mode, args.think) for mode in ('per-view', 'store')}
+        finally:
+            server.shutdown()
+            server.server_close()
+        for mode, r in results.items():
+            print(f'{size:>9} {mode:<9} {r["requests"]:>9} {r["bytes"] / 1e6:>9.2f} {r["wall"]:>8.2f} {r["channels"]:>9}')
+        before, after = results['per-view'], results['store']
+        summary.append((size, 1 - after['requests'] / before['requests'], 1 - after['bytes'] / before['bytes']))
+
+    print()
+    for size, requests, size_saved in summary:
+        print(f'{size:>9} bookings: {requests:.0%} fewer round trips, {size_saved:.0%} fewer bytes with the store')
+
+
+if __name__ == '__main__':
+    main()
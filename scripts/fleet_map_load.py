@@ -0,0 +1,264 @@
+"""Fleet map under load: per-render React markers vs the culled, clustered layer.
+
+    python scripts/fleet_map_load.py --stand-in                       # 500 simulated vehicles
+    python scripts/fleet_map_load.py --stand-in --vehicles 200 500 2000 --zooms 9 11 13 15
+    python scripts/fleet_map_load.py                                  # live driver_locations, same movement
+
+The frame rate itself is measured in the browser: open the operations hub of a dev build
+(npm run dev) with ?fleetLoadTest=500 and components/FleetMap.tsx replaces the store with
+500 simulated vehicles (components/FleetLoadTest.tsx) and shows the FPS. This script replays the same load (every vehicle reporting once every 3 s,
+the realtime events coalesced per animation frame as entityStore does) and counts what each
+version of the map does with it per second:
+
+  before  every flush re-rendered all driver <Marker>s: a locations.find and shifts.find per
+          driver, a new divIcon (so Leaflet replaced every marker's DOM) and a setLatLng each.
+  after   FleetLayer (mirrored here: viewport padded by VIEWPORT_PAD, CLUSTER_CELL_PX squares
+          of Web Mercator pixels below CLUSTER_MAX_ZOOM) moves only the markers on screen whose
+          position changed and replaces an icon only when status or initials change.
+
+It also checks the layer: each vehicle in the padded view is drawn exactly once, as a marker or
+inside one cluster, and nothing outside it is drawn; exit code 1 otherwise.
+"""
+import argparse
+import math
+import random
+import sys
+from collections import defaultdict
+
+CLUSTER_MAX_ZOOM = 13
+CLUSTER_CELL_PX = 64
+VIEWPORT_PAD = 0.25
+TILE_PX = 256
+FRAME_MS = 1000 / 60
+REPORT_S = 3
+
+VIEW_PX = (1100, 650)            # the map panel of the operations hub
+CENTER = (38.2822, -0.5582)      # FleetMap defaultCenter
+
+HOTSPOTS = [
+    (38.2822, -0.5582), (38.5411, -0.1225), (38.3452, -0.4810), (38.5990, -0.0510),
+    (38.6447, 0.0445), (38.2699, -0.6983), (37.9787, -0.6822), (38.8391, 0.1057),
+]
+STATUSES = ['Working', 'Working', 'En Route', 'In Progress', 'Paused', 'Off']
+
+
+def project(lat, lng, zoom):
+    """Leaflet's EPSG:3857 map.project: pixel coordinates at zoom."""
+    scale = TILE_PX * 2 ** zoom
+    s = math.sin(max(-85.0511, min(85.0511, lat)) * math.pi / 180)
+    return (lng + 180) / 360 * scale, (0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)) * scale
+
+
+def unproject(x, y, zoom):
+    scale = TILE_PX * 2 ** zoom
+    lng = x / scale * 360 - 180
+    lat = math.atan(math.sinh(math.pi * (1 - 2 * y / scale))) * 180 / math.pi
+    return lat, lng
+
+
+def padded_bounds(zoom):
+    """map.getBounds().pad(VIEWPORT_PAD) around CENTER: (south, west, north, east)."""
+    cx, cy = project(*CENTER, zoom)
+    w, h = VIEW_PX
+    north, west = unproject(cx - w / 2, cy - h / 2, zoom)
+    south, east = unproject(cx + w / 2, cy + h / 2, zoom)
+    dlat, dlng = (north - south) * VIEWPORT_PAD, (east - west) * VIEWPORT_PAD
+    return south - dlat, west - dlng, north + dlat, east + dlng
+
+
+def layout(vehicles, zoom, bounds):
+    """FleetLayer draw(): the vehicles drawn as markers and the clusters (lists of vehicles)."""
+    south, west, north, east = bounds
+    visible = [v for v in vehicles.values() if south <= v['lat'] <= north and west <= v['lng'] <= east]
+    if zoom >= CLUSTER_MAX_ZOOM:
+        return visible, []
+    cells = defaultdict(list)
+    for v in visible:
+        x, y = project(v['lat'], v['lng'], zoom)
+        cells[(math.floor(x / CLUSTER_CELL_PX), math.floor(y / CLUSTER_CELL_PX))].append(v)
+    singles = [cell[0] for cell in cells.values() if len(cell) == 1]
+    groups = [cell for cell in cells.values() if len(cell) > 1]
+    return singles, groups
+
+
+class Layer:
+    """The marker bookkeeping of FleetLayer, counting the Leaflet calls it makes."""
+
+    def __init__(self):
+        self.markers = {}        # id -> (lat, lng, icon key)
+        self.shown = set()
+        self.clusters = []       # (lat, lng, count, on layer)
+        self.ops = defaultdict(int)
+
+    def draw(self, vehicles, zoom, bounds):
+        singles, groups = layout(vehicles, zoom, bounds)
+        shown = set()
+        for v in singles:
+            icon = (v['status'], v['name'][:2].upper())
+            marker = self.markers.get(v['id'])
+            if marker is None:
+                self.ops['create'] += 1
+            else:
+                if marker[:2] != (v['lat'], v['lng']):
+                    self.ops['setLatLng'] += 1
+                if marker[2] != icon:
+                    self.ops['setIcon'] += 1
+            self.markers[v['id']] = (v['lat'], v['lng'], icon)
+            if v['id'] not in self.shown:
+                self.ops['add'] += 1
+            shown.add(v['id'])
+        self.ops['remove'] += len(self.shown - shown)
+        self.shown = shown
+
+        for i, members in enumerate(groups):
+            lat = sum(v['lat'] for v in members) / len(members)
+            lng = sum(v['lng'] for v in members) / len(members)
+            if i >= len(self.clusters):
+                self.ops['create'] += 1
+                self.ops['add'] += 1
+            else:
+                old_lat, old_lng, old_count, on_layer = self.clusters[i]
+                if (old_lat, old_lng) != (lat, lng):
+                    self.ops['setLatLng'] += 1
+                if old_count != len(members):
+                    self.ops['setIcon'] += 1
+                if not on_layer:
+                    self.ops['add'] += 1
+            entry = (lat, lng, len(members), True)
+            if i < len(self.clusters):
+                self.clusters[i] = entry
+            else:
+                self.clusters.append(entry)
+        for i in range(len(groups), len(self.clusters)):
+            if self.clusters[i][3]:
+                self.ops['remove'] += 1
+                self.clusters[i] = self.clusters[i][:3] + (False,)
+        return singles, groups
+
+
+def check_layout(vehicles, singles, groups, bounds):
+    south, west, north, east = bounds
+    drawn = [v['id'] for v in singles] + [v['id'] for g in groups for v in g]
+    inside = {v['id'] for v in vehicles.values() if south <= v['lat'] <= north and west <= v['lng'] <= east}
+    return len(drawn) == len(set(drawn)) and set(drawn) == inside
+
+
+def stand_in_fleet(rng, count):
+    vehicles = {}
+    for i in range(count):
+        lat, lng = HOTSPOTS[i % len(HOTSPOTS)]
+        vehicles[f'sim-{i}'] = {'id': f'sim-{i}', 'lat': lat + (rng.random() - 0.5) * 0.2,
+                                'lng': lng + (rng.random() - 0.5) * 0.2,
+                                'status': STATUSES[i % len(STATUSES)], 'name': f'V{i}', 'heading': rng.random() * 6.283}
+    return vehicles
+
+
+def replay(rng, vehicles, zoom, seconds, status_changes_per_min):
+    """Replays `seconds` of position reports; returns per-second counts for both versions."""
+    bounds = padded_bounds(zoom)
+    layer = Layer()
+    layer.draw(vehicles, zoom, bounds)
+    layer.ops.clear()
+    ids = list(vehicles)
+    per_frame = len(ids) / (REPORT_S * 1000 / FRAME_MS)
+    frames = int(seconds * 1000 / FRAME_MS)
+    carry, cursor = 0.0, 0
+    flushes = before_icons = before_moves = before_compares = 0
+    ok = True
+    for frame in range(frames):
+        carry += per_frame
+        changed = int(carry)
+        carry -= changed
+        status_changed = rng.random() < status_changes_per_min * len(ids) / 60 * FRAME_MS / 1000
+        if status_changed:  # a drivers row: the same redraw as a position
+            vehicles[rng.choice(ids)]['status'] = rng.choice(STATUSES)
+        if not changed and not status_changed:
+            continue
+        for _ in range(changed):
+            v = vehicles[ids[cursor % len(ids)]]
+            cursor += 1
+            v['heading'] += (rng.random() - 0.5) * 0.6
+            step = 0 if v['status'] in ('Paused', 'Off') else 0.0012
+            v['lat'] += math.cos(v['heading']) * step
+            v['lng'] += math.sin(v['heading']) * step
+        flushes += 1
+        # Before: every driver re-rendered, whatever moved
+        n = len(vehicles)
+        before_icons += n
+        before_moves += n
+        before_compares += n * n // 2 + n * n // 2   # locations.find + shifts.find, half the list on average
+        singles, groups = layer.draw(vehicles, zoom, bounds)
+        if frame % 60 == 0:
+            ok = ok and check_layout(vehicles, singles, groups, bounds)
+    singles, groups = layer.draw(vehicles, zoom, bounds)
+    return {
+        'flushes': flushes / seconds,
+        'before_dom': len(vehicles),
+        'before_icons': before_icons / seconds,
+        'before_moves': before_moves / seconds,
+        'before_compares': before_compares / seconds,
+        'after_dom': len(singles) + len(groups),
+        'after_icons': layer.ops['setIcon'] / seconds,
+        'after_moves': layer.ops['setLatLng'] / seconds,
+        'after_churn': (layer.ops['add'] + layer.ops['remove']) / seconds,
+        'ok': ok and check_layout(vehicles, singles, groups, bounds),
+    }
+
+
+def report(rng, fleets, zooms, seconds):
+    print(f'{"vehicles":>8} {"zoom":>4} {"flush/s":>7} | {"before: DOM":>11} {"icons/s":>8} {"moves/s":>8} {"compares/s":>11} '
+          f'| {"after: DOM":>10} {"icons/s":>8} {"moves/s":>8} {"add+rm/s":>8}')
+    problems = 0
+    for label, make in fleets:
+        for zoom in zooms:
+            r = replay(rng, make(), zoom, seconds, status_changes_per_min=0.02)
+            print(f'{label:>8} {zoom:>4} {r["flushes"]:>7.0f} | {r["before_dom"]:>11} {r["before_icons"]:>8.0f} '
+                  f'{r["before_moves"]:>8.0f} {r["before_compares"]:>11.0f} | {r["after_dom"]:>10} {r["after_icons"]:>8.1f} '
+                  f'{r["after_moves"]:>8.1f} {r["after_churn"]:>8.1f}' + ('' if r['ok'] else '  LAYOUT MISMATCH'))
+            problems += not r['ok']
+    if problems:
+        sys.exit(1)
+    print('OK: every vehicle in view drawn once, as a marker or in a cluster')
+
+
+def run_stand_in(args):
+    rng = random.Random(args.seed)
+    fleets = [(n, lambda n=n: stand_in_fleet(rng, n)) for n in args.vehicles]
+    report(rng, fleets, args.zooms, args.seconds)
+
+
+def run_live(args):
+    from supabase_rest import SupabaseRest
+
+    rest = SupabaseRest()
+    rng = random.Random(args.seed)
+    drivers = {d['id']: d for d in rest.select('drivers', 'id,name,current_status')}
+    base = {}
+    for loc in rest.select('driver_locations', 'driver_id,lat,lng,updated_at', key='driver_id',
+                           order='updated_at.desc'):
+        d = drivers.get(loc['driver_id'])
+        if d and loc.get('lat') and loc.get('lng') and d['id'] not in base:
+            base[d['id']] = {'id': d['id'], 'lat': loc['lat'], 'lng': loc['lng'], 'status': d.get('current_status') or 'Off',
+                             'name': d.get('name') or '', 'heading': rng.random() * 6.283}
+    if not base:
+        raise SystemExit('No driver positions in driver_locations')
+    report(rng, [(len(base), lambda: {k: dict(v) for k, v in base.items()})], args.zooms, args.seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stand-in', action='store_true', help='Simulated fleets instead of driver_locations')
+    parser.add_argument('--vehicles', type=int, nargs='+', default=[500], help='Stand-in fleet sizes')
+    parser.add_argument('--zooms', type=int, nargs='+', default=[9, 11, 13, 15])
+    parser.add_argument('--seconds', type=int, default=20, help='Simulated seconds per run')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if args.stand_in:
+        run_stand_in(args)
+    else:
+        run_live(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Flight status sync benchmark against the AirLabs stand-in.
+
+    python scripts/airlabs_mock_server.py --quiet &
+    python scripts/flight_sync_bench.py                       # 200 flights, 8 in flight
+    python scripts/flight_sync_bench.py --count 200 --concurrency 16 --ttl 60
+    python scripts/flight_sync_bench.py --function-url http://127.0.0.1:54321/functions/v1/sync-flights
+
+Runs the same lookups (radar first, schedule when the radar has no arrival times)
+two ways: one flight after another, as the Operations Hub used to, and with the
+strategy of sync-flights/airlabs.ts: bounded concurrency, a TTL cache keyed by
+flight_iata and coalescing of lookups already in flight. The concurrent sync is run
+as two overlapping syncs (cron + "Sync" button) and then once more inside the TTL,
+to show what the cache and coalescing save. Exit code 1 if both ways disagree.
+
+With --function-url it also times the edge function itself (serve it with
+AIRLABS_BASE_URL pointing at the stand-in); that call writes to the flights table.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import urllib.request
+
+from supabase_rest import load_env
+
+DEFAULT_BASE_URL = 'http://127.0.0.1:8090/api/v9'
+AIRLINES = ['FR', 'U2', 'LS', 'VY', 'W6', 'BA', 'TOM', 'EW', 'HV', 'DY']
+
+
+def airlabs_get(base_url, endpoint, flight_iata):
+    url = f'{base_url}/{endpoint}?api_key=bench&flight_iata={flight_iata}&arr_iata=ALC'
+    with urllib.request.urlopen(url, timeout=30) as resp:
+        data = json.loads(resp.read())
+    return data['response'][0] if data.get('response') else None
+
+
+def fetch_flight(base_url, flight_iata, counter):
+    counter['calls'] += 1
+    flight = airlabs_get(base_url, 'flights', flight_iata)
+    if not flight or (not flight.get('arr_time_utc') and not flight.get('arr_time')):
+        counter['calls'] += 1
+        schedule = airlabs_get(base_url, 'schedules', flight_iata)
+        if schedule:
+            flight = {**schedule, **flight} if flight else schedule
+    return flight
+
+
+class FlightLookup:
+    """asyncio mirror of sync-flights/airlabs.ts: TTL cache + in-flight coalescing."""
+
+    def __init__(self, base_url, ttl):
+        self.base_url, self.ttl = base_url, ttl
+        self.cache = {}
+        self.in_flight = {}
+        self.counter = {'calls': 0, 'cache_hits': 0, 'coalesced': 0}
+
+    async def get(self, flight_iata):
+        cached = self.cache.get(flight_iata)
+        if cached and cached[0] > time.monotonic():
+            self.counter['cache_hits'] += 1
+            return cached[1]
+        pending = self.in_flight.get(flight_iata)
+        if pending:
+            self.counter['coalesced'] += 1
+            return await pending
+
+        task = asyncio.ensure_future(asyncio.to_thread(fetch_flight, self.base_url, flight_iata, self.counter))
+        self.in_flight[flight_iata] = task
+        try:
+            value = await task
+            self.cache[flight_iata] = (time.monotonic() + self.ttl, value)
+            return value
+        finally:
+            self.in_flight.pop(flight_iata, None)
+
+
+async def sync_concurrent(lookup, numbers, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(number):
+        async with semaphore:
+            return await lookup.get(number)
+
+    return await asyncio.gather(*(one(n) for n in numbers))
+
+
+def sync_sequential(base_url, numbers, counter):
+    return [fetch_flight(base_url, n, counter) for n in numbers]
+
+
+def flight_numbers(count, seed):
+    rng = random.Random(seed)
+    numbers = set()
+    while len(numbers) < count:
+        numbers.add(f'{rng.choice(AIRLINES)}{rng.randrange(100, 9999)}')
+    return sorted(numbers)
+
+
+def report(label, count, elapsed, calls, extra=''):
+    print(f'  {label:<30} {count:4d} flights in {elapsed:6.2f} s  {count / elapsed:7.1f}/s  {calls:4d} API calls{extra}')
+
+
+def call_function(url, key, numbers):
+    req = urllib.request.Request(
+        url, method='POST', data=json.dumps({'flight_numbers': numbers}).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {key}', 'apikey': key},
+    )
+    with urllib.request.urlopen(req, timeout=300) as resp:
+        return json.loads(resp.read())
+
+
+async def run(args):
+    numbers = flight_numbers(args.count, args.seed)
+    print(f'{len(numbers)} flights against {args.base_url}')
+
+    counter = {'calls': 0}
+    started = time.perf_counter()
+    sequential = await asyncio.to_thread(sync_sequential, args.base_url, numbers, counter)
+    report('sequential', len(numbers), time.perf_counter() - started, counter['calls'])
+
+    lookup = FlightLookup(args.base_url, args.ttl)
+    started = time.perf_counter()
+    cron, button = await asyncio.gather(
+        sync_concurrent(lookup, numbers, args.concurrency),
+        sync_concurrent(lookup, numbers, args.concurrency),
+    )
+    report(f'concurrent x2 overlapping ({args.concurrency})', len(numbers), time.perf_counter() - started,
+           lookup.counter['calls'], f'  coalesced {lookup.counter["coalesced"]}')
+
+    calls_before = lookup.counter['calls']
+    started = time.perf_counter()
+    again = await sync_concurrent(lookup, numbers, args.concurrency)
+    report('concurrent, within TTL', len(numbers), time.perf_counter() - started,
+           lookup.counter['calls'] - calls_before, f'  cache hits {lookup.counter["cache_hits"]}')
+
+    mismatches = [n for n, a, b, c, d in zip(numbers, sequential, cron, button, again) if not (a == b == c == d)]
+
+    if args.function_url:
+        env = load_env()
+        key = env.get('SUPABASE_ANON_KEY') or env.get('VITE_SUPABASE_ANON_KEY', '')
+        for label in ('sync-flights', 'sync-flights (warm cache)'):
+            started = time.perf_counter()
+            data = await asyncio.to_thread(call_function, args.function_url, key, numbers)
+            if data.get('error'):
+                print(f'  {label}: {data["error"]}')
+                break
+            report(label, data.get('checked', 0), time.perf_counter() - started, data.get('api_calls', 0),
+                   f'  cache hits {data.get("cache_hits", 0)}  updated {len(data.get("updated") or [])}')
+
+    if mismatches:
+        print(f'{len(mismatches)} flights differ between sequential and concurrent sync, e.g. {mismatches[:5]}')
+        sys.exit(1)
+    print('OK: sequential and concurrent sync agree')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL, help='AirLabs API base URL')
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8, help='Lookups in flight (AIRLABS_CONCURRENCY on the function)')
+    parser.add_argument('--ttl', type=float, default=60, help='Cache TTL in seconds (AIRLABS_CACHE_TTL_MS on the function)')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--function-url', help='Also time the sync-flights edge function')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
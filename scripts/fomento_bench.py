@@ -0,0 +1,103 @@
+"""Throughput benchmark for the fomento-vtc edge function against the SOAP stand-in.
+
+    python scripts/fomento_mock_server.py --quiet &
+    FOMENTO_ENDPOINT_URL=http://host.docker.internal:8089/VTCPort supabase functions serve fomento-vtc
+    python scripts/fomento_bench.py --count 200
+    python scripts/fomento_bench.py --count 200 --concurrency 8 --batch-size 25
+
+Communicates `count` synthetic altas and then annuls them, first one request per
+communication (how the views used to call the function) and then through the
+`batch` action the app's queue uses. Prints communications per second for each.
+"""
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from supabase_rest import load_env
+
+DEFAULT_FUNCTION_URL = 'http://127.0.0.1:54321/functions/v1/fomento-vtc'
+
+
+def alta_payload(i):
+    day = (date.today() + timedelta(days=1 + i % 30)).isoformat()
+    return {
+        'niftitular': 'B26816025', 'nif': 'B26816025', 'matricula': '2170-LVB',
+        'cgprovcontrato': '03', 'cgmunicontrato': '014',
+        'cgprovinicio': '03', 'cgmuniinicio': '065', 'direccioninicio': f'Aeropuerto de Alicante-Elche (bench {i})',
+        'cgprovfin': '03', 'cgmunifin': '031', 'direccionfin': 'Benidorm',
+        'fecinicio': day, 'horinicio': '10:00', 'fecfin': day,
+        'is_test': True,
+    }
+
+
+class FunctionClient:
+    def __init__(self, url, key):
+        self.url, self.key = url, key
+        self.requests = 0
+
+    def post(self, body):
+        req = urllib.request.Request(
+            self.url, method='POST', data=json.dumps(body).encode('utf-8'),
+            headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {self.key}', 'apikey': self.key},
+        )
+        with urllib.request.urlopen(req, timeout=300) as resp:
+            self.requests += 1
+            return json.loads(resp.read())
+
+
+def run_single(client, items, parallel):
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        return list(pool.map(lambda item: client.post(item), items))
+
+
+def run_batched(client, items, batch_size, concurrency):
+    results = []
+    for i in range(0, len(items), batch_size):
+        data = client.post({'action': 'batch', 'items': items[i:i + batch_size], 'concurrency': concurrency})
+        results.extend(data.get('results') or [{'success': False, 'error': data.get('error')}] * len(items[i:i + batch_size]))
+    return results
+
+
+def measure(label, fn):
+    started = time.perf_counter()
+    results = fn()
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for r in results if r.get('success'))
+    retried = sum(1 for r in results if (r.get('attempts') or 1) > 1)
+    print(f'  {label:<28} {len(results):5d} in {elapsed:6.2f} s  {len(results) / elapsed:7.1f}/s  ok {ok}  retried {retried}')
+    return results
+
+
+def round_trip(label, send, count):
+    altas = [{'action': 'alta', 'payload': alta_payload(i)} for i in range(count)]
+    results = measure(f'{label} alta', lambda: send(altas))
+    anulaciones = [{'action': 'anulacion', 'payload': {'idservicio': r['idservicio'], 'is_test': True}}
+                   for r in results if r.get('success') and r.get('idservicio')]
+    measure(f'{label} anulacion', lambda: send(anulaciones))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help=f'fomento-vtc URL (default {DEFAULT_FUNCTION_URL})')
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--parallel', type=int, default=1, help='Concurrent single requests (the views send one at a time)')
+    parser.add_argument('--batch-size', type=int, default=25)
+    parser.add_argument('--concurrency', type=int, default=4, help='Edge-side send concurrency per batch')
+    args = parser.parse_args()
+
+    env = load_env()
+    client = FunctionClient(args.url or DEFAULT_FUNCTION_URL,
+                            env.get('SUPABASE_ANON_KEY') or env.get('VITE_SUPABASE_ANON_KEY', ''))
+
+    print(f'{args.count} communications against {client.url}')
+    round_trip('single', lambda items: run_single(client, items, args.parallel), args.count)
+    before = client.requests
+    round_trip('batch', lambda items: run_batched(client, items, args.batch_size, args.concurrency), args.count)
+    print(f'  batch mode used {client.requests - before} function calls')
+
+
+if __name__ == '__main__':
+    main()
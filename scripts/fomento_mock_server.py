@@ -0,0 +1,196 @@
+"""Local stand-in for the Ministry's Registro VTC SOAP service.
+
+    python scripts/fomento_mock_server.py                     # http://127.0.0.1:8089/VTCPort
+    python scripts/fomento_mock_server.py --latency 300 --jitter 200 --drop-rate 0.05
+
+Point the fomento-vtc edge function at it with FOMENTO_ENDPOINT_URL, e.g.
+`supabase functions serve` with FOMENTO_ENDPOINT_URL=http://host.docker.internal:8089/VTCPort,
+then drive it with scripts/fomento_bench.py.
+
+Implements the operations of manual.txt §3.4 that the app uses: alta (qaltavtc),
+inicio (qiniciovtc), anulación (qanulacionvtc), modificación (qmodificavtc) and
+consulta (qconsultavtc). Services live in memory. The envelope must carry a
+ds:Signature and a BinarySecurityToken, but the signature itself is not verified.
+Result codes follow the ones the edge function maps (00, 57, 79); "not found"
+and "invalid state" use 99, which is not part of the official table.
+"""
+import argparse
+import itertools
+import random
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import quoteattr
+
+VTC_NS = 'http://mfom.com/vtc'
+PLATE = re.compile(r'^[0-9]{4}-?[A-Z]{3}$')
+
+ESTADO_ALTA, ESTADO_INICIADO, ESTADO_ANULADO = '1', '2', '3'
+
+services = {}
+by_idcomunica = {}
+services_lock = threading.Lock()
+next_id = itertools.count(int(time.time()) % 1_000_000 * 1000)
+stats = {'requests': 0, 'dropped': 0}
+
+
+def now_iso():
+    return datetime.now().replace(microsecond=0).isoformat()
+
+
+def envelope(op, inner):
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"><soapenv:Body>'
+        f'<vtc:{op} xmlns:vtc="{VTC_NS}"><header version="1.0" fecha="{now_iso()}"/>'
+        f'<body>{inner}</body></vtc:{op}></soapenv:Body></soapenv:Envelope>'
+    )
+
+
+def fault(message):
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"><soapenv:Body>'
+        f'<soapenv:Fault><faultcode>soapenv:Client</faultcode><faultstring>{message}</faultstring></soapenv:Fault>'
+        '</soapenv:Body></soapenv:Envelope>'
+    )
+
+
+def result(op, code, iderror=None, **fields):
+    inner = f'<resultado>{code}</resultado>'
+    if iderror:
+        inner += f'<iderror>{iderror}</iderror>'
+    inner += ''.join(f'<{k}>{v}</{k}>' for k, v in fields.items() if v is not None)
+    return envelope(op, inner)
+
+
+def alta(header, servicio):
+    plate = servicio.get('matricula', '')
+    if not PLATE.match(plate):
+        return result('raltavtc', '79', 'matricula')
+    if servicio.get('ffin', '') < servicio.get('fprevistainicio', '')[:10]:
+        return result('raltavtc', '57', 'ffin')
+    idcomunica = header.get('idcomunica')
+    with services_lock:
+        # Same idcomunica twice (a client retry) returns the original service
+        if idcomunica and idcomunica in by_idcomunica:
+            return result('raltavtc', '00', idservicio=by_idcomunica[idcomunica], idcomunica=idcomunica)
+        idservicio = str(next(next_id))
+        services[idservicio] = {**servicio, 'idcomunica': idcomunica, 'estado': ESTADO_ALTA}
+        if idcomunica:
+            by_idcomunica[idcomunica] = idservicio
+    return result('raltavtc', '00', idservicio=idservicio, idcomunica=idcomunica)
+
+
+def transition(op, servicio, allowed, new_estado, updates=()):
+    idservicio = servicio.get('idservicio')
+    with services_lock:
+        s = services.get(idservicio)
+        if s is None:
+            return result(op, '99', 'idservicio no encontrado')
+        if s['estado'] not in allowed:
+            return result(op, '99', f'estado {s["estado"]} no admite la operación')
+        s['estado'] = new_estado or s['estado']  # modificación keeps the estado
+        for field in updates:
+            if servicio.get(field):
+                s[field] = servicio[field]
+    return result(op, '00', idservicio=idservicio)
+
+
+def consulta(servicio):
+    idservicio = servicio.get('idservicio')
+    with services_lock:
+        s = dict(services.get(idservicio) or {})
+    if not s:
+        return result('rconsultavtc', '99', 'idservicio no encontrado')
+    attrs = ' '.join(f'{k}={quoteattr(str(v))}' for k, v in s.items() if k != 'idcomunica')
+    return envelope('rconsultavtc', f'<resultado>00</resultado><vtcservicio idservicio="{idservicio}" {attrs}/>')
+
+
+def handle(xml_text):
+    try:
+        root = ET.fromstring(xml_text.encode('utf-8'))
+    except ET.ParseError as e:
+        return fault(f'XML mal formado: {e}')
+    if not any(el.tag.endswith('}Signature') for el in root.iter()):
+        return fault('Mensaje sin firma WS-Security')
+    if not any(el.tag.endswith('}BinarySecurityToken') for el in root.iter()):
+        return fault('Falta BinarySecurityToken')
+
+    request = next((el for el in root.iter() if el.tag.startswith('{' + VTC_NS + '}')), None)
+    if request is None:
+        return fault('Operación no reconocida')
+    op = request.tag.split('}')[1]
+    header = request.find('header')
+    body = request.find('body')
+    servicio = next(iter(body), None) if body is not None else None
+    if header is None or servicio is None:
+        return fault('Faltan header/body')
+    header, servicio = dict(header.attrib), dict(servicio.attrib)
+
+    if op == 'qaltavtc':
+        return alta(header, servicio)
+    if op == 'qiniciovtc':
+        return transition('riniciovtc', servicio, {ESTADO_ALTA}, ESTADO_INICIADO)
+    if op == 'qanulacionvtc':
+        return transition('ranulacionvtc', servicio, {ESTADO_ALTA}, ESTADO_ANULADO)
+    if op == 'qmodificavtc':
+        return transition('rmodificavtc', servicio, {ESTADO_ALTA, ESTADO_INICIADO}, None,
+                          ('cgprovfin', 'cgmunifin', 'direccionfin', 'matricula'))
+    if op == 'qconsultavtc':
+        return consulta(servicio)
+    return fault(f'Operación {op} no soportada')
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        xml_text = self.rfile.read(length).decode('utf-8')
+        stats['requests'] += 1
+
+        if random.random() < self.config.drop_rate:
+            # Simulated network failure: close without answering
+            stats['dropped'] += 1
+            self.close_connection = True
+            return
+
+        delay = self.config.latency + random.uniform(0, self.config.jitter)
+        time.sleep(delay / 1000)
+        response = handle(xml_text).encode('utf-8')
+        self.send_response(500 if b'Fault>' in response else 200)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, fmt, *args):
+        if not self.config.quiet:
+            super().log_message(fmt, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=150, help='Base response latency in ms')
+    parser.add_argument('--jitter', type=float, default=100, help='Extra random latency in ms')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Fraction of requests dropped without answer')
+    parser.add_argument('--quiet', action='store_true')
+    Handler.config = parser.parse_args()
+
+    server = ThreadingHTTPServer((Handler.config.host, Handler.config.port), Handler)
+    print(f'Registro VTC stand-in on http://{Handler.config.host}:{Handler.config.port}/VTCPort')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f'\n{stats["requests"]} requests ({stats["dropped"]} dropped), {len(services)} services registered')
+
+
+if __name__ == '__main__':
+    main()
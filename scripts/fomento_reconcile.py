@@ -0,0 +1,152 @@
+"""Reconcile bookings marked as communicated with the Registro VTC (consulta).
+
+    python scripts/fomento_reconcile.py 2026-09-01 2026-09-30
+    python scripts/fomento_reconcile.py 2026-09-01 2026-09-30 --dry-run
+    python scripts/fomento_reconcile.py 2026-09-01 2026-09-30 \\
+        --function-url http://127.0.0.1:54321/functions/v1/fomento-vtc   # local serve + fomento_mock_server.py
+
+Pages through the bookings of the range that have a fomento_status, sends consulta
+for each idservicio in batches through fomento-vtc (signer and key material are
+reused on the function side) with several batches in flight, and writes every
+disagreement to fomento_reconciliation under a new run_id. Exit code 1 if any
+issue was found.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from supabase_rest import SupabaseRest
+
+EXPECTED_ESTADO = {'COMUNICADO': '1', 'INICIADO': '2', 'ANULADO': '3'}
+BATCH_SIZE = 25
+
+
+def xml_value(raw, tag):
+    match = (re.search(rf'<(?:[^>:]+:)?{tag}[^>]*>([^<]+)</(?:[^>:]+:)?{tag}>', raw or '', re.I)
+             or re.search(rf'{tag}="([^"]+)"', raw or '', re.I))
+    return match.group(1).strip() if match else None
+
+
+def normalize_plate(plate):
+    return re.sub(r'[^0-9A-Z]', '', (plate or '').upper())
+
+
+def consulta_batch(function_url, key, bookings, concurrency):
+    body = {
+        'action': 'batch',
+        'concurrency': concurrency,
+        'items': [{'action': 'consulta', 'payload': {'idservicio': b['fomento_idservicio']}} for b in bookings],
+    }
+    req = urllib.request.Request(
+        function_url, method='POST', data=json.dumps(body).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {key}', 'apikey': key},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=300) as resp:
+            data = json.loads(resp.read())
+    except Exception as e:  # the whole batch failed; report each booking
+        return [{'success': False, 'error': str(e)}] * len(bookings)
+    return data.get('results') or [{'success': False, 'error': data.get('error')}] * len(bookings)
+
+
+def classify(booking, response, plates):
+    """Returns (issue, registry_estado, details) or None when app and registry agree."""
+    app_status = booking['fomento_status']
+    raw = response.get('rawResponse') or ''
+    resultado = response.get('resultado')
+    if not response.get('success'):
+        if resultado and resultado not in ('TIMEOUT', 'ERROR'):
+            return 'no_registrado', None, {'error': response.get('error')}
+        return 'error_consulta', None, {'error': response.get('error')}
+
+    estado = xml_value(raw, 'estado')
+    expected = EXPECTED_ESTADO.get(app_status)
+    if expected and estado and estado != expected:
+        return 'estado_distinto', estado, {'expected': expected}
+    if booking.get('status') == 'Cancelled' and estado in ('1', '2'):
+        return 'cancelada_sin_anular', estado, {}
+
+    registry_plate = xml_value(raw, 'matricula')
+    booking_plate = plates.get(booking.get('vehicle_id'))
+    if registry_plate and booking_plate and normalize_plate(registry_plate) != normalize_plate(booking_plate):
+        return 'matricula_distinta', estado, {'registry': registry_plate, 'booking': booking_plate}
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('start', help='First pickup date (inclusive)')
+    parser.add_argument('end', help='Last pickup date (inclusive)')
+    parser.add_argument('--function-url', help='fomento-vtc URL (default <VITE_SUPABASE_URL>/functions/v1/fomento-vtc)')
+    parser.add_argument('--parallel', type=int, default=4, help='Batches in flight')
+    parser.add_argument('--concurrency', type=int, default=4, help='Consultas in flight per batch (edge side)')
+    parser.add_argument('--dry-run', action='store_true', help='Print issues without writing the report')
+    args = parser.parse_args()
+
+    db = SupabaseRest()
+    function_url = args.function_url or f'{db.url}/functions/v1/fomento-vtc'
+    started = time.perf_counter()
+
+    bookings = db.select(
+        'bookings', 'id,pickup_date,status,vehicle_id,fomento_status,fomento_idservicio',
+        pickup_date=[f'gte.{args.start}', f'lte.{args.end}T23:59:59'],
+        fomento_status='in.(COMUNICADO,INICIADO,ANULADO)',
+        order='pickup_date.asc',
+    )
+    plates = {v['id']: v['plate'] for v in db.select('vehicles', 'id,plate')}
+
+    run_id = str(uuid.uuid4())
+    issues = []
+
+    def report(booking, issue, estado=None, resultado=None, details=None):
+        issues.append({
+            'run_id': run_id,
+            'booking_id': booking['id'],
+            'pickup_date': (booking.get('pickup_date') or '')[:10] or None,
+            'fomento_idservicio': booking.get('fomento_idservicio'),
+            'app_status': booking['fomento_status'],
+            'registry_estado': estado,
+            'resultado': resultado,
+            'issue': issue,
+            'details': details or {},
+        })
+
+    to_check = []
+    for b in bookings:
+        if b.get('fomento_idservicio'):
+            to_check.append(b)
+        else:
+            report(b, 'sin_idservicio')
+
+    chunks = [to_check[i:i + BATCH_SIZE] for i in range(0, len(to_check), BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+        for chunk, responses in zip(chunks, pool.map(lambda c: consulta_batch(function_url, db.key, c, args.concurrency), chunks)):
+            for booking, response in zip(chunk, responses):
+                outcome = classify(booking, response, plates)
+                if outcome:
+                    issue, estado, details = outcome
+                    report(booking, issue, estado, response.get('resultado'), details)
+
+    elapsed = time.perf_counter() - started
+    print(f'{len(bookings)} bookings {args.start}..{args.end}: {len(to_check)} consultas in {len(chunks)} batches, {elapsed:.1f} s')
+    counts = {}
+    for row in issues:
+        counts[row['issue']] = counts.get(row['issue'], 0) + 1
+    for issue, n in sorted(counts.items()):
+        print(f'  {issue:<22} {n}')
+
+    if issues and not args.dry_run:
+        db.upsert('fomento_reconciliation', issues, on_conflict='run_id,booking_id')
+        print(f'Wrote {len(issues)} rows to fomento_reconciliation (run {run_id})')
+    if issues:
+        sys.exit(1)
+    print('OK: every communicated booking matches the registry')
+
+
+if __name__ == '__main__':
+    main()
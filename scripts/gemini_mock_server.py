@@ -0,0 +1,179 @@
+"""Local stand-in for the Gemini generateContent API, for booking intake benchmarks.
+
+    python scripts/gemini_mock_server.py                      # http://127.0.0.1:8093
+    python scripts/gemini_mock_server.py --latency 600 --ms-per-token 4 --error-rate 0.02
+
+Point the app at it with VITE_GEMINI_BASE_URL=http://127.0.0.1:8093 (any VITE_GEMINI_API_KEY),
+or drive it with scripts/booking_parse_bench.py.
+
+Answers POST /v1beta/models/<model>:generateContent for the two booking prompts of
+services/geminiService.ts: the batch prompt (a JSON array of {index, text} after
+"Messages (JSON):"), answered with a JSON array as a response schema would make the model
+do, and the old one-message prompt (Text: "..."), answered with a JSON object in a
+```json block. Fields are pulled out with regular expressions that understand the messages
+the benchmark writes (English and Spanish, relative dates); places are returned as written.
+Latency is --latency plus --ms-per-token for every output token, and usageMetadata counts
+four characters per token, so batching shows up in both time and tokens. The key is not
+checked.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+stats = {'requests': 0, 'messages': 0, 'errors': 0, 'prompt_tokens': 0, 'output_tokens': 0}
+stats_lock = threading.Lock()
+
+WEEKDAYS = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6,
+            'lunes': 0, 'martes': 1, 'miercoles': 2, 'miércoles': 2, 'jueves': 3, 'viernes': 4, 'sabado': 5,
+            'sábado': 5, 'domingo': 6}
+EMAIL = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+PHONE = re.compile(r'\+?\d[\d ]{7,}\d')
+TIME = re.compile(r'\b([01]?\d|2[0-3])[:h.]([0-5]\d)\b')
+ISO_DATE = re.compile(r'\b(\d{4})-(\d{2})-(\d{2})\b')
+DMY_DATE = re.compile(r'\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b')
+PAX = re.compile(r'\b(\d{1,2})\s*(?:pax|passengers|people|personas|adultos|adults)\b', re.I)
+FLIGHT = re.compile(r'\b(?:flight|vuelo)\s*:?\s*([A-Z0-9]{2}\s?\d{2,4})\b', re.I)
+ROUTE = re.compile(r'\b(?:from|desde)\s+(.+?)\s+(?:to|hasta)\s+(.+?)(?=[,.;\n]| on | el | at | a las |$)', re.I)
+NAME = re.compile(r'(?:name|pasajero|passenger|a nombre de|for)\s*:?\s+((?:(?:Mr|Mrs|Ms|Sr|Sra)\.?\s+)?[A-ZÁÉÍÓÚÑ][\w\'-]+(?:\s+(?:de\s+|van\s+)?[A-ZÁÉÍÓÚÑ][\w\'-]+)*)')
+NOTES = re.compile(r'(?:notes?|notas?|nota)\s*:\s*([^\n]+)', re.I)
+
+
+def extract(text, today):
+    """What the model would make of one message."""
+    booking = {k: None for k in ('passenger', 'phone', 'email', 'pickup_date', 'pickup_time', 'origin',
+                                 'destination', 'pax_count', 'flight_number', 'notes')}
+    if m := EMAIL.search(text):
+        booking['email'] = m.group(0)
+    if m := PHONE.search(text):
+        booking['phone'] = m.group(0).replace(' ', '')
+    if m := TIME.search(text):
+        booking['pickup_time'] = f'{int(m.group(1)):02d}:{m.group(2)}'
+    lower = text.lower()
+    if m := ISO_DATE.search(text):
+        booking['pickup_date'] = m.group(0)
+    elif m := DMY_DATE.search(text):
+        year = int(m.group(3) or today.year)
+        year = year + 2000 if year < 100 else year
+        booking['pickup_date'] = date(year, int(m.group(2)), int(m.group(1))).isoformat()
+    elif 'pasado mañana' in lower or 'day after tomorrow' in lower:
+        booking['pickup_date'] = (today + timedelta(days=2)).isoformat()
+    elif 'tomorrow' in lower or 'mañana' in lower:
+        booking['pickup_date'] = (today + timedelta(days=1)).isoformat()
+    elif 'today' in lower or 'hoy' in lower:
+        booking['pickup_date'] = today.isoformat()
+    else:
+        for word, weekday in WEEKDAYS.items():
+            if re.search(rf'\b{word}\b', lower):
+                booking['pickup_date'] = (today + timedelta(days=(weekday - today.weekday() - 1) % 7 + 1)).isoformat()
+                break
+    pax = PAX.search(text)
+    booking['pax_count'] = int(pax.group(1)) if pax else 1
+    if m := FLIGHT.search(text):
+        booking['flight_number'] = m.group(1).replace(' ', '').upper()
+    if m := ROUTE.search(text):
+        booking['origin'], booking['destination'] = m.group(1).strip(), m.group(2).strip()
+    if m := NAME.search(text):
+        booking['passenger'] = m.group(1).strip()
+    if m := NOTES.search(text):
+        booking['notes'] = m.group(1).strip()
+    return booking
+
+
+def tokens(text):
+    return math.ceil(len(text) / 4)
+
+
+class Handler(BaseHTTPRequestHandler):
+    config = None
+
+    def do_POST(self):
+        if not re.match(r'^/v1(beta)?/models/[\w.-]+:generateContent', self.path):
+            return self.reply(404, {'error': {'code': 404, 'message': f'Unknown path {self.path}', 'status': 'NOT_FOUND'}})
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        prompt = ''.join(part.get('text', '') for content in body.get('contents', [])
+                         for part in content.get('parts', []))
+        with stats_lock:
+            stats['requests'] += 1
+        if random.random() < self.config.error_rate:
+            with stats_lock:
+                stats['errors'] += 1
+            return self.reply(503, {'error': {'code': 503, 'message': 'The model is overloaded.', 'status': 'UNAVAILABLE'}})
+
+        today_match = re.search(r'Current Date: (\d{4}-\d{2}-\d{2})', prompt)
+        today = date.fromisoformat(today_match.group(1)) if today_match else date.today()
+        if 'Messages (JSON):' in prompt:
+            messages = json.loads(prompt.split('Messages (JSON):', 1)[1])
+            answer = json.dumps([dict(index=m['index'], **extract(m['text'], today)) for m in messages],
+                                ensure_ascii=False)
+            count = len(messages)
+        else:
+            text_match = re.search(r'Text: "([\s\S]*?)"\s*\n\s*Return ONLY JSON', prompt)
+            booking = extract(text_match.group(1) if text_match else prompt, today)
+            answer = '```json\n' + json.dumps(booking, ensure_ascii=False, indent=2) + '\n```'
+            count = 1
+
+        prompt_tokens, output_tokens = tokens(prompt), tokens(answer)
+        with stats_lock:
+            stats['messages'] += count
+            stats['prompt_tokens'] += prompt_tokens
+            stats['output_tokens'] += output_tokens
+        time.sleep((self.config.latency + random.random() * self.config.jitter
+                    + output_tokens * self.config.ms_per_token) / 1000)
+        self.reply(200, {
+            'candidates': [{'content': {'role': 'model', 'parts': [{'text': answer}]}, 'finishReason': 'STOP', 'index': 0}],
+            'usageMetadata': {'promptTokenCount': prompt_tokens, 'candidatesTokenCount': output_tokens,
+                              'totalTokenCount': prompt_tokens + output_tokens},
+            'modelVersion': 'gemini-2.5-flash-mock',
+        })
+
+    def do_OPTIONS(self):
+        # The browser SDK preflights its requests
+        self.send_response(204)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', '*')
+        self.end_headers()
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        if not self.config.quiet:
+            super().log_message(fmt, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8093)
+    parser.add_argument('--latency', type=float, default=500, help='Base response latency in ms')
+    parser.add_argument('--jitter', type=float, default=200, help='Extra random latency in ms')
+    parser.add_argument('--ms-per-token', type=float, default=4, help='Generation time per output token in ms')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered 503')
+    parser.add_argument('--quiet', action='store_true')
+    Handler.config = parser.parse_args()
+
+    server = ThreadingHTTPServer((Handler.config.host, Handler.config.port), Handler)
+    print(f'Gemini stand-in on http://{Handler.config.host}:{Handler.config.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f'\n{stats["requests"]} requests ({stats["messages"]} messages, {stats["errors"]} errors), '
+              f'{stats["prompt_tokens"]} prompt and {stats["output_tokens"]} output tokens')
+
+
+if __name__ == '__main__':
+    main()
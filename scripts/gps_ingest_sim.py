@@ -0,0 +1,275 @@
+"""GPS telemetry: write amplification of the old per-fix writes vs batched ingestion.
+
+    python scripts/gps_ingest_sim.py                             # 40 drivers, 10 h shifts
+    python scripts/gps_ingest_sim.py --drivers 120 --hours 8 --offline 0.1 --clients 25
+
+Generates a fleet's 1 Hz GPS traces (idle spells parked with a few metres of jitter,
+trips with urban and motorway speed profiles, coverage gaps) and replays them through:
+
+  before  DriverAppView as it was: every 30 s one driver_locations upsert, plus an
+          updateBooking(max_speed) per active booking whenever the current speed beats
+          the stored maximum; fixes taken offline are lost
+  after   services/telemetryQueue.ts: fixes thinned on the phone (each point carrying the
+          peak speed since the previous one), queued while offline and sent every 30 s as
+          one ingest_gps_points call that appends to gps_points and moves driver_locations
+          to the newest point (migration 20261019000110); max_speed is raised in 10 km/h
+          steps during the trip and set exactly by the status change that ends it
+
+Bytes written are estimated per row version: heap tuple plus one entry per index it
+touches. A bookings update rewrites the whole row and, with updated_at indexed by the
+delta-sync migration, is never HOT, so every index of bookings gets a new entry; each
+one is also pushed to every realtime client. "amplification" is bytes written per byte
+of position data the server receives (timestamp, position and speed: 18 bytes a fix);
+"history" is the points still queryable afterwards. Max-speed error is against the 1 Hz
+trace, over the trips that ended within the shift.
+"""
+import argparse
+import math
+import random
+
+FLUSH_S = 30
+
+# Thinning, as in services/telemetryQueue.ts
+MOVING_KEEP_S = 30
+STATIONARY_KEEP_S = 120
+MOVING_MIN_S = 5
+BEND_M = 25
+STATIONARY_RADIUS_M = 15
+MAX_SPEED_STEP = 10                 # ingest_gps_points, while the trip is in progress
+
+POINT_PAYLOAD = 18                  # 8 timestamp + 4 + 4 coordinates + 2 speed
+GPS_POINT_TUPLE = 24 + 16 + 8 + 4 + 4 + 2 + 16 + 6   # header, columns, alignment
+INDEX_ENTRY = 16 + 24               # b-tree tuple: header + (uuid, timestamptz) key
+LOCATION_TUPLE = 24 + 16 + 8 + 8 + 8
+
+
+def distance_m(a, b):
+    rad = math.pi / 180
+    d_lat = (b[0] - a[0]) * rad
+    d_lng = (b[1] - a[1]) * rad * math.cos((a[0] + b[0]) / 2 * rad)
+    return 6371000 * math.hypot(d_lat, d_lng)
+
+
+def move(lat, lng, heading, metres):
+    d_lat = metres * math.cos(heading) / 111320
+    d_lng = metres * math.sin(heading) / (111320 * math.cos(math.radians(lat)))
+    return lat + d_lat, lng + d_lng
+
+
+def make_trace(rng, seconds, offline_share):
+    """1 Hz fixes: (t, lat, lng, speed_kmh, trip index or None, online)."""
+    lat, lng = 40.4168 + rng.uniform(-0.1, 0.1), -3.7038 + rng.uniform(-0.1, 0.1)
+    fixes, t, trip = [], 0, 0
+    online_until, offline_until = 0, 0
+    while t < seconds:
+        idle = rng.randint(300, 2400)
+        for _ in range(idle):
+            jitter = move(lat, lng, rng.uniform(0, 2 * math.pi), rng.uniform(0, 6))
+            fixes.append([t, *jitter, 0, None])
+            t += 1
+        duration = rng.randint(900, 3600)
+        motorway = rng.random() < 0.4
+        cruise = rng.uniform(95, 128) if motorway else rng.uniform(30, 55)
+        heading, speed = rng.uniform(0, 2 * math.pi), 0.0
+        for s in range(duration):
+            if rng.random() < (0.002 if motorway else 0.01):
+                speed = 0.0  # lights, junctions, traffic
+            target = cruise * (0.5 if s < 120 or s > duration - 120 else 1.0)
+            speed += max(-8.0, min(4.0, target - speed)) + rng.gauss(0, 1.5)
+            speed = max(0.0, speed)
+            heading += rng.gauss(0, 0.03)
+            lat, lng = move(lat, lng, heading, speed / 3.6)
+            fixes.append([t, lat, lng, round(speed), trip])
+            t += 1
+        trip += 1
+    # Coverage gaps: tunnels, car parks, rural stretches
+    for fix in fixes:
+        if fix[0] >= offline_until and fix[0] >= online_until:
+            if rng.random() < offline_share:
+                offline_until = fix[0] + rng.randint(120, 900)
+            else:
+                online_until = fix[0] + rng.randint(300, 3600)
+        fix.append(fix[0] >= offline_until)
+    return fixes[:seconds]
+
+
+def true_max(traces):
+    """Max speed of every finished trip (the one running at the end of a shift is left out)."""
+    best = {}
+    for d, fixes in enumerate(traces):
+        for _, _, _, speed, trip, _ in fixes:
+            if trip is not None:
+                best[(d, trip)] = max(best.get((d, trip), 0), speed)
+        if fixes[-1][4] is not None:
+            best.pop((d, fixes[-1][4]), None)
+    return best
+
+
+def replay_before(traces, args):
+    totals = dict(requests=0, rows=0, bytes=0, booking_rewrites=0, realtime=0, points=0, history=0, lost=0)
+    stored = {}
+    for d, fixes in enumerate(traces):
+        for t, lat, lng, speed, trip, online in fixes[FLUSH_S - 1::FLUSH_S]:
+            if not online:
+                totals['lost'] += 1
+                continue
+            totals['requests'] += 1
+            totals['rows'] += 1
+            totals['points'] += 1
+            totals['bytes'] += LOCATION_TUPLE + INDEX_ENTRY
+            if trip is not None and speed > 0 and speed > stored.get((d, trip), 0):
+                stored[(d, trip)] = speed
+                totals['requests'] += 1
+                totals['rows'] += 1
+                totals['booking_rewrites'] += 1
+                totals['bytes'] += args.booking_row_bytes + args.booking_indexes * INDEX_ENTRY
+                totals['realtime'] += args.booking_row_bytes * args.clients
+    return totals, stored
+
+
+class Thinner:
+    """The client side of services/telemetryQueue.ts for one driver."""
+
+    def __init__(self):
+        self.queue = []
+        self.last_kept = self.last_fix = self.skipped = None
+        self.travelled = 0.0
+        self.trip_max = {}
+
+    def keeps(self, fix):
+        t, lat, lng, _, trip = fix
+        if self.last_kept is None or self.last_kept[4] != trip:
+            return True
+        elapsed = t - self.last_kept[0]
+        moved = distance_m(self.last_kept[1:3], (lat, lng))
+        if moved < STATIONARY_RADIUS_M:
+            return elapsed >= STATIONARY_KEEP_S
+        return elapsed >= MOVING_KEEP_S or (self.travelled - moved > BEND_M and elapsed >= MOVING_MIN_S)
+
+    def keep(self, fix):
+        self.last_kept, self.skipped, self.travelled = fix, None, 0.0
+        if fix[4] is not None:
+            self.trip_max[fix[4]] = max(self.trip_max.get(fix[4], 0), fix[3])
+        self.queue.append(fix)
+
+    def settle(self):
+        if self.skipped and self.skipped[4] is not None and self.skipped[3] > self.trip_max.get(self.skipped[4], 0):
+            self.keep(self.skipped)
+        self.skipped = None
+
+    def record(self, fix):
+        if self.skipped and self.skipped[4] != fix[4]:
+            self.settle()
+        if self.last_fix:
+            self.travelled += distance_m(self.last_fix[1:3], fix[1:3])
+        self.last_fix = fix
+        peak = max(fix[3], self.skipped[3]) if self.skipped else fix[3]
+        if self.keeps(fix):
+            self.keep((*fix[:3], peak, fix[4]))
+        else:
+            self.skipped = (*fix[:3], peak, fix[4])
+
+    def take(self):
+        self.settle()
+        batch, self.queue = self.queue, []
+        return batch
+
+
+def replay_after(traces, args):
+    totals = dict(requests=0, rows=0, bytes=0, booking_rewrites=0, realtime=0, points=0, history=0, lost=0)
+    stored = {}
+
+    def rewrite(key, speed):
+        stored[key] = speed
+        totals['rows'] += 1
+        totals['booking_rewrites'] += 1
+        totals['bytes'] += args.booking_row_bytes + args.booking_indexes * INDEX_ENTRY
+        totals['realtime'] += args.booking_row_bytes * args.clients
+
+    for d, fixes in enumerate(traces):
+        client, uploaded, pending = Thinner(), {}, []
+        current = None
+        for t, lat, lng, speed, trip, online in fixes:
+            if trip != current and current is not None:
+                # Status change ending the trip: max_speed from the points already uploaded
+                key = (d, current)
+                if uploaded.get(current, 0) > stored.get(key, 0):
+                    stored[key] = uploaded[current]
+            current = trip
+            client.record((t, lat, lng, speed, trip))
+            if (t + 1) % FLUSH_S:
+                continue
+            pending += client.take()
+            if not online or not pending:
+                continue
+            # One ingest_gps_points call with everything queued
+            totals['requests'] += 1
+            totals['points'] += len(pending)
+            totals['history'] += len(pending)
+            totals['rows'] += len(pending) + 1
+            on_trip = sum(1 for f in pending if f[4] is not None)
+            totals['bytes'] += (len(pending) * (GPS_POINT_TUPLE + INDEX_ENTRY) + on_trip * INDEX_ENTRY
+                                + LOCATION_TUPLE + INDEX_ENTRY)
+            batch_max = {}
+            for f in pending:
+                if f[4] is not None:
+                    batch_max[f[4]] = max(batch_max.get(f[4], 0), f[3])
+            for trip_no, top in batch_max.items():
+                uploaded[trip_no] = max(uploaded.get(trip_no, 0), top)
+                have = stored.get((d, trip_no), 0)
+                in_progress = trip_no == trip
+                if top > have and (top >= have + MAX_SPEED_STEP or not in_progress):
+                    rewrite((d, trip_no), top)
+            pending = []
+        pending += client.take()
+        totals['lost'] += len(pending)  # still queued at the end of the shift: sent on the next start
+    return totals, stored
+
+
+def max_speed_error(stored, truth):
+    errors = [truth[k] - stored.get(k, 0) for k in truth]
+    return sum(errors) / len(errors), max(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--drivers', type=int, default=40)
+    parser.add_argument('--hours', type=float, default=10)
+    parser.add_argument('--offline', type=float, default=0.05, help='Chance that a connectivity spell is a gap')
+    parser.add_argument('--clients', type=int, default=15, help='Realtime subscribers of bookings')
+    parser.add_argument('--booking-row-bytes', type=int, default=1800, help='Average bookings tuple size')
+    parser.add_argument('--booking-indexes', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    traces = [make_trace(rng, int(args.hours * 3600), args.offline) for _ in range(args.drivers)]
+    truth = true_max(traces)
+    driver_hours = args.drivers * args.hours
+    fixes = sum(len(f) for f in traces)
+    offline = sum(1 for f in traces for fix in f if not fix[5])
+
+    print(f'{args.drivers} drivers x {args.hours:g} h, {fixes} fixes at 1 Hz, {offline / fixes:.1%} offline, '
+          f'{len(truth)} trips')
+    print(f'{"":<7} {"requests/h":>11} {"rows/h":>8} {"KB written/h":>13} {"booking rewrites":>17} '
+          f'{"realtime KB/h":>14} {"fixes in":>9} {"history":>8} {"lost":>6} {"amplification":>14} {"max speed err (avg/max)":>24}')
+    results = {}
+    for name, replay in (('before', replay_before), ('after', replay_after)):
+        totals, stored = replay(traces, args)
+        avg_err, worst = max_speed_error(stored, truth)
+        amplification = totals['bytes'] / max(1, totals['points'] * POINT_PAYLOAD)
+        results[name] = totals
+        print(f'{name:<7} {totals["requests"] / driver_hours:>11.0f} {totals["rows"] / driver_hours:>8.0f} '
+              f'{totals["bytes"] / 1024 / driver_hours:>13.1f} {totals["booking_rewrites"]:>17} '
+              f'{totals["realtime"] / 1024 / driver_hours:>14.1f} {totals["points"]:>9} {totals["history"]:>8} {totals["lost"]:>6} '
+              f'{amplification:>13.1f}x {avg_err:>14.1f} / {worst:<3} km/h')
+
+    before, after = results['before'], results['after']
+    print()
+    print(f'requests: {1 - after["requests"] / before["requests"]:.0%} fewer; '
+          f'booking rewrites: {before["booking_rewrites"]} -> {after["booking_rewrites"]}; '
+          f'realtime traffic: {1 - after["realtime"] / max(1, before["realtime"]):.0%} less; '
+          f'bytes written: {after["bytes"] / before["bytes"] - 1:+.0%}, with a {after["history"]}-point history')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""Build the municipality token index and benchmark it against per-lookup regexes.
+
+    python scripts/municipality_index.py                      # bookings of today
+    python scripts/municipality_index.py --date 2026-10-19
+    python scripts/municipality_index.py --out municipality_index.json
+
+Mirrors utils/municipalityResolver.ts: an exact-name map, a word token index
+(token -> municipalities with cod_prov/cod_mun) and an Aho-Corasick automaton
+over every name, built once. Each booking's origin and destination is resolved
+both ways (the old hasWord regex scan and the index) and the codes must agree.
+Exit code 1 on mismatch.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from collections import deque
+from datetime import date
+
+from supabase_rest import SupabaseRest
+
+TOKEN_SPLIT = re.compile(r'[\s,\-/]+')
+DEFAULT = ('03', '014')
+FALLBACKS = [
+    (('ELCHE', 'ELX'), ('03', '065')),
+    (('CAMPELLO',), ('03', '050')),
+    (('BENIDORM',), ('03', '031')),
+    (('ALTEA',), ('03', '018')),
+    (('ALICANTE', 'ALC'), ('03', '014')),
+]
+
+
+def is_delimiter(ch):
+    return ch is None or ch in ',-/' or ch.isspace()
+
+
+def is_word_at(text, start, length):
+    before = text[start - 1] if start > 0 else None
+    after = text[start + length] if start + length < len(text) else None
+    return is_delimiter(before) and is_delimiter(after)
+
+
+class MunicipalityIndex:
+    def __init__(self, municipalities):
+        self.entries = [(m['name'].upper(), m) for m in municipalities if m.get('cod_mun') and m.get('name')]
+        self.by_name = {}
+        self.by_token = {}
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for i, (name, _) in enumerate(self.entries):
+            self.by_name.setdefault(name, i)
+            for token in set(filter(None, TOKEN_SPLIT.split(name))):
+                self.by_token.setdefault(token, []).append(i)
+            node = 0
+            for ch in name:
+                if ch not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[node][ch] = len(self.goto) - 1
+                node = self.goto[node][ch]
+            self.out[node].append(i)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            current = queue.popleft()
+            for ch, child in self.goto[current].items():
+                f = self.fail[current]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+                queue.append(child)
+
+    def names_in_text(self, text):
+        found, node = set(), 0
+        for pos, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for i in self.out[node]:
+                length = len(self.entries[i][0])
+                if is_word_at(text, pos - length + 1, length):
+                    found.add(i)
+        return found
+
+    def names_containing_text(self, text):
+        tokens = [t for t in TOKEN_SPLIT.split(text) if t]
+        if not tokens:
+            return set()
+        candidates = set(self.by_token.get(tokens[0], []))
+        for token in tokens[1:]:
+            candidates &= set(self.by_token.get(token, []))
+        found = set()
+        for i in candidates:
+            name = self.entries[i][0]
+            at = name.find(text)
+            while at != -1:
+                if is_word_at(name, at, len(text)):
+                    found.add(i)
+                    break
+                at = name.find(text, at + 1)
+        return found
+
+    def pick(self, matches, exact):
+        best = None
+        for i in sorted(matches):
+            name = self.entries[i][0]
+            if name == exact:
+                return self.entries[i][1]
+            if best is None or len(name) > len(self.entries[best][0]):
+                best = i
+        return None if best is None else self.entries[best][1]
+
+    def match(self, loc, muni=None, address=None):
+        """matchMunicipality: the municipality row named by a location, or None."""
+        upper, upper_muni, upper_address = (loc or '').upper(), (muni or '').upper(), (address or '').upper()
+        match = self.entries[self.by_name[upper_muni]][1] if upper_muni in self.by_name else None
+        if not match and upper:
+            match = self.pick(self.names_in_text(upper) | self.names_containing_text(upper), upper)
+        if not match and upper_address:
+            match = self.pick(self.names_in_text(upper_address), upper_address)
+        return match
+
+    def resolve(self, loc, muni=None, address=None):
+        upper, upper_address = (loc or '').upper(), (address or '').upper()
+        if hub(upper, upper_address):
+            return ('03', '065')
+        return codes(self.match(loc, muni, address), upper, upper_address)
+
+    def to_json(self):
+        return {
+            'municipalities': [{'name': m['name'], 'cod_prov': m.get('cod_prov'), 'cod_mun': m['cod_mun']} for _, m in self.entries],
+            'tokens': self.by_token,
+            'automaton': {'goto': self.goto, 'fail': self.fail, 'out': self.out},
+        }
+
+
+def hub(upper, upper_address):
+    return any(w in upper or w in upper_address for w in ('AEROPUERTO', 'AIRPORT'))
+
+
+def codes(match, upper, upper_address):
+    if match:
+        return (match.get('cod_prov') or '03', match.get('cod_mun') or '014')
+    for words, fallback in FALLBACKS:
+        if any(w in upper or w in upper_address for w in words):
+            return fallback
+    return DEFAULT
+
+
+def resolve_naive(municipalities, loc, muni=None, address=None):
+    """The previous fomentoHelper.getCodes: one regex per municipality per lookup."""
+    upper, upper_muni, upper_address = (loc or '').upper(), (muni or '').upper(), (address or '').upper()
+    if hub(upper, upper_address):
+        return ('03', '065')
+
+    def has_word(text, word):
+        return bool(word) and re.search(r'(?:^|\s|,|-|/)' + re.escape(word) + r'(?:$|\s|,|-|/)', text) is not None
+
+    def best(matches, exact):
+        matches.sort(key=lambda m: (m['name'].upper() != exact, -len(m['name'])))
+        return matches[0] if matches else None
+
+    valid = [m for m in municipalities if m.get('cod_mun') and m.get('name')]
+    match = next((m for m in valid if m['name'].upper() == upper_muni), None)
+    if not match and upper:
+        match = best([m for m in valid if has_word(upper, m['name'].upper()) or has_word(m['name'].upper(), upper)], upper)
+    if not match and upper_address:
+        match = best([m for m in valid if has_word(upper_address, m['name'].upper())], upper_address)
+    return codes(match, upper, upper_address)
+
+
+def lookups(bookings):
+    for b in bookings:
+        yield ('ALICANTE', 'ALICANTE', None)
+        yield (b.get('origin'), b.get('origin_municipality'), b.get('origin_address'))
+        yield (b.get('destination'), b.get('destination_municipality'), b.get('destination_address'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--date', default=date.today().isoformat(), help='Pickup date of the bookings to resolve')
+    parser.add_argument('--out', help='Write the generated index as JSON')
+    args = parser.parse_args()
+
+    db = SupabaseRest()
+    municipalities = db.select('municipalities', 'name,cod_prov,cod_mun')
+    bookings = db.select(
+        'bookings',
+        'origin,origin_municipality,origin_address,destination,destination_municipality,destination_address',
+        pickup_date=[f'gte.{args.date}', f'lte.{args.date}T23:59:59'],
+    )
+    queries = list(lookups(bookings))
+
+    started = time.perf_counter()
+    index = MunicipalityIndex(municipalities)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    indexed = [index.resolve(*q) for q in queries]
+    indexed_ms = (time.perf_counter() - started) * 1000
+
+    re.purge()
+    started = time.perf_counter()
+    naive = [resolve_naive(municipalities, *q) for q in queries]
+    naive_ms = (time.perf_counter() - started) * 1000
+
+    print(f'{len(municipalities)} municipalities, {len(index.by_token)} tokens, {len(index.goto)} automaton states')
+    print(f'{len(bookings)} bookings on {args.date}: {len(queries)} lookups')
+    print(f'  regex scan   {naive_ms:8.1f} ms')
+    print(f'  index        {indexed_ms:8.1f} ms  (+{build_ms:.1f} ms build, once)')
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(index.to_json(), f, ensure_ascii=False)
+        print(f'Wrote {args.out}')
+
+    mismatches = [(q, a, b) for q, a, b in zip(queries, naive, indexed) if a != b]
+    for q, a, b in mismatches[:50]:
+        print(f'  MISMATCH {q}: regex {a} index {b}')
+    if mismatches:
+        print(f'{len(mismatches)} mismatches')
+        sys.exit(1)
+    print('OK: index matches the regex resolver')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""Nearest available drivers: grid search vs a full scan.
+
+    python scripts/nearest_driver_bench.py                        # live driver_locations, every located municipality
+    python scripts/nearest_driver_bench.py --stand-in --drivers 100 500 1000
+
+Mirrors utils/geoGrid.ts (driver positions inside SERVICE_AREA bucketed in CELL_DEG cells,
+rings of cells searched outward, candidates checked in distance order until k pass) and
+nearestAvailableDrivers in services/autoAssignment.ts. The full scan is what a ranking by
+real distance costs without the index: every driver checked against the schedule, then
+all of them sorted by distance. Both must return the same drivers in the same order;
+exit code 1 otherwise. The full scan is slow, so a stand-in run times it on the first
+--scan-queries pickups only and compares the results there.
+
+The availability check stands in for isDriverAvailable: the scan reads the whole bookings
+list for each driver, as suggestDriver does; the grid search reads only the driver's own
+bookings (the bookingsByDriver index).
+"""
+import argparse
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+
+CELL_DEG = 0.02
+SERVICE_AREA = (37.0, 41.0, -2.5, 1.0)   # south, north, west, east: geoGrid.ts SERVICE_AREA
+EARTH_KM = 6371
+RAD = math.pi / 180
+
+
+def geo_cell(lat, lng):
+    return (math.floor(lat / CELL_DEG), math.floor(lng / CELL_DEG))
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    a = (math.sin((lat2 - lat1) * RAD / 2) ** 2 +
+         math.cos(lat1 * RAD) * math.cos(lat2 * RAD) * math.sin((lng2 - lng1) * RAD / 2) ** 2)
+    return 2 * EARTH_KM * math.asin(min(1, math.sqrt(a)))
+
+
+def in_service_area(loc):
+    south, north, west, east = SERVICE_AREA
+    return south <= loc['lat'] <= north and west <= loc['lng'] <= east
+
+
+def build_grid(locations):
+    """entityStore driverLocationsByCell (positions outside SERVICE_AREA left out); the extent
+    as geoGrid.ts caches it."""
+    grid = defaultdict(list)
+    for loc in locations:
+        if in_service_area(loc):
+            grid[geo_cell(loc['lat'], loc['lng'])].append(loc)
+    rows = [r for r, _ in grid]
+    cols = [c for _, c in grid]
+    extent = (min(rows), max(rows), min(cols), max(cols),
+              max(max(abs(r * CELL_DEG), abs((r + 1) * CELL_DEG)) for r in rows)) if grid else None
+    return grid, extent
+
+
+def nearest_in_grid(grid, extent, lat, lng, k, accept):
+    found = []
+    if not extent or k <= 0:
+        return found
+    min_row, max_row, min_col, max_col, max_lat = extent
+    row0, col0 = geo_cell(lat, lng)
+    max_ring = max(abs(row0 - min_row), abs(row0 - max_row), abs(col0 - min_col), abs(col0 - max_col))
+    cell_km = CELL_DEG * RAD * EARTH_KM * min(1, math.cos(max(abs(lat), max_lat) * RAD))
+
+    pending = []
+
+    def visit(row, col):
+        for loc in grid.get((row, col), ()):
+            pending.append((distance_km(lat, lng, loc['lat'], loc['lng']), loc))
+
+    ring = 0
+    while ring <= max_ring and len(found) < k:
+        if ring == 0:
+            visit(row0, col0)
+        else:
+            for col in range(col0 - ring, col0 + ring + 1):
+                visit(row0 - ring, col)
+                visit(row0 + ring, col)
+            for row in range(row0 - ring + 1, row0 + ring):
+                visit(row, col0 - ring)
+                visit(row, col0 + ring)
+        pending.sort(key=lambda p: p[0])
+        bound = math.inf if ring == max_ring else ring * cell_km
+        taken = 0
+        while taken < len(pending) and len(found) < k and pending[taken][0] <= bound:
+            if accept(pending[taken][1]):
+                found.append(pending[taken])
+            taken += 1
+        pending = pending[taken:]
+        ring += 1
+    return found
+
+
+def full_scan(locations, lat, lng, k, accept):
+    ranked = [(distance_km(lat, lng, loc['lat'], loc['lng']), loc) for loc in locations
+              if in_service_area(loc) and accept(loc)]
+    ranked.sort(key=lambda p: p[0])
+    return ranked[:k]
+
+
+def schedule_checks(bookings, by_driver):
+    """Two versions of the availability check: over all bookings, and over the driver's own."""
+    def over_all(loc):
+        return not any(b['driver_id'] == loc['driver_id'] and b['busy'] for b in bookings) and loc['active']
+
+    def over_own(loc):
+        return not any(b['busy'] for b in by_driver.get(loc['driver_id'], ())) and loc['active']
+
+    return over_all, over_own
+
+
+def bench(locations, bookings, queries, k, scan_queries):
+    by_driver = defaultdict(list)
+    for b in bookings:
+        by_driver[b['driver_id']].append(b)
+    over_all, over_own = schedule_checks(bookings, by_driver)
+
+    started = time.perf_counter()
+    grid, extent = build_grid(locations)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    scanned = [full_scan(locations, lat, lng, k, over_all) for lat, lng in queries[:scan_queries]]
+    scan_ms = (time.perf_counter() - started) * 1000 / min(len(queries), scan_queries)
+
+    started = time.perf_counter()
+    indexed = [nearest_in_grid(grid, extent, lat, lng, k, over_own) for lat, lng in queries]
+    grid_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    mismatches = sum(1 for a, b in zip(scanned, indexed)
+                     if [loc['driver_id'] for _, loc in a] != [loc['driver_id'] for _, loc in b])
+    return build_ms, scan_ms, grid_ms, mismatches
+
+
+# Pickup hotspots of the operation and how many cars wait around each
+HOTSPOTS = [
+    (38.2822, -0.5582, 0.30), (38.5411, -0.1225, 0.20), (38.3452, -0.4810, 0.15), (38.5990, -0.0510, 0.06),
+    (38.6447, 0.0445, 0.06), (38.2699, -0.6983, 0.05), (37.9787, -0.6822, 0.05), (38.7891, 0.1663, 0.04),
+    (39.4699, -0.3763, 0.04), (38.4286, -0.3975, 0.05),
+]
+
+
+def stand_in_fleet(rng, drivers):
+    locations, bookings = [], []
+    for i in range(drivers):
+        lat, lng, _ = rng.choices(HOTSPOTS, [h[2] for h in HOTSPOTS])[0]
+        spread = rng.choice((0.01, 0.05, 0.2))
+        driver_id = f'd{i}'
+        if rng.random() < 0.01:  # a phone without a fix reports (0,0)
+            lat, lng, spread = 0.0, 0.0, 0.0
+        locations.append({'driver_id': driver_id, 'lat': lat + rng.gauss(0, spread), 'lng': lng + rng.gauss(0, spread),
+                          'active': rng.random() < 0.8})
+        for _ in range(rng.randint(2, 8)):  # the day's bookings, a quarter of drivers on a trip now
+            bookings.append({'driver_id': driver_id, 'busy': False})
+        if rng.random() < 0.25:
+            bookings.append({'driver_id': driver_id, 'busy': True})
+    rng.shuffle(bookings)
+    return locations, bookings
+
+
+def run_stand_in(args):
+    rng = random.Random(args.seed)
+    print(f'{"drivers":>8} {"bookings":>9} {"full scan":>12} {"grid":>12} {"speed-up":>9} {"build":>10}')
+    problems = 0
+    for drivers in args.drivers:
+        locations, bookings = stand_in_fleet(rng, drivers)
+        queries = []
+        for _ in range(args.queries):
+            lat, lng, _ = rng.choices(HOTSPOTS, [h[2] for h in HOTSPOTS])[0]
+            queries.append((lat + rng.gauss(0, 0.05), lng + rng.gauss(0, 0.05)))
+        build_ms, scan_ms, grid_ms, mismatches = bench(locations, bookings, queries, args.k, args.scan_queries)
+        print(f'{drivers:>8} {len(bookings):>9} {scan_ms:>9.3f} ms {grid_ms:>9.3f} ms {scan_ms / grid_ms:>8.0f}x '
+              f'{build_ms:>7.2f} ms' + (f'  {mismatches} MISMATCHES' if mismatches else ''))
+        problems += mismatches
+    if problems:
+        sys.exit(1)
+    print(f'OK: grid search returns the same {args.k} nearest drivers as the full scan')
+
+
+def run_live(args):
+    from supabase_rest import SupabaseRest
+
+    rest = SupabaseRest()
+    locations = [dict(loc, active=True) for loc in rest.select('driver_locations', 'driver_id,lat,lng,updated_at', key='driver_id')
+                 if loc.get('lat') is not None and loc.get('lng') is not None]
+    places = rest.select('municipalities', 'name,lat,lng', lat='not.is.null')
+    if not locations or not places:
+        raise SystemExit('No driver positions or located municipalities (run scripts/travel_time_model.py first)')
+    queries = [(p['lat'], p['lng']) for p in places]
+    build_ms, scan_ms, grid_ms, mismatches = bench(locations, [], queries, args.k, len(queries))
+    print(f'{len(locations)} driver positions, {len(queries)} municipalities queried (k={args.k})')
+    print(f'  full scan {scan_ms:.3f} ms/query, grid {grid_ms:.3f} ms/query, build {build_ms:.2f} ms')
+    if mismatches:
+        print(f'{mismatches} mismatches')
+        sys.exit(1)
+    print('OK: grid search matches the full scan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stand-in', action='store_true', help='Simulated fleets instead of driver_locations')
+    parser.add_argument('--drivers', type=int, nargs='+', default=[100, 500, 1000], help='Stand-in fleet sizes')
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--scan-queries', type=int, default=10, help='Stand-in queries also run as a full scan (slow)')
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.stand_in:
+        run_stand_in(args)
+    else:
+        run_live(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+"""Local stand-in for the project's PostgREST API, with synthetic operations data.
+
+    python scripts/postgrest_mock_server.py                   # http://127.0.0.1:8092/rest/v1
+    python scripts/postgrest_mock_server.py --bookings 50000 --latency 40 --jitter 20
+
+Serves GET /rest/v1/<table> for the tables the back office reads (bookings, drivers,
+shifts, vehicles, clients, ...) with the PostgREST query syntax the app uses:
+select=<columns> (embeds are ignored), order=<col>.<asc|desc>[,...], limit, offset,
+column filters eq, neq, gt, gte, lt, lte, in.(...), is.null and not.<filter>, and
+or=(...) / and=(...) logic trees with quoted values (keyset cursors). Rows are generated
+from --seed, so two runs with the same arguments serve the same data. Bookings span
+--days days of history up to a week ahead.
+
+Rows carry an updated_at and deletes leave a sync_tombstones row, as with migration
+20261019000100; Database.mutate() makes such writes. Range: a-b request headers page
+like PostgREST does. GET /stats returns requests, rows and response bytes per table;
+POST /stats/reset clears them. scripts/entity_store_load.py starts it in-process for each table size.
+The apikey is not checked.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+PLACES = ['Aeropuerto de Alicante', 'Benidorm', 'Alicante', 'Torrevieja', 'Elche', 'Calpe', 'Altea',
+          'Jávea', 'Dénia', 'Orihuela Costa', 'Murcia', 'Valencia', 'La Manga', 'Villajoyosa']
+NAMES = ['Smith', 'Jones', 'Williams', 'García', 'Martínez', 'Müller', 'Jansen', 'Dubois', 'Rossi', 'Nowak',
+         'Hansen', 'Olsen', 'Brown', 'Taylor', 'Fernández', 'López']
+STATUSES = ['Completed'] * 6 + ['Cancelled', 'Confirmed', 'Pending', 'En Camino']
+SHIFT_TYPES = ['Mañana', 'Tarde', 'Noche', 'Libre']
+
+
+class Database:
+    """In-memory tables shaped like the production ones (column names, value sizes)."""
+
+    def __init__(self, bookings=5000, drivers=25, vehicles=15, clients=80, days=730, seed=1):
+        rng = random.Random(seed)
+        uid = lambda: str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        today = date.today()
+        created = datetime(2024, 1, 1)
+        stamp = lambda: (created + timedelta(seconds=rng.randrange(0, 900 * 86400))).isoformat() + '+00:00'
+
+        self.tables = {}
+        self.tables['vehicles'] = [
+            {'id': uid(), 'created_at': stamp(), 'plate': f'{rng.randrange(1000, 9999)}-{"".join(rng.choices("BCDFGHJKLMNPRSTVWXYZ", k=3))}',
+             'model': rng.choice(['Mercedes V-Class', 'Mercedes E-Class', 'Tesla Model Y', 'Ford Tourneo']),
+             'status': 'Operativo', 'seats': rng.choice([4, 7, 8]), 'mileage': rng.randrange(10000, 300000),
+             'itv_date': str(today + timedelta(days=rng.randrange(-30, 365)))}
+            for _ in range(vehicles)]
+        self.tables['drivers'] = [
+            {'id': uid(), 'created_at': stamp(), 'name': f'{rng.choice(["Juan", "Ana", "Pedro", "Lucía", "Nikolay", "Marta"])} {rng.choice(NAMES)}',
+             'email': f'driver{i}@example.com', 'phone': f'+34 6{rng.randrange(10000000, 99999999)}',
+             'license_number': f'{rng.randrange(10000000, 99999999)}X', 'status': 'Active', 'user_id': uid(),
+             'current_vehicle_id': rng.choice(self.tables['vehicles'])['id']}
+            for i in range(drivers)]
+        self.tables['clients'] = [
+            {'id': uid(), 'created_at': stamp(), 'name': f'{rng.choice(NAMES)} Travel {i}', 'email': f'client{i}@example.com',
+             'phone': f'+34 9{rng.randrange(10000000, 99999999)}', 'tax_id': f'B{rng.randrange(10000000, 99999999)}',
+             'address': f'Calle {rng.choice(NAMES)} {rng.randrange(1, 200)}, {rng.choice(PLACES)}', 'bookings': 0}
+            for i in range(clients)]
+        self.tables['tariffs'] = [
+            {'id': uid(), 'created_at': stamp(), 'origin': 'Aeropuerto de Alicante', 'destination': place,
+             'price': rng.randrange(40, 260), 'vehicle_type': vt, 'client_id': None}
+            for place in PLACES[1:] for vt in ('Standard', 'Van')]
+        self.tables['shift_types'] = [{'id': uid(), 'created_at': stamp(), 'name': t, 'start_time': '06:00', 'end_time': '14:00'}
+                                      for t in SHIFT_TYPES]
+        self.tables['shifts'] = [
+            {'id': uid(), 'created_at': stamp(), 'driver_id': d['id'], 'date': str(today + timedelta(days=offset)),
+             'type': rng.choice(SHIFT_TYPES), 'vehicle_id': rng.choice(self.tables['vehicles'])['id']}
+            for d in self.tables['drivers'] for offset in range(-60, 31)]
+        driver_ids = [d['id'] for d in self.tables['drivers']]
+        client_ids = [c['id'] for c in self.tables['clients']]
+        rows = []
+        for i in range(bookings):
+            day = today - timedelta(days=days) + timedelta(days=int((days + 7) * i / max(1, bookings)))
+            status = rng.choice(STATUSES) if day < today else rng.choice(['Pending', 'Confirmed'])
+            rows.append({
+                'id': uid(), 'display_id': 10000 + i, 'created_at': stamp(),
+                'pickup_date': str(day),
+                'pickup_time': f'{rng.randrange(0, 24):02d}:{rng.choice([0, 15, 30, 45]):02d}' if rng.random() > 0.01 else None,
+                'passenger': f'{rng.choice(["Mr", "Mrs", "Ms"])} {rng.choice(NAMES)}', 'email': f'pax{i}@example.com',
+                'phone': f'+44 7{rng.randrange(100000000, 999999999)}', 'pax': rng.randrange(1, 8),
+                'origin': rng.choice(PLACES), 'destination': rng.choice(PLACES),
+                'flight_number': f'{rng.choice(["FR", "U2", "LS", "BA"])}{rng.randrange(100, 9999)}',
+                'price': rng.randrange(40, 260), 'collaborator_price': rng.randrange(20, 150),
+                'status': status, 'driver_id': rng.choice(driver_ids) if status != 'Pending' else None,
+                'assigned_driver_name': None, 'client_id': rng.choice(client_ids + [None] * 20),
+                'vehicle_type': rng.choice(['Standard', 'Van']), 'payment_method': rng.choice(['Efectivo', 'Tarjeta', 'Factura']),
+                'notes': rng.choice(['', '', 'Silla de bebé', 'Cartel con nombre', 'Equipaje extra: 2 bolsas de golf']),
+                'push_notifications_sent': None,
+            })
+        self.tables['bookings'] = rows
+        for table in ('profiles', 'system_settings', 'municipalities', 'service_extras', 'vehicle_expenses',
+                      'vehicle_maintenance', 'flights', 'driver_locations', 'driver_logs', 'time_correction_requests'):
+            self.tables.setdefault(table, [{'id': uid(), 'created_at': stamp(), 'name': f'{table} {i}', 'value': 'x' * 40}
+                                           for i in range(20)])
+        for rows in self.tables.values():
+            for row in rows:
+                row['updated_at'] = datetime.fromisoformat(row['created_at']).isoformat(timespec='microseconds')
+        self.tables['sync_tombstones'] = []
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.rng = rng
+        self.uid = uid
+        self.clock_offset = timedelta(0)  # simulated time for Database.mutate()
+
+    def now(self):
+        return (datetime.now(timezone.utc) + self.clock_offset).isoformat(timespec='microseconds')
+
+    def mutate(self, table='bookings', updates=0, inserts=0, deletes=0):
+        """Server-side writes as the triggers of migration 20261019000100 record them."""
+        with self.lock:
+            rows = self.tables[table]
+            for row in self.rng.sample(rows, min(updates, len(rows))):
+                row['status'] = self.rng.choice(STATUSES)
+                row['notes'] = f'edited {self.rng.randrange(1000)}'
+                row['updated_at'] = self.now()
+            for _ in range(inserts):
+                row = dict(self.rng.choice(rows), id=self.uid())
+                row['created_at'] = row['updated_at'] = self.now()
+                rows.append(row)
+            for row in self.rng.sample(rows, min(deletes, len(rows))):
+                rows.remove(row)
+                self.tables['sync_tombstones'] = [t for t in self.tables['sync_tombstones']
+                                                  if (t['table_name'], t['row_id']) != (table, row['id'])]
+                self.tables['sync_tombstones'].append({'table_name': table, 'row_id': str(row['id']), 'deleted_at': self.now()})
+
+    def record(self, table, rows, size):
+        with self.lock:
+            s = self.stats.setdefault(table, {'requests': 0, 'rows': 0, 'bytes': 0})
+            s['requests'] += 1
+            s['rows'] += rows
+            s['bytes'] += size
+
+    def query(self, table, params):
+        rows = self.tables.get(table)
+        if rows is None:
+            return None
+        select, order, limit, offset = '*', None, None, 0
+        filters = []
+        for key, value in params:
+            if key == 'select':
+                select = value
+            elif key == 'order':
+                order = value
+            elif key == 'limit':
+                limit = int(value)
+            elif key == 'offset':
+                offset = int(value)
+            else:
+                filters.append((key, value))
+        rows = [r for r in rows if all(matches_param(r, key, value) for key, value in filters)]
+        if order:
+            for part in reversed(order.split(',')):
+                col, _, direction = part.partition('.')
+                desc = direction.startswith('desc')
+                present = [r for r in rows if r.get(col) is not None]
+                missing = [r for r in rows if r.get(col) is None]
+                present.sort(key=lambda r: r[col], reverse=desc)
+                rows = missing + present if desc else present + missing  # Postgres null placement
+        rows = rows[offset:offset + limit if limit is not None else None]
+        if select != '*':
+            columns = [c.strip() for c in select.split(',') if c.strip() and '(' not in c and ':' not in c]
+            rows = [{c: r.get(c) for c in columns} for r in rows]
+        return rows
+
+
+def split_top(text):
+    """Splits on commas outside parentheses and double quotes."""
+    parts, depth, quoted, escaped, start = [], 0, False, False, 0
+    for i, ch in enumerate(text):
+        if escaped:
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == '(':
+            depth += 1
+        elif not quoted and ch == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ',':
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [p for p in parts if p]
+
+
+def unquote(arg):
+    if len(arg) >= 2 and arg[0] == arg[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', arg[1:-1])
+    return arg
+
+
+def matches_tree(row, kind, body):
+    """Logic trees: or=(...), and=(...), nested and(...) / or(...) / not.and(...)."""
+    results = []
+    for item in split_top(body.strip()[1:-1]):
+        negate = item.startswith('not.')
+        if negate:
+            item = item[4:]
+        if item.startswith(('and(', 'or(')):
+            sub_kind, _, sub_body = item.partition('(')
+            result = matches_tree(row, sub_kind, '(' + sub_body)
+        else:
+            col, _, cond = item.partition('.')
+            result = matches(row.get(col), cond)
+        results.append(not result if negate else result)
+    return any(results) if kind == 'or' else all(results)
+
+
+def matches_param(row, key, value):
+    if key in ('or', 'and'):
+        return matches_tree(row, key, value)
+    return matches(row.get(key), value)
+
+
+def matches(value, cond):
+    op, _, arg = cond.partition('.')
+    if op == 'not':
+        if arg.startswith('is.'):
+            return not matches(value, arg)
+        return value is not None and not matches(value, arg)  # NOT of a NULL comparison is NULL
+    if op == 'is':
+        return value is None if arg == 'null' else value is not None
+    if value is None:
+        return False
+    value = str(value)
+    if op == 'in':
+        return value in [unquote(a) for a in split_top(arg.strip('()'))]
+    arg = unquote(arg)
+    if op == 'eq':
+        return value == arg
+    if op == 'neq':
+        return value != arg
+    if op in ('gt', 'gte', 'lt', 'lte'):
+        return {'gt': value > arg, 'gte': value >= arg, 'lt': value < arg, 'lte': value <= arg}[op]
+    raise ValueError(f'unsupported filter {cond}')
+
+
+def make_handler(db, latency=0, jitter=0):
+    class Handler(BaseHTTPRequestHandler):
+        def reply(self, status, payload):
+            body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return len(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/stats':
+                self.reply(200, db.stats)
+                return
+            if not url.path.startswith('/rest/v1/'):
+                self.reply(404, {'message': 'not found'})
+                return
+            if latency or jitter:
+                time.sleep(max(0, latency + random.uniform(-jitter, jitter)) / 1000)
+            table = url.path[len('/rest/v1/'):]
+            params = parse_qsl(url.query, keep_blank_values=True)
+            first, _, last = (self.headers.get('Range') or '').partition('-')
+            if first.isdigit() and last.isdigit():
+                params += [('offset', first), ('limit', str(int(last) - int(first) + 1))]
+            try:
+                rows = db.query(table, params)
+            except ValueError as e:
+                self.reply(400, {'message': str(e)})
+                return
+            if rows is None:
+                self.reply(404, {'message': f'relation "public.{table}" does not exist'})
+                return
+            db.record(table, len(rows), self.reply(200, rows))
+
+        def do_POST(self):
+            if urlparse(self.path).path == '/stats/reset':
+                with db.lock:
+                    db.stats.clear()
+                self.reply(200, {})
+            else:
+                self.reply(405, {'message': 'read-only stand-in'})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve(db, port=8092, latency=0, jitter=0):
+    """Starts the stand-in on a background thread and returns the server."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(db, latency, jitter))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8092)
+    parser.add_argument('--bookings', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=730, help='Days of booking history')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0, help='Added latency per request, ms')
+    parser.add_argument('--jitter', type=float, default=0, help='Random +/- latency, ms')
+    args = parser.parse_args()
+
+    db = Database(bookings=args.bookings, days=args.days, seed=args.seed)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(db, args.latency, args.jitter))
+    print(f'PostgREST stand-in on http://127.0.0.1:{args.port}/rest/v1 ({args.bookings} bookings)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Drive check-and-send-push with a fake clock against a local push endpoint.
+
+    supabase functions serve check-and-send-push   # with PUSH_ALLOW_FAKE_CLOCK=true
+    python scripts/push_reminder_check.py --user-id <driver auth uid> \\
+        --start 2026-10-20T06:00 --end 2026-10-20T23:00 --step 5 \\
+        --endpoint-host host.docker.internal
+
+Starts a stand-in push service on --port (default 8091) that accepts every web-push
+POST, points the driver's push_subscriptions row at it, and then calls the function
+every --step minutes of fake time from --start to --end (Madrid wall clock). Checks
+that each (booking, slot) reminder fires once and only inside its window
+[fire_at, fire_at + 10 min). Exit code 1 on any violation.
+
+The run marks the reminders it fires as sent and replaces the driver's subscription;
+use a test driver or re-subscribe from the driver app afterwards.
+"""
+import argparse
+import base64
+import json
+import secrets
+import sys
+import threading
+import urllib.request
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from zoneinfo import ZoneInfo
+
+from supabase_rest import SupabaseRest
+
+MADRID = ZoneInfo('Europe/Madrid')
+WINDOW = timedelta(minutes=10)
+
+# NIST P-256, enough to derive a valid p256dh public key for the test subscription
+P = 0xffffffff00000001000000000000000000000000ffffffffffffffffffffffff
+A = P - 3
+G = (0x6b17d1f2e12c4247f8bce6e563a440f277037d812deb33a0f4a13945d898c296,
+     0x4fe342e2fe1a7f9b8ee7eb4a7c0f9e162bce33576b315ececbb6406837bf51f5)
+N = 0xffffffff00000000ffffffffffffffffbce6faada7179e84f3b9cac2fc632551
+
+
+def ec_add(p1, p2):
+    if p1 is None:
+        return p2
+    if p2 is None:
+        return p1
+    if p1[0] == p2[0] and (p1[1] + p2[1]) % P == 0:
+        return None
+    if p1 == p2:
+        slope = (3 * p1[0] * p1[0] + A) * pow(2 * p1[1], -1, P) % P
+    else:
+        slope = (p2[1] - p1[1]) * pow(p2[0] - p1[0], -1, P) % P
+    x = (slope * slope - p1[0] - p2[0]) % P
+    return x, (slope * (p1[0] - x) - p1[1]) % P
+
+
+def ec_mul(k, point):
+    result = None
+    while k:
+        if k & 1:
+            result = ec_add(result, point)
+        point = ec_add(point, point)
+        k >>= 1
+    return result
+
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def test_subscription(endpoint):
+    x, y = ec_mul(secrets.randbelow(N - 1) + 1, G)
+    public = b'\x04' + x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
+    return {'endpoint': endpoint, 'expirationTime': None,
+            'keys': {'p256dh': b64url(public), 'auth': b64url(secrets.token_bytes(16))}}
+
+
+received = []
+
+
+class PushHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        received.append({'path': self.path, 'ttl': self.headers.get('TTL'), 'encoding': self.headers.get('Content-Encoding')})
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def call_function(url, key, now):
+    req = urllib.request.Request(
+        url, method='POST', data=json.dumps({'now': now.isoformat()}).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {key}', 'apikey': key},
+    )
+    with urllib.request.urlopen(req, timeout=120) as resp:
+        return json.loads(resp.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--user-id', required=True, help='auth user id of the (test) driver to subscribe')
+    parser.add_argument('--start', required=True, help='Fake clock start, Madrid time (YYYY-MM-DDTHH:MM)')
+    parser.add_argument('--end', required=True, help='Fake clock end, Madrid time')
+    parser.add_argument('--step', type=int, default=5, help='Minutes between runs (the cron interval)')
+    parser.add_argument('--port', type=int, default=8091)
+    parser.add_argument('--endpoint-host', default='127.0.0.1', help='Host the function uses to reach this script')
+    parser.add_argument('--function-url', help='default <VITE_SUPABASE_URL>/functions/v1/check-and-send-push')
+    args = parser.parse_args()
+
+    db = SupabaseRest()
+    function_url = args.function_url or f'{db.url}/functions/v1/check-and-send-push'
+
+    server = ThreadingHTTPServer(('0.0.0.0', args.port), PushHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f'http://{args.endpoint_host}:{args.port}/push/{args.user_id}'
+    db.upsert('push_subscriptions', [{'user_id': args.user_id, 'subscription': test_subscription(endpoint)}],
+              on_conflict='user_id')
+
+    now = datetime.fromisoformat(args.start).replace(tzinfo=MADRID)
+    end = datetime.fromisoformat(args.end).replace(tzinfo=MADRID)
+    fired, problems, runs = {}, [], 0
+    while now <= end:
+        data = call_function(function_url, db.key, now)
+        runs += 1
+        if data.get('error'):
+            print(f'{now:%Y-%m-%d %H:%M}: {data["error"]}')
+            sys.exit(1)
+        for n in data.get('notificationsSent') or []:
+            key = (n['bookingId'], n['slot'])
+            fire_at = datetime.fromisoformat(n['fireAt'].replace('Z', '+00:00'))
+            if key in fired:
+                problems.append(f'{key} fired twice ({fired[key]:%H:%M} and {now:%H:%M})')
+            if not fire_at <= now < fire_at + WINDOW:
+                problems.append(f'{key} fired at {now:%H:%M}, outside [{fire_at.astimezone(MADRID):%H:%M}, +10 min)')
+            fired[key] = now
+            print(f'  {now:%Y-%m-%d %H:%M}  {n["slot"]:<13} booking {n["bookingId"]}  {n.get("driver") or ""}')
+        now += timedelta(minutes=args.step)
+
+    server.shutdown()
+    print(f'{runs} runs, {len(fired)} reminders fired, {len(received)} pushes received by the local endpoint')
+    if len(received) < len(fired):
+        problems.append(f'only {len(received)} of {len(fired)} reminders reached the endpoint')
+    for p in problems:
+        print(f'  {p}')
+    if problems:
+        sys.exit(1)
+    print('OK: every reminder fired once, inside its window')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Realtime replay: per-event application vs per-frame coalesced batches.
+
+    python scripts/realtime_replay_bench.py                      # 20k bookings, 50..5000 events/s
+    python scripts/realtime_replay_bench.py --bookings 50000 --rates 100,1000 --render-ms 4
+
+Replays a synthetic postgres_changes stream on the bookings table (status and GPS
+writes concentrated on the trips in progress, plus inserts and deletes) at each rate
+for --seconds of stream time, through the two pipelines:
+
+  per-event  the old useSupabaseData handler: prev.map / prev.filter / [new, ...prev]
+             copies the whole array and renders once per event
+  batched    services/entityStore.ts: events buffered per table and coalesced by id,
+             flushed once per 60 Hz frame with one merge (the untouched rows keep their
+             order, the changed ones are sorted and merged in) and one render
+
+Work per frame is the measured apply time plus --render-ms per render (the React
+re-render is not run, only charged). A pipeline keeps up with a rate while its average
+frame stays within the 16.7 ms budget; "sustains" is the highest tested rate that does.
+Both pipelines must end with the same rows in the same order. Exit code 1 otherwise.
+"""
+import argparse
+import heapq
+import random
+import sys
+import time
+
+FRAME_MS = 1000 / 60
+
+
+def make_bookings(n, rng):
+    base = 1_700_000_000
+    rows = [{'id': i, 'created_at': base + i * 37, 'status': 'Confirmed', 'driver_id': rng.randrange(200),
+             'max_speed': 0} for i in range(n)]
+    rows.sort(key=lambda r: r['created_at'], reverse=True)  # order created_at.desc, as loaded
+    return rows
+
+
+def make_stream(rows, count, rng):
+    """Events as (event_type, row); 80% hit the ~2% of trips in progress."""
+    live = [r['id'] for r in rng.sample(rows, max(1, len(rows) // 50))]
+    ids = [r['id'] for r in rows]
+    by_id = {r['id']: r for r in rows}
+    next_id = max(ids) + 1
+    created = max(r['created_at'] for r in rows)
+    events = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.95:
+            row_id = rng.choice(live) if roll < 0.8 else rng.choice(ids)
+            if row_id not in by_id:
+                continue
+            row = dict(by_id[row_id], max_speed=rng.randrange(140), status=rng.choice(['En Route', 'In Progress', 'Completed']))
+            by_id[row_id] = row
+            events.append(('UPDATE', row))
+        elif roll < 0.985:
+            created += 1
+            row = {'id': next_id, 'created_at': created, 'status': 'Pending', 'driver_id': None, 'max_speed': 0}
+            by_id[next_id] = row
+            ids.append(next_id)
+            next_id += 1
+            events.append(('INSERT', row))
+        else:
+            row_id = rng.choice(ids)
+            if by_id.pop(row_id, None) is not None:
+                events.append(('DELETE', {'id': row_id}))
+    return events
+
+
+def sort_key(row):
+    return -row['created_at']  # created_at.desc
+
+
+class PerEvent:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.renders = 0
+
+    def receive(self, event_type, row):
+        if event_type == 'INSERT':
+            self.rows = [row, *self.rows]
+        elif event_type == 'UPDATE':
+            self.rows = [row if item['id'] == row['id'] else item for item in self.rows]
+        else:
+            self.rows = [item for item in self.rows if item['id'] != row['id']]
+        self.renders += 1
+
+    def frame(self):
+        pass
+
+
+class Batched:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.by_id = {r['id']: r for r in rows}
+        self.upserts, self.removed = {}, set()
+        self.renders = 0
+
+    def receive(self, event_type, row):
+        if event_type == 'DELETE':
+            self.upserts.pop(row['id'], None)
+            self.removed.add(row['id'])
+        else:
+            self.removed.discard(row['id'])
+            self.upserts[row['id']] = row
+
+    def frame(self):
+        removed = {i for i in self.removed if i in self.by_id}
+        incoming = {i: r for i, r in self.upserts.items() if self.by_id.get(i) is not r}
+        self.upserts, self.removed = {}, set()
+        if not removed and not incoming:
+            return
+        kept = [r for r in self.rows if r['id'] not in removed and r['id'] not in incoming]
+        self.rows = list(heapq.merge(kept, sorted(incoming.values(), key=sort_key), key=sort_key))
+        for i in removed:
+            del self.by_id[i]
+        self.by_id.update(incoming)
+        self.renders += 1
+
+
+def replay(pipeline, events, rate, budget_s):
+    """Feeds the events at `rate` per second of stream time; returns (CPU seconds, events fed)."""
+    per_frame = rate / 60
+    spent, carry, i = 0.0, 0.0, 0
+    while i < len(events):
+        carry += per_frame
+        n, carry = int(carry), carry - int(carry)
+        start = time.perf_counter()
+        for event_type, row in events[i:i + n]:
+            pipeline.receive(event_type, row)
+        pipeline.frame()
+        spent += time.perf_counter() - start
+        i = min(i + n, len(events))
+        if spent > budget_s:
+            return spent, i
+    return spent, i
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--rates', default='50,200,1000,5000', help='Events per second to replay')
+    parser.add_argument('--seconds', type=float, default=2, help='Stream time replayed per rate')
+    parser.add_argument('--render-ms', type=float, default=2, help='Cost charged per render')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = make_bookings(args.bookings, rng)
+    rates = [int(r) for r in args.rates.split(',')]
+    frames = int(args.seconds * 60)
+    sustains = {'per-event': 0, 'batched': 0}
+    problems = []
+
+    print(f'{args.bookings} bookings, {args.seconds:g} s of stream per rate, render {args.render_ms:g} ms')
+    print(f'{"events/s":>9} {"pipeline":<10} {"events":>7} {"renders/s":>10} {"ms/frame":>9} {"budget":>7}')
+    for rate in rates:
+        events = make_stream(rows, int(rate * args.seconds), random.Random(args.seed + rate))
+        finals = {}
+        for name, cls in (('per-event', PerEvent), ('batched', Batched)):
+            pipeline = cls(rows)
+            # Stop early once a pipeline is hopelessly behind (10x the frame budget)
+            spent, done = replay(pipeline, events, rate, 10 * frames * FRAME_MS / 1000)
+            frames_run = max(1, done / (rate / 60))
+            frame_ms = (spent * 1000 + pipeline.renders * args.render_ms) / frames_run
+            keeps_up = frame_ms <= FRAME_MS and done == len(events)
+            if keeps_up:
+                sustains[name] = max(sustains[name], rate)
+            if done == len(events):
+                finals[name] = pipeline.rows
+            print(f'{rate:>9} {name:<10} {done:>7} {pipeline.renders / (frames_run / 60):>10.0f} '
+                  f'{frame_ms:>9.2f} {"ok" if keeps_up else "over":>7}')
+        if len(finals) == 2 and [r['id'] for r in finals['per-event']] != [r['id'] for r in finals['batched']]:
+            problems.append(f'{rate} events/s: pipelines disagree on the final rows')
+        if len(finals) == 2 and finals['per-event'] != finals['batched']:
+            problems.append(f'{rate} events/s: pipelines disagree on row contents')
+
+    print()
+    for name, rate in sustains.items():
+        print(f'{name:<10} sustains {rate or "none of the tested rates":>6}{" events/s" if rate else ""}')
+    for p in problems:
+        print(f'  {p}')
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
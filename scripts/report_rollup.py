@@ -0,0 +1,110 @@
+"""Rebuild and verify the report_daily_rollup store behind ReportesView.
+
+    python scripts/report_rollup.py                 # verify against the raw tables
+    python scripts/report_rollup.py --rebuild       # rebuild server-side, then verify
+    python scripts/report_rollup.py --window 2026-01-01 2026-10-19
+
+Verification recomputes every (day, vehicle, client, status) bucket from
+bookings, invoices and vehicle_expenses and compares it with the stored rows.
+Exit code 1 on mismatch.
+"""
+import argparse
+import sys
+import time
+from collections import defaultdict
+
+from supabase_rest import SupabaseRest
+
+MEASURES = ['revenue', 'booking_count', 'invoiced_amount', 'invoice_count',
+            'fuel_cost', 'maintenance_cost', 'other_cost']
+FUEL_TYPES = {'Combustible', 'Electricidad'}
+MAINTENANCE_TYPES = {'Taller / Mantenimiento', 'ITV'}
+TOLERANCE = 0.005
+ROLLUP_KEY = 'day,vehicle_id,client_id,status'  # the unique key of report_daily_rollup
+
+
+def expense_category(expense_type):
+    if expense_type in FUEL_TYPES:
+        return 'fuel_cost'
+    if expense_type in MAINTENANCE_TYPES:
+        return 'maintenance_cost'
+    return 'other_cost'
+
+
+def recompute(db):
+    buckets = defaultdict(lambda: dict.fromkeys(MEASURES, 0.0))
+    for b in db.select('bookings', 'pickup_date,vehicle_id,client_id,status,price'):
+        if not b['pickup_date']:
+            continue
+        row = buckets[(b['pickup_date'][:10], b['vehicle_id'], b['client_id'], b['status'])]
+        row['revenue'] += float(b['price'] or 0)
+        row['booking_count'] += 1
+    for inv in db.select('invoices', 'date_issued,client_id,status,total_amount'):
+        if not inv['date_issued']:
+            continue
+        row = buckets[(inv['date_issued'][:10], None, inv['client_id'], inv['status'])]
+        row['invoiced_amount'] += float(inv['total_amount'] or 0)
+        row['invoice_count'] += 1
+    for e in db.select('vehicle_expenses', 'date,vehicle_id,expense_type,amount'):
+        if not e['date']:
+            continue
+        buckets[(e['date'][:10], e['vehicle_id'], None, None)][expense_category(e['expense_type'])] += float(e['amount'] or 0)
+    return buckets
+
+
+def load_rollup(db, **filters):
+    return {
+        (r['day'], r['vehicle_id'], r['client_id'], r['status']): {m: float(r[m] or 0) for m in MEASURES}
+        for r in db.select('report_daily_rollup', key=ROLLUP_KEY, **filters)
+    }
+
+
+def verify(db):
+    expected = recompute(db)
+    actual = load_rollup(db)
+    zero = dict.fromkeys(MEASURES, 0.0)
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        exp, act = expected.get(key, zero), actual.get(key, zero)
+        for m in MEASURES:
+            if abs(exp[m] - act[m]) > TOLERANCE:
+                mismatches.append((key, m, exp[m], act[m]))
+    return expected, mismatches
+
+
+def window_summary(db, start, end):
+    started = time.perf_counter()
+    rows = db.select('report_daily_rollup', key=ROLLUP_KEY, day=[f'gte.{start}', f'lte.{end}'])
+    elapsed = (time.perf_counter() - started) * 1000
+    revenue = sum(float(r['revenue']) for r in rows if r['status'] != 'Cancelled')
+    costs = sum(float(r['fuel_cost']) + float(r['maintenance_cost']) + float(r['other_cost']) for r in rows)
+    print(f'{start}..{end}: {len(rows)} rollup rows in {elapsed:.0f} ms')
+    print(f'  revenue {revenue:.2f}  costs {costs:.2f}  net {revenue - costs:.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the rollup from scratch before verifying')
+    parser.add_argument('--window', nargs=2, metavar=('START', 'END'), help='Print the totals of an inclusive date window')
+    args = parser.parse_args()
+
+    db = SupabaseRest()
+    if args.window:
+        window_summary(db, *args.window)
+        return
+    if args.rebuild:
+        rows = db.rpc('report_rebuild_daily_rollup')
+        print(f'Rebuilt {rows} rollup rows')
+
+    expected, mismatches = verify(db)
+    print(f'Checked {len(expected)} buckets in {db.round_trips} requests')
+    for key, measure, exp, act in mismatches[:50]:
+        print(f'  MISMATCH {key} {measure}: expected {exp} got {act}')
+    if mismatches:
+        print(f'{len(mismatches)} mismatches. Run with --rebuild to repair.')
+        sys.exit(1)
+    print('OK: rollup matches the raw tables')
+
+
+if __name__ == '__main__':
+    main()
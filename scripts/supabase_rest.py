@@ -0,0 +1,98 @@
+"""Minimal PostgREST client for the maintenance scripts in this folder.
+
+Reads VITE_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY (falling back to
+VITE_SUPABASE_ANON_KEY) from the environment or from .env / .env.local in the
+project root, the same way the Node scripts do. Standard library only.
+"""
+import json
+import os
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_SIZE = 1000
+
+
+def load_env():
+    env = {}
+    for name in ('.env', '.env.local'):
+        path = os.path.join(ROOT, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if '=' not in line or line.lstrip().startswith('#'):
+                    continue
+                key, value = line.split('=', 1)
+                env[key.strip()] = value.strip().strip('"').strip("'")
+    env.update({k: v for k, v in os.environ.items() if k.startswith(('VITE_', 'SUPABASE_'))})
+    return env
+
+
+class SupabaseRest:
+    def __init__(self, url=None, key=None):
+        env = load_env()
+        self.url = (url or env.get('SUPABASE_URL') or env.get('VITE_SUPABASE_URL') or '').rstrip('/')
+        self.key = key or env.get('SUPABASE_SERVICE_ROLE_KEY') or env.get('VITE_SUPABASE_ANON_KEY')
+        if not self.url or not self.key:
+            raise SystemExit('Missing VITE_SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY. Make sure they are in .env.local')
+        self.round_trips = 0
+        self.bytes_received = 0
+
+    def _request(self, method, path, params=None, body=None, headers=None):
+        query = ('?' + urllib.parse.urlencode(params, doseq=True)) if params else ''
+        req = urllib.request.Request(
+            f'{self.url}/rest/v1/{path}{query}',
+            method=method,
+            data=json.dumps(body).encode('utf-8') if body is not None else None,
+            headers={
+                'apikey': self.key,
+                'Authorization': f'Bearer {self.key}',
+                'Content-Type': 'application/json',
+                **(headers or {}),
+            },
+        )
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            raw = resp.read()
+        self.round_trips += 1
+        self.bytes_received += len(raw)
+        return json.loads(raw) if raw else None
+
+    def select(self, table, columns='*', key='id', **filters):
+        """Fetch every matching row, paging with Range headers.
+
+        Filters use PostgREST syntax, e.g. cycle_id='eq.3'. Pages are only stable over a
+        total order, so the columns of `key` (the table's primary key, comma-separated)
+        are appended to `order` unless it already sorts by them.
+        """
+        order = [part for part in (filters.pop('order', '') or '').split(',') if part]
+        ordered = {part.split('.')[0] for part in order}
+        order += [f'{column}.asc' for column in key.split(',') if column not in ordered]
+        rows = []
+        offset = 0
+        while True:
+            page = self._request(
+                'GET', table,
+                params={'select': columns, **filters, 'order': ','.join(order)},
+                headers={'Range-Unit': 'items', 'Range': f'{offset}-{offset + PAGE_SIZE - 1}'},
+            )
+            rows.extend(page or [])
+            if not page or len(page) < PAGE_SIZE:
+                return rows
+            offset += PAGE_SIZE
+
+    def upsert(self, table, rows, on_conflict=None):
+        if not rows:
+            return
+        params = {'on_conflict': on_conflict} if on_conflict else None
+        for i in range(0, len(rows), PAGE_SIZE):
+            self._request(
+                'POST', table, params=params, body=rows[i:i + PAGE_SIZE],
+                headers={'Prefer': 'resolution=merge-duplicates,return=minimal'},
+            )
+
+    def delete(self, table, **filters):
+        self._request('DELETE', table, params=filters, headers={'Prefer': 'return=minimal'})
+
+    def rpc(self, fn, **args):
+        return self._request('POST', f'rpc/{fn}', body=args)
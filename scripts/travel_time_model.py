@@ -0,0 +1,586 @@
+"""Learn travel and wait times from completed bookings and write the travel_times table.
+
+    python scripts/travel_time_model.py                          # last 12 weeks, writes travel_times
+    python scripts/travel_time_model.py --weeks 26 --dry-run     # fit and evaluate only
+    python scripts/travel_time_model.py --out travel_times.json
+    python scripts/travel_time_model.py --stand-in
+
+Each completed booking gives a wait (passenger on board, the In Progress log, minus the
+later of the pickup time and the driver's At Origin log) and a travel time (arrival minus
+on board). The arrival is taken from the trip_tracks polyline, the first point after
+boarding within ARRIVAL_M of where the track ends, because the Completed tap often comes
+minutes after the car stopped; without a track the Completed log is used. Locations map to
+zones as services/autoAssignment.ts maps them (travelZone: 'ALC' for the airport, the
+municipality code, ':EST' for a station). Per origin and destination zone (destination
+'*' for the wait) the 80th percentile over every hour is one row (hour_of_week -1), and an
+hour of the week gets its own row when its neighbourhood (the hour before and after) has
+enough samples and, shrunk toward the route figure, differs from it by MIN_HOUR_DIFF.
+
+Before writing, the model is fitted without the last --holdout days and both it and the
+hand-entered estimates are replayed over them: minutes reserved beyond the real service,
+services that overran their reservation by more than the delay tolerance, and the drivers
+a greedy day plan needs, with the pickups it would have reached late.
+
+The same samples place each municipality for nearest-driver dispatch: the median position
+of the pickups (At Origin log) and drop-offs (end of the track, else the Completed log)
+resolved to it, written with set_municipality_positions() (migration 20261019000140).
+
+--stand-in runs the same pipeline on a simulated operation (status logs with late
+Completed taps, tracks packed with scripts/trip_tracks.py) where the true durations are
+known. Exit code 1 if the learned plan does not need fewer drivers, reaches more pickups
+late than the hand-entered one, the GPS arrival is off by more than a minute or a
+municipality is placed more than 5 km from every place in it.
+"""
+import argparse
+import json
+import math
+import re
+import sys
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from municipality_index import MunicipalityIndex
+from trip_tracks import decode_track, distance_m
+
+MADRID = ZoneInfo('Europe/Madrid')
+QUANTILE = 0.8
+MIN_ROUTE_SAMPLES = 5
+MIN_HOUR_SAMPLES = 6
+PRIOR_SAMPLES = 8           # an hour's figure is pulled toward the route's with this weight
+MIN_HOUR_DIFF = 3           # minutes; smaller hourly deviations are not worth a row
+ARRIVAL_M = 150
+MAX_TRAVEL_MIN = 300
+MAX_WAIT_MIN = 180
+MIN_POSITION_SAMPLES = 3
+ANY_HOUR = -1
+WAIT_ZONE = '*'
+AIRPORT_ZONE = 'ALC'
+CITY_DELAY_TOLERANCE = 15   # autoAssignment.ts
+AIRPORT_DELAY_TOLERANCE = 30
+
+AIRPORT = re.compile(r'AEROPUERTO|AIRPORT|\bALC\b')
+STATION = re.compile(r'ESTACI[OÓ]N|RENFE|\bAVE\b')
+
+# Hand-entered fallbacks of autoAssignment.ts
+WAIT_TIMES = {'AIRPORT': 50, 'STATION': 15, 'CITY': 0}
+DEFAULT_TRAVEL_TIME = 60
+TRAVEL_TIME_MAP = {
+    'ALICANTE AEROPUERTO (ALC) - Benidorm': 40, 'ALICANTE AEROPUERTO (ALC) - Albir': 45,
+    'ALICANTE AEROPUERTO (ALC) - Altea': 50, 'ALICANTE AEROPUERTO (ALC) - Calpe': 55,
+    'ALICANTE AEROPUERTO (ALC) - Benissa': 65, 'ALICANTE AEROPUERTO (ALC) - Moraira': 70,
+    'ALICANTE AEROPUERTO (ALC) - Javea': 75, 'ALICANTE AEROPUERTO (ALC) - Denia': 70,
+    'ALICANTE AEROPUERTO (ALC) - Villajoyosa': 35, 'ALICANTE AEROPUERTO (ALC) - El Campello': 20,
+    'ALICANTE AEROPUERTO (ALC) - Alicante': 15, 'ALICANTE AEROPUERTO (ALC) - Alicante Centro': 15,
+    'ALICANTE AEROPUERTO (ALC) - Elche': 20, 'ALICANTE AEROPUERTO (ALC) - Santa Pola': 15,
+    'ALICANTE AEROPUERTO (ALC) - Torrevieja': 45, 'ALICANTE AEROPUERTO (ALC) - Murcia': 55,
+    'ALICANTE AEROPUERTO (ALC) - Valencia': 115, 'ALICANTE AEROPUERTO (ALC) - Gandía': 85,
+    'Benidorm - Altea': 20, 'Benidorm - Calpe': 30, 'Benidorm - Valencia': 90, 'Benidorm - Alicante': 35,
+    'Benidorm - ALICANTE AEROPUERTO (ALC)': 40, 'Calpe - ALICANTE AEROPUERTO (ALC)': 55,
+    'Alicante Centro - ALICANTE AEROPUERTO (ALC)': 15,
+}
+STATIC_ROUTES = {k.lower(): v for k, v in TRAVEL_TIME_MAP.items()}
+
+
+def static_wait(location):
+    loc = (location or '').lower()
+    if 'aeropuerto' in loc or 'alc' in loc:
+        return WAIT_TIMES['AIRPORT']
+    if 'estación' in loc or 'renfe' in loc or 'ave' in loc:
+        return WAIT_TIMES['STATION']
+    return WAIT_TIMES['CITY']
+
+
+def static_travel(origin, destination):
+    o, d = (origin or '').strip().lower(), (destination or '').strip().lower()
+    is_airport = lambda loc: 'aeropuerto' in loc or 'alc' in loc  # noqa: E731
+    if is_airport(o) and is_airport(d):
+        return 0
+    if o == d:
+        return 15
+    return STATIC_ROUTES.get(f'{o} - {d}', STATIC_ROUTES.get(f'{d} - {o}', DEFAULT_TRAVEL_TIME))
+
+
+def travel_zone(index, location, municipality=None, address=None):
+    """autoAssignment.travelZone."""
+    upper = (location or '').upper()
+    if AIRPORT.search(upper):
+        return AIRPORT_ZONE
+    match = index.match(location, municipality, address)
+    if not match:
+        return None
+    return f'{match.get("cod_prov") or "03"}{match["cod_mun"]}' + (':EST' if STATION.search(upper) else '')
+
+
+def hour_of_week(at):
+    return at.weekday() * 24 + at.hour
+
+
+def pickup_at(booking):
+    try:
+        return datetime.fromisoformat(f'{str(booking["pickup_date"])[:10]}T{str(booking["pickup_time"])[:5]}').replace(tzinfo=MADRID)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def parse_ts(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def log_times(logs):
+    """First At Origin and In Progress, last Completed: {status: (time, (lat, lng) or None)}."""
+    times = {}
+    for log in logs or []:
+        if not log.get('time') or log.get('status') not in ('At Origin', 'In Progress', 'Completed'):
+            continue
+        position = (float(log['lat']), float(log['lng'])) if log.get('lat') is not None and log.get('lng') is not None else None
+        if log['status'] == 'Completed' or log['status'] not in times:
+            times[log['status']] = (parse_ts(log['time']), position)
+    return times
+
+
+def track_arrival(track, on_board):
+    """First point after boarding within ARRIVAL_M of the end of the track, and the end."""
+    points = decode_track(track)
+    if not points:
+        return None, None
+    start = parse_ts(track['started_at'])
+    end = points[-1]
+    for t, lat, lng in points:
+        at = start + timedelta(seconds=t)
+        if at >= on_board and distance_m(lat, lng, end[1], end[2]) <= ARRIVAL_M:
+            return at, (end[1], end[2])
+    return None, (end[1], end[2])
+
+
+def extract(booking, track, index):
+    """Zones, hour and the measured wait and travel minutes (either may be None)."""
+    pickup = pickup_at(booking)
+    times = log_times(booking.get('status_logs'))
+    if not pickup or 'In Progress' not in times:
+        return None
+    on_board, boarded_at = times['In Progress']
+    at_origin, origin_position = times.get('At Origin', (pickup, None))
+    completed, completed_position = times.get('Completed', (None, None))
+    origin = travel_zone(index, booking.get('origin'), booking.get('origin_municipality'), booking.get('origin_address'))
+    destination = travel_zone(index, booking.get('destination'), booking.get('destination_municipality'),
+                              booking.get('destination_address'))
+    if not origin or not destination:
+        return None
+
+    wait = (on_board - max(pickup, at_origin)).total_seconds() / 60
+    arrival, track_end = track_arrival(track, on_board) if track else (None, None)
+    arrival = arrival or completed
+    travel = (arrival - on_board).total_seconds() / 60 if arrival else None
+    return {
+        'booking': booking,
+        'pickup': pickup,
+        'origin': origin,
+        'destination': destination,
+        'origin_position': origin_position or boarded_at,
+        'destination_position': track_end or completed_position,
+        'hour': hour_of_week(pickup),
+        'wait': wait if 0 <= wait <= MAX_WAIT_MIN else None,
+        'travel': travel if 1 <= (travel or 0) <= MAX_TRAVEL_MIN else None,
+    }
+
+
+def quantile(values, q):
+    values = sorted(values)
+    pos = (len(values) - 1) * q
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def fit(samples):
+    """travel_times rows: {(origin, destination, hour): (minutes, samples)}."""
+    groups = defaultdict(list)
+    for s in samples:
+        if s['travel'] is not None:
+            groups[(s['origin'], s['destination'])].append((s['hour'], s['travel']))
+        if s['wait'] is not None:
+            groups[(s['origin'], WAIT_ZONE)].append((s['hour'], s['wait']))
+
+    rows = {}
+    for (origin, destination), obs in groups.items():
+        if len(obs) < MIN_ROUTE_SAMPLES:
+            continue
+        route = quantile([m for _, m in obs], QUANTILE)
+        rows[(origin, destination, ANY_HOUR)] = (math.ceil(route - 1e-9), len(obs))
+        by_hour = defaultdict(list)
+        for hour, minutes in obs:
+            for h in (hour - 1, hour, hour + 1):
+                by_hour[h % 168].append(minutes)
+        for hour, values in by_hour.items():
+            if len(values) < MIN_HOUR_SAMPLES:
+                continue
+            shrunk = (len(values) * quantile(values, QUANTILE) + PRIOR_SAMPLES * route) / (len(values) + PRIOR_SAMPLES)
+            if abs(shrunk - route) >= MIN_HOUR_DIFF:
+                rows[(origin, destination, hour)] = (math.ceil(shrunk - 1e-9), len(values))
+    return rows
+
+
+def municipality_positions(samples):
+    """Median pickup / drop-off position per municipality zone: set_municipality_positions rows."""
+    seen = defaultdict(list)
+    for s in samples:
+        for zone, position in ((s['origin'], s['origin_position']), (s['destination'], s['destination_position'])):
+            if position and zone != AIRPORT_ZONE:
+                seen[zone.split(':')[0]].append(position)
+    rows = []
+    for code, positions in sorted(seen.items()):
+        if len(positions) >= MIN_POSITION_SAMPLES:
+            rows.append({'cod_prov': code[:2], 'cod_mun': code[2:],
+                         'lat': round(quantile([p[0] for p in positions], 0.5), 6),
+                         'lng': round(quantile([p[1] for p in positions], 0.5), 6)})
+    return rows
+
+
+class Estimator:
+    """calculateAvailableAt / estimateTravelTime, with or without learned rows."""
+
+    def __init__(self, rows=None):
+        self.rows = {k: m for k, (m, _) in (rows or {}).items()}
+
+    def learned(self, origin, destination, hour):
+        if not origin or not destination:
+            return None
+        found = self.rows.get((origin, destination, hour))
+        return found if found is not None else self.rows.get((origin, destination, ANY_HOUR))
+
+    def service(self, s):
+        b = s['booking']
+        wait = self.learned(s['origin'], WAIT_ZONE, s['hour'])
+        travel = self.learned(s['origin'], s['destination'], s['hour'])
+        return ((wait if wait is not None else static_wait(b.get('origin'))) +
+                (travel if travel is not None else static_travel(b.get('origin'), b.get('destination'))))
+
+    def reposition(self, prev, nxt, hour):
+        learned = self.learned(prev['destination'], nxt['origin'], hour)
+        return learned if learned is not None else static_travel(prev['booking'].get('destination'), nxt['booking'].get('origin'))
+
+
+def tolerance(s):
+    return AIRPORT_DELAY_TOLERANCE if s['origin'] == AIRPORT_ZONE else CITY_DELAY_TOLERANCE
+
+
+def plan_day(services, estimator):
+    """Greedy dispatch of a day: each service to the free driver who gets there first."""
+    drivers = []  # [(free at, last service)]
+    chains = []
+    for s in sorted(services, key=lambda s: s['pickup']):
+        best, best_arrival = None, None
+        for i, (free_at, last) in enumerate(drivers):
+            arrival = free_at + timedelta(minutes=estimator.reposition(last, s, hour_of_week(free_at)))
+            if arrival <= s['pickup'] + timedelta(minutes=tolerance(s)) and (best is None or arrival < best_arrival):
+                best, best_arrival = i, arrival
+        end = s['pickup'] + timedelta(minutes=estimator.service(s))
+        if best is None:
+            drivers.append((end, s))
+            chains.append([s])
+        else:
+            drivers[best] = (end, s)
+            chains[best].append(s)
+    return chains
+
+
+def evaluate(services, estimator, actual_service, actual_reposition):
+    """Reservation error per service and the day plans replayed with real durations."""
+    over = late_services = 0.0
+    for s in services:
+        reserved, real = estimator.service(s), actual_service(s)
+        over += max(0, reserved - real)
+        late_services += real - reserved > tolerance(s)
+    by_day = defaultdict(list)
+    for s in services:
+        by_day[s['pickup'].date()].append(s)
+    drivers = late_pickups = 0
+    for day_services in by_day.values():
+        for chain in plan_day(day_services, estimator):
+            drivers += 1
+            for prev, nxt in zip(chain, chain[1:]):
+                free_at = prev['pickup'] + timedelta(minutes=actual_service(prev))
+                arrival = free_at + timedelta(minutes=actual_reposition(prev, nxt, hour_of_week(free_at)))
+                late_pickups += arrival > nxt['pickup'] + timedelta(minutes=tolerance(nxt))
+    return {
+        'over_min': over / max(1, len(services)),
+        'overrun': late_services / max(1, len(services)),
+        'drivers': drivers,
+        'late_pickups': late_pickups,
+        'days': len(by_day),
+    }
+
+
+def report(services, static, learned, actual_service, actual_reposition):
+    print(f'{"holdout":<14} {"reserved/svc":>12} {"over/svc":>9} {"overrun":>8} {"drivers":>8} {"svc/driver":>10} {"late pickups":>12}')
+    results = {}
+    for name, estimator in (('hand-entered', static), ('learned', learned)):
+        r = evaluate(services, estimator, actual_service, actual_reposition)
+        reserved = sum(estimator.service(s) for s in services) / max(1, len(services))
+        print(f'{name:<14} {reserved:>9.1f} min {r["over_min"]:>5.1f} min {r["overrun"]:>8.1%} {r["drivers"]:>8} '
+              f'{len(services) / max(1, r["drivers"]):>10.2f} {r["late_pickups"]:>12}')
+        results[name] = r
+    return results['hand-entered'], results['learned']
+
+
+def describe(rows):
+    routes = sum(1 for k in rows if k[2] == ANY_HOUR and k[1] != WAIT_ZONE)
+    waits = sum(1 for k in rows if k[2] == ANY_HOUR and k[1] == WAIT_ZONE)
+    print(f'model: {len(rows)} rows ({routes} routes, {waits} wait zones, {len(rows) - routes - waits} hourly overrides)')
+
+
+def table_rows(rows, stamp):
+    return [{'origin_zone': o, 'destination_zone': d, 'hour_of_week': h, 'minutes': m, 'samples': n, 'built_at': stamp}
+            for (o, d, h), (m, n) in sorted(rows.items())]
+
+
+def run_live(args):
+    from supabase_rest import SupabaseRest
+
+    rest = SupabaseRest()
+    since = (date.today() - timedelta(weeks=args.weeks)).isoformat()
+    bookings = rest.select(
+        'bookings',
+        'id,pickup_date,pickup_time,origin,origin_municipality,origin_address,'
+        'destination,destination_municipality,destination_address,status_logs',
+        status='eq.Completed', pickup_date=f'gte.{since}',
+    )
+    tracks = {t['booking_id']: t for t in rest.select('trip_tracks', 'booking_id,started_at,polyline,time_deltas', key='booking_id',
+                                                      started_at=f'gte.{since}')}
+    index = MunicipalityIndex(rest.select('municipalities', 'name,cod_prov,cod_mun'))
+    samples = [s for s in (extract(b, tracks.get(b['id']), index) for b in bookings) if s]
+    print(f'{len(bookings)} completed bookings since {since}, {len(tracks)} tracks: {len(samples)} usable '
+          f'({sum(s["travel"] is not None for s in samples)} travel, {sum(s["wait"] is not None for s in samples)} wait)')
+
+    cutoff = datetime.now(MADRID) - timedelta(days=args.holdout)
+    train = [s for s in samples if s['pickup'] < cutoff]
+    holdout = [s for s in samples if s['pickup'] >= cutoff and s['travel'] is not None and s['wait'] is not None]
+    if train and holdout:
+        learned = Estimator(fit(train))
+        # Real durations are known per service; between services the learned figure is the best guess
+        report(holdout, Estimator(), learned, lambda s: s['wait'] + s['travel'], learned.reposition)
+
+    rows = fit(samples)
+    describe(rows)
+    positions = municipality_positions(samples)
+    print(f'municipality positions: {len(positions)} located from pickups and drop-offs')
+    stamp = datetime.now(timezone.utc).isoformat()
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(table_rows(rows, stamp), f, ensure_ascii=False)
+        print(f'Wrote {args.out}')
+    if args.dry_run:
+        return
+    if not rows:
+        print('No route has enough samples; travel_times left as it was')
+        return
+    rest.upsert('travel_times', table_rows(rows, stamp), on_conflict='origin_zone,destination_zone,hour_of_week')
+    rest.delete('travel_times', built_at=f'lt.{stamp}')
+    moved = rest.rpc('set_municipality_positions', p_rows=positions) if positions else 0
+    print(f'travel_times: {len(rows)} rows written; municipalities: {moved} moved; '
+          f'{rest.round_trips} round trips')
+
+
+# --- Stand-in operation -------------------------------------------------------------------
+
+STAND_IN_MUNICIPALITIES = [
+    ('ALICANTE', '03', '014'), ('BENIDORM', '03', '031'), ('ALTEA', '03', '018'), ('CALPE', '03', '047'),
+    ('ELCHE', '03', '065'), ('SANTA POLA', '03', '121'), ('TORREVIEJA', '03', '133'), ('VILLAJOYOSA', '03', '139'),
+    ('EL CAMPELLO', '03', '050'), ('JAVEA', '03', '082'), ('DENIA', '03', '063'), ('VALENCIA', '46', '250'),
+    ('MURCIA', '30', '030'),
+]
+AIRPORT_PLACE = ('ALICANTE AEROPUERTO (ALC)', 38.2822, -0.5582)
+STATION_PLACES = [('Estación Renfe Alicante', 38.3440, -0.4950), ('Estación AVE Valencia Joaquín Sorolla', 39.4600, -0.3840)]
+TOWN_PLACES = [
+    ('Alicante', 38.3452, -0.4810), ('Benidorm', 38.5411, -0.1225), ('Hotel Meliá Benidorm', 38.5340, -0.1310),
+    ('Altea', 38.5990, -0.0510), ('Calpe', 38.6447, 0.0445), ('Elche', 38.2699, -0.6983),
+    ('Santa Pola', 38.1916, -0.5658), ('Torrevieja', 37.9787, -0.6822), ('Villajoyosa', 38.5075, -0.2335),
+    ('El Campello', 38.4286, -0.3975), ('Javea', 38.7891, 0.1663), ('Denia', 38.8408, 0.1057),
+    ('Valencia', 39.4699, -0.3763), ('Murcia', 37.9922, -1.1307),
+]
+
+
+class World:
+    """True durations of the simulated operation."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.route_bias = {}
+
+    def base_travel(self, a, b):
+        if a[0] == b[0]:
+            return 8.0
+        road_km = distance_m(a[1], a[2], b[1], b[2]) / 1000 * 1.3
+        key = tuple(sorted((a[0], b[0])))
+        if key not in self.route_bias:  # what a straight-line speed does not know about a road
+            self.route_bias[key] = self.rng.uniform(0.85, 1.25)
+        return (6 + road_km / (90 if road_km > 25 else 45) * 60) * self.route_bias[key]
+
+    @staticmethod
+    def congestion(hour, road_minutes):
+        day, h = divmod(hour, 24)
+        if h < 6:
+            return 0.85
+        if day < 5 and (7 <= h <= 9 or 17 <= h <= 19):
+            return 1.35
+        if road_minutes > 30 and ((day == 4 and 15 <= h <= 20) or (day == 6 and 17 <= h <= 21)):
+            return 1.25
+        return 1.0
+
+    def travel(self, a, b, hour, noise=True):
+        base = self.base_travel(a, b)
+        minutes = base * self.congestion(hour, base)
+        return minutes * (self.rng.lognormvariate(0, 0.12) if noise else 1)
+
+    def wait(self, place, hour):
+        h = hour % 24
+        if place[0] == AIRPORT_PLACE[0]:
+            return 12 + self.rng.lognormvariate(math.log(14 if h < 20 else 24), 0.55)
+        if place in STATION_PLACES:
+            return 3 + self.rng.lognormvariate(math.log(5), 0.5)
+        return min(20.0, self.rng.expovariate(1 / 3))
+
+
+def stand_in_booking(rng, world, day, n):
+    from trip_tracks import encode_track
+
+    # Airport and station runs to any town, nearer towns more often; local runs mostly short
+    def near(place):
+        weights = [math.exp(-distance_m(place[1], place[2], t[1], t[2]) / 40000) for t in TOWN_PLACES]
+        return rng.choices(TOWN_PLACES, weights)[0]
+
+    r = rng.random()
+    if r < 0.45:
+        pair = [AIRPORT_PLACE, near(AIRPORT_PLACE)]
+    elif r < 0.55:
+        station = rng.choice(STATION_PLACES)
+        pair = [station, near(station)]
+    else:
+        town = rng.choice(TOWN_PLACES)
+        pair = [town, near(town)]
+    if rng.random() < 0.5:
+        pair.reverse()
+    origin, destination = pair
+    minute = int(rng.triangular(5 * 60, 23 * 60 + 30, 14 * 60))
+    pickup = datetime(day.year, day.month, day.day, minute // 60, minute % 60, tzinfo=MADRID)
+    hour = hour_of_week(pickup)
+
+    wait = world.wait(origin, hour)
+    travel = world.travel(origin, destination, hour)
+    at_origin = pickup - timedelta(minutes=rng.uniform(0, 10) if rng.random() < 0.9 else -rng.uniform(0, 15))
+    on_board = max(pickup, at_origin) + timedelta(minutes=wait)
+    arrival = on_board + timedelta(minutes=travel)
+    late_tap = rng.random() < 0.15
+    completed = arrival + timedelta(minutes=rng.uniform(5, 45) if late_tap else rng.uniform(0, 1.5))
+
+    # Track: waiting at the origin, the drive, then parked at the destination until the tap
+    points, t = [], at_origin
+    while t < completed:
+        if t < on_board:
+            lat, lng = origin[1], origin[2]
+        elif t < arrival:
+            f = (t - on_board) / (arrival - on_board)
+            lat, lng = origin[1] + (destination[1] - origin[1]) * f, origin[2] + (destination[2] - origin[2]) * f
+        else:
+            lat, lng = destination[1], destination[2]
+        points.append((t.timestamp(), lat + rng.gauss(0, 0.00004), lng + rng.gauss(0, 0.00004)))
+        t += timedelta(seconds=30 if on_board <= t < arrival else 120)
+    points.append((completed.timestamp(), destination[1], destination[2]))
+    track = {'started_at': datetime.fromtimestamp(math.floor(points[0][0]), timezone.utc).isoformat(), **encode_track(points)}
+
+    def log(status, at, place):
+        return {'status': status, 'time': at.astimezone(timezone.utc).isoformat(),
+                'lat': place[1] + rng.gauss(0, 0.0003), 'lng': place[2] + rng.gauss(0, 0.0003)}
+
+    logs = [log('In Progress', on_board, origin), log('Completed', completed, destination)]
+    if rng.random() < 0.95:
+        logs.insert(0, log('At Origin', at_origin, origin))
+    booking = {
+        'id': f'{day.isoformat()}-{n}', 'pickup_date': day.isoformat(), 'pickup_time': f'{minute // 60:02d}:{minute % 60:02d}',
+        'origin': origin[0], 'destination': destination[0], 'status_logs': logs,
+    }
+    truth = {'origin': origin, 'destination': destination, 'wait': wait, 'travel': travel,
+             'completed_travel': (completed - on_board).total_seconds() / 60}
+    return booking, track, truth
+
+
+def run_stand_in(args):
+    import random
+
+    rng = random.Random(args.seed)
+    world = World(rng)
+    index = MunicipalityIndex([{'name': n, 'cod_prov': p, 'cod_mun': m} for n, p, m in STAND_IN_MUNICIPALITIES])
+    first = date(2026, 10, 19) - timedelta(weeks=args.weeks)
+    samples, truths = [], {}
+    for d in range(args.weeks * 7):
+        day = first + timedelta(days=d)
+        for n in range(int(args.per_day * (1.3 if day.weekday() >= 5 else 1))):
+            booking, track, truth = stand_in_booking(rng, world, day, n)
+            s = extract(booking, track, index)
+            if s:
+                samples.append(s)
+                truths[booking['id']] = truth
+
+    gps_err = [abs(s['travel'] - truths[s['booking']['id']]['travel']) for s in samples if s['travel'] is not None]
+    tap_err = [abs(truths[s['booking']['id']]['completed_travel'] - truths[s['booking']['id']]['travel']) for s in samples]
+    print(f'{len(samples)} services over {args.weeks} weeks, {len({(s["origin"], s["destination"]) for s in samples})} zone pairs')
+    print(f'  travel measured from the track: mean error {sum(gps_err) / len(gps_err):.2f} min '
+          f'(Completed tap alone: {sum(tap_err) / len(tap_err):.2f} min)')
+
+    # Municipality positions against the places the simulation puts in each municipality
+    places = defaultdict(list)
+    for truth in truths.values():
+        for place in (truth['origin'], truth['destination']):
+            places[travel_zone(index, place[0]).split(':')[0]].append(place)
+    position_err = 0.0
+    for row in municipality_positions(samples):
+        nearest = min(distance_m(row['lat'], row['lng'], p[1], p[2]) for p in places[row['cod_prov'] + row['cod_mun']])
+        position_err = max(position_err, nearest)
+    print(f'  municipality positions: worst {position_err / 1000:.2f} km from a place in the municipality')
+
+    cutoff = datetime.combine(first + timedelta(weeks=args.weeks) - timedelta(days=args.holdout), datetime.min.time(), MADRID)
+    train = [s for s in samples if s['pickup'] < cutoff]
+    holdout = [s for s in samples if s['pickup'] >= cutoff]
+    rows = fit(train)
+    describe(rows)
+    truth_of = lambda s: truths[s['booking']['id']]  # noqa: E731
+    actual_service = lambda s: truth_of(s)['wait'] + truth_of(s)['travel']  # noqa: E731
+    actual_reposition = lambda prev, nxt, hour: world.travel(truth_of(prev)['destination'], truth_of(nxt)['origin'], hour, noise=False)  # noqa: E731
+    static, learned = report(holdout, Estimator(), Estimator(rows), actual_service, actual_reposition)
+
+    problems = []
+    if learned['drivers'] >= static['drivers']:
+        problems.append(f'learned plan needs {learned["drivers"]} drivers, hand-entered {static["drivers"]}')
+    if learned['late_pickups'] > static['late_pickups']:
+        problems.append(f'learned plan reaches {learned["late_pickups"]} pickups late, hand-entered {static["late_pickups"]}')
+    if position_err > 5000:
+        problems.append('a municipality position is more than 5 km from every place in it')
+    if sum(gps_err) / len(gps_err) > 1:
+        problems.append('travel measured from the tracks is off by more than a minute')
+    for p in problems:
+        print(f'  {p}')
+    if problems:
+        sys.exit(1)
+    print(f'OK: {static["drivers"] - learned["drivers"]} fewer driver-days for the same {len(holdout)} services')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weeks', type=int, default=12, help='Completed bookings of the last N weeks')
+    parser.add_argument('--holdout', type=int, default=14, help='Days left out of the fit for the evaluation')
+    parser.add_argument('--dry-run', action='store_true', help='Fit and evaluate, do not write travel_times')
+    parser.add_argument('--out', help='Also write the rows as JSON')
+    parser.add_argument('--stand-in', action='store_true', help='Run on a simulated operation with known durations')
+    parser.add_argument('--per-day', type=int, default=70, help='Stand-in services per weekday')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if args.stand_in:
+        run_stand_in(args)
+    else:
+        run_live(args)
+
+
+if __name__ == '__main__':
+    main()
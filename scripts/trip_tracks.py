@@ -0,0 +1,247 @@
+"""Trip tracks: polyline codec, distance/duration per service and payroll totals.
+
+    python scripts/trip_tracks.py --from 2026-10-01 --to 2026-10-31              # every driver
+    python scripts/trip_tracks.py --from 2026-10-01 --to 2026-10-31 --driver <uuid> --services
+    python scripts/trip_tracks.py --from 2026-10-01 --to 2026-10-31 --csv nominas.csv --recompute
+    python scripts/trip_tracks.py --stand-in --drivers 40 --hours 10
+
+Reads trip_tracks (migration 20261019000120), one row per finished trip with the path as
+a Google encoded polyline (1e-5 degrees) and the seconds between points coded the same
+way, and reports distance and duration per service and per driver without touching the
+raw gps_points. --recompute decodes every track and rebuilds distance and duration from
+the polyline, reporting any track whose stored figures disagree (exit code 1).
+
+--stand-in checks the codec offline: fleet traces from scripts/gps_ingest_sim.py are
+thinned as the driver app does, packed per trip exactly as build_trip_track() packs them
+(REAL coordinates, rounded steps), decoded again and compared with the points they came
+from, and the storage of the packed tracks is set against the raw rows they replace.
+"""
+import argparse
+import csv
+import math
+import struct
+import sys
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+SCALE = 100000  # polyline precision: 1e-5 degrees, ~1.1 m
+
+
+def chunk(value):
+    """One signed integer in polyline coding (public.polyline_chunk)."""
+    v = ~(value << 1) if value < 0 else value << 1
+    out = []
+    while v >= 32:
+        out.append(chr((32 | (v & 31)) + 63))
+        v >>= 5
+    out.append(chr(v + 63))
+    return ''.join(out)
+
+
+def decode_values(text):
+    values, v, shift = [], 0, 0
+    for ch in text:
+        b = ord(ch) - 63
+        v |= (b & 31) << shift
+        shift += 5
+        if b < 32:
+            values.append(~(v >> 1) if v & 1 else v >> 1)
+            v, shift = 0, 0
+    return values
+
+
+def real(value):
+    """A coordinate as stored in a REAL column."""
+    return struct.unpack('f', struct.pack('f', value))[0]
+
+
+def distance_m(lat1, lng1, lat2, lng2):
+    """Haversine, as public.geo_distance_m."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+
+def encode_track(points):
+    """points: (epoch seconds, lat, lng) in time order -> trip_tracks fields, as build_trip_track()."""
+    polyline, times = [], []
+    prev_lat = prev_lng = 0
+    prev_ts = None
+    prev = None
+    distance = 0.0
+    for ts, lat, lng in points:
+        lat, lng = real(lat), real(lng)
+        ilat, ilng, second = round(lat * SCALE), round(lng * SCALE), math.floor(ts)
+        polyline.append(chunk(ilat - prev_lat) + chunk(ilng - prev_lng))
+        times.append(chunk(second - (prev_ts if prev_ts is not None else second)))
+        if prev:
+            distance += distance_m(prev[0], prev[1], lat, lng)
+        prev_lat, prev_lng, prev_ts, prev = ilat, ilng, second, (lat, lng)
+    return {
+        'point_count': len(points),
+        'distance_m': round(distance),
+        'duration_s': math.floor(points[-1][0] - points[0][0]) if points else 0,
+        'polyline': ''.join(polyline),
+        'time_deltas': ''.join(times),
+    }
+
+
+def decode_track(track):
+    """trip_tracks row -> [(seconds since the first point, lat, lng)]."""
+    coords = decode_values(track['polyline'])
+    deltas = decode_values(track['time_deltas'])
+    points, lat, lng, t = [], 0, 0, 0
+    for i, dt in enumerate(deltas):
+        lat += coords[2 * i]
+        lng += coords[2 * i + 1]
+        t += dt
+        points.append((t, lat / SCALE, lng / SCALE))
+    return points
+
+
+def reconstruct(track):
+    """Distance (m) and duration (s) of a service from its polyline alone."""
+    points = decode_track(track)
+    distance = sum(distance_m(a[1], a[2], b[1], b[2]) for a, b in zip(points, points[1:]))
+    return distance, (points[-1][0] if points else 0)
+
+
+def track_row_bytes(track):
+    # tuple header + uuids, timestamps, integers + the two texts, plus the PK and driver index entries
+    return 24 + 16 * 2 + 8 * 3 + 4 * 4 + 2 + len(track['polyline']) + len(track['time_deltas']) + 4 + 40 + 48
+
+
+RAW_POINT_BYTES = 84 + 40 + 40  # gps_points tuple + PK entry + booking index entry
+
+
+def run_stand_in(args):
+    import random
+
+    from gps_ingest_sim import Thinner, make_trace
+
+    rng = random.Random(args.seed)
+    start = datetime(2026, 10, 19, 6).timestamp()
+    tracks, worst_m, worst_share, worst_s = 0, 0.0, 0.0, 0
+    raw_bytes = packed_bytes = 0
+    path_total = kept_total = 0.0
+    problems = []
+    for d in range(args.drivers):
+        fixes = make_trace(rng, int(args.hours * 3600), 0)
+        thinner = Thinner()
+        kept = defaultdict(list)
+        path = defaultdict(float)
+        prev = None
+        for t, lat, lng, speed, trip, _ in fixes:
+            if trip is not None and prev and prev[4] == trip:
+                path[trip] += distance_m(prev[1], prev[2], lat, lng)
+            prev = (t, lat, lng, speed, trip)
+            thinner.record((t, lat, lng, speed, trip))
+        for p in thinner.take():
+            if p[4] is not None:
+                kept[p[4]].append((start + p[0] + rng.random(), p[1], p[2]))
+        for trip, points in kept.items():
+            points.sort()
+            track = encode_track(points)
+            distance, duration = reconstruct(track)
+            tracks += 1
+            # The decoded path differs from the stored points only by the 1e-5 degree rounding
+            off_m = abs(distance - track['distance_m'])
+            worst_m = max(worst_m, off_m)
+            worst_share = max(worst_share, off_m / max(1, track['distance_m']))
+            worst_s = max(worst_s, abs(duration - track['duration_s']))
+            if off_m > 1 + 0.001 * track['distance_m'] or abs(duration - track['duration_s']) > 1:
+                problems.append(f'driver {d} trip {trip}: {distance:.0f} m / {duration} s decoded, '
+                                f'{track["distance_m"]} m / {track["duration_s"]} s stored')
+            raw_bytes += len(points) * RAW_POINT_BYTES
+            packed_bytes += track_row_bytes(track)
+            path_total += path[trip]
+            kept_total += track['distance_m']
+
+    print(f'{args.drivers} drivers x {args.hours:g} h: {tracks} trips')
+    print(f'  decoded vs stored distance: worst {worst_m:.1f} m ({worst_share:.3%}), duration: worst {worst_s} s')
+    print(f'  thinned track vs 1 Hz path: {kept_total / 1000:.1f} km of {path_total / 1000:.1f} km '
+          f'({1 - kept_total / path_total:.2%} shorter)')
+    print(f'  storage: raw points {raw_bytes / 1e6:.2f} MB -> tracks {packed_bytes / 1e6:.2f} MB '
+          f'({raw_bytes / packed_bytes:.1f}x smaller); a report reads {tracks} rows instead of '
+          f'{raw_bytes // RAW_POINT_BYTES} points')
+    for p in problems[:20]:
+        print(f'  {p}')
+    if problems:
+        sys.exit(1)
+    print('OK: every track decodes to its stored distance and duration')
+
+
+def run_report(args):
+    from supabase_rest import SupabaseRest
+
+    rest = SupabaseRest()
+    to_exclusive = (date.fromisoformat(args.to) + timedelta(days=1)).isoformat()
+    filters = {'started_at': [f'gte.{args.date_from}', f'lt.{to_exclusive}'], 'order': 'started_at.asc'}
+    if args.driver:
+        filters['driver_id'] = f'eq.{args.driver}'
+    columns = 'booking_id,driver_id,started_at,point_count,distance_m,duration_s,max_speed_kmh'
+    if args.recompute:
+        columns += ',polyline,time_deltas'
+    tracks = rest.select('trip_tracks', columns, key='booking_id', **filters)
+    drivers = {d['id']: d['name'] for d in rest.select('drivers', 'id,name')}
+
+    problems = []
+    totals = defaultdict(lambda: {'services': 0, 'distance_m': 0, 'duration_s': 0})
+    for track in tracks:
+        if args.recompute:
+            distance, duration = reconstruct(track)
+            if abs(distance - track['distance_m']) > 1 + 0.001 * track['distance_m'] or abs(duration - track['duration_s']) > 1:
+                problems.append(f'{track["booking_id"]}: stored {track["distance_m"]} m / {track["duration_s"]} s, '
+                                f'polyline {distance:.0f} m / {duration} s')
+        t = totals[track['driver_id']]
+        t['services'] += 1
+        t['distance_m'] += track['distance_m']
+        t['duration_s'] += track['duration_s']
+        if args.services:
+            print(f'{track["started_at"][:16]}  {drivers.get(track["driver_id"], track["driver_id"]):<28} '
+                  f'{track["booking_id"][:8]}  {track["distance_m"] / 1000:>8.1f} km {track["duration_s"] / 60:>7.0f} min '
+                  f'{track["max_speed_kmh"] or 0:>5} km/h')
+
+    print(f'{"driver":<30} {"services":>8} {"km":>10} {"hours":>8}')
+    for driver_id, t in sorted(totals.items(), key=lambda kv: drivers.get(kv[0], '') or ''):
+        print(f'{drivers.get(driver_id, driver_id) or "-":<30} {t["services"]:>8} {t["distance_m"] / 1000:>10.1f} '
+              f'{t["duration_s"] / 3600:>8.2f}')
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['driver_id', 'driver', 'services', 'km', 'hours'])
+            for driver_id, t in totals.items():
+                writer.writerow([driver_id, drivers.get(driver_id, ''), t['services'],
+                                 round(t['distance_m'] / 1000, 1), round(t['duration_s'] / 3600, 2)])
+        print(f'Wrote {args.csv}')
+    print(f'{len(tracks)} tracks, {rest.round_trips} round trips, {rest.bytes_received / 1e3:.0f} KB')
+    for p in problems:
+        print(f'  {p}')
+    if problems:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--from', dest='date_from', help='First day, YYYY-MM-DD')
+    parser.add_argument('--to', help='Last day, YYYY-MM-DD (inclusive)')
+    parser.add_argument('--driver', help='Only this driver id')
+    parser.add_argument('--services', action='store_true', help='List every service, not only the totals')
+    parser.add_argument('--csv', help='Write the per-driver totals for payroll to this file')
+    parser.add_argument('--recompute', action='store_true', help='Check stored figures against the polylines')
+    parser.add_argument('--stand-in', action='store_true', help='Check the codec on simulated fleet traces')
+    parser.add_argument('--drivers', type=int, default=40)
+    parser.add_argument('--hours', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.stand_in:
+        run_stand_in(args)
+    elif args.date_from and args.to:
+        run_report(args)
+    else:
+        parser.error('--from and --to are required (or --stand-in)')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
 import { Booking, Driver } from '../types';
+import { supabase } from './supabase';
+import { buildMunicipalityIndex, matchMunicipality, MunicipalityIndex } from '../utils/municipalityResolver';
+import { nearestInGrid } from '../utils/geoGrid';
 
 /**
  * POLICY CONSTANTS
+ * Fallbacks for the routes the learned model (below) has no figure for.
  */
 const WAIT_TIMES = {
     AIRPORT: 50, // minutes
@@ -49,6 +53,92 @@ const TRAVEL_TIME_MAP: Record<string, number> = {
     'Alicante Centro - ALICANTE AEROPUERTO (ALC)': 15, // redundant but safe
 };
 
+/**
+ * LEARNED MODEL
+ * travel_times (migration 20261019000130), written by scripts/travel_time_model.py from
+ * completed bookings: 80th percentile minutes per origin zone, destination zone ('*' for
+ * the wait at the origin) and hour of the week (-1: any hour). Loaded once per session.
+ */
+const ANY_HOUR = -1;
+const WAIT_ZONE = '*';
+const AIRPORT_ZONE = 'ALC';
+
+let municipalityIndex: MunicipalityIndex | null = null;
+let learnedMinutes = new Map<string, number>(); // `${origin}|${destination}|${hour}` -> minutes
+let zoneCache = new Map<string, string | null>();
+let modelLoad: Promise<void> | null = null;
+const modelListeners = new Set<() => void>();
+
+const isAirportText = (upper: string) => upper.includes('AEROPUERTO') || upper.includes('AIRPORT') || /\bALC\b/.test(upper);
+const isStationText = (upper: string) => /ESTACI[OÓ]N|RENFE|\bAVE\b/.test(upper);
+
+/**
+ * Loads the learned travel and wait times (and the municipalities that map a location to its
+ * zone and position). Until it resolves, and for routes it does not cover, the fallbacks above are used.
+ */
+export function loadTravelTimeModel(): Promise<void> {
+    if (!modelLoad) {
+        modelLoad = (async () => {
+            const [times, municipalities] = await Promise.all([
+                supabase.from('travel_times').select('origin_zone, destination_zone, hour_of_week, minutes'),
+                supabase.from('municipalities').select('name, cod_prov, cod_mun, lat, lng'),
+            ]);
+            if (times.error || municipalities.error) {
+                console.error('Error loading travel times:', times.error || municipalities.error);
+                modelLoad = null; // retried on the next call
+                return;
+            }
+            const learned = new Map<string, number>();
+            (times.data || []).forEach((r: any) => learned.set(`${r.origin_zone}|${r.destination_zone}|${r.hour_of_week}`, r.minutes));
+            municipalityIndex = buildMunicipalityIndex(municipalities.data || []);
+            learnedMinutes = learned;
+            zoneCache = new Map();
+            modelListeners.forEach(listener => listener());
+        })();
+    }
+    return modelLoad;
+}
+
+/** Calls `listener` whenever a travel time model is loaded, so estimates cached before it can be dropped. */
+export function onTravelTimeModelLoaded(listener: () => void): () => void {
+    modelListeners.add(listener);
+    return () => modelListeners.delete(listener);
+}
+
+/**
+ * Zone of a location as the model keys it: 'ALC' for the airport, the municipality code
+ * (cod_prov + cod_mun) with ':EST' for a station, or null when no municipality matches.
+ */
+export function travelZone(location: string, municipality?: string, address?: string): string | null {
+    if (!municipalityIndex) return null;
+    const cacheKey = `${location}|${municipality || ''}|${address || ''}`;
+    const cached = zoneCache.get(cacheKey);
+    if (cached !== undefined) return cached;
+
+    const upper = (location || '').toUpperCase();
+    let zone: string | null = null;
+    if (isAirportText(upper)) {
+        zone = AIRPORT_ZONE;
+    } else {
+        const match = matchMunicipality(municipalityIndex, location, municipality, address);
+        if (match) zone = `${match.cod_prov || '03'}${match.cod_mun}` + (isStationText(upper) ? ':EST' : '');
+    }
+    zoneCache.set(cacheKey, zone);
+    return zone;
+}
+
+/** Monday 00:00 = 0 ... Sunday 23:00 = 167, local time as pickup_date/pickup_time. */
+const hourOfWeek = (at: Date) => ((at.getDay() + 6) % 7) * 24 + at.getHours();
+
+function learned(origin: string | null, destination: string | null, at?: Date): number | null {
+    if (!origin || !destination || learnedMinutes.size === 0) return null;
+    if (at && !Number.isNaN(at.getTime())) {
+        const hourly = learnedMinutes.get(`${origin}|${destination}|${hourOfWeek(at)}`);
+        if (hourly !== undefined) return hourly;
+    }
+    return learnedMinutes.get(`${origin}|${destination}|${ANY_HOUR}`) ?? null;
+}
+
 /**
  * Heuristic to determine wait time based on origin text
  */
@@ -60,9 +150,9 @@ function getWaitTime(location: string): number {
 }
 
 /**
- * Estimate travel time between origin and destination
+ * Hand-entered estimate between origin and destination
  */
-export function estimateTravelTime(origin: string, destination: string): number {
+function staticTravelTime(origin: string, destination: string): number {
     const o = origin.trim().toLowerCase();
     const d = destination.trim().toLowerCase();
 
@@ -88,6 +178,13 @@ export function estimateTravelTime(origin: string, destination: string): number
     return DEFAULT_TRAVEL_TIME;
 }
 
+/**
+ * Estimate travel time between origin and destination, for a departure at `at` if given
+ */
+export function estimateTravelTime(origin: string, destination: string, at?: Date): number {
+    return learned(travelZone(origin), travelZone(destination), at) ?? staticTravelTime(origin, destination);
+}
+
 /**
  * Safely parse date and time strings regardless of format
  */
@@ -102,8 +199,10 @@ function parseDateTime(date: any, time: string): Date {
  */
 export function calculateAvailableAt(booking: any): Date {
     const pickupDate = parseDateTime(booking.pickup_date, booking.pickup_time);
-    const waitTime = getWaitTime(booking.origin);
-    const travelTime = estimateTravelTime(booking.origin, booking.destination);
+    const originZone = travelZone(booking.origin, booking.origin_municipality, booking.origin_address);
+    const destinationZone = travelZone(booking.destination, booking.destination_municipality, booking.destination_address);
+    const waitTime = learned(originZone, WAIT_ZONE, pickupDate) ?? getWaitTime(booking.origin);
+    const travelTime = learned(originZone, destinationZone, pickupDate) ?? staticTravelTime(booking.origin, booking.destination);
 
     // Total time = Pickup + Wait + Travel + Safety Buffer
     const totalMinutes = waitTime + travelTime + SAFETY_BUFFER;
@@ -244,7 +343,7 @@ export function isDriverAvailable(driver: any, vehicle: any, newBooking: any, al
 
         // a. If the new booking comes AFTER the existing booking `b`
         if (newStart.getTime() >= bStart.getTime()) {
-            const repositionTime = estimateTravelTime(b.destination, newBooking.origin);
+            const repositionTime = estimateTravelTime(b.destination, newBooking.origin, bEnd);
             const arrivalTime = bEnd.getTime() + repositionTime * 60000;
             const isAirportPickup = newBooking.origin.toLowerCase().includes('aeropuerto') || newBooking.origin.toLowerCase().includes('alc');
             const toleranceMinutes = isAirportPickup ? AIRPORT_DELAY_TOLERANCE : CITY_DELAY_TOLERANCE;
@@ -254,7 +353,7 @@ export function isDriverAvailable(driver: any, vehicle: any, newBooking: any, al
 
         // b. If the new booking comes BEFORE the existing booking `b`
         if (bStart.getTime() >= newStart.getTime()) {
-            const repositionTime = estimateTravelTime(newBooking.destination, b.origin);
+            const repositionTime = estimateTravelTime(newBooking.destination, b.origin, newEnd);
             const arrivalTime = newEnd.getTime() + repositionTime * 60000;
             const isAirportPickup = b.origin.toLowerCase().includes('aeropuerto') || b.origin.toLowerCase().includes('alc');
             const toleranceMinutes = isAirportPickup ? AIRPORT_DELAY_TOLERANCE : CITY_DELAY_TOLERANCE;
@@ -385,7 +484,7 @@ export function detectScheduleConflicts(bookings: any[]): { messages: string[],
 
             let conflict = false;
 
-            const repositionTime = estimateTravelTime(current.destination, next.origin);
+            const repositionTime = estimateTravelTime(current.destination, next.origin, currentEnd);
             const arrivalTime = currentEnd.getTime() + repositionTime * 60000;
             const delayMs = arrivalTime - nextStart.getTime();
 
@@ -414,3 +513,82 @@ export function detectScheduleConflicts(bookings: any[]): { messages: string[],
 
     return { messages, conflictIds };
 }
+
+/**
+ * NEAREST DRIVERS
+ * For a pickup in the next LIVE_HORIZON_MIN, where a driver is now (driver_locations, bucketed
+ * by the driverLocationsByCell index) says more than where their previous drop-off was.
+ * The pickup is placed at the booking's coordinates, else the airport or the centroid of its
+ * municipality (municipalities.lat/lng, migration 20261019000140).
+ */
+const LIVE_HORIZON_MIN = 120;
+const LOCATION_MAX_AGE_MIN = 20;    // older positions say little about where the car is
+const ROAD_FACTOR = 1.3;            // road distance over straight-line distance
+const URBAN_KM = 10;                // first stretch at urban speed, the rest by motorway
+const URBAN_KMH = 35;
+const ROAD_KMH = 80;
+const AIRPORT_POSITION: [number, number] = [38.2822, -0.5582];
+const ON_TRIP_STATUSES = ['En Route', 'At Origin', 'In Progress'];
+
+export interface NearbyDriver {
+    driver: any;
+    distanceKm: number;
+    etaMinutes: number;
+}
+
+/** Minutes to drive a straight-line distance. */
+export function etaMinutes(distanceKm: number): number {
+    const road = distanceKm * ROAD_FACTOR;
+    const urban = Math.min(road, URBAN_KM);
+    return Math.ceil((urban / URBAN_KMH + (road - urban) / ROAD_KMH) * 60);
+}
+
+/** Approximate position of a location (see loadTravelTimeModel), or null. */
+export function locatePlace(location: string, municipality?: string, address?: string): [number, number] | null {
+    if (isAirportText((location || '').toUpperCase())) return AIRPORT_POSITION;
+    if (!municipalityIndex) return null;
+    const match = matchMunicipality(municipalityIndex, location, municipality, address);
+    const lat = Number(match?.lat), lng = Number(match?.lng);
+    return match && match.lat != null && Number.isFinite(lat) && Number.isFinite(lng) ? [lat, lng] : null;
+}
+
+function pickupPosition(booking: any): [number, number] | null {
+    const lat = Number(booking.origin_lat), lng = Number(booking.origin_lng);
+    if (booking.origin_lat != null && booking.origin_lng != null && Number.isFinite(lat) && Number.isFinite(lng)) return [lat, lng];
+    return locatePlace(booking.origin, booking.origin_municipality, booking.origin_address);
+}
+
+/**
+ * The k drivers nearest to a pickup that are free now and pass isDriverAvailable, nearest
+ * first, with a driving ETA. Empty when the pickup is not in the next LIVE_HORIZON_MIN or
+ * cannot be placed; suggestDriver is the ranking then. Only the drivers the grid search
+ * reaches are checked against their schedule (bookingsByDriver: the entityStore index).
+ */
+export function nearestAvailableDrivers(
+    booking: any,
+    locationsByCell: Map<string, any[]>,
+    context: { drivers: any[]; bookingsByDriver: Map<string, any[]>; vehicles: any[]; shifts: any[]; k?: number; now?: Date }
+): NearbyDriver[] {
+    const { drivers, bookingsByDriver, vehicles, shifts, k = 3, now = new Date() } = context;
+    const pickup = parseDateTime(booking.pickup_date, booking.pickup_time);
+    if (Number.isNaN(pickup.getTime()) || pickup.getTime() - now.getTime() > LIVE_HORIZON_MIN * 60000) return [];
+    const position = pickupPosition(booking);
+    if (!position) return [];
+
+    const driversById = new Map<string, any>();
+    for (const d of drivers) driversById.set(d.id, d);
+    const oldest = now.getTime() - LOCATION_MAX_AGE_MIN * 60000;
+
+    const accept = (loc: any) => {
+        const driver = driversById.get(loc.driver_id);
+        if (!driver || driver.status !== 'Active' || (driver.current_status !== 'Working' && driver.current_status !== 'Paused')) return false;
+        if (!loc.updated_at || new Date(loc.updated_at).getTime() < oldest) return false;
+        const own = bookingsByDriver.get(driver.id) || [];
+        if (own.some(b => b.id !== booking.id && ON_TRIP_STATUSES.includes(b.status))) return false;
+        const vehicle = getAssignedVehicleForBooking({ ...booking, driver_id: driver.id }, shifts, vehicles, drivers);
+        return isDriverAvailable(driver, vehicle, booking, own, shifts);
+    };
+
+    return nearestInGrid(locationsByCell, position[0], position[1], k, (loc: any) => [loc.lat, loc.lng], accept)
+        .map(({ item, distanceKm }) => ({ driver: driversById.get(item.driver_id), distanceKm, etaMinutes: etaMinutes(distanceKm) }));
+}
@@ -0,0 +1,287 @@
+import { supabase } from './supabase';
+import { calculateAvailableAt, estimateTravelTime, onTravelTimeModelLoaded } from './autoAssignment';
+
+// Fleet occupancy per day and minute, for booking intake.
+// A day is loaded once (vehicles, shifts and the bookings of that day and the previous
+// one) and then kept current from realtime booking changes, so "is HH:MM available"
+// is an array lookup and "free slots of the day" a pass over the day's minutes.
+// Occupancy depends on where the new service starts (deadhead from each booking's
+// destination), so every day keeps one timeline per requested origin, built on demand.
+// week() loads all missing days of a range in one round trip and returns the free
+// vehicles per 15-minute slot, which the booking form and client portal render as a heatmap.
+
+const MINUTE = 60000;
+const DEFAULT_FLEET = 12;
+const FALLBACK_DURATION_MS = 60 * MINUTE;
+const RELOAD_AFTER_MS = 5 * 60000; // safety net in case realtime events were missed
+const INACTIVE_STATUSES = ['Cancelled', 'Completed'];
+const CLOSED_SHIFT_TYPES = ['Libre', 'OFF'];
+
+interface BookingSpan {
+    startMs: number;
+    dropoffMs: number;
+    destination: string | null;
+    exact: boolean; // false when the end is the 1 h fallback (no deadhead added)
+}
+
+export interface DayAvailability {
+    date: string;
+    capacity: number;
+    slots: { time: string; free: number }[];
+}
+
+interface DayState {
+    day: string;
+    startMs: number;
+    minutes: number;
+    capacity: number;
+    loadedAt: number;
+    bookings: Map<string, BookingSpan>;
+    timelines: Map<string, Int16Array>;
+}
+
+const toDay = (value: any): string =>
+    typeof value === 'string' ? value.split('T')[0] : new Date(value).toISOString().split('T')[0];
+
+const shiftDay = (day: string, delta: number): string => {
+    const d = new Date(`${day}T12:00:00Z`); // midday keeps DST out of the arithmetic
+    d.setUTCDate(d.getUTCDate() + delta);
+    return d.toISOString().split('T')[0];
+};
+const previousDay = (day: string) => shiftDay(day, -1);
+const nextDay = (day: string) => shiftDay(day, 1);
+
+const dayStartMs = (day: string) => new Date(`${day}T00:00`).getTime();
+
+function bookingSpan(b: any): BookingSpan | null {
+    if (!b.pickup_time || !b.pickup_date || !b.status || INACTIVE_STATUSES.includes(b.status)) return null;
+    const startMs = new Date(`${toDay(b.pickup_date)}T${b.pickup_time}`).getTime();
+    if (Number.isNaN(startMs)) return null;
+    try {
+        return { startMs, dropoffMs: calculateAvailableAt(b).getTime(), destination: b.destination || null, exact: true };
+    } catch (e) {
+        console.error('Error calculating end time', e);
+        return { startMs, dropoffMs: startMs + FALLBACK_DURATION_MS, destination: null, exact: false };
+    }
+}
+
+function spanEndMs(span: BookingSpan, origin: string): number {
+    if (!span.exact || !origin || !span.destination) return span.dropoffMs;
+    return span.dropoffMs + estimateTravelTime(span.destination, origin, new Date(span.dropoffMs)) * MINUTE;
+}
+
+/** Minutes [from, to) of the day whose instant t satisfies start <= t < end. */
+function minuteRange(state: DayState, startMs: number, endMs: number): [number, number] {
+    return [
+        Math.max(0, Math.ceil((startMs - state.startMs) / MINUTE)),
+        Math.min(state.minutes, Math.ceil((endMs - state.startMs) / MINUTE)),
+    ];
+}
+
+function applySpan(timeline: Int16Array, state: DayState, startMs: number, endMs: number, delta: number) {
+    const [from, to] = minuteRange(state, startMs, endMs);
+    for (let m = from; m < to; m++) timeline[m] += delta;
+}
+
+const slotTime = (state: DayState, minute: number) => {
+    const t = new Date(state.startMs + minute * MINUTE);
+    return `${String(t.getHours()).padStart(2, '0')}:${String(t.getMinutes()).padStart(2, '0')}`;
+};
+
+class CapacityEngine {
+    private days = new Map<string, DayState>();
+    private loading = new Map<string, Promise<DayState>>();
+    private channel: any = null;
+
+    constructor() {
+        // Spans and timelines built on the fallback times are stale once the learned model
+        // arrives: reload those days on next use
+        onTravelTimeModelLoaded(() => this.days.clear());
+    }
+
+    /** True if one more service can start at `time` on `date` from `origin`. */
+    async isAvailable(date: string, time: string, origin: string): Promise<boolean> {
+        const state = await this.day(date);
+        if (state.capacity === 0) return false;
+        const minute = Math.round((new Date(`${date}T${time}`).getTime() - state.startMs) / MINUTE);
+        if (minute < 0 || minute >= state.minutes) return false;
+        return this.timeline(state, origin)[minute] < state.capacity;
+    }
+
+    /** Start times (HH:MM, every `stepMinutes`) of `date` at which a service from `origin` still fits. */
+    async freeSlots(date: string, origin: string, stepMinutes = 15): Promise<string[]> {
+        const state = await this.day(date);
+        if (state.capacity === 0) return [];
+        const timeline = this.timeline(state, origin);
+        const slots: string[] = [];
+        for (let m = 0; m < state.minutes; m += stepMinutes) {
+            if (timeline[m] < state.capacity) slots.push(slotTime(state, m));
+        }
+        return slots;
+    }
+
+    /**
+     * Free vehicles per slot for `days` days from `startDate`, for a service from `origin`.
+     * A slot is free when free > 0. `excludeBookingId` leaves a booking being changed out of
+     * the occupancy, so it does not compete with itself.
+     */
+    async week(startDate: string, origin: string, days = 7, stepMinutes = 15, excludeBookingId?: string): Promise<DayAvailability[]> {
+        const dates = Array.from({ length: days }, (_, i) => shiftDay(startDate, i));
+        const states = await this.loadDays(dates);
+        return states.map(state => {
+            const timeline = this.timelineWithout(state, origin, excludeBookingId);
+            const slots: DayAvailability['slots'] = [];
+            for (let m = 0; m < state.minutes; m += stepMinutes) {
+                slots.push({ time: slotTime(state, m), free: Math.max(0, state.capacity - timeline[m]) });
+            }
+            return { date: state.day, capacity: state.capacity, slots };
+        });
+    }
+
+    private async day(date: string): Promise<DayState> {
+        return (await this.loadDays([date]))[0];
+    }
+
+    /** Fresh states for `dates`; the missing ones are fetched together, concurrent callers share the fetch. */
+    private async loadDays(dates: string[]): Promise<DayState[]> {
+        const now = Date.now();
+        const missing = dates.filter(d => {
+            const state = this.days.get(d);
+            return !this.loading.has(d) && !(state && now - state.loadedAt < RELOAD_AFTER_MS);
+        });
+        if (missing.length > 0) {
+            const batch = this.load(missing);
+            for (const d of missing) {
+                const pending = batch.then(states => states.get(d)!);
+                this.loading.set(d, pending);
+                pending.catch(() => undefined).finally(() => this.loading.delete(d));
+            }
+        }
+        return Promise.all(dates.map(d => this.loading.get(d) ?? Promise.resolve(this.days.get(d)!)));
+    }
+
+    private async load(dates: string[]): Promise<Map<string, DayState>> {
+        this.subscribe();
+        const pickupDays = [...new Set(dates.flatMap(d => [previousDay(d), d]))];
+
+        const [{ data: vehicles }, { data: shifts }, { data: bookings, error }] = await Promise.all([
+            supabase.from('vehicles').select('id').eq('status', 'Operativo'),
+            supabase.from('shifts').select('date, type, vehicle_id, driver_id').in('date', dates),
+            supabase.from('bookings')
+                // calculateAvailableAt matches the zones on the municipality and address columns too
+                .select('id, pickup_date, pickup_time, origin, destination, status, origin_municipality, origin_address, destination_municipality, destination_address')
+                .in('pickup_date', pickupDays)
+                .not('status', 'in', `(${INACTIVE_STATUSES.join(',')})`),
+        ]);
+        if (error) throw error;
+
+        const fleet = vehicles && vehicles.length > 0 ? vehicles.length : DEFAULT_FLEET;
+        const spans = (bookings || [])
+            .map((b: any) => ({ id: b.id, day: toDay(b.pickup_date), span: bookingSpan(b) }))
+            .filter(b => b.span);
+
+        const loaded = new Map<string, DayState>();
+        for (const date of dates) {
+            // Capacity: operative fleet, narrowed to the vehicles/drivers on shift when the day has shifts
+            let capacity = fleet;
+            const onShift = (shifts || []).filter((s: any) => toDay(s.date) === date && !CLOSED_SHIFT_TYPES.includes(s.type));
+            if (onShift.length > 0) {
+                const uniqueVehicles = new Set(onShift.map((s: any) => s.vehicle_id).filter(Boolean));
+                const uniqueDrivers = new Set(onShift.map((s: any) => s.driver_id).filter(Boolean));
+                capacity = Math.min(Math.max(uniqueVehicles.size, uniqueDrivers.size, 1), fleet);
+            }
+
+            const startMs = dayStartMs(date);
+            const state: DayState = {
+                day: date,
+                startMs,
+                minutes: Math.round((dayStartMs(nextDay(date)) - startMs) / MINUTE), // 1380/1500 on DST days
+                capacity,
+                loadedAt: Date.now(),
+                bookings: new Map(),
+                timelines: new Map(),
+            };
+            const yesterday = previousDay(date);
+            for (const b of spans) {
+                if (b.day === date || b.day === yesterday) state.bookings.set(b.id, b.span!);
+            }
+            this.days.set(date, state);
+            loaded.set(date, state);
+        }
+        return loaded;
+    }
+
+    private timeline(state: DayState, origin: string): Int16Array {
+        const key = origin || '';
+        let timeline = state.timelines.get(key);
+        if (!timeline) {
+            // Difference array + prefix sum: O(bookings + minutes) whatever the span lengths
+            const diff = new Int16Array(state.minutes + 1);
+            for (const span of state.bookings.values()) {
+                const [from, to] = minuteRange(state, span.startMs, spanEndMs(span, key));
+                if (from < to) {
+                    diff[from]++;
+                    diff[to]--;
+                }
+            }
+            timeline = new Int16Array(state.minutes);
+            let running = 0;
+            for (let m = 0; m < state.minutes; m++) timeline[m] = running += diff[m];
+            state.timelines.set(key, timeline);
+        }
+        return timeline;
+    }
+
+    /** The day's timeline minus one booking's span (a copy; the cached timeline is untouched). */
+    private timelineWithout(state: DayState, origin: string, bookingId?: string): Int16Array {
+        const timeline = this.timeline(state, origin);
+        const span = bookingId ? state.bookings.get(bookingId) : undefined;
+        if (!span) return timeline;
+        const copy = timeline.slice();
+        applySpan(copy, state, span.startMs, spanEndMs(span, origin || ''), -1);
+        return copy;
+    }
+
+    /** Moves one booking in every loaded day it touches (pickup on that day or the previous one). */
+    private applyBookingChange(id: string, row: any | null) {
+        const span = row ? bookingSpan(row) : null;
+        const pickupDay = row?.pickup_date ? toDay(row.pickup_date) : null;
+
+        for (const state of this.days.values()) {
+            const previous = state.bookings.get(id);
+            if (previous) {
+                for (const [origin, timeline] of state.timelines) {
+                    applySpan(timeline, state, previous.startMs, spanEndMs(previous, origin), -1);
+                }
+                state.bookings.delete(id);
+            }
+            if (span && pickupDay && (pickupDay === state.day || pickupDay === previousDay(state.day))) {
+                for (const [origin, timeline] of state.timelines) {
+                    applySpan(timeline, state, span.startMs, spanEndMs(span, origin), 1);
+                }
+                state.bookings.set(id, span);
+            }
+        }
+    }
+
+    private subscribe() {
+        if (this.channel) return;
+        this.channel = supabase
+            .channel('capacity-engine')
+            .on('postgres_changes', { event: '*', schema: 'public', table: 'bookings' }, (payload: any) => {
+                if (payload.eventType === 'DELETE') this.applyBookingChange(payload.old.id, null);
+                else this.applyBookingChange(payload.new.id, payload.new);
+            })
+            .on('postgres_changes', { event: '*', schema: 'public', table: 'shifts' }, (payload: any) => {
+                // Capacity is derived per day; reload the affected day on next use
+                // (a DELETE only carries the id, so it drops every loaded day)
+                const date = payload.new?.date || payload.old?.date;
+                if (date) this.days.delete(toDay(date));
+                else this.days.clear();
+            })
+            .on('postgres_changes', { event: '*', schema: 'public', table: 'vehicles' }, () => this.days.clear())
+            .subscribe();
+    }
+}
+
+export const capacityEngine = new CapacityEngine();
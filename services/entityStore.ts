@@ -0,0 +1,593 @@
+import { supabase } from './supabase';
+import { loadSnapshot, saveSnapshot } from './localCache';
+import { geoCell, inServiceArea } from '../utils/geoGrid';
+
+// One client-side copy of each table, shared by every view.
+// useSupabaseData used to fetch `select('*')` of the whole table for every hook instance
+// (ManagementModules alone mounts 14) and, with `realtime`, open one channel per instance.
+// Now each distinct query (table + select + order + limit) is fetched once and kept in an
+// key-indexed collection (ROW_KEYS; `id` unless the table says otherwise). A table gets a
+// realtime channel only while some view asked for `realtime`; its events are applied to all
+// of that table's collections. Collections outlive the views that use them: while a channel
+// is open they stay current, otherwise the rows are still shown at once and revalidated in
+// the background when a view mounts (at most every REVALIDATE_MS; a delta for synced tables).
+// Derived indexes (bookings by date / by driver, shifts by driver|date, driver locations by
+// grid cell) are rebuilt once per change of their collection, on first read, instead of
+// every view filtering the table.
+// A windowed collection (QueryOptions.window) pushes a day range and status predicates to
+// the database and pages with a keyset cursor, e.g. (pickup_date, pickup_time, id), so a
+// view over a multi-year table only transfers the rows it shows.
+// Full-table collections of SYNCED_TABLES are delta-synced: the rows are persisted in
+// IndexedDB (services/localCache.ts) with the max(updated_at) seen, and every later load
+// (cold start, revalidation on mount, 'app:refresh') only asks for rows with a
+// newer updated_at plus the sync_tombstones of deleted ids (migration 20261019000100) and
+// of rows that moved to another driver (migration 20261019000190).
+// Realtime events are not applied one by one: they are buffered per table, coalesced by row
+// and flushed once per animation frame, so a burst of GPS and status writes costs one
+// merge and one render per frame instead of an array copy and a render per event.
+
+const CHANNEL_IDLE_MS = 5 * 60000; // keep the channel across view switches
+const SYNC_OVERLAP_MS = 60000; // re-read the last minute: updated_at is set before commit
+const SNAPSHOT_MAX_AGE_MS = 25 * 86400000; // tombstones are kept 30 days server-side
+const PERSIST_DELAY_MS = 2000;
+const FLUSH_FALLBACK_MS = 100; // requestAnimationFrame does not fire in background tabs
+const REVALIDATE_MS = 30000; // a table without a channel is refetched on mount after this
+const DELTA_PAGE_SIZE = 1000; // PostgREST max-rows: longer deltas are read in pages
+const SYNCED_TABLES = [
+    'bookings', 'drivers', 'shifts', 'shift_types', 'vehicles', 'vehicle_expenses', 'vehicle_maintenance',
+    'clients', 'tariffs', 'service_extras', 'profiles', 'system_settings', 'municipalities',
+    'driver_logs', 'time_correction_requests',
+];
+
+type Row = { [key: string]: any };
+
+// Primary key per table, for merging realtime rows and local writes; `id` when not listed
+const ROW_KEYS: Record<string, string> = {
+    driver_locations: 'driver_id',
+};
+const rowKey = (table: string) => ROW_KEYS[table] ?? 'id';
+
+export interface WindowOptions {
+    column: string;              // day column filtered by from/to
+    from?: string;               // YYYY-MM-DD, inclusive
+    to?: string;                 // YYYY-MM-DD, inclusive
+    statusIn?: string[];
+    statusNotIn?: string[];
+    keyset: string[];            // ascending sort and cursor columns, the last one unique
+    pageSize: number;
+}
+
+export interface QueryOptions {
+    select?: string;
+    orderBy?: string;
+    ascending?: boolean;
+    limit?: number;
+    window?: WindowOptions;
+}
+
+export interface CollectionSnapshot<T = any> {
+    data: T[];
+    loading: boolean;
+    error: string | null;
+    hasMore: boolean;            // windowed: more pages after the loaded ones
+}
+
+const dayOf = (value: any): string => (typeof value === 'string' ? value.split(' ')[0].split('T')[0] : '');
+
+interface IndexSpec {
+    table: string;
+    options?: QueryOptions;      // the collection it is built on; the views' own query, so it is fetched once
+    key: (row: any) => string;
+}
+
+// Index name -> collection and key. Rows with an empty key are left out.
+const INDEXES = {
+    bookingsByDate: { table: 'bookings', key: (b: any) => dayOf(b.pickup_date) },
+    bookingsByDriver: { table: 'bookings', key: (b: any) => b.driver_id || '' },
+    shiftsByDriverDate: { table: 'shifts', key: (s: any) => (s.driver_id && s.date ? `${s.driver_id}|${dayOf(s.date)}` : '') },
+    driverLocationsByCell: {
+        table: 'driver_locations',
+        options: { orderBy: 'updated_at' },  // as FleetMap; driver_locations has no created_at
+        // A (0,0) or garbage fix would stretch the grid extent every nearest-driver search walks
+        key: (l: any) => (l.driver_id && inServiceArea(l.lat, l.lng) ? geoCell(l.lat, l.lng) : ''),
+    },
+} satisfies Record<string, IndexSpec>;
+
+export type IndexName = keyof typeof INDEXES;
+
+const nextDay = (day: string): string => {
+    const d = new Date(`${day}T12:00:00Z`);
+    d.setUTCDate(d.getUTCDate() + 1);
+    return d.toISOString().split('T')[0];
+};
+
+const isNull = (value: any) => value === null || value === undefined;
+
+const latest = (a: string | null, b: string | null | undefined): string | null =>
+    !b ? a : !a || Date.parse(b) > Date.parse(a) ? b : a;
+
+const maxOf = (rows: Row[], column: string): string | null =>
+    rows.reduce<string | null>((max, row) => latest(max, row[column]), null);
+
+const sinceMark = (mark: string) => new Date(Date.parse(mark) - SYNC_OVERLAP_MS).toISOString();
+
+/** Every page of an ordered query; `build` must sort by a total order so pages do not overlap. */
+export async function fetchPages(build: () => any): Promise<{ data: any[]; error: any }> {
+    const data: any[] = [];
+    for (let from = 0; ; from += DELTA_PAGE_SIZE) {
+        const page = await build().range(from, from + DELTA_PAGE_SIZE - 1);
+        if (page.error) return { data, error: page.error };
+        data.push(...(page.data || []));
+        if ((page.data || []).length < DELTA_PAGE_SIZE) return { data, error: null };
+    }
+}
+
+function compareBy(orderBy: string, ascending: boolean) {
+    return (a: Row, b: Row) => {
+        const x = a[orderBy], y = b[orderBy];
+        if (x === y) return 0;
+        // Postgres default: NULLS LAST ascending, NULLS FIRST descending
+        if (isNull(x)) return ascending ? 1 : -1;
+        if (isNull(y)) return ascending ? -1 : 1;
+        return (x < y ? -1 : 1) * (ascending ? 1 : -1);
+    };
+}
+
+function compareByKeyset(keyset: string[]) {
+    const comparators = keyset.map(column => compareBy(column, true));
+    return (a: Row, b: Row) => {
+        for (const compare of comparators) {
+            const result = compare(a, b);
+            if (result !== 0) return result;
+        }
+        return 0;
+    };
+}
+
+/** Merges two lists sorted by `compare`; on ties the row from `a` comes first. */
+function mergeSorted(a: Row[], b: Row[], compare: (x: Row, y: Row) => number): Row[] {
+    if (!b.length) return a;
+    const out: Row[] = new Array(a.length + b.length);
+    let i = 0, j = 0, k = 0;
+    while (i < a.length && j < b.length) out[k++] = compare(b[j], a[i]) < 0 ? b[j++] : a[i++];
+    while (i < a.length) out[k++] = a[i++];
+    while (j < b.length) out[k++] = b[j++];
+    return out;
+}
+
+// PostgREST needs reserved characters (, . : ( ) inside logic trees double-quoted
+const literal = (value: any) => `"${String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"')}"`;
+
+/**
+ * `or` filter for the rows strictly after `last` in keyset order (ascending, nulls last):
+ * (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... where "> v" also admits NULL and "= NULL" is IS NULL.
+ */
+export function keysetAfter(keyset: string[], last: Row): string {
+    const terms: string[] = [];
+    for (let i = 0; i < keyset.length; i++) {
+        const value = last[keyset[i]];
+        if (isNull(value)) continue; // nothing sorts after NULL in this column
+        const equal = keyset.slice(0, i).map(k => (isNull(last[k]) ? `${k}.is.null` : `${k}.eq.${literal(last[k])}`));
+        const after = i === keyset.length - 1
+            ? `${keyset[i]}.gt.${literal(value)}`
+            : `or(${keyset[i]}.gt.${literal(value)},${keyset[i]}.is.null)`;
+        terms.push(equal.length ? `and(${[...equal, after].join(',')})` : after);
+    }
+    return `(${terms.join(',')})`;
+}
+
+class Collection {
+    readonly table: string;
+    readonly key: string;
+    readonly options: Required<Omit<QueryOptions, 'limit' | 'window'>> & { limit?: number; window?: WindowOptions };
+    private compare: (a: Row, b: Row) => number;
+    private rows: Row[] = [];
+    private byId = new Map<string | number, Row>();
+    private loading = true;
+    private error: string | null = null;
+    private hasMore = false;
+    private snapshot: CollectionSnapshot;
+    private inFlight: Promise<void> | null = null;
+    private indexes = new Map<IndexName, Map<string, any[]>>();
+    private hwm: string | null = null;
+    private tombstoneHwm: string | null = null;
+    private syncedAt = 0;
+    private persistTimer: ReturnType<typeof setTimeout> | null = null;
+    private cacheKey: string | null = null;
+    listeners = new Set<() => void>();
+    loaded = false;
+    stale = false;
+    fetchedAt = 0;
+
+    constructor(table: string, options: QueryOptions) {
+        const { select = '*', orderBy = 'created_at', ascending = false, limit, window } = options;
+        this.table = table;
+        this.key = rowKey(table);
+        this.options = { select, orderBy, ascending, limit, window };
+        this.compare = window ? compareByKeyset(window.keyset) : compareBy(orderBy, ascending);
+        this.snapshot = { data: this.rows, loading: true, error: null, hasMore: false };
+    }
+
+    get windowed() {
+        return !!this.options.window;
+    }
+
+    /** Full copy of a synced table, the only shape that can be patched from deltas. */
+    get deltaSynced() {
+        const { select, limit, window } = this.options;
+        return SYNCED_TABLES.includes(this.table) && select === '*' && !limit && !window;
+    }
+
+    getSnapshot = () => this.snapshot;
+
+    private publish() {
+        this.snapshot = { data: this.rows, loading: this.loading, error: this.error, hasMore: this.hasMore };
+        this.indexes.clear();
+        this.listeners.forEach(listener => listener());
+    }
+
+    private query(after?: Row) {
+        const { select, orderBy, ascending, limit, window } = this.options;
+        let query = supabase.from(this.table).select(select);
+        if (!window) {
+            query = query.order(orderBy, { ascending });
+            return limit ? query.limit(limit) : query;
+        }
+        if (window.from) query = query.gte(window.column, window.from);
+        if (window.to) query = query.lt(window.column, nextDay(window.to)); // also catches timestamps on `to`
+        if (window.statusIn?.length) query = query.in('status', window.statusIn);
+        if (window.statusNotIn?.length) query = query.not('status', 'in', `(${window.statusNotIn.map(literal).join(',')})`);
+        if (after) query = query.or(keysetAfter(window.keyset, after).slice(1, -1));
+        for (const column of window.keyset) query = query.order(column, { ascending: true });
+        return query.limit(window.pageSize);
+    }
+
+    private run(load: () => Promise<void>): Promise<void> {
+        if (this.inFlight) return this.inFlight;
+        this.inFlight = (async () => {
+            try {
+                await load();
+                this.error = null;
+            } catch (err: any) {
+                console.error(`Error fetching ${this.table}:`, err);
+                this.error = err.message;
+            } finally {
+                this.loading = false;
+                this.inFlight = null;
+                this.publish();
+            }
+        })();
+        return this.inFlight;
+    }
+
+    private replaceRows(rows: Row[]) {
+        this.rows = rows;
+        this.byId = new Map(rows.map(row => [row[this.key], row]));
+    }
+
+    private async fullLoad() {
+        const { data, error } = await this.query();
+        if (error) throw error;
+        this.replaceRows((data || []) as Row[]);
+        this.hasMore = this.windowed && this.rows.length === this.options.window!.pageSize;
+        this.hwm = this.tombstoneHwm = maxOf(this.rows, 'updated_at');
+    }
+
+    /** Loads the rows (the first page when windowed); concurrent callers share one request. */
+    fetch(): Promise<void> {
+        return this.run(async () => {
+            if (this.deltaSynced) {
+                await this.sync();
+            } else {
+                this.loading = !this.loaded;
+                if (this.loading) this.publish();
+                await this.fullLoad();
+            }
+            this.loaded = true;
+            this.stale = false;
+            this.fetchedAt = Date.now();
+        });
+    }
+
+    /** Snapshot from IndexedDB first, then only what changed since its high-water mark. */
+    private async sync() {
+        if (!this.loaded) {
+            const { data } = await supabase.auth.getSession();
+            const userId = data.session?.user?.id;
+            // Snapshots are per user: RLS decides which rows a session may see
+            this.cacheKey = userId ? `${userId}|${this.table}|${this.options.orderBy}|${this.options.ascending}` : null;
+            const snapshot = this.cacheKey ? await loadSnapshot(this.cacheKey) : null;
+            if (snapshot && !this.loaded) {
+                this.replaceRows(snapshot.rows.slice().sort(this.compare));
+                this.hwm = snapshot.hwm;
+                this.tombstoneHwm = snapshot.tombstoneHwm;
+                this.syncedAt = snapshot.syncedAt;
+                this.loaded = true;
+                this.loading = false;
+                this.publish();
+            }
+        }
+        this.loading = !this.loaded;
+        if (this.loading) this.publish();
+
+        if (!this.hwm || Date.now() - this.syncedAt > SNAPSHOT_MAX_AGE_MS) {
+            await this.fullLoad();
+        } else {
+            const hwm = this.hwm, tombstoneHwm = this.tombstoneHwm ?? this.hwm;
+            const [changed, deleted] = await Promise.all([
+                fetchPages(() => supabase.from(this.table).select('*').gte('updated_at', sinceMark(hwm))
+                    .order('updated_at', { ascending: true }).order('id', { ascending: true })),
+                fetchPages(() => supabase.from('sync_tombstones').select('row_id, deleted_at')
+                    .eq('table_name', this.table).gte('deleted_at', sinceMark(tombstoneHwm))
+                    .order('deleted_at', { ascending: true }).order('row_id', { ascending: true })),
+            ]);
+            if (changed.error || deleted.error) {
+                // Delta columns missing (migration not applied yet): behave like a plain load
+                console.error(`Delta sync of ${this.table} failed, reloading:`, changed.error || deleted.error);
+                await this.fullLoad();
+            } else {
+                // A row that is also in `changed` is still visible (reassigned to this session's
+                // scope, or read by staff): merge lets its upsert win over the tombstone
+                this.merge(changed.data as Row[], deleted.data.map((t: any) => t.row_id), false);
+                this.hwm = latest(this.hwm, maxOf(changed.data as Row[], 'updated_at'));
+                this.tombstoneHwm = latest(this.tombstoneHwm, maxOf(deleted.data, 'deleted_at'));
+            }
+        }
+        this.syncedAt = Date.now();
+        this.schedulePersist();
+    }
+
+    private schedulePersist() {
+        if (!this.cacheKey || this.persistTimer) return;
+        this.persistTimer = setTimeout(() => {
+            this.persistTimer = null;
+            if (!this.cacheKey || !this.hwm) return;
+            saveSnapshot(this.cacheKey, { rows: this.rows, hwm: this.hwm, tombstoneHwm: this.tombstoneHwm, syncedAt: this.syncedAt });
+        }, PERSIST_DELAY_MS);
+    }
+
+    /** Windowed: appends the next page after the last loaded row. */
+    loadMore(): Promise<void> {
+        if (!this.hasMore || this.inFlight) return this.inFlight ?? Promise.resolve();
+        return this.run(async () => {
+            const { data, error } = await this.query(this.rows[this.rows.length - 1]);
+            if (error) throw error;
+            const page = ((data || []) as Row[]).filter(row => !this.byId.has(row[this.key]));
+            for (const row of page) this.byId.set(row[this.key], row);
+            this.rows = [...this.rows, ...page];
+            this.hasMore = (data || []).length === this.options.window!.pageSize;
+        });
+    }
+
+    /** Windowed: whether a row satisfies the range and status predicates. */
+    private inWindow(row: Row): boolean {
+        const window = this.options.window;
+        if (!window) return true;
+        const day = dayOf(row[window.column]);
+        if (window.from && !(day >= window.from)) return false;
+        if (window.to && !(day <= window.to)) return false;
+        if (window.statusIn?.length && !window.statusIn.includes(row.status)) return false;
+        if (window.statusNotIn?.length && (isNull(row.status) || window.statusNotIn.includes(row.status))) return false;
+        return true;
+    }
+
+    get(id: string | number): Row | undefined {
+        return this.byId.get(id);
+    }
+
+    private resolveId(id: string | number) {
+        // sync_tombstones.row_id is text; integer-keyed tables need the number back
+        return this.byId.has(id) || typeof id !== 'string' || Number.isNaN(Number(id)) ? id : Number(id);
+    }
+
+    /** Windowed: whether a changed row belongs to the loaded pages. */
+    private accepts(row: Row): boolean {
+        if (!this.windowed) return true;
+        const last = this.rows[this.rows.length - 1];
+        return this.inWindow(row) && !(this.hasMore && last && last[this.key] !== row[this.key] && this.compare(row, last) > 0);
+    }
+
+    /**
+     * Applies changed rows and deleted ids in one pass and publishes once: the untouched
+     * rows keep their order and the changed ones are sorted and merged in, O(N + k log k).
+     * Rows that left a window (or sort past its loaded pages) are dropped.
+     */
+    merge(upserts: Row[], removedIds: (string | number)[], persist = true) {
+        const removed = new Set<string | number>();
+        const incoming = new Map<string | number, Row>();
+        for (const id of removedIds) {
+            const key = this.resolveId(id);
+            if (this.byId.has(key)) removed.add(key);
+        }
+        for (const row of upserts) {
+            const id = row?.[this.key];
+            if (id === undefined || id === null) continue;
+            if (this.accepts(row)) {
+                removed.delete(id);
+                if (this.byId.get(id) === row) incoming.delete(id);
+                else incoming.set(id, row);
+            } else {
+                incoming.delete(id);
+                if (this.byId.has(id)) removed.add(id);
+            }
+        }
+        if (!removed.size && !incoming.size) return;
+        const kept = this.rows.filter(row => !removed.has(row[this.key]) && !incoming.has(row[this.key]));
+        let rows = mergeSorted(kept, [...incoming.values()].sort(this.compare), this.compare);
+        for (const id of removed) this.byId.delete(id);
+        for (const [id, row] of incoming) this.byId.set(id, row);
+        const { limit } = this.options;
+        if (limit && rows.length > limit) {
+            for (const row of rows.slice(limit)) this.byId.delete(row[this.key]);
+            rows = rows.slice(0, limit);
+        }
+        this.rows = rows;
+        this.publish();
+        if (persist) this.schedulePersist();
+    }
+
+    index(name: IndexName): Map<string, any[]> {
+        let index = this.indexes.get(name);
+        if (!index) {
+            const key = INDEXES[name].key;
+            index = new Map();
+            for (const row of this.rows) {
+                const k = key(row);
+                if (!k) continue;
+                const bucket = index.get(k);
+                if (bucket) bucket.push(row); else index.set(k, [row]);
+            }
+            this.indexes.set(name, index);
+        }
+        return index;
+    }
+}
+
+class EntityStore {
+    private collections = new Map<string, Collection>();
+    private channels = new Map<string, { channel: any; users: number; closeTimer: ReturnType<typeof setTimeout> | null }>();
+    // table -> changes received since the last flush, last event per id wins
+    private pending = new Map<string, { upserts: Map<string | number, Row>; removed: Set<string | number> }>();
+    private flushScheduled = false;
+
+    constructor() {
+        if (typeof window !== 'undefined') {
+            window.addEventListener('app:refresh', () => this.refreshAll());
+        }
+    }
+
+    collection(table: string, options: QueryOptions = {}): Collection {
+        const { select = '*', orderBy = 'created_at', ascending = false, limit, window } = options;
+        const key = [table, select, orderBy, ascending, limit ?? '', window ? JSON.stringify(window) : ''].join('|');
+        let collection = this.collections.get(key);
+        if (!collection) {
+            collection = new Collection(table, options);
+            if (window) {
+                // Windows change with the view's filters; keep only the ones still in use
+                for (const [k, c] of this.collections) {
+                    if (c.table === table && c.windowed && c.listeners.size === 0) this.collections.delete(k);
+                }
+            }
+            this.collections.set(key, collection);
+        }
+        return collection;
+    }
+
+    /**
+     * Registers a view on a collection; returns the matching release. With `realtime` the
+     * table's channel is kept open while the view is mounted; without it the rows are
+     * revalidated on mount unless a channel keeps them current.
+     */
+    acquire(collection: Collection, listener: () => void, realtime = false): () => void {
+        collection.listeners.add(listener);
+        if (realtime) this.openChannel(collection.table);
+        const live = this.channels.has(collection.table);
+        if (!collection.loaded || collection.stale || (!live && Date.now() - collection.fetchedAt > REVALIDATE_MS)) {
+            collection.fetch();
+        }
+        return () => {
+            collection.listeners.delete(listener);
+            if (realtime) this.releaseChannel(collection.table);
+        };
+    }
+
+    private tableCollections(table: string): Collection[] {
+        return [...this.collections.values()].filter(c => c.table === table);
+    }
+
+    private openChannel(table: string) {
+        const entry = this.channels.get(table);
+        if (entry) {
+            entry.users++;
+            if (entry.closeTimer) clearTimeout(entry.closeTimer);
+            entry.closeTimer = null;
+            return;
+        }
+        const key = rowKey(table);
+        const channel = supabase
+            .channel(`store:${table}`)
+            .on('postgres_changes', { event: '*', schema: 'public', table }, (payload: any) => {
+                if (payload.eventType === 'DELETE') this.enqueue(table, { removeId: payload.old?.[key] });
+                else this.enqueue(table, { upsert: payload.new });
+            })
+            .subscribe();
+        this.channels.set(table, { channel, users: 1, closeTimer: null });
+    }
+
+    private releaseChannel(table: string) {
+        const entry = this.channels.get(table);
+        if (!entry || --entry.users > 0) return;
+        entry.closeTimer = setTimeout(() => {
+            supabase.removeChannel(entry.channel);
+            this.channels.delete(table);
+            // Without the channel the copy may drift; the next view to mount revalidates it
+            for (const collection of this.tableCollections(table)) collection.stale = true;
+        }, CHANNEL_IDLE_MS);
+    }
+
+    private enqueue(table: string, change: { upsert?: Row; removeId?: string | number }) {
+        let batch = this.pending.get(table);
+        if (!batch) {
+            batch = { upserts: new Map(), removed: new Set() };
+            this.pending.set(table, batch);
+        }
+        const id = change.upsert?.[rowKey(table)];
+        if (change.upsert && id !== undefined && id !== null) {
+            batch.removed.delete(id);
+            batch.upserts.set(id, change.upsert);
+        } else if (change.removeId !== undefined && change.removeId !== null) {
+            batch.upserts.delete(change.removeId);
+            batch.removed.add(change.removeId);
+        }
+        this.scheduleFlush();
+    }
+
+    private scheduleFlush() {
+        if (this.flushScheduled) return;
+        this.flushScheduled = true;
+        // Whichever fires first; the other finds nothing pending
+        const fallback = setTimeout(() => this.flush(), FLUSH_FALLBACK_MS);
+        if (typeof requestAnimationFrame !== 'undefined') {
+            requestAnimationFrame(() => {
+                clearTimeout(fallback);
+                this.flush();
+            });
+        }
+    }
+
+    /** Applies the buffered changes: one merge (and one publish) per collection and table. */
+    private flush(table?: string) {
+        const tables = table ? [table] : [...this.pending.keys()];
+        if (!table) this.flushScheduled = false;
+        for (const t of tables) {
+            const batch = this.pending.get(t);
+            if (!batch) continue;
+            this.pending.delete(t);
+            const upserts = [...batch.upserts.values()];
+            const removed = [...batch.removed];
+            for (const collection of this.tableCollections(t)) collection.merge(upserts, removed);
+        }
+    }
+
+    /** Applies a write made by this client to every collection of the table, right away. */
+    applyLocal(table: string, change: { upsert?: Row; removeId?: string | number }) {
+        // Through the buffer, so an older realtime event still pending cannot overwrite it
+        this.enqueue(table, change);
+        this.flush(table);
+    }
+
+    /** The collection an index is built on. */
+    indexCollection(name: IndexName): Collection {
+        const spec: IndexSpec = INDEXES[name];
+        return this.collection(spec.table, spec.options);
+    }
+
+    refreshAll() {
+        for (const collection of this.collections.values()) {
+            if (collection.listeners.size > 0) collection.fetch();
+            else collection.stale = true;
+        }
+    }
+}
+
+export const entityStore = new EntityStore();
@@ -0,0 +1,111 @@
+import { supabase } from './supabase';
+
+// Queued communicator for the fomento-vtc edge function.
+// Calls made within a short window are sent together as one `batch` request; the edge
+// function keeps the certificate parsed between calls, sends with bounded concurrency
+// and retries transient failures. Each caller still gets its own result back.
+
+export type FomentoAction = 'alta' | 'anulacion' | 'inicio' | 'modificacion' | 'consulta';
+
+interface QueuedCall {
+    action: FomentoAction;
+    payload: any;
+    resolve: (data: any) => void;
+    reject: (err: any) => void;
+}
+
+const FLUSH_DELAY_MS = 50;
+const MAX_BATCH_SIZE = 25;
+// fomento-vtc answers a batch within BATCH_DEADLINE_MS + SEND_TIMEOUT_MS (90 s + 25 s):
+// no attempt starts after its deadline, and what was not sent comes back as NOT_SENT
+const EDGE_BATCH_DEADLINE_MS = 90000;
+const EDGE_SEND_TIMEOUT_MS = 25000;
+const REQUEST_TIMEOUT_MS = EDGE_BATCH_DEADLINE_MS + EDGE_SEND_TIMEOUT_MS + 15000;
+
+let pending: QueuedCall[] = [];
+let flushTimer: ReturnType<typeof setTimeout> | null = null;
+
+const getAuthHeaders = async () => {
+    // Session lookup with timeout to prevent hanging
+    const sessionPromise = supabase.auth.getSession();
+    const timeoutPromise = new Promise<{ data: any }>((resolve) => setTimeout(() => resolve({ data: { session: null } }), 3000));
+    const { data: sessionData } = await Promise.race([sessionPromise, timeoutPromise]);
+    const token = sessionData?.session?.access_token;
+
+    const supabaseAnonKey = import.meta.env.VITE_SUPABASE_ANON_KEY || (window as any)._env_?.VITE_SUPABASE_ANON_KEY;
+    return {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${token || supabaseAnonKey}`,
+        'apikey': supabaseAnonKey
+    };
+};
+
+const sendBatch = async (calls: QueuedCall[]) => {
+    const supabaseUrl = import.meta.env.VITE_SUPABASE_URL || (window as any)._env_?.VITE_SUPABASE_URL;
+    const controller = new AbortController();
+    const timeoutId = setTimeout(() => controller.abort(), REQUEST_TIMEOUT_MS);
+
+    try {
+        const response = await fetch(`${supabaseUrl}/functions/v1/fomento-vtc`, {
+            method: 'POST',
+            signal: controller.signal,
+            headers: await getAuthHeaders(),
+            body: JSON.stringify({
+                action: 'batch',
+                items: calls.map(c => ({ action: c.action, payload: c.payload }))
+            })
+        });
+        if (!response.ok) {
+            const text = await response.text();
+            let message = text;
+            try { message = JSON.parse(text).error || text; } catch { /* not JSON */ }
+            calls.forEach(c => c.resolve({ success: false, error: `fomento-vtc HTTP ${response.status}: ${message || response.statusText}` }));
+            return;
+        }
+        const data = await response.json();
+
+        if (!Array.isArray(data.results)) {
+            // Function-level failure (missing secrets, bad request): same error for every call
+            calls.forEach(c => c.resolve({ success: false, error: data.error || 'Respuesta inválida de fomento-vtc' }));
+            return;
+        }
+        calls.forEach((c, i) => {
+            const result = data.results[i];
+            // Never reached the Ministry (batch deadline): safe to send again
+            if (result?.resultado === 'NOT_SENT') enqueue(c);
+            else c.resolve(result || { success: false, error: 'Sin respuesta para esta comunicación' });
+        });
+    } catch (err) {
+        calls.forEach(c => c.reject(err));
+    } finally {
+        clearTimeout(timeoutId);
+    }
+};
+
+const enqueue = (call: QueuedCall) => {
+    pending.push(call);
+    if (pending.length >= MAX_BATCH_SIZE) {
+        if (flushTimer) clearTimeout(flushTimer);
+        flush();
+    } else if (!flushTimer) {
+        flushTimer = setTimeout(flush, FLUSH_DELAY_MS);
+    }
+};
+
+const flush = () => {
+    flushTimer = null;
+    const calls = pending;
+    pending = [];
+    for (let i = 0; i < calls.length; i += MAX_BATCH_SIZE) {
+        sendBatch(calls.slice(i, i + MAX_BATCH_SIZE));
+    }
+};
+
+/**
+ * Queues one Fomento RVTC communication and resolves with the edge function's result
+ * ({ success, resultado, error, idservicio, idcomunica, signedXml, rawResponse }).
+ * Rejects only on network failure.
+ */
+export const callFomento = (action: FomentoAction, payload: any): Promise<any> => {
+    return new Promise((resolve, reject) => enqueue({ action, payload, resolve, reject }));
+};
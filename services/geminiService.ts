@@ -1,10 +1,14 @@
-import { GoogleGenAI } from "@google/genai";
+import { GoogleGenAI, Type } from "@google/genai";
+import { supabase } from "./supabase";
+import { buildMunicipalityIndex, matchMunicipality, MunicipalityIndex } from "../utils/municipalityResolver";
 
 const apiKey = import.meta.env.VITE_GEMINI_API_KEY;
+// e.g. http://127.0.0.1:8093 for scripts/gemini_mock_server.py
+const baseUrl = import.meta.env.VITE_GEMINI_BASE_URL;
 
 let ai: GoogleGenAI | null = null;
 if (apiKey) {
-  ai = new GoogleGenAI({ apiKey });
+  ai = new GoogleGenAI({ apiKey, ...(baseUrl ? { httpOptions: { baseUrl } } : {}) });
 }
 
 interface GeminiResponse {
@@ -59,54 +63,247 @@ export const getGeminiResponse = async (prompt: string, useMaps: boolean = false
   }
 };
 
-export const parseBookingDetails = async (text: string): Promise<any> => {
-  if (!ai) return null;
+// Booking intake: agencies send dozens of bookings at once by email or WhatsApp. The
+// messages go to the model in batches (one request per BATCH_SIZE messages or
+// BATCH_MAX_CHARS of text) with a response schema, so the answer is a JSON array and no
+// text has to be cut out of it. Results are cached per day by a hash of the normalized
+// message, so a resent booking costs nothing. Origins and destinations come back as
+// written and are matched against the municipalities here, not by a list in the prompt.
+// scripts/gemini_mock_server.py and scripts/booking_parse_bench.py benchmark this offline.
 
-  try {
-    // Use standard flash model for parsing
-    const modelId = "gemini-2.5-flash";
-
-    const prompt = `
-      Extract booking details from the following text and return a JSON object.
-      Current Date: ${new Date().toISOString().split('T')[0]}
-      
-      Text: "${text}"
-      
-      Return ONLY JSON with these fields (use null if not found):
-      - passenger (string)
-      - phone (string)
-      - email (string)
-      - pickup_date (YYYY-MM-DD, infer from text like "tomorrow", "next friday")
-      - pickup_time (HH:MM)
-      - origin (string, strictly map to one of: "ALICANTE AEROPUERTO (ALC)", "Alacant/Alicante", "Alfàs del Pi, l'", "Altea", "Benidorm", "Calp")
-      - destination (string, strictly map to one of: "ALICANTE AEROPUERTO (ALC)", "Alacant/Alicante", "Alfàs del Pi, l'", "Altea", "Benidorm", "Calp")
-      - pax_count (number, default 1)
-      - notes (string)
-      
-      Example JSON:
-      {
-        "passenger": "John Doe",
-        "pickup_date": "2024-05-20",
-        "origin": "Benidorm"
+const BATCH_SIZE = 20;
+const BATCH_MAX_CHARS = 20000;
+const BATCH_CONCURRENCY = 2;
+const CACHE_LIMIT = 1000;
+const AIRPORT_NAME = "ALICANTE AEROPUERTO (ALC)";
+
+export interface ParsedBooking {
+  passenger: string | null;
+  phone: string | null;
+  email: string | null;
+  pickup_date: string | null;   // YYYY-MM-DD
+  pickup_time: string | null;   // HH:MM
+  origin: string | null;
+  destination: string | null;
+  pax_count: number | null;
+  flight_number: string | null;
+  notes: string | null;
+}
+
+export interface BatchParseItem {
+  booking: ParsedBooking | null;           // null: the model gave nothing for this message
+  cached: boolean;
+  unmatched: ("origin" | "destination")[]; // places kept as written: no municipality matched
+}
+
+export interface BatchParseResult {
+  items: BatchParseItem[];                 // in the order of the messages
+  requests: number;
+  promptTokens: number;
+  outputTokens: number;
+}
+
+const nullable = (type: Type) => ({ type, nullable: true });
+
+const BOOKING_BATCH_SCHEMA = {
+  type: Type.ARRAY,
+  items: {
+    type: Type.OBJECT,
+    properties: {
+      index: { type: Type.INTEGER },
+      passenger: nullable(Type.STRING),
+      phone: nullable(Type.STRING),
+      email: nullable(Type.STRING),
+      pickup_date: nullable(Type.STRING),
+      pickup_time: nullable(Type.STRING),
+      origin: nullable(Type.STRING),
+      destination: nullable(Type.STRING),
+      pax_count: nullable(Type.INTEGER),
+      flight_number: nullable(Type.STRING),
+      notes: nullable(Type.STRING),
+    },
+    required: ["index"],
+    propertyOrdering: ["index", "passenger", "phone", "email", "pickup_date", "pickup_time", "origin", "destination", "pax_count", "flight_number", "notes"],
+  },
+};
+
+const BOOKING_FIELDS = BOOKING_BATCH_SCHEMA.items.propertyOrdering.slice(1) as (keyof ParsedBooking)[];
+
+const bookingPrompt = (today: string, messages: { index: number; text: string }[]) => `
+Extract the booking details of each message below. Current Date: ${today}
+The messages come from travel agencies by email or WhatsApp, in any language. Return one object
+per message with its index; use null for anything the message does not say.
+- pickup_date: YYYY-MM-DD, infer from text like "tomorrow", "next friday"
+- pickup_time: HH:MM, 24-hour clock
+- origin, destination: the place as written (town, hotel, "airport"); do not translate or correct it
+- pax_count: number of passengers, 1 if not given
+- notes: luggage, child seats and other requests
+Messages (JSON):
+${JSON.stringify(messages)}`;
+
+// Same message, same day: same booking ("tomorrow" depends on the day)
+const normalizeMessage = (text: string) => text.normalize("NFKC").toLowerCase().replace(/\s+/g, " ").trim();
+
+const messageKey = async (today: string, text: string) => {
+  const digest = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(`${today}\n${normalizeMessage(text)}`));
+  return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, "0")).join("");
+};
+
+const parseCache = new Map<string, ParsedBooking>();
+
+const cacheBooking = (key: string, booking: ParsedBooking) => {
+  parseCache.delete(key);
+  parseCache.set(key, booking);
+  if (parseCache.size > CACHE_LIMIT) parseCache.delete(parseCache.keys().next().value!);
+};
+
+const foldAccents = (text: string) => text.normalize("NFD").replace(/[\u0300-\u036f]/g, "");
+
+interface PlaceIndex {
+  index: MunicipalityIndex;
+  folded: MunicipalityIndex; // names without accents, for "Alfas del Pi"
+}
+
+let placeLoad: Promise<PlaceIndex | null> | null = null;
+
+const loadPlaceIndex = (): Promise<PlaceIndex | null> => {
+  if (!placeLoad) {
+    placeLoad = (async () => {
+      const { data, error } = await supabase.from("municipalities").select("name, cod_prov, cod_mun");
+      if (error) {
+        console.error("Error loading municipalities:", error);
+        placeLoad = null; // retried on the next batch
+        return null;
       }
-    `;
+      const municipalities = data || [];
+      return {
+        index: buildMunicipalityIndex(municipalities),
+        folded: buildMunicipalityIndex(municipalities.map((m: any) => ({ ...m, name: foldAccents(String(m.name || "")), row: m }))),
+      };
+    })();
+  }
+  return placeLoad;
+};
 
-    // FIX: Use correctly imported SDK method
-    const response = await ai.models.generateContent({
-      model: modelId,
-      contents: prompt
-    });
+/** The canonical name of a place (the airport or a municipality), or null when none matches. */
+const matchPlace = (places: PlaceIndex, text: string): string | null => {
+  if (/AEROPUERTO|AEROPORT|AIRPORT|\bALC\b|ALTET/.test(text.toUpperCase())) return AIRPORT_NAME;
+  const match = matchMunicipality(places.index, text) || matchMunicipality(places.folded, foldAccents(text))?.row;
+  return match ? match.name : null;
+};
+
+const toBooking = (raw: any): ParsedBooking => {
+  const booking = {} as any;
+  for (const field of BOOKING_FIELDS) {
+    const value = raw?.[field];
+    booking[field] = value === undefined || value === "" ? null : value;
+  }
+  return booking;
+};
+
+async function requestBookings(today: string, messages: { index: number; text: string }[]) {
+  const response = await ai!.models.generateContent({
+    model: "gemini-2.5-flash",
+    contents: bookingPrompt(today, messages),
+    config: {
+      responseMimeType: "application/json",
+      responseSchema: BOOKING_BATCH_SCHEMA,
+    },
+  });
+  const rows = JSON.parse(response.text || "[]");
+  return {
+    rows: Array.isArray(rows) ? rows : [],
+    promptTokens: response.usageMetadata?.promptTokenCount || 0,
+    outputTokens: response.usageMetadata?.candidatesTokenCount || 0,
+  };
+}
 
-    const textResponse = response.text || response.candidates?.[0]?.content?.parts?.[0]?.text || "";
+/**
+ * Parses many booking messages with as few model requests as possible. Each item keeps
+ * the position of its message; a failed request leaves its messages with a null booking.
+ */
+export const parseBookingBatch = async (messages: string[]): Promise<BatchParseResult> => {
+  const result: BatchParseResult = {
+    items: messages.map(() => ({ booking: null, cached: false, unmatched: [] })),
+    requests: 0,
+    promptTokens: 0,
+    outputTokens: 0,
+  };
+  if (!ai || messages.length === 0) return result;
 
-    // Extract JSON from markdown code blocks if present
-    const jsonMatch = textResponse.match(/\{[\s\S]*\}/);
-    if (jsonMatch) {
-      return JSON.parse(jsonMatch[0]);
+  const today = new Date().toISOString().split("T")[0];
+  const keys = await Promise.all(messages.map(text => messageKey(today, text)));
+  const bookings = new Map<string, ParsedBooking>();
+
+  // 1. Cached messages, and each new one once however many times it was sent
+  const pending: { key: string; text: string }[] = [];
+  keys.forEach((key, i) => {
+    const cached = parseCache.get(key);
+    if (cached) {
+      cacheBooking(key, cached); // most recently used: evicted last
+      bookings.set(key, cached);
+      result.items[i].cached = true;
+    } else if (!pending.some(p => p.key === key) && messages[i].trim()) {
+      pending.push({ key, text: messages[i] });
+    }
+  });
+
+  // 2. Batches by count and size
+  const chunks: { key: string; text: string }[][] = [];
+  let chars = 0;
+  for (const message of pending) {
+    const last = chunks[chunks.length - 1];
+    if (!last || last.length >= BATCH_SIZE || chars + message.text.length > BATCH_MAX_CHARS) {
+      chunks.push([message]);
+      chars = message.text.length;
+    } else {
+      last.push(message);
+      chars += message.text.length;
     }
-    return JSON.parse(textResponse);
-  } catch (error) {
-    console.error("Error parsing booking details:", error);
-    return null;
   }
+
+  let next = 0;
+  const worker = async () => {
+    while (next < chunks.length) {
+      const chunk = chunks[next++];
+      try {
+        const { rows, promptTokens, outputTokens } = await requestBookings(today, chunk.map((m, index) => ({ index, text: m.text })));
+        result.requests++;
+        result.promptTokens += promptTokens;
+        result.outputTokens += outputTokens;
+        for (const row of rows) {
+          const message = Number.isInteger(row?.index) ? chunk[row.index] : undefined;
+          if (!message) continue;
+          const booking = toBooking(row);
+          bookings.set(message.key, booking);
+          cacheBooking(message.key, booking);
+        }
+      } catch (error) {
+        result.requests++;
+        console.error("Error parsing booking batch:", error);
+      }
+    }
+  };
+  await Promise.all(Array.from({ length: Math.min(BATCH_CONCURRENCY, chunks.length) }, worker));
+
+  // 3. Places checked against the municipalities (a copy: the cache keeps the model's answer)
+  const places = await loadPlaceIndex();
+  keys.forEach((key, i) => {
+    const raw = bookings.get(key);
+    if (!raw) return;
+    const booking = { ...raw };
+    for (const field of ["origin", "destination"] as const) {
+      if (!booking[field]) continue;
+      const name = places ? matchPlace(places, booking[field]!) : null;
+      if (name) booking[field] = name;
+      else result.items[i].unmatched.push(field);
+    }
+    result.items[i].booking = booking;
+  });
+  return result;
+};
+
+export const parseBookingDetails = async (text: string): Promise<any> => {
+  const { items } = await parseBookingBatch([text]);
+  return items[0]?.booking ?? null;
 };
@@ -0,0 +1,57 @@
+// IndexedDB persistence for the entity store's table snapshots (services/entityStore.ts).
+// A snapshot holds the rows of one collection plus the high-water marks of the last delta
+// sync, so a cold start (e.g. the driver app on a slow mobile connection) renders from
+// disk and then only asks the server for what changed. Every call degrades to "no cache"
+// when IndexedDB is unavailable (private browsing, old WebViews).
+
+const DB_NAME = 'palladium-entity-store';
+const DB_VERSION = 1;
+const STORE = 'snapshots';
+
+export interface TableSnapshot {
+    rows: any[];
+    hwm: string | null;            // max(updated_at) received from the server
+    tombstoneHwm: string | null;   // max(deleted_at) of the sync_tombstones applied
+    syncedAt: number;              // client time of the last successful sync
+}
+
+let dbPromise: Promise<IDBDatabase | null> | null = null;
+
+function openDb(): Promise<IDBDatabase | null> {
+    if (!dbPromise) {
+        dbPromise = new Promise(resolve => {
+            if (typeof indexedDB === 'undefined') return resolve(null);
+            try {
+                const request = indexedDB.open(DB_NAME, DB_VERSION);
+                request.onupgradeneeded = () => request.result.createObjectStore(STORE);
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => resolve(null);
+                request.onblocked = () => resolve(null);
+            } catch (e) {
+                resolve(null);
+            }
+        });
+    }
+    return dbPromise;
+}
+
+function run<T>(mode: IDBTransactionMode, action: (store: IDBObjectStore) => IDBRequest<T>): Promise<T | null> {
+    return openDb().then(db => new Promise<T | null>(resolve => {
+        if (!db) return resolve(null);
+        try {
+            const request = action(db.transaction(STORE, mode).objectStore(STORE));
+            request.onsuccess = () => resolve(request.result ?? null);
+            request.onerror = () => resolve(null);
+        } catch (e) {
+            resolve(null);
+        }
+    }));
+}
+
+export const loadSnapshot = (key: string) => run<TableSnapshot>('readonly', store => store.get(key));
+
+export const saveSnapshot = (key: string, snapshot: TableSnapshot) =>
+    run('readwrite', store => store.put(snapshot, key)).then(() => undefined);
+
+/** Drops every snapshot, e.g. on logout. */
+export const clearLocalCache = () => run('readwrite', store => store.clear()).then(() => undefined);
@@ -0,0 +1,156 @@
+import { supabase } from './supabase';
+
+// GPS telemetry from the driver app.
+// Positions are thinned on the phone (a stationary car does not need a point every few
+// seconds, a moving one does not need one every metre), kept in localStorage and uploaded
+// every FLUSH_INTERVAL_MS as one ingest_gps_points call (migration 20261019000110), which
+// also moves driver_locations and raises bookings.max_speed server-side. Without a
+// connection the points stay queued and go out together once the phone is back online.
+
+export interface GpsPoint {
+    driver_id: string;
+    recorded_at: string;
+    lat: number;
+    lng: number;
+    speed_kmh: number | null;
+    booking_id: string | null;
+}
+
+const STORAGE_KEY = 'palladium-gps-queue';
+const FLUSH_INTERVAL_MS = 30000;
+const MAX_BATCH_SIZE = 500;
+const MAX_QUEUED = 5000;          // ~40 h of a moving car; the oldest points go first
+const MOVING_KEEP_MS = 30000;     // at most this long between points while moving
+const STATIONARY_KEEP_MS = 120000;
+const MOVING_MIN_MS = 5000;
+const BEND_M = 25;                // path since the last point strays this far from a straight line
+const STATIONARY_RADIUS_M = 15;
+
+let queue: GpsPoint[] = load();
+let lastKept: GpsPoint | null = null;
+let lastFix: GpsPoint | null = null;
+let travelled = 0;                  // metres along the fixes since lastKept
+let skipped: GpsPoint | null = null; // newest fix not kept, with the peak speed since lastKept
+let tripMax = new Map<string, number>(); // booking -> highest speed queued
+let flushTimer: ReturnType<typeof setInterval> | null = null;
+let sending = false;
+
+function load(): GpsPoint[] {
+    try {
+        return JSON.parse(localStorage.getItem(STORAGE_KEY) || '[]');
+    } catch (e) {
+        return [];
+    }
+}
+
+function persist() {
+    try {
+        localStorage.setItem(STORAGE_KEY, JSON.stringify(queue));
+    } catch (e) {
+        // Storage full or unavailable: the points are still sent from memory
+    }
+}
+
+function distanceM(a: { lat: number; lng: number }, b: { lat: number; lng: number }): number {
+    const rad = Math.PI / 180;
+    const dLat = (b.lat - a.lat) * rad;
+    const dLng = (b.lng - a.lng) * rad * Math.cos(((a.lat + b.lat) / 2) * rad);
+    return 6371000 * Math.sqrt(dLat * dLat + dLng * dLng);
+}
+
+/** Whether a fix adds information over the last kept point. */
+function keeps(point: GpsPoint): boolean {
+    if (!lastKept || lastKept.driver_id !== point.driver_id || lastKept.booking_id !== point.booking_id) return true;
+    const elapsed = Date.parse(point.recorded_at) - Date.parse(lastKept.recorded_at);
+    const moved = distanceM(lastKept, point);
+    if (moved < STATIONARY_RADIUS_M) return elapsed >= STATIONARY_KEEP_MS;
+    // Straight stretches need no intermediate points; bends do
+    return elapsed >= MOVING_KEEP_MS || (travelled - moved > BEND_M && elapsed >= MOVING_MIN_MS);
+}
+
+function keep(point: GpsPoint) {
+    lastKept = point;
+    skipped = null;
+    travelled = 0;
+    if (point.booking_id && point.speed_kmh !== null) {
+        tripMax.set(point.booking_id, Math.max(tripMax.get(point.booking_id) ?? 0, point.speed_kmh));
+    }
+    queue.push(point);
+    if (queue.length > MAX_QUEUED) queue = queue.slice(queue.length - MAX_QUEUED);
+    persist();
+}
+
+/** Queues the newest skipped fix if its peak speed is above everything queued for its trip. */
+function settle() {
+    if (skipped?.booking_id && (skipped.speed_kmh ?? 0) > (tripMax.get(skipped.booking_id) ?? 0)) keep(skipped);
+    skipped = null;
+}
+
+const peak = (a: number | null, b: number | null | undefined) => (b == null ? a : a == null ? b : Math.max(a, b));
+
+/**
+ * Records a position fix (from watchPosition); returns whether it was queued.
+ * A point's speed_kmh is the peak since the previous point, so the maximum over a trip's
+ * points is the maximum over all its fixes even though most fixes are dropped.
+ */
+export function recordPosition(driverId: string, coords: GeolocationCoordinates, timestamp: number, bookingId: string | null): boolean {
+    const point: GpsPoint = {
+        driver_id: driverId,
+        recorded_at: new Date(timestamp).toISOString(),
+        lat: coords.latitude,
+        lng: coords.longitude,
+        speed_kmh: coords.speed !== null && coords.speed >= 0 ? Math.round(coords.speed * 3.6) : null,
+        booking_id: bookingId,
+    };
+    if (skipped && skipped.booking_id !== point.booking_id) settle();
+    if (lastFix && lastFix.driver_id === driverId) travelled += distanceM(lastFix, point);
+    lastFix = point;
+    if (keeps(point)) {
+        keep({ ...point, speed_kmh: peak(point.speed_kmh, skipped?.speed_kmh) });
+        return true;
+    }
+    skipped = { ...point, speed_kmh: peak(point.speed_kmh, skipped?.speed_kmh) };
+    return false;
+}
+
+/** Uploads the queued points; failed batches stay queued for the next attempt. */
+export async function flushTelemetry(): Promise<void> {
+    settle();
+    if (sending || queue.length === 0) return;
+    if (typeof navigator !== 'undefined' && navigator.onLine === false) return;
+    sending = true;
+    try {
+        while (queue.length > 0) {
+            const batch = queue.slice(0, MAX_BATCH_SIZE);
+            const { error } = await supabase.rpc('ingest_gps_points', { p_points: batch });
+            if (error) {
+                console.error('Error uploading GPS points:', error);
+                return;
+            }
+            queue = queue.slice(batch.length);
+            persist();
+        }
+    } finally {
+        sending = false;
+    }
+}
+
+const onOnline = () => { flushTelemetry(); };
+
+/** Starts the periodic upload; returns the matching stop (which flushes once more). */
+export function startTelemetry(): () => void {
+    if (!flushTimer) {
+        flushTimer = setInterval(flushTelemetry, FLUSH_INTERVAL_MS);
+        window.addEventListener('online', onOnline);
+        flushTelemetry(); // points left from an earlier session
+    }
+    return () => {
+        if (flushTimer) clearInterval(flushTimer);
+        flushTimer = null;
+        window.removeEventListener('online', onOnline);
+        flushTelemetry(); // settles the last stretch before the state is dropped
+        lastKept = lastFix = null;
+        travelled = 0;
+        tripMax = new Map();
+    };
+}
@@ -0,0 +1,23 @@
+// Bounded-concurrency map shared by the edge functions (AirLabs lookups in sync-flights,
+// Fomento sends in fomento-vtc, push fan-out in _shared/push.ts).
+
+/**
+ * Runs `fn` over `items` with at most `limit` calls in flight; results keep the order
+ * of `items`.
+ */
+export async function mapWithConcurrency<T, R>(
+  items: T[],
+  limit: number,
+  fn: (item: T, index: number) => Promise<R>
+): Promise<R[]> {
+  const results = new Array<R>(items.length)
+  let next = 0
+  const runners = Array.from({ length: Math.min(limit, items.length) }, async () => {
+    while (next < items.length) {
+      const i = next++
+      results[i] = await fn(items[i], i)
+    }
+  })
+  await Promise.all(runners)
+  return results
+}
@@ -0,0 +1,169 @@
+// @ts-ignore
+import webpush from "npm:web-push@3.6.7"
+import { mapWithConcurrency } from "./concurrency.ts"
+
+declare const Deno: any;
+
+// Push delivery shared by notify-driver and check-and-send-push.
+//
+// SubscriptionDirectory caches driver -> user -> subscriptions for the life of the
+// isolate. push_directory_version is bumped by statement triggers on drivers and
+// push_subscriptions (migration 20261019000070), so one tiny read per request tells
+// whether the cache is still valid; misses are fetched in one `in` query per table.
+//
+// sendPushBatch encrypts with web-push but sends with fetch, which keeps connections to
+// each push service open across requests. Messages to the same endpoint go out in
+// order on one queue; different endpoints run with bounded concurrency. Endpoints that
+// answer 404/410 are returned for a single bulk delete.
+
+const DIRECTORY_TTL_MS = 10 * 60_000 // safety net if the version read fails
+const DEFAULT_CONCURRENCY = Number(Deno.env.get('PUSH_CONCURRENCY') ?? 10)
+const PUSH_TTL_SECONDS = 4 * 60 * 60
+
+export interface PushSubscriptionJSON {
+  endpoint: string
+  keys: { p256dh: string; auth: string }
+}
+
+export interface PushMessage {
+  userId: string
+  payload: string
+  key?: string // caller's id for the message, echoed in the result
+}
+
+export interface PushBatchResult {
+  delivered: Set<string> // keys of messages that reached at least one subscription
+  gone: string[]         // endpoints to prune
+  requests: number
+  sent: number           // successful requests (one per message and subscription)
+}
+
+let vapidConfigured = false
+
+export function configureVapid(subject?: string) {
+  if (vapidConfigured) return
+  const vapidPublicKey = Deno.env.get('VAPID_PUBLIC_KEY')
+  const vapidPrivateKey = Deno.env.get('VAPID_PRIVATE_KEY')
+  if (!vapidPublicKey || !vapidPrivateKey) {
+    throw new Error("Missing VAPID keys in environment variables")
+  }
+  webpush.setVapidDetails(subject ?? Deno.env.get('VAPID_SUBJECT') ?? 'mailto:info@palladiumtransfers.com', vapidPublicKey, vapidPrivateKey)
+  vapidConfigured = true
+}
+
+class SubscriptionDirectory {
+  private version: number | null = null
+  private checkedAt = 0
+  private driverUsers = new Map<string, { userId: string | null; name: string | null }>()
+  private userSubs = new Map<string, PushSubscriptionJSON[]>()
+
+  private clear() {
+    this.driverUsers.clear()
+    this.userSubs.clear()
+  }
+
+  /** Drops the cache when drivers or push_subscriptions changed since the last request. */
+  async refresh(client: any) {
+    const { data, error } = await client.from('push_directory_version').select('version').eq('id', 1).maybeSingle()
+    const version = error || !data ? null : Number(data.version)
+    const expired = Date.now() - this.checkedAt > DIRECTORY_TTL_MS
+    if (version === null || version !== this.version || expired) {
+      this.clear()
+      this.checkedAt = Date.now()
+    }
+    this.version = version
+  }
+
+  /** driver id -> auth user id and name (userId null when the driver has no app account). */
+  async usersForDrivers(client: any, driverIds: string[]) {
+    const missing = [...new Set(driverIds)].filter(id => !this.driverUsers.has(id))
+    if (missing.length > 0) {
+      const { data, error } = await client.from('drivers').select('id, user_id, name').in('id', missing)
+      if (error) throw error
+      for (const id of missing) this.driverUsers.set(id, { userId: null, name: null })
+      for (const d of data || []) this.driverUsers.set(d.id, { userId: d.user_id, name: d.name })
+    }
+    return new Map(driverIds.map(id => [id, this.driverUsers.get(id)!]))
+  }
+
+  async subscriptions(client: any, userIds: string[]): Promise<Map<string, PushSubscriptionJSON[]>> {
+    const missing = [...new Set(userIds)].filter(id => id && !this.userSubs.has(id))
+    if (missing.length > 0) {
+      const { data, error } = await client.from('push_subscriptions').select('user_id, subscription').in('user_id', missing)
+      if (error) throw error
+      for (const id of missing) this.userSubs.set(id, [])
+      for (const row of data || []) this.userSubs.get(row.user_id)?.push(row.subscription)
+    }
+    return new Map(userIds.map(id => [id, this.userSubs.get(id) ?? []]))
+  }
+
+  forget(endpoints: string[]) {
+    const gone = new Set(endpoints)
+    for (const [userId, subs] of this.userSubs) this.userSubs.set(userId, subs.filter(s => !gone.has(s.endpoint)))
+  }
+}
+
+export const directory = new SubscriptionDirectory()
+
+async function sendOne(subscription: PushSubscriptionJSON, payload: string): Promise<number> {
+  const details = webpush.generateRequestDetails(subscription, payload, { TTL: PUSH_TTL_SECONDS })
+  const res = await fetch(details.endpoint, {
+    method: details.method,
+    headers: details.headers,
+    body: details.body ? new Uint8Array(details.body) : undefined,
+  })
+  await res.body?.cancel()
+  return res.status
+}
+
+/**
+ * Sends every message to every subscription of its user. `subsByUser` comes from
+ * directory.subscriptions(). The caller prunes `gone` (see pruneSubscriptions).
+ */
+export async function sendPushBatch(
+  messages: PushMessage[],
+  subsByUser: Map<string, PushSubscriptionJSON[]>,
+  concurrency = DEFAULT_CONCURRENCY,
+): Promise<PushBatchResult> {
+  configureVapid()
+  const result: PushBatchResult = { delivered: new Set(), gone: [], requests: 0, sent: 0 }
+
+  // One ordered queue per endpoint
+  const queues = new Map<string, { subscription: PushSubscriptionJSON; items: PushMessage[] }>()
+  messages.forEach((message, i) => {
+    message.key ??= String(i)
+    for (const subscription of subsByUser.get(message.userId) ?? []) {
+      if (!queues.has(subscription.endpoint)) queues.set(subscription.endpoint, { subscription, items: [] })
+      queues.get(subscription.endpoint)!.items.push(message)
+    }
+  })
+
+  await mapWithConcurrency([...queues.values()], concurrency, async ({ subscription, items }) => {
+    for (const message of items) {
+      result.requests++
+      try {
+        const status = await sendOne(subscription, message.payload)
+        if (status >= 200 && status < 300) {
+          result.delivered.add(message.key!)
+          result.sent++
+        } else if (status === 404 || status === 410) {
+          result.gone.push(subscription.endpoint)
+          return // the rest of this endpoint's queue would fail the same way
+        } else {
+          console.error(`Push to ${new URL(subscription.endpoint).host} failed with ${status}`)
+        }
+      } catch (err) {
+        console.error(`Push to ${subscription.endpoint} failed:`, err)
+      }
+    }
+  })
+  return result
+}
+
+/** Deletes gone subscriptions in one statement and drops them from the cache. */
+export async function pruneSubscriptions(client: any, endpoints: string[]) {
+  if (endpoints.length === 0) return
+  directory.forget(endpoints)
+  const { error } = await client.from('push_subscriptions').delete().in('subscription->>endpoint', endpoints)
+  if (error) console.error('Error pruning push subscriptions:', error)
+}
@@ -3,8 +3,7 @@ import "jsr:@supabase/functions-js/edge-runtime.d.ts";
 import { serve } from "https://deno.land/std@0.177.0/http/server.ts"
 // @ts-ignore
 import { createClient } from "https://esm.sh/@supabase/supabase-js@2.39.0"
-// @ts-ignore
-import webpush from "npm:web-push@3.6.7"
+import { configureVapid, directory, pruneSubscriptions, sendPushBatch } from "../_shared/push.ts"
 
 declare const Deno: any;
 
@@ -13,6 +12,22 @@ const corsHeaders = {
   'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
 }
 
+// Reminders are precomputed in push_reminders (see migration 20261019000060) with the
+// instant they become due; a run only reads the due ones through a partial index.
+const MAX_REMINDERS_PER_RUN = Number(Deno.env.get('PUSH_MAX_PER_RUN') ?? 500)
+// Lets scripts/push_reminder_check.py drive the scheduler with a fake clock ({ "now": ISO })
+const ALLOW_FAKE_CLOCK = Deno.env.get('PUSH_ALLOW_FAKE_CLOCK') === 'true'
+
+const MESSAGES: Record<string, (pickupTime: string) => string> = {
+  '240m_pending': t => `Recordatorio: Tienes un servicio PENDIENTE en 4 horas (${t}). ¡Por favor, confírmalo!`,
+  '120m_pending': () => `¡Atención! Faltan 2 horas para un traslado que no has confirmado. Entra y confírmalo.`,
+  '60m_pending': () => `URGENTE: Tienes un servicio en 1 hora sin confirmar.`,
+  '60m': t => `Recordatorio: Tienes un servicio en 1 hora (${t})`,
+  '30m': t => `¡Atención! Falta media hora (${t}) y no has iniciado el trayecto.`,
+  '20m': () => `AVISO: Faltan 20 min para el traslado. Por favor, indica que vas "En Camino".`,
+  '10m': () => `URGENTE: El servicio empieza en 10 min. Confirmar estado "En Camino".`,
+}
+
 serve(async (req: Request) => {
   if (req.method === 'OPTIONS') {
     return new Response('ok', { headers: corsHeaders })
@@ -24,126 +39,61 @@ serve(async (req: Request) => {
       Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') ?? ''
     )
 
-    const vapidPublicKey = Deno.env.get('VAPID_PUBLIC_KEY')
-    const vapidPrivateKey = Deno.env.get('VAPID_PRIVATE_KEY')
-    const vapidSubject = Deno.env.get('VAPID_SUBJECT') ?? 'mailto:info@palladiumtransfers.com'
-
-    if (!vapidPublicKey || !vapidPrivateKey) {
-      throw new Error("Missing VAPID keys in environment variables")
+    configureVapid()
+
+    const body = req.method === 'POST' ? await req.json().catch(() => ({})) : {}
+    const now = ALLOW_FAKE_CLOCK && body?.now ? new Date(body.now) : new Date()
+    if (Number.isNaN(now.getTime())) throw new Error(`Invalid now: ${body.now}`)
+    const nowIso = now.toISOString()
+
+    // 1. Reminders whose window is open right now
+    const { data: due, error: dueError } = await supabaseClient
+      .from('push_reminders')
+      .select('booking_id, slot, fire_at, booking:booking_id(id, status, pickup_time, driver_id)')
+      .is('sent_at', null)
+      .lte('fire_at', nowIso)
+      .gt('expires_at', nowIso)
+      .order('fire_at', { ascending: true })
+      .limit(MAX_REMINDERS_PER_RUN)
+
+    if (dueError) throw dueError
+
+    // 2. Drivers and subscriptions from the cached directory (misses in one query each)
+    await directory.refresh(supabaseClient)
+    const drivers = await directory.usersForDrivers(supabaseClient, (due || []).map((r: any) => r.booking?.driver_id).filter(Boolean))
+    const reminders = (due || []).filter((r: any) => drivers.get(r.booking?.driver_id)?.userId)
+    const subsByUser = await directory.subscriptions(supabaseClient, reminders.map((r: any) => drivers.get(r.booking.driver_id)!.userId!))
+
+    // 3. One fan-out cycle for everything that is due
+    const batch = await sendPushBatch(reminders.map((r: any) => ({
+      key: `${r.booking_id}|${r.slot}`,
+      userId: drivers.get(r.booking.driver_id)!.userId!,
+      payload: JSON.stringify({
+        title: 'Palladium Transfers - Aviso',
+        body: (MESSAGES[r.slot] ?? (() => 'Recordatorio de servicio'))(r.booking.pickup_time),
+        url: '/driver-app' // Link to driver app
+      }),
+    })), subsByUser)
+    const sent = reminders.filter((r: any) => batch.delivered.has(`${r.booking_id}|${r.slot}`))
+
+    // 4. Record what went out in one call, drop dead subscriptions in another
+    if (sent.length > 0) {
+      const { error: markError } = await supabaseClient.rpc('mark_push_reminders_sent', {
+        p_booking_ids: sent.map((r: any) => r.booking_id),
+        p_slots: sent.map((r: any) => r.slot),
+      })
+      if (markError) throw markError
     }
+    await pruneSubscriptions(supabaseClient, batch.gone)
 
-    webpush.setVapidDetails(vapidSubject, vapidPublicKey, vapidPrivateKey)
-
-    const formatter = new Intl.DateTimeFormat('en-US', {
-        timeZone: 'Europe/Madrid',
-        year: 'numeric', month: '2-digit', day: '2-digit',
-        hour: '2-digit', minute: '2-digit', second: '2-digit',
-        hour12: false
-    });
-    const madridTimeStr = formatter.format(new Date());
-    const [datePart, timePart] = madridTimeStr.split(', ');
-    const [month, day, year] = datePart.split('/');
-    const [hoursStr, minutesStr, secondsStr] = timePart.split(':');
-    
-    // nowLocal represents the "wall time" in Madrid, constructed as a native Date for exact math
-    const nowLocal = new Date(Number(year), Number(month) - 1, Number(day), Number(hoursStr), Number(minutesStr), Number(secondsStr));
-    
-    // Get Madrid today's date in YYYY-MM-DD
-    const madridTodayStr = `${year}-${month}-${day}`;
-
-    // Fetch confirmed bookings within the window (from today onwards, handles midnight crossing safely)
-    const { data: bookings, error: bookingsError } = await supabaseClient
-      .from('bookings')
-      .select('*, driver:driver_id(*)')
-      .in('status', ['Confirmed', 'Pending'])
-      .gte('pickup_date', madridTodayStr)
-      .not('driver_id', 'is', null)
-
-    if (bookingsError) throw bookingsError
-
-    const notificationsSent = []
-
-    for (const booking of bookings || []) {
-        const [pickupYear, pickupMonth, pickupDay] = booking.pickup_date.split('-').map(Number);
-        const [hours, minutes] = booking.pickup_time.split(':').map(Number);
-        
-        // pickupLocal represents the "wall time" of the pickup
-        const pickupLocal = new Date(pickupYear, pickupMonth - 1, pickupDay, hours, minutes, 0);
-
-        const diffMinutes = Math.floor((pickupLocal.getTime() - nowLocal.getTime()) / 60000);
-        
-        // Define notification slots
-        let slot = null
-        let message = ''
-
-        if (booking.status === 'Pending') {
-            if (diffMinutes <= 240 && diffMinutes > 230) {
-                slot = '240m_pending'
-                message = `Recordatorio: Tienes un servicio PENDIENTE en 4 horas (${booking.pickup_time}). ¡Por favor, confírmalo!`
-            } else if (diffMinutes <= 120 && diffMinutes > 110) {
-                slot = '120m_pending'
-                message = `¡Atención! Faltan 2 horas para un traslado que no has confirmado. Entra y confírmalo.`
-            } else if (diffMinutes <= 60 && diffMinutes > 50) {
-                slot = '60m_pending'
-                message = `URGENTE: Tienes un servicio en 1 hora sin confirmar.`
-            }
-        } else if (booking.status === 'Confirmed') {
-            if (diffMinutes <= 60 && diffMinutes > 50) {
-                slot = '60m'
-                message = `Recordatorio: Tienes un servicio en 1 hora (${booking.pickup_time})`
-            } else if (diffMinutes <= 30 && diffMinutes > 20) {
-                slot = '30m'
-                message = `¡Atención! Falta media hora (${booking.pickup_time}) y no has iniciado el trayecto.`
-            } else if (diffMinutes <= 20 && diffMinutes > 10) {
-                slot = '20m'
-                message = `AVISO: Faltan 20 min para el traslado. Por favor, indica que vas "En Camino".`
-            } else if (diffMinutes <= 10 && diffMinutes > 0) {
-                slot = '10m'
-                message = `URGENTE: El servicio empieza en 10 min. Confirmar estado "En Camino".`
-            }
-        }
-
-        if (!slot) continue
-
-        // Check if already sent for this slot
-        const sentSlots = booking.push_notifications_sent || {}
-        if (sentSlots[slot]) continue
-
-
-
-        // Get driver's subscription
-        const { data: subData } = await supabaseClient
-            .from('push_subscriptions')
-            .select('subscription')
-            .eq('user_id', booking.driver?.user_id) // We need user_id from auth, which is linked to drivers
-            .single()
-
-        if (!subData) continue
-
-        try {
-            await webpush.sendNotification(
-                subData.subscription,
-                JSON.stringify({
-                    title: 'Palladium Transfers - Aviso',
-                    body: message,
-                    url: '/driver-app' // Link to driver app
-                })
-            )
-
-            // Mark as sent
-            sentSlots[slot] = new Date().toISOString()
-            await supabaseClient
-                .from('bookings')
-                .update({ push_notifications_sent: sentSlots })
-                .eq('id', booking.id)
-
-            notificationsSent.push({ bookingId: booking.id, slot, driver: booking.driver?.nombre })
-        } catch (pushErr) {
-            console.error(`Error sending push to ${booking.driver?.nombre}:`, pushErr)
-        }
-    }
+    const notificationsSent = sent.map((r: any) => ({
+      bookingId: r.booking_id,
+      slot: r.slot,
+      fireAt: r.fire_at,
+      driver: drivers.get(r.booking.driver_id)?.name,
+    }))
 
-    return new Response(JSON.stringify({ message: "Check complete", notificationsSent }), {
+    return new Response(JSON.stringify({ message: "Check complete", notificationsSent, due: reminders.length, pushRequests: batch.requests, now: nowIso }), {
       headers: { ...corsHeaders, 'Content-Type': 'application/json' },
       status: 200,
     })
@@ -0,0 +1,206 @@
+import { createHash, createPrivateKey, createSign, type KeyObject } from "node:crypto";
+import { SignedXml } from "npm:xml-crypto@2.1.3";
+
+/**
+ * WS-Security envelope for the RVTC service.
+ *
+ * EnvelopeSigner produces byte-for-byte the document xml-crypto used to build for
+ * createSignedSoap (verify with envelope_bench.ts): everything outside the signed
+ * body is precomputed per certificate, and a request only canonicalizes its body,
+ * hashes it and signs the fixed-shape SignedInfo.
+ */
+
+const SOAPENV_NS = "http://schemas.xmlsoap.org/soap/envelope/";
+const WSU_NS = "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-utility-1.0.xsd";
+const WSSE_NS = "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-secext-1.0.xsd";
+const X509_TOKEN = "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-x509-token-profile-1.0#X509v3";
+const BASE64_ENCODING = "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-soap-message-security-1.0#Base64Binary";
+const DSIG_NS = "http://www.w3.org/2000/09/xmldsig#";
+const EXC_C14N = "http://www.w3.org/2001/10/xml-exc-c14n#";
+const ENVELOPED = "http://www.w3.org/2000/09/xmldsig#enveloped-signature";
+const RSA_SHA256 = "http://www.w3.org/2001/04/xmldsig-more#rsa-sha256";
+const SHA256 = "http://www.w3.org/2001/04/xmlenc#sha256";
+
+const KEY_INFO = `<wsse:SecurityTokenReference xmlns:wsse="${WSSE_NS}"><wsse:Reference URI="#X509Token" ValueType="${X509_TOKEN}"/></wsse:SecurityTokenReference>`;
+
+// SignedInfo as serialized in the document and in exclusive C14N form, split around DigestValue
+const SIGNED_INFO_HEAD = `<SignedInfo><CanonicalizationMethod Algorithm="${EXC_C14N}"/><SignatureMethod Algorithm="${RSA_SHA256}"/><Reference URI="#TheBody"><Transforms><Transform Algorithm="${ENVELOPED}"/><Transform Algorithm="${EXC_C14N}"/></Transforms><DigestMethod Algorithm="${SHA256}"/><DigestValue>`;
+const SIGNED_INFO_C14N_HEAD = `<SignedInfo xmlns="${DSIG_NS}"><CanonicalizationMethod Algorithm="${EXC_C14N}"></CanonicalizationMethod><SignatureMethod Algorithm="${RSA_SHA256}"></SignatureMethod><Reference URI="#TheBody"><Transforms><Transform Algorithm="${ENVELOPED}"></Transform><Transform Algorithm="${EXC_C14N}"></Transform></Transforms><DigestMethod Algorithm="${SHA256}"></DigestMethod><DigestValue>`;
+const SIGNED_INFO_TAIL = `</DigestValue></Reference></SignedInfo>`;
+
+const BODY_OPEN = `<soapenv:Body wsu:Id="TheBody" xmlns:wsu="${WSU_NS}">`;
+const BODY_C14N_OPEN = `<soapenv:Body xmlns:soapenv="${SOAPENV_NS}" xmlns:wsu="${WSU_NS}" wsu:Id="TheBody">`;
+const BODY_CLOSE = `</soapenv:Body>`;
+
+function certificateBase64(certificatePem: string): string {
+    return certificatePem.replace(/-----(BEGIN|END) CERTIFICATE-----|\n/g, '');
+}
+
+function envelopeHead(certificatePem: string): string {
+    return `<?xml version="1.0" encoding="UTF-8"?><soapenv:Envelope xmlns:soapenv="${SOAPENV_NS}" xmlns:wsu="${WSU_NS}"><soapenv:Header><wsse:Security xmlns:wsse="${WSSE_NS}" xmlns:wsu="${WSU_NS}"><wsse:BinarySecurityToken EncodingType="${BASE64_ENCODING}" ValueType="${X509_TOKEN}" wsu:Id="X509Token" xmlns:wsu="${WSU_NS}">${certificateBase64(certificatePem)}</wsse:BinarySecurityToken>`;
+}
+
+/**
+ * Escapes a value for a double-quoted attribute, the way the serializer writes it back.
+ */
+export function xmlAttr(value: unknown): string {
+    return String(value).replace(/[\r\n\t]/g, ' ').replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/"/g, '&quot;');
+}
+
+const ENTITIES: Record<string, string> = { lt: '<', gt: '>', amp: '&', quot: '"', apos: "'" };
+
+function unescapeXml(text: string): string {
+    return text.replace(/&(#x[0-9a-fA-F]+|#[0-9]+|\w+);/g, (match, ref: string) => {
+        if (ref[0] === '#') return String.fromCodePoint(ref[1] === 'x' ? parseInt(ref.slice(2), 16) : parseInt(ref.slice(1), 10));
+        return ENTITIES[ref] ?? match;
+    });
+}
+
+const c14nText = (text: string) => text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/\r/g, '&#xD;');
+const c14nAttr = (value: string) => value.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/"/g, '&quot;')
+    .replace(/\r/g, '&#xD;').replace(/\n/g, '&#xA;').replace(/\t/g, '&#x9;');
+
+const TOKEN = /<\/([^\s>]+)\s*>|<([^\s/>]+)((?:\s+[^\s=]+\s*=\s*"[^"]*")*)\s*(\/?)>|([^<]+)/g;
+const ATTRIBUTE = /([^\s=]+)\s*=\s*"([^"]*)"/g;
+
+interface Scope {
+    declared: Map<string, string>; // prefix -> namespace declared in the source ('' = default)
+    rendered: Set<string>;        // prefixes already output by an output ancestor
+    defaultNs: string;            // default namespace in the output
+}
+
+/**
+ * Exclusive XML canonicalization (without comments) of a generated body fragment,
+ * with the same output as xml-crypto's ExclusiveCanonicalization for an element whose
+ * ancestors are soapenv:Body. Handles the subset the request templates produce:
+ * elements, double-quoted attributes and text; no comments, CDATA or PIs.
+ */
+export function canonicalizeFragment(xml: string, inherited: Map<string, string> = new Map([['soapenv', SOAPENV_NS], ['wsu', WSU_NS]])): string {
+    const out: string[] = [];
+    const stack: Scope[] = [{ declared: inherited, rendered: new Set(['soapenv', 'wsu']), defaultNs: '' }];
+    const resolve = (prefix: string) => {
+        for (let i = stack.length - 1; i >= 0; i--) {
+            const ns = stack[i].declared.get(prefix);
+            if (ns !== undefined) return ns;
+        }
+        return prefix === 'xml' ? 'http://www.w3.org/XML/1998/namespace' : '';
+    };
+
+    for (const match of xml.matchAll(TOKEN)) {
+        const [, closing, name, rawAttrs, selfClosing, text] = match;
+        if (text !== undefined) {
+            out.push(c14nText(unescapeXml(text)));
+            continue;
+        }
+        if (closing !== undefined) {
+            stack.pop();
+            out.push(`</${closing}>`);
+            continue;
+        }
+
+        const parent = stack[stack.length - 1];
+        const attrs = [...(rawAttrs || '').matchAll(ATTRIBUTE)].map(a => ({ name: a[1], value: unescapeXml(a[2]) }));
+        const declared = new Map<string, string>();
+        for (const a of attrs) {
+            if (a.name === 'xmlns') declared.set('', a.value);
+            else if (a.name.startsWith('xmlns:')) declared.set(a.name.slice(6), a.value);
+        }
+        const scope: Scope = { declared, rendered: new Set(parent.rendered), defaultNs: parent.defaultNs };
+        stack.push(scope);
+
+        const nsToRender: { prefix: string; uri: string }[] = [];
+        let defaultDecl = '';
+        const elementPrefix = name.includes(':') ? name.split(':')[0] : '';
+        if (elementPrefix) {
+            if (!scope.rendered.has(elementPrefix)) {
+                nsToRender.push({ prefix: elementPrefix, uri: resolve(elementPrefix) });
+                scope.rendered.add(elementPrefix);
+            }
+        } else {
+            const ns = resolve('');
+            if (ns !== scope.defaultNs) {
+                scope.defaultNs = ns;
+                defaultDecl = ` xmlns="${ns}"`;
+            }
+        }
+
+        const rendered: { name: string; value: string; key: string; namespaced: boolean }[] = [];
+        for (const a of attrs) {
+            if (a.name === 'xmlns' || a.name.startsWith('xmlns:')) continue;
+            const prefix = a.name.includes(':') ? a.name.split(':')[0] : '';
+            const local = prefix ? a.name.slice(prefix.length + 1) : a.name;
+            if (prefix && prefix !== 'xml' && !scope.rendered.has(prefix)) {
+                nsToRender.push({ prefix, uri: resolve(prefix) });
+                scope.rendered.add(prefix);
+            }
+            const ns = prefix ? resolve(prefix) : '';
+            rendered.push({ name: a.name, value: a.value, key: ns ? ns + local : 'null' + local, namespaced: !!ns });
+        }
+
+        nsToRender.sort((a, b) => a.prefix === b.prefix ? 0 : a.prefix.localeCompare(b.prefix));
+        rendered.sort((a, b) => {
+            if (!a.namespaced && b.namespaced) return -1;
+            if (!b.namespaced && a.namespaced) return 1;
+            return a.key === b.key ? 0 : (a.key < b.key ? -1 : 1);
+        });
+
+        out.push(`<${name}${defaultDecl}`);
+        for (const ns of nsToRender) out.push(` xmlns:${ns.prefix}="${ns.uri}"`);
+        for (const a of rendered) out.push(` ${a.name}="${c14nAttr(a.value)}"`);
+        out.push('>');
+        if (selfClosing) {
+            stack.pop();
+            out.push(`</${name}>`);
+        }
+    }
+    return out.join('');
+}
+
+/**
+ * Per-certificate signer. Build once per key pair and reuse for every message.
+ */
+export class EnvelopeSigner {
+    private readonly key: KeyObject;
+    private readonly head: string;
+
+    constructor(privateKeyPem: string, certificatePem: string) {
+        this.key = createPrivateKey(privateKeyPem);
+        this.head = envelopeHead(certificatePem);
+    }
+
+    sign(dataXml: string): string {
+        const canonicalBody = BODY_C14N_OPEN + canonicalizeFragment(dataXml) + BODY_CLOSE;
+        const digest = createHash('sha256').update(canonicalBody, 'utf8').digest('base64');
+        const signatureValue = createSign('RSA-SHA256')
+            .update(SIGNED_INFO_C14N_HEAD + digest + SIGNED_INFO_TAIL)
+            .sign(this.key, 'base64');
+
+        return this.head
+            + `<Signature xmlns="${DSIG_NS}">${SIGNED_INFO_HEAD}${digest}${SIGNED_INFO_TAIL}`
+            + `<SignatureValue>${signatureValue}</SignatureValue><KeyInfo>${KEY_INFO}</KeyInfo></Signature>`
+            + `</wsse:Security></soapenv:Header>${BODY_OPEN}${dataXml}${BODY_CLOSE}</soapenv:Envelope>`;
+    }
+}
+
+/**
+ * Reference implementation: the full xml-crypto pipeline (parse, C14N, sign, serialize).
+ */
+export function signWithXmlCrypto(dataXml: string, privateKeyPem: string, certificatePem: string): string {
+    const fullSoap = `${envelopeHead(certificatePem)}</wsse:Security></soapenv:Header>${BODY_OPEN}${dataXml}${BODY_CLOSE}</soapenv:Envelope>`;
+
+    const sig = new SignedXml();
+    sig.signatureAlgorithm = RSA_SHA256;
+    sig.addReference(
+        "//*[@*[local-name()='Id' and .='TheBody']]",
+        [ENVELOPED, EXC_C14N],
+        SHA256
+    );
+    sig.signingKey = privateKeyPem;
+    sig.keyInfoProvider = {
+        getKeyInfo: () => KEY_INFO
+    };
+    sig.computeSignature(fullSoap, {
+        location: { reference: "//*[local-name(.)='Security']", action: "append" }
+    });
+    return sig.getSignedXml();
+}
@@ -0,0 +1,96 @@
+/**
+ * Verifies EnvelopeSigner against xml-crypto byte for byte and measures signatures/s.
+ *
+ *   deno task bench:envelope                  # throwaway 2048-bit key
+ *   FOMENTO_CERT_BASE64=... FOMENTO_CERT_PASSWORD=... deno task bench:envelope
+ *
+ * Exits with code 1 if any envelope differs.
+ */
+import forge from "npm:node-forge@1.3.1";
+import { EnvelopeSigner, signWithXmlCrypto, xmlAttr } from "./envelope.ts";
+
+const COUNT = Number(Deno.env.get('BENCH_COUNT') || 300);
+
+function throwawayKeyPair() {
+    const keys = forge.pki.rsa.generateKeyPair(2048);
+    const cert = forge.pki.createCertificate();
+    cert.publicKey = keys.publicKey;
+    cert.serialNumber = '01';
+    cert.validity.notBefore = new Date();
+    cert.validity.notAfter = new Date(Date.now() + 24 * 60 * 60 * 1000);
+    const attrs = [{ name: 'commonName', value: 'envelope-bench' }];
+    cert.setSubject(attrs);
+    cert.setIssuer(attrs);
+    cert.sign(keys.privateKey, forge.md.sha256.create());
+    return { privateKeyPem: forge.pki.privateKeyToPem(keys.privateKey), certificatePem: forge.pki.certificateToPem(cert) };
+}
+
+function configuredKeyPair() {
+    const p12Base64 = Deno.env.get('FOMENTO_CERT_BASE64');
+    const password = Deno.env.get('FOMENTO_CERT_PASSWORD');
+    if (!p12Base64 || !password) return null;
+    const p12 = forge.pkcs12.pkcs12FromAsn1(forge.asn1.fromDer(forge.util.createBuffer(atob(p12Base64), 'raw').getBytes()), password);
+    const key = p12.getBags({ bagType: forge.pki.oids.pkcs8ShroudedKeyBag })[forge.pki.oids.pkcs8ShroudedKeyBag]![0].key!;
+    const cert = p12.getBags({ bagType: forge.pki.oids.certBag })[forge.pki.oids.certBag]![0].cert!;
+    return { privateKeyPem: forge.pki.privateKeyToPem(key), certificatePem: forge.pki.certificateToPem(cert) };
+}
+
+const ADDRESSES = [
+    'Aeropuerto de Alicante-Elche, Terminal T1',
+    'Hotel Meliá "Villa Gadea", Altea',
+    'C/ Mayor 12 & 14, 3º <izq>',
+    'Avda. de Europa,\n7 - Benidorm',
+    'Playa de San Juan > Cabo de las Huertas',
+];
+
+function sampleBody(i: number): string {
+    const id = 100000 + i;
+    if (i % 3 === 0) {
+        return `
+            <vtc:qanulacionvtc xmlns:vtc="http://mfom.com/vtc">
+                <header version="1.0" versionsender="1.0" fecha="2026-10-19T10:${String(i % 60).padStart(2, '0')}:00+02:00"/>
+                <body>
+                    <vtcservicio idservicio="${id}"/>
+                </body>
+            </vtc:qanulacionvtc>
+        `.trim();
+    }
+    const origin = ADDRESSES[i % ADDRESSES.length];
+    const destination = ADDRESSES[(i + 2) % ADDRESSES.length];
+    return `
+            <vtc:qaltavtc xmlns:vtc="http://mfom.com/vtc">
+                <header version="1.0" versionsender="1.0" fecha="2026-10-19T10:00:00+02:00" idcomunica="${id}"/>
+                <body>
+                    <vtcservicio niftitular="B26816025" nom="${xmlAttr('Cliente ' + i)}" matricula="2170-LVB" fcontrato="2026-10-18T10:00:00" cgprovcontrato="03" cgmunicontrato="014" cgprovinicio="03" cgmuniinicio="065" direccioninicio="${xmlAttr(origin)}" fprevistainicio="2026-10-20T09:30:00" cgprovfin="03" cgmunifin="031" direccionfin="${xmlAttr(destination)}" ffin="2026-10-20" veraz="S"/>
+                </body>
+            </vtc:qaltavtc>
+        `.trim();
+}
+
+const { privateKeyPem, certificatePem } = configuredKeyPair() ?? throwawayKeyPair();
+const bodies = Array.from({ length: COUNT }, (_, i) => sampleBody(i));
+
+let started = performance.now();
+const reference = bodies.map(b => signWithXmlCrypto(b, privateKeyPem, certificatePem));
+const xmlCryptoMs = performance.now() - started;
+
+started = performance.now();
+const signer = new EnvelopeSigner(privateKeyPem, certificatePem);
+const cached = bodies.map(b => signer.sign(b));
+const cachedMs = performance.now() - started;
+
+const mismatches = reference.map((xml, i) => xml === cached[i] ? -1 : i).filter(i => i >= 0);
+
+console.log(`${COUNT} envelopes`);
+console.log(`  xml-crypto       ${(COUNT / xmlCryptoMs * 1000).toFixed(0).padStart(6)} signatures/s`);
+console.log(`  EnvelopeSigner   ${(COUNT / cachedMs * 1000).toFixed(0).padStart(6)} signatures/s  (includes key import)`);
+
+if (mismatches.length > 0) {
+    const i = mismatches[0];
+    const at = [...reference[i]].findIndex((ch, k) => ch !== cached[i][k]);
+    console.error(`${mismatches.length} envelopes differ; first at #${i}, offset ${at}:`);
+    console.error(`  xml-crypto: ...${reference[i].slice(Math.max(0, at - 80), at + 80)}`);
+    console.error(`  signer:     ...${cached[i].slice(Math.max(0, at - 80), at + 80)}`);
+    Deno.exit(1);
+}
+console.log('OK: byte-for-byte identical');
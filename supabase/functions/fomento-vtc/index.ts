@@ -1,11 +1,15 @@
 import forge from "npm:node-forge@1.3.1";
-import { SignedXml } from "npm:xml-crypto@2.1.3";
+import { EnvelopeSigner, signWithXmlCrypto, xmlAttr } from "./envelope.ts";
+import { mapWithConcurrency } from "../_shared/concurrency.ts";
 
 const corsHeaders = {
   'Access-Control-Allow-Origin': '*',
   'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
 };
 
+// Longest wait for one SOAP exchange, on every path (direct, internal proxy, relay)
+const SEND_TIMEOUT_MS = 25000;
+
 // Consolidated Date Helpers for Fomento VTC (Madrid Timezone)
 const MADRID_OFFSET = "+02:00";
 
@@ -99,9 +103,27 @@ function extractPemFromP12(p12Base64: string, password: string) {
     return { privateKeyPem, certificatePem };
 }
 
-function createSignedSoap(action: 'alta' | 'anulacion', payload: any, privateKeyPem: string, certificatePem: string, isTest: boolean) {
-    const certBase64 = certificatePem.replace(/-----(BEGIN|END) CERTIFICATE-----|\n/g, '');
-    const wsuNs = "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-utility-1.0.xsd";
+interface KeyMaterial {
+    p12Base64: string;
+    password: string;
+    privateKeyPem: string;
+    certificatePem: string;
+    signer: EnvelopeSigner;
+}
+
+// Parsed key material and the envelope signer are kept for the lifetime of the isolate:
+// decrypting the PKCS#12 bag is far more expensive than signing, and warm invocations reuse it.
+let keyMaterialCache: KeyMaterial | null = null;
+
+function getKeyMaterial(p12Base64: string, password: string): KeyMaterial {
+    if (!keyMaterialCache || keyMaterialCache.p12Base64 !== p12Base64 || keyMaterialCache.password !== password) {
+        const { privateKeyPem, certificatePem } = extractPemFromP12(p12Base64, password);
+        keyMaterialCache = { p12Base64, password, privateKeyPem, certificatePem, signer: new EnvelopeSigner(privateKeyPem, certificatePem) };
+    }
+    return keyMaterialCache;
+}
+
+function createSignedSoap(action: 'alta' | 'anulacion', payload: any, keys: KeyMaterial, isTest: boolean) {
     const vtcUri = "http://mfom.com/vtc";
     
     let dataXml = '';
@@ -142,13 +164,13 @@ function createSignedSoap(action: 'alta' | 'anulacion', payload: any, privateKey
         console.log(`[FOMENTO-VTC] Alta: fecha="${isoCommTime}" | fprevistainicio="${isoFprevistainicio}" | fcontrato="${isoFcontrato}" | idcomunica="${uniqueIdComunica}"`);
 
         const nifAttr = (payload.nif && payload.nif !== payload.niftitular) ? `nif="${payload.nif}" ` : '';
-        const nomAttr = payload.nom ? `nom="${payload.nom}" ` : '';
+        const nomAttr = payload.nom ? `nom="${xmlAttr(payload.nom)}" ` : '';
         
         dataXml = `
             <vtc:qaltavtc xmlns:vtc="${vtcUri}">
                 <header version="1.0" versionsender="1.0" fecha="${isoCommTime}" idcomunica="${uniqueIdComunica}"/>
                 <body>
-                    <vtcservicio niftitular="${payload.niftitular}" ${nifAttr}${nomAttr}matricula="${payload.matricula}" fcontrato="${isoFcontrato}" cgprovcontrato="${payload.cgprovcontrato}" cgmunicontrato="${payload.cgmunicontrato}" cgprovinicio="${payload.cgprovinicio}" cgmuniinicio="${payload.cgmuniinicio}" direccioninicio="${(payload.direccioninicio || 'Direccion Origen').substring(0, 100)}" fprevistainicio="${isoFprevistainicio}" cgprovfin="${payload.cgprovfin}" cgmunifin="${payload.cgmunifin}" direccionfin="${(payload.direccionfin || 'Direccion Destino').substring(0, 100)}" ffin="${isoFfin}" veraz="S"/>
+                    <vtcservicio niftitular="${payload.niftitular}" ${nifAttr}${nomAttr}matricula="${payload.matricula}" fcontrato="${isoFcontrato}" cgprovcontrato="${payload.cgprovcontrato}" cgmunicontrato="${payload.cgmunicontrato}" cgprovinicio="${payload.cgprovinicio}" cgmuniinicio="${payload.cgmuniinicio}" direccioninicio="${xmlAttr((payload.direccioninicio || 'Direccion Origen').substring(0, 100))}" fprevistainicio="${isoFprevistainicio}" cgprovfin="${payload.cgprovfin}" cgmunifin="${payload.cgmunifin}" direccionfin="${xmlAttr((payload.direccionfin || 'Direccion Destino').substring(0, 100))}" ffin="${isoFfin}" veraz="S"/>
                 </body>
             </vtc:qaltavtc>
         `.trim();
@@ -182,7 +204,7 @@ function createSignedSoap(action: 'alta' | 'anulacion', payload: any, privateKey
             <vtc:qmodificavtc xmlns:vtc="${vtcUri}">
                 <header version="1.0" versionsender="1.0" fecha="${isoCommTime}"/>
                 <body>
-                    <vtcservicio idservicio="${payload.idservicio}" cgprovfin="${payload.cgprovfin}" cgmunifin="${payload.cgmunifin}" direccionfin="${(payload.direccionfin || '').substring(0, 100)}" matricula="${payload.matricula}"/>
+                    <vtcservicio idservicio="${payload.idservicio}" cgprovfin="${payload.cgprovfin}" cgmunifin="${payload.cgmunifin}" direccionfin="${xmlAttr((payload.direccionfin || '').substring(0, 100))}" matricula="${payload.matricula}"/>
                 </body>
             </vtc:qmodificavtc>
         `.trim();
@@ -201,24 +223,9 @@ function createSignedSoap(action: 'alta' | 'anulacion', payload: any, privateKey
 
 
 
-    const fullSoap = `<?xml version="1.0" encoding="UTF-8"?><soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:wsu="${wsuNs}"><soapenv:Header><wsse:Security xmlns:wsse="http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-secext-1.0.xsd" xmlns:wsu="${wsuNs}"><wsse:BinarySecurityToken EncodingType="http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-soap-message-security-1.0#Base64Binary" ValueType="http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-x509-token-profile-1.0#X509v3" wsu:Id="X509Token" xmlns:wsu="${wsuNs}">${certBase64}</wsse:BinarySecurityToken></wsse:Security></soapenv:Header><soapenv:Body wsu:Id="TheBody" xmlns:wsu="${wsuNs}">${dataXml}</soapenv:Body></soapenv:Envelope>`;
-
-    const sig = new SignedXml();
-    sig.signatureAlgorithm = "http://www.w3.org/2001/04/xmldsig-more#rsa-sha256";
-    sig.addReference(
-        "//*[@*[local-name()='Id' and .='TheBody']]", 
-        ["http://www.w3.org/2000/09/xmldsig#enveloped-signature", "http://www.w3.org/2001/10/xml-exc-c14n#"],
-        "http://www.w3.org/2001/04/xmlenc#sha256"
-    );
-    sig.signingKey = privateKeyPem;
-    sig.keyInfoProvider = {
-        getKeyInfo: () => `<wsse:SecurityTokenReference xmlns:wsse="http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-secext-1.0.xsd"><wsse:Reference URI="#X509Token" ValueType="http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-x509-token-profile-1.0#X509v3"/></wsse:SecurityTokenReference>`
-    };
-    sig.computeSignature(fullSoap, {
-        location: { reference: "//*[local-name(.)='Security']", action: "append" }
-    });
-
-    const signedXml = sig.getSignedXml();
+    const signedXml = Deno.env.get('FOMENTO_SIGNER') === 'xml-crypto'
+        ? signWithXmlCrypto(dataXml, keys.privateKeyPem, keys.certificatePem)
+        : keys.signer.sign(dataXml);
     console.log(`[FOMENTO-VTC] FULL SIGNED XML: ${signedXml}`);
     
     return {
@@ -229,6 +236,74 @@ function createSignedSoap(action: 'alta' | 'anulacion', payload: any, privateKey
 
 
 
+/**
+ * Parses a raw RVTC SOAP response into the result shape returned to the app.
+ */
+function parseMinistryResponse(rawXml: string, action: string) {
+    const isFault = /<[^>]*Fault[^>]*>/i.test(rawXml);
+    if (isFault) {
+        const faultMatch = rawXml.match(/<faultstring[^>]*>(.*?)<\/faultstring>/i) || 
+                           rawXml.match(/<[^>]*faultstring[^>]*>(.*?)<\/[^>]*faultstring>/i);
+        const detailMatch = rawXml.match(/<detail[^>]*>(.*?)<\/detail>/i);
+        const errorMsg = faultMatch ? faultMatch[1] : (detailMatch ? detailMatch[1] : "Error SOAP (Cuerpo no parseable)");
+        return { success: false, resultado: "ERROR", error: `Ministerio: ${errorMsg}`, body: rawXml, rawResponse: rawXml };
+    }
+
+    // Parse resultado: try attribute first (alta/inicio), then element (consulta/anulacion)
+    const resultadoAttrMatch = rawXml.match(/resultado="([^"]+)"/i);
+    const resultadoElemMatch = rawXml.match(/<resultado[^>]*>([^<]+)<\/resultado>/i);
+    const resultado = resultadoAttrMatch ? resultadoAttrMatch[1] : (resultadoElemMatch ? resultadoElemMatch[1].trim() : null);
+
+    // Parse other fields - try attribute then element format
+    const iderrorMatch = rawXml.match(/iderror="([^"]+)"/i) || rawXml.match(/<iderror[^>]*>([^<]+)<\/iderror>/i);
+    const idservicioMatch = rawXml.match(/idservicio="([^"]+)"/i) || rawXml.match(/<idservicio[^>]*>([^<]+)<\/idservicio>/i);
+    const idcomunicaMatch = rawXml.match(/idcomunica="([^"]+)"/i) || rawXml.match(/<idcomunica[^>]*>([^<]+)<\/idcomunica>/i);
+
+    // Log raw response for debugging
+    console.log(`[PROXY] resultado: "${resultado}", raw snippet: ${rawXml.substring(0, 300)}`);
+
+    const RVTC_ERRORS: Record<string, string> = {
+        '00': 'OK - Servicio registrado correctamente',
+        '0':  'OK - Servicio registrado correctamente',
+        '51': 'El NIF que comunica no puede crear servicios para ese intermediario y matrícula',
+        '52': 'EL NIF comunicado no puede gestionar servicios para esa matrícula',
+        '53': 'El NIF del intermediario no es correcto',
+        '54': 'El NIF del titular no es correcto',
+        '55': 'La fecha de contrato debe ser anterior a la fecha prevista de inicio',
+        '56': 'La fecha y hora prevista de inicio debe ser posterior a la fecha y hora actual',
+        '57': 'La fecha fin del servicio debe ser igual o posterior a la fecha de inicio',
+        '58': 'La provincia del contrato no es correcta',
+        '59': 'La provincia de origen no es correcta',
+        '60': 'La provincia de destino no es correcta',
+        '61': 'La provincia del lugar más lejano no es correcta',
+        '62': 'El municipio del contrato no es correcto',
+        '63': 'El municipio inicio no es correcto',
+        '64': 'El municipio fin no es correcto',
+        '65': 'El municipio del lugar más lejano no es correcto',
+        '66': 'Los lugares de inicio y fin son iguales. Debe comunicar el punto más lejano',
+        '69': 'Error en el SW al crear el servicio',
+        '79': 'El formato de la matrícula no es correcto',
+        '83': 'El titular no dispone de la autorización de esa matrícula',
+        '84': 'El NIF comunicado no puede gestionar servicios',
+        '85': 'Error al crear el servicio',
+    };
+
+    const isSuccess = resultado === '00' || resultado === '0';
+    // For consulta: if resultado is null but no fault, treat as success and return raw XML
+    const consultaNoResult = action === 'consulta' && resultado === null && !rawXml.includes('Fault');
+    const errorMsg = (isSuccess || consultaNoResult) ? null : (RVTC_ERRORS[resultado ?? ''] || `Error Ministerio código: ${resultado} (iderror: ${iderrorMatch ? iderrorMatch[1] : 'N/A'})`);
+
+    return {
+        success: isSuccess || consultaNoResult,
+        resultado: resultado,
+        error: errorMsg,
+        idservicio: idservicioMatch ? idservicioMatch[1] : null,
+        idcomunica: idcomunicaMatch ? idcomunicaMatch[1] : null,
+        body: (isSuccess || consultaNoResult) ? rawXml : errorMsg,
+        rawResponse: rawXml
+    };
+}
+
 async function sendToFomento(signedXml: string, action: string, isTest: boolean) {
     const endpoint = !isTest
         ? 'https://sede.transportes.gob.es/MFOM.Services.VTC.Server/VTCPort'
@@ -248,6 +323,26 @@ async function sendToFomento(signedXml: string, action: string, isTest: boolean)
         : 'http://www.fomento.org/VTCService/Anulacion';
 
     const internalProxyUrl = Deno.env.get('FOMENTO_INTERNAL_PROXY_URL');
+    const directEndpoint = Deno.env.get('FOMENTO_ENDPOINT_URL');
+
+    // PRIORITY 0: Explicit endpoint override (local SOAP stand-in: scripts/fomento_mock_server.py)
+    if (directEndpoint) {
+        console.log(`[DIRECT] Calling ${action} → ${directEndpoint}`);
+        try {
+            const response = await fetch(directEndpoint, {
+                method: 'POST',
+                headers: { 'Content-Type': 'text/xml; charset=utf-8', 'SOAPAction': `"${soapAction}"` },
+                body: signedXml,
+                signal: AbortSignal.timeout(SEND_TIMEOUT_MS)
+            });
+            return parseMinistryResponse(await response.text(), action);
+        } catch (err) {
+            if (err.name === 'TimeoutError') {
+                return { success: false, resultado: "TIMEOUT", error: "El Ministerio no responde (Timeout).", body: "", rawResponse: "" };
+            }
+            return { success: false, error: "Direct Connection Error: " + err.message, body: err.message };
+        }
+    }
 
     // PRIORITY 1: Use our own Supabase proxy (correct SOAPAction support)
     if (internalProxyUrl && relaySecret) {
@@ -262,7 +357,8 @@ async function sendToFomento(signedXml: string, action: string, isTest: boolean)
                     endpoint: endpoint,
                     signedXml: signedXml,
                     soapAction: soapAction
-                })
+                }),
+                signal: AbortSignal.timeout(SEND_TIMEOUT_MS)
             });
             const text = await response.text();
             try {
@@ -274,73 +370,15 @@ async function sendToFomento(signedXml: string, action: string, isTest: boolean)
 
                 const rawXml = proxyData.rawResponse || "";
                 
-                const isFault = /<[^>]*Fault[^>]*>/i.test(rawXml);
-                if (isFault) {
-                    const faultMatch = rawXml.match(/<faultstring[^>]*>(.*?)<\/faultstring>/i) || 
-                                       rawXml.match(/<[^>]*faultstring[^>]*>(.*?)<\/[^>]*faultstring>/i);
-                    const detailMatch = rawXml.match(/<detail[^>]*>(.*?)<\/detail>/i);
-                    const errorMsg = faultMatch ? faultMatch[1] : (detailMatch ? detailMatch[1] : "Error SOAP (Cuerpo no parseable)");
-                    return { success: false, resultado: "ERROR", error: `Ministerio: ${errorMsg}`, body: rawXml, rawResponse: rawXml };
-                }
-
-                // Parse resultado: try attribute first (alta/inicio), then element (consulta/anulacion)
-                const resultadoAttrMatch = rawXml.match(/resultado="([^"]+)"/i);
-                const resultadoElemMatch = rawXml.match(/<resultado[^>]*>([^<]+)<\/resultado>/i);
-                const resultado = resultadoAttrMatch ? resultadoAttrMatch[1] : (resultadoElemMatch ? resultadoElemMatch[1].trim() : null);
-
-                // Parse other fields - try attribute then element format
-                const iderrorMatch = rawXml.match(/iderror="([^"]+)"/i) || rawXml.match(/<iderror[^>]*>([^<]+)<\/iderror>/i);
-                const idservicioMatch = rawXml.match(/idservicio="([^"]+)"/i) || rawXml.match(/<idservicio[^>]*>([^<]+)<\/idservicio>/i);
-                const idcomunicaMatch = rawXml.match(/idcomunica="([^"]+)"/i) || rawXml.match(/<idcomunica[^>]*>([^<]+)<\/idcomunica>/i);
-                
-                // Log raw response for debugging
-                console.log(`[PROXY] resultado: "${resultado}", raw snippet: ${rawXml.substring(0, 300)}`);
-
-                const RVTC_ERRORS: Record<string, string> = {
-                    '00': 'OK - Servicio registrado correctamente',
-                    '0':  'OK - Servicio registrado correctamente',
-                    '51': 'El NIF que comunica no puede crear servicios para ese intermediario y matrícula',
-                    '52': 'EL NIF comunicado no puede gestionar servicios para esa matrícula',
-                    '53': 'El NIF del intermediario no es correcto',
-                    '54': 'El NIF del titular no es correcto',
-                    '55': 'La fecha de contrato debe ser anterior a la fecha prevista de inicio',
-                    '56': 'La fecha y hora prevista de inicio debe ser posterior a la fecha y hora actual',
-                    '57': 'La fecha fin del servicio debe ser igual o posterior a la fecha de inicio',
-                    '58': 'La provincia del contrato no es correcta',
-                    '59': 'La provincia de origen no es correcta',
-                    '60': 'La provincia de destino no es correcta',
-                    '61': 'La provincia del lugar más lejano no es correcta',
-                    '62': 'El municipio del contrato no es correcto',
-                    '63': 'El municipio inicio no es correcto',
-                    '64': 'El municipio fin no es correcto',
-                    '65': 'El municipio del lugar más lejano no es correcto',
-                    '66': 'Los lugares de inicio y fin son iguales. Debe comunicar el punto más lejano',
-                    '69': 'Error en el SW al crear el servicio',
-                    '79': 'El formato de la matrícula no es correcto',
-                    '83': 'El titular no dispone de la autorización de esa matrícula',
-                    '84': 'El NIF comunicado no puede gestionar servicios',
-                    '85': 'Error al crear el servicio',
-                };
-
-                const isSuccess = resultado === '00' || resultado === '0';
-                // For consulta: if resultado is null but no fault, treat as success and return raw XML
-                const consultaNoResult = action === 'consulta' && resultado === null && !rawXml.includes('Fault');
-                const errorMsg = (isSuccess || consultaNoResult) ? null : (RVTC_ERRORS[resultado ?? ''] || `Error Ministerio código: ${resultado} (iderror: ${iderrorMatch ? iderrorMatch[1] : 'N/A'})`);
-
-                return {
-                    success: isSuccess || consultaNoResult,
-                    resultado: resultado,
-                    error: errorMsg,
-                    idservicio: idservicioMatch ? idservicioMatch[1] : null,
-                    idcomunica: idcomunicaMatch ? idcomunicaMatch[1] : null,
-                    body: (isSuccess || consultaNoResult) ? rawXml : errorMsg,
-                    rawResponse: rawXml
-                };
+                return parseMinistryResponse(rawXml, action);
             } catch (e) {
                 console.error("[INTERNAL PROXY JSON ERROR]", text);
                 return { success: false, error: "Proxy JSON Error: " + e.message, body: text };
             }
         } catch (err) {
+            if (err.name === 'TimeoutError') {
+                return { success: false, resultado: "TIMEOUT", error: "El Ministerio no responde (Timeout).", body: "", rawResponse: "" };
+            }
             return { success: false, error: "Proxy Connection Error: " + err.message, body: err.message };
         }
     }
@@ -357,7 +395,8 @@ async function sendToFomento(signedXml: string, action: string, isTest: boolean)
                     soapBody: signedXml,
                     signedXml: signedXml,
                     soapAction: soapAction
-                })
+                }),
+                signal: AbortSignal.timeout(SEND_TIMEOUT_MS)
             });
             const text = await response.text();
             try {
@@ -409,12 +448,72 @@ async function sendToFomento(signedXml: string, action: string, isTest: boolean)
                 return { success: false, error: "Relay JSON Error: " + e.message, body: text };
             }
         } catch (err) {
+            if (err.name === 'TimeoutError') {
+                return { success: false, resultado: "TIMEOUT", error: "El Ministerio no responde (Timeout).", body: "", rawResponse: "" };
+            }
             return { success: false, error: "Relay Connection Error: " + err.message, body: err.message };
         }
     }
     return { success: false, error: "Faltan variables de entorno RELAY", body: "Configuración incompleta" };
 }
 
+const SOAP_ACTIONS = ['alta', 'anulacion', 'inicio', 'modificacion', 'consulta'];
+const DEFAULT_BATCH_CONCURRENCY = 4;
+const MAX_BATCH_CONCURRENCY = 8;
+const MAX_ATTEMPTS = 3;
+// A batch answers within BATCH_DEADLINE_MS + SEND_TIMEOUT_MS, well inside the edge
+// runtime's 150 s wall clock: no attempt starts after the deadline. Items never sent are
+// returned as NOT_SENT, which services/fomentoQueue.ts queues again (its request timeout
+// mirrors these two constants).
+const BATCH_DEADLINE_MS = 90000;
+
+/**
+ * Failures where the Ministry never processed the message. Timeouts are only retried for
+ * consulta: an alta that timed out may still have been registered.
+ */
+function isRetryable(action: string, res: any): boolean {
+    if (res.resultado === 'TIMEOUT') return action === 'consulta';
+    return !res.resultado && typeof res.error === 'string' && res.error.includes('Connection Error');
+}
+
+/**
+ * Signs and sends one communication, retrying transient failures with exponential backoff.
+ * The same signed envelope (and idcomunica) is resent on every attempt. No attempt starts
+ * after `deadline` (epoch ms); if none was made the result is NOT_SENT.
+ */
+async function communicate(action: string, payload: any, keys: KeyMaterial, maxAttempts: number, deadline = Infinity) {
+    if (Date.now() >= deadline) {
+        return { success: false, resultado: "NOT_SENT", error: "No enviado: tiempo del lote agotado", attempts: 0 };
+    }
+    const isTest = (Deno.env.get('FOMENTO_ENV') !== 'production') || (payload && payload.is_test === true);
+    const { signedXml, idcomunica } = createSignedSoap(action as any, payload, keys, isTest);
+
+    let fomentoRes: any;
+    let attempt = 0;
+    while (true) {
+        attempt++;
+        fomentoRes = await sendToFomento(signedXml, action, isTest);
+        if (attempt >= maxAttempts || !isRetryable(action, fomentoRes)) break;
+        const delay = 500 * 2 ** (attempt - 1) + Math.random() * 250;
+        if (Date.now() + delay >= deadline) break;
+        console.warn(`[FOMENTO-VTC] ${action} attempt ${attempt} failed (${fomentoRes.error}), retrying in ${Math.round(delay)} ms`);
+        await new Promise(resolve => setTimeout(resolve, delay));
+    }
+
+    return {
+        success: fomentoRes.success === true,
+        resultado: fomentoRes.resultado,
+        error: fomentoRes.error,
+        body: fomentoRes.body,
+        idservicio: fomentoRes.idservicio,
+        idcomunica: fomentoRes.idcomunica || idcomunica,
+        signedXml: signedXml,
+        rawResponse: fomentoRes.rawResponse || fomentoRes.body,
+        attempts: attempt,
+        isTest
+    };
+}
+
 Deno.serve(async (req) => {
     if (req.method === 'OPTIONS') {
         return new Response('ok', { headers: corsHeaders });
@@ -431,9 +530,9 @@ Deno.serve(async (req) => {
         }
 
         const bodyText = await req.text();
-        let action, payload;
+        let action, payload, body;
         try {
-            const body = JSON.parse(bodyText);
+            body = JSON.parse(bodyText);
             action = body.action;
             payload = body.payload;
         } catch (e) {
@@ -457,7 +556,7 @@ Deno.serve(async (req) => {
             }
         }
 
-        const { privateKeyPem, certificatePem } = extractPemFromP12(certBase64, certPassword);
+        const keys = getKeyMaterial(certBase64, certPassword);
 
         if (action === 'wsdl') {
             const wsdlUrl = 'https://presede.mitma.gob.es/MFOM.Services.VTC.Server/VTCPort?wsdl';
@@ -469,27 +568,47 @@ Deno.serve(async (req) => {
             });
         }
 
-        if (action === 'alta' || action === 'anulacion' || action === 'inicio' || action === 'modificacion' || action === 'consulta') {
-            const isTest = (Deno.env.get('FOMENTO_ENV') !== 'production') || (payload && payload.is_test === true);
-            const { signedXml, idcomunica } = createSignedSoap(action as any, payload, privateKeyPem, certificatePem, isTest);
+        if (action === 'batch') {
+            // Several communications in one call: bounded concurrency, retry with backoff
+            const items = Array.isArray(body.items) ? body.items : [];
+            const concurrency = Math.max(1, Math.min(Number(body.concurrency) || DEFAULT_BATCH_CONCURRENCY, MAX_BATCH_CONCURRENCY));
+            const deadline = Date.now() + BATCH_DEADLINE_MS;
+            const results = await mapWithConcurrency(items, concurrency, async (item: any) => {
+                if (!SOAP_ACTIONS.includes(item?.action)) {
+                    return { success: false, error: `Unsupported action: ${item?.action}` };
+                }
+                try {
+                    return await communicate(item.action, item.payload, keys, MAX_ATTEMPTS, deadline);
+                } catch (e) {
+                    return { success: false, error: e.message };
+                }
+            });
 
+            return new Response(JSON.stringify({
+                success: true,
+                results,
+                diagnostics: {
+                    hasRelayUrl: !!relayUrl,
+                    hasRelaySecret: !!relaySecret,
+                    fomentoEnv: Deno.env.get('FOMENTO_ENV') || 'not set',
+                    concurrency
+                }
+            }), {
+                headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+                status: 200,
+            });
+        }
 
-            const fomentoRes = await sendToFomento(signedXml, action, isTest);
+        if (SOAP_ACTIONS.includes(action)) {
+            const result = await communicate(action, payload, keys, 1);
 
             return new Response(JSON.stringify({
-                success: fomentoRes.success === true,
-                resultado: fomentoRes.resultado,
-                error: fomentoRes.error,
-                body: fomentoRes.body,
-                idservicio: fomentoRes.idservicio,
-                idcomunica: fomentoRes.idcomunica || idcomunica,
-                signedXml: signedXml, 
-                rawResponse: fomentoRes.rawResponse || fomentoRes.body,
+                ...result,
                 diagnostics: {
                     hasRelayUrl: !!relayUrl,
                     hasRelaySecret: !!relaySecret,
                     fomentoEnv: Deno.env.get('FOMENTO_ENV') || 'not set',
-                    isTest: isTest
+                    isTest: result.isTest
                 }
             }), {
                 headers: { ...corsHeaders, 'Content-Type': 'application/json' },
@@ -1,19 +1,23 @@
-import { serve } from "https://deno.land/std@0.168.0/http/server.ts";
-import { createClient } from "https://esm.sh/@supabase/supabase-js@2.21.0";
-import webpush from "npm:web-push@3.6.4";
+// @ts-ignore
+import { serve } from "https://deno.land/std@0.177.0/http/server.ts";
+// @ts-ignore
+import { createClient } from "https://esm.sh/@supabase/supabase-js@2.39.0";
+import { configureVapid, directory, pruneSubscriptions, sendPushBatch } from "../_shared/push.ts";
+
+declare const Deno: any;
 
 const corsHeaders = {
    'Access-Control-Allow-Origin': '*',
    'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
 };
 
-webpush.setVapidDetails(
-   'mailto:admin@palladiumtransfers.com',
-   Deno.env.get('VAPID_PUBLIC_KEY') || '',
-   Deno.env.get('VAPID_PRIVATE_KEY') || ''
-);
+interface Notification {
+   driver_id: string;
+   message: string;
+   title?: string;
+}
 
-serve(async (req) => {
+serve(async (req: Request) => {
    if (req.method === 'OPTIONS') {
       return new Response('ok', { headers: corsHeaders });
    }
@@ -23,63 +27,48 @@ serve(async (req) => {
          Deno.env.get('SUPABASE_URL') ?? '',
          Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') ?? ''
       );
+      configureVapid('mailto:admin@palladiumtransfers.com');
 
-      const { driver_id, message, title = "Aviso de Operaciones" } = await req.json();
+      // Either one notification ({ driver_id, message, title }) or a burst ({ notifications: [...] })
+      const body = await req.json();
+      const notifications: Notification[] = Array.isArray(body.notifications) ? body.notifications : [body];
 
-      if (!driver_id || !message) {
+      if (notifications.length === 0 || notifications.some(n => !n?.driver_id || !n?.message)) {
          throw new Error("Missing driver_id or message");
       }
 
-      // 1. Get driver's user_id
-      const { data: driver } = await supabase
-         .from('drivers')
-         .select('user_id')
-         .eq('id', driver_id)
-         .single();
+      // 1. Drivers' user ids and their push subscriptions, from the cached directory
+      await directory.refresh(supabase);
+      const drivers = await directory.usersForDrivers(supabase, notifications.map(n => n.driver_id));
+      const linked = notifications.filter(n => drivers.get(n.driver_id)?.userId);
 
-      if (!driver || !driver.user_id) {
+      if (linked.length === 0) {
          return new Response(JSON.stringify({ success: true, message: "Driver not linked to user, no push sent." }), {
             headers: { ...corsHeaders, 'Content-Type': 'application/json' },
          });
       }
 
-      // 2. Get active push subscriptions for this user
-      const { data: subs } = await supabase
-         .from('push_subscriptions')
-         .select('subscription')
-         .eq('user_id', driver.user_id);
+      const subsByUser = await directory.subscriptions(supabase, linked.map(n => drivers.get(n.driver_id)!.userId!));
 
-      if (!subs || subs.length === 0) {
+      if ([...subsByUser.values()].every(subs => subs.length === 0)) {
          return new Response(JSON.stringify({ success: true, message: "No push subscriptions found for driver." }), {
             headers: { ...corsHeaders, 'Content-Type': 'application/json' },
          });
       }
 
-      // 3. Send Push
-      const payload = JSON.stringify({
-         title,
-         body: message,
-         icon: '/icon-192.png',
-         url: '/app'
-      });
-
-      let sentCount = 0;
-      for (const sub of subs) {
-         try {
-            await webpush.sendNotification(sub.subscription, payload);
-            sentCount++;
-         } catch (error: any) {
-            console.error("Error sending push:", error);
-            if (error.statusCode === 410 || error.statusCode === 404) {
-               await supabase
-                  .from('push_subscriptions')
-                  .delete()
-                  .eq('subscription->>endpoint', sub.subscription.endpoint);
-            }
-         }
-      }
+      // 2. Send everything in one fan-out, then drop dead subscriptions in one delete
+      const batch = await sendPushBatch(linked.map(n => ({
+         userId: drivers.get(n.driver_id)!.userId!,
+         payload: JSON.stringify({
+            title: n.title ?? "Aviso de Operaciones",
+            body: n.message,
+            icon: '/icon-192.png',
+            url: '/app'
+         }),
+      })), subsByUser);
+      await pruneSubscriptions(supabase, batch.gone);
 
-      return new Response(JSON.stringify({ success: true, sent: sentCount }), {
+      return new Response(JSON.stringify({ success: true, sent: batch.sent }), {
          headers: { ...corsHeaders, 'Content-Type': 'application/json' },
       });
 
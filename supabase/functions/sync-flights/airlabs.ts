@@ -0,0 +1,113 @@
+// AirLabs lookups shared by every sync in this isolate.
+// Results are cached per flight_iata for a short TTL, and concurrent lookups of the
+// same flight share one request, so overlapping syncs (cron + "Sync" button) and
+// repeated flight numbers cost one radar call (plus one schedule call when the radar
+// has no times) per flight per TTL.
+
+const AIRLABS_BASE = (Deno.env.get('AIRLABS_BASE_URL') ?? 'https://airlabs.co/api/v9').replace(/\/$/, '')
+const CACHE_TTL_MS = Number(Deno.env.get('AIRLABS_CACHE_TTL_MS') ?? 60_000)
+const ARRIVAL_AIRPORT = 'ALC'
+
+export interface FlightLookup {
+  data: any | null
+  source: 'radar' | 'schedule' | 'mixed' | null
+}
+
+const cache = new Map<string, { expires: number; value: FlightLookup }>()
+const inFlight = new Map<string, Promise<FlightLookup>>()
+
+export const stats = { apiCalls: 0, cacheHits: 0, coalesced: 0 }
+
+async function airlabsGet(endpoint: 'flights' | 'schedules', flightIata: string, apiKey: string) {
+  stats.apiCalls++
+  const res = await fetch(`${AIRLABS_BASE}/${endpoint}?api_key=${apiKey}&flight_iata=${flightIata}&arr_iata=${ARRIVAL_AIRPORT}`)
+  if (!res.ok) {
+    console.warn(`AirLabs ${endpoint} error for ${flightIata}: ${res.statusText}`)
+    return null
+  }
+  const data = await res.json()
+  return data?.response?.length > 0 ? data.response[0] : null
+}
+
+async function fetchFlight(flightIata: string, apiKey: string): Promise<FlightLookup> {
+  // Radar (live flights) first; fall back to / merge with the schedule when times are missing
+  let flightData: any = null
+  let source: FlightLookup['source'] = null
+  try {
+    flightData = await airlabsGet('flights', flightIata, apiKey)
+    if (flightData) source = 'radar'
+  } catch (e) {
+    console.error(`Radar error for ${flightIata}:`, e)
+  }
+
+  const missingTimes = !flightData || (!flightData.arr_time_utc && !flightData.arr_time)
+  if (missingTimes) {
+    try {
+      const scheduleData = await airlabsGet('schedules', flightIata, apiKey)
+      if (scheduleData) {
+        // Radar wins for live state, schedule fills in the planned times
+        flightData = flightData ? { ...scheduleData, ...flightData } : scheduleData
+        source = source ? 'mixed' : 'schedule'
+      }
+    } catch (e) {
+      console.error(`Schedule error for ${flightIata}:`, e)
+    }
+  }
+
+  return { data: flightData, source }
+}
+
+export function lookupFlight(flightIata: string, apiKey: string): Promise<FlightLookup> {
+  const cached = cache.get(flightIata)
+  if (cached && cached.expires > Date.now()) {
+    stats.cacheHits++
+    return Promise.resolve(cached.value)
+  }
+
+  const pending = inFlight.get(flightIata)
+  if (pending) {
+    stats.coalesced++
+    return pending
+  }
+
+  const request = fetchFlight(flightIata, apiKey)
+    .then(value => {
+      cache.set(flightIata, { expires: Date.now() + CACHE_TTL_MS, value })
+      return value
+    })
+    .finally(() => inFlight.delete(flightIata))
+  inFlight.set(flightIata, request)
+  return request
+}
+
+export const normalizeFlightNumber = (n: string) => n.replace(/\s+/g, '').toUpperCase()
+
+/**
+ * Translates an AirLabs record into the columns of `flights`.
+ */
+export function toFlightColumns(flightData: any, previousStatus?: string) {
+  // AirLabs status translation: 'en-route', 'active', 'scheduled', 'landed', 'cancelled'
+  const airlabsStatus = (flightData.status || '').toLowerCase()
+  let status = previousStatus || 'Scheduled'
+  if (airlabsStatus === 'en-route' || airlabsStatus === 'active') {
+    status = flightData.delayed ? 'Delayed' : 'En Route'
+  } else if (airlabsStatus === 'landed') {
+    status = 'Landed'
+  } else if (airlabsStatus === 'cancelled') {
+    status = 'Cancelled'
+  } else if (airlabsStatus === 'scheduled') {
+    status = flightData.delayed ? 'Delayed' : 'Scheduled'
+  }
+
+  // The schedules endpoint sometimes returns arr_time/arr_estimated without _utc
+  const scheduled = flightData.arr_time_utc || flightData.arr_time || null
+  const estimated = flightData.arr_estimated_utc || flightData.arr_estimated || scheduled
+
+  let delay = flightData.delayed || 0
+  if (scheduled && estimated) {
+    const diff = Math.round((new Date(estimated).getTime() - new Date(scheduled).getTime()) / 60000)
+    if (diff !== 0) delay = diff // negative when early
+  }
+
+  return { status, delay, scheduled, estimated, origin: flightData.dep_iata || null }
+}
@@ -1,6 +1,9 @@
 import "jsr:@supabase/functions-js/edge-runtime.d.ts";
 import { serve } from "https://deno.land/std@0.177.0/http/server.ts"
 import { createClient } from "https://esm.sh/@supabase/supabase-js@2.39.0"
+import { mapWithConcurrency } from "../_shared/concurrency.ts"
+import { lookupFlight, normalizeFlightNumber, stats, toFlightColumns } from "./airlabs.ts"
+import { MAX_POLLS_PER_RUN, nextPollAt } from "./schedule.ts"
 
 // CORS headers
 const corsHeaders = {
@@ -8,6 +11,9 @@ const corsHeaders = {
   'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
 }
 
+const ACTIVE_STATUSES = ['Scheduled', 'En Route', 'Delayed', 'Taxiing', 'Final Approach']
+const FETCH_CONCURRENCY = Number(Deno.env.get('AIRLABS_CONCURRENCY') ?? 8)
+
 serve(async (req) => {
   if (req.method === 'OPTIONS') {
     return new Response('ok', { headers: corsHeaders })
@@ -26,89 +32,130 @@ serve(async (req) => {
       throw new Error("Missing VITE_AIRLABS_API_KEY")
     }
 
-    // 3. Find target flights: flights that are not 'Landed' or 'Cancelled' and are registered for today or tomorrow (basic filtering)
-    // We only want to sync flights that are actively pending to arrive
-    const { data: activeFlights, error: fetchError } = await supabaseClient
-      .from('flights')
-      .select('*')
-      .in('status', ['Scheduled', 'En Route', 'Delayed', 'Taxiing', 'Final Approach'])
-
+    // 3. Target flights: the numbers sent by the Operations Hub (flights not yet in the
+    //    table are auto-registered), or the pending flights whose next poll is due (cron)
+    const body = req.method === 'POST' ? await req.json().catch(() => ({})) : {}
+    const requested: string[] = Array.isArray(body?.flight_numbers)
+      ? [...new Set<string>(body.flight_numbers.filter(Boolean).map(normalizeFlightNumber))]
+      : []
+
+    // Requested numbers are matched on number_key (the normalized number), latest flight first
+    const { data: knownFlights, error: fetchError } = requested.length > 0
+      ? await supabaseClient
+        .from('flights')
+        .select('*')
+        .in('number_key', requested)
+        .order('scheduled', { ascending: false, nullsFirst: false })
+      : await supabaseClient
+        .from('flights')
+        .select('*')
+        .in('status', ACTIVE_STATUSES)
+        .or(`next_poll_at.is.null,next_poll_at.lte.${new Date().toISOString()}`)
+        .order('next_poll_at', { ascending: true, nullsFirst: true })
+        .limit(MAX_POLLS_PER_RUN)
     if (fetchError) throw fetchError;
-    if (!activeFlights || activeFlights.length === 0) {
-      return new Response(JSON.stringify({ message: "No active flights found to sync." }), {
+
+    const byNumber = new Map<string, any>()
+    for (const flight of knownFlights ?? []) {
+      const key = flight.number ? normalizeFlightNumber(flight.number) : ''
+      if (key && !byNumber.has(key)) byNumber.set(key, flight)
+    }
+    const targets = requested.length > 0 ? requested : [...byNumber.keys()]
+
+    if (targets.length === 0) {
+      return new Response(JSON.stringify({ message: "No flights due for sync." }), {
         headers: { ...corsHeaders, 'Content-Type': 'application/json' },
         status: 200,
       })
     }
 
-    // 4. Group flight numbers to minimize API calls (AirLabs allows multiple IATA codes if needed, or we just loop)
-    // AirLabs flight_iata search is direct. We will loop them for simplicity and stability
-
-    const results = [];
-    for (const flight of activeFlights) {
-      if (!flight.number) continue;
-
-      // Clean flight number from spaces (e.g. "FR 2070" -> "FR2070")
-      const flightIata = flight.number.replace(/\s+/g, '').toUpperCase();
-
-      console.log(`Checking flight ${flightIata}...`);
-
-      const airlabsRes = await fetch(`https://airlabs.co/api/v9/flights?api_key=${airlabsKey}&flight_iata=${flightIata}`);
-
-      if (!airlabsRes.ok) {
-        console.warn(`AirLabs API error for ${flightIata}: ${airlabsRes.statusText}`);
-        continue; // Skip and try the next one
-      }
-
-      const data = await airlabsRes.json();
-
-      if (data && data.response && data.response.length > 0) {
-        // AirLabs status translation: 'en-route', 'scheduled', 'landed', 'cancelled', 'delayed'
-        const flightData = data.response[0]; // Get the first match
-        let newStatus = flight.status;
-
-        switch (flightData.status) {
-          case 'en-route':
-          case 'active':
-            newStatus = flightData.delayed ? 'Delayed' : 'En Route';
-            break;
-          case 'scheduled':
-            newStatus = flightData.delayed ? 'Delayed' : 'Scheduled';
-            break;
-          case 'landed':
-            newStatus = 'Landed';
-            break;
-          case 'cancelled':
-            newStatus = 'Cancelled';
-            break;
-          default:
-            // Keep previous status for unknown states
-            newStatus = flight.status;
+    // 4. Look every flight up with bounded concurrency (cached / coalesced per flight_iata)
+    const callsBefore = stats.apiCalls
+    const hitsBefore = stats.cacheHits
+    const lookups = await mapWithConcurrency(targets, FETCH_CONCURRENCY, async flightIata => ({
+      flightIata,
+      ...(await lookupFlight(flightIata, airlabsKey)),
+    }))
+
+    // 5. Collect the changes and the new due times, and write them in one upsert + one insert
+    const nowMs = Date.now()
+    const now = new Date(nowMs).toISOString()
+    const polled: any[] = []
+    const created: any[] = []
+    const results: any[] = []
+
+    for (const { flightIata, data, source } of lookups) {
+      const existing = byNumber.get(flightIata)
+      if (!data) {
+        console.log(`No AirLabs data for ${flightIata}`)
+        if (existing) {
+          polled.push({
+            id: existing.id,
+            number: existing.number,
+            status: existing.status,
+            delay: existing.delay,
+            estimated: existing.estimated,
+            updated_at: existing.updated_at ?? null,
+            last_polled_at: now,
+            next_poll_at: nextPollAt(existing.estimated || existing.scheduled, nowMs),
+          })
         }
-
-        // Let's also guess if it's arriving soon by checking altitude or status speed if en-route, but 'En Route' or 'Delayed' is enough for Operation Hub.
-
-        // Check if there is a change to avoid unnecessary DB writes
-        if (newStatus !== flight.status) {
-          console.log(`Flight ${flight.number} changed status from ${flight.status} to ${newStatus}`);
-
-          const { error: updateError } = await supabaseClient
-            .from('flights')
-            .update({ status: newStatus, updated_at: new Date().toISOString() })
-            .eq('id', flight.id);
-
-          if (updateError) {
-            console.error(`Error updating flight ${flight.number}:`, updateError);
-          } else {
-            results.push({ flight: flight.number, oldStatus: flight.status, newStatus });
-          }
+        continue
+      }
+      const columns = toFlightColumns(data, existing?.status)
+      const eta = columns.estimated || columns.scheduled
+      console.log(`[AirLabs ${source}] ${flightIata}: Status=${columns.status}, Delay=${columns.delay}, ETA=${columns.estimated}`)
+
+      if (existing) {
+        const hasChange = columns.status !== existing.status
+          || columns.delay !== (existing.delay || 0)
+          || (columns.estimated || '') !== (existing.estimated || '')
+        // Every row carries the same columns: a bulk upsert fills missing keys with NULL
+        polled.push({
+          id: existing.id,
+          number: existing.number,
+          status: columns.status,
+          delay: columns.delay,
+          estimated: columns.estimated,
+          updated_at: hasChange ? now : (existing.updated_at ?? null),
+          last_polled_at: now,
+          next_poll_at: nextPollAt(eta, nowMs),
+        })
+        if (hasChange) {
+          results.push({ flight: flightIata, oldStatus: existing.status, newStatus: columns.status, delay: columns.delay })
         }
-      } else {
-        console.log(`No live radar tracking found directly right now for ${flight.number}`);
+      } else if (requested.length > 0) {
+        created.push({
+          number: flightIata,
+          status: columns.status,
+          delay: columns.delay,
+          scheduled: columns.scheduled,
+          estimated: columns.estimated,
+          origin: columns.origin || 'Sincronizado',
+          updated_at: now,
+          last_polled_at: now,
+          next_poll_at: nextPollAt(eta, nowMs),
+        })
+        results.push({ flight: flightIata, newStatus: columns.status, delay: columns.delay, created: true })
       }
     }
 
-    return new Response(JSON.stringify({ message: "Sync complete", updated: results }), {
+    if (polled.length > 0) {
+      const { error } = await supabaseClient.from('flights').upsert(polled, { onConflict: 'id' })
+      if (error) throw error
+    }
+    if (created.length > 0) {
+      const { error } = await supabaseClient.from('flights').insert(created)
+      if (error) throw error
+    }
+
+    return new Response(JSON.stringify({
+      message: "Sync complete",
+      updated: results,
+      checked: targets.length,
+      api_calls: stats.apiCalls - callsBefore,
+      cache_hits: stats.cacheHits - hitsBefore,
+    }), {
       headers: { ...corsHeaders, 'Content-Type': 'application/json' },
       status: 200,
     })
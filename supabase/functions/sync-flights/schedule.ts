@@ -0,0 +1,41 @@
+// Adaptive polling: how soon a flight should be looked up again, from its ETA at ALC.
+// flights.next_poll_at is the queue (partial index ordered by due time); each cron run
+// takes the flights that are due, earliest first, and reschedules every flight it polled.
+
+const MINUTE = 60_000
+
+// [minutes to arrival at least, poll every n minutes]; first match wins
+const POLL_INTERVALS: [number, number][] = [
+  [360, 60],   // more than 6 h out: hourly
+  [120, 30],
+  [45, 10],
+  [-30, 3],    // final 45 min and the first half hour after the ETA: every few minutes
+  [-180, 10],  // overdue and not landed yet
+]
+const FALLBACK_INTERVAL = 60 // no ETA, no data, or long overdue
+const CLOSE_WINDOW = 45
+
+export const MAX_POLLS_PER_RUN = Number(Deno.env.get('AIRLABS_MAX_POLLS_PER_RUN') ?? 100)
+
+export function pollIntervalMinutes(eta: string | null | undefined, now = Date.now()): number {
+  if (!eta) return FALLBACK_INTERVAL
+  const minutesOut = (new Date(eta).getTime() - now) / MINUTE
+  if (Number.isNaN(minutesOut)) return FALLBACK_INTERVAL
+  for (const [threshold, interval] of POLL_INTERVALS) {
+    if (minutesOut >= threshold) return interval
+  }
+  return FALLBACK_INTERVAL
+}
+
+/**
+ * Next due time for a flight just polled. Never lets a long interval jump over the
+ * start of the final 45 minutes, so the first close-in poll happens on time.
+ */
+export function nextPollAt(eta: string | null | undefined, now = Date.now()): string {
+  let due = now + pollIntervalMinutes(eta, now) * MINUTE
+  if (eta) {
+    const windowStart = new Date(eta).getTime() - CLOSE_WINDOW * MINUTE
+    if (windowStart > now && windowStart < due) due = windowStart
+  }
+  return new Date(due).toISOString()
+}
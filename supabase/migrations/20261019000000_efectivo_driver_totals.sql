@@ -0,0 +1,140 @@
+-- Migration: Efectivo running totals per (cycle, driver)
+-- Date: 2026-10-19
+-- Keeps efectivo_driver_totals in sync with the uber/vgd/entrega/expense/initial-balance
+-- record tables so CashReconciliationView reads one small row per driver instead of
+-- every uploaded record of the cycle. Maintained by statement-level triggers, so a
+-- 5,000-row upload batch costs one grouped upsert, not 5,000 row updates.
+-- scripts/efectivo_totals.py rebuilds and verifies the table against a full recompute.
+
+CREATE TABLE IF NOT EXISTS public.efectivo_driver_totals (
+  cycle_id BIGINT NOT NULL REFERENCES public.efectivo_cycles(id) ON DELETE CASCADE,
+  driver_name TEXT NOT NULL,
+  saldo_inicial NUMERIC NOT NULL DEFAULT 0.0,
+  uber_cash_collected NUMERIC NOT NULL DEFAULT 0.0,
+  vgd_cash_collected NUMERIC NOT NULL DEFAULT 0.0,
+  cash_delivered NUMERIC NOT NULL DEFAULT 0.0,
+  gastos NUMERIC NOT NULL DEFAULT 0.0,
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (cycle_id, driver_name)
+);
+
+ALTER TABLE public.efectivo_driver_totals ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow auth access for efectivo_driver_totals" ON public.efectivo_driver_totals;
+CREATE POLICY "Allow auth access for efectivo_driver_totals" ON public.efectivo_driver_totals FOR ALL TO authenticated USING (true) WITH CHECK (true);
+
+-- 1. Delta application
+-- TG_ARGV[0] = value column in the record table, TG_ARGV[1] = totals column.
+-- Transition tables are always named new_rows / old_rows.
+-- Removals only touch existing totals rows: when a cycle is deleted its totals
+-- are cascaded away before the record-table triggers fire.
+CREATE OR REPLACE FUNCTION public.efectivo_sync_driver_totals()
+RETURNS TRIGGER AS $$
+DECLARE
+    value_col TEXT := TG_ARGV[0];
+    totals_col TEXT := TG_ARGV[1];
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        EXECUTE format(
+            'UPDATE public.efectivo_driver_totals t
+                SET %1$I = t.%1$I - d.delta, updated_at = NOW()
+               FROM (SELECT cycle_id, driver_name, SUM(COALESCE(%2$I, 0)) AS delta
+                       FROM old_rows WHERE cycle_id IS NOT NULL
+                      GROUP BY cycle_id, driver_name) d
+              WHERE t.cycle_id = d.cycle_id AND t.driver_name = d.driver_name',
+            totals_col, value_col);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE format(
+            'INSERT INTO public.efectivo_driver_totals AS t (cycle_id, driver_name, %1$I)
+             SELECT cycle_id, driver_name, SUM(COALESCE(%2$I, 0))
+               FROM new_rows WHERE cycle_id IS NOT NULL
+              GROUP BY cycle_id, driver_name
+             ON CONFLICT (cycle_id, driver_name)
+             DO UPDATE SET %1$I = t.%1$I + EXCLUDED.%1$I, updated_at = NOW()',
+            totals_col, value_col);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.efectivo_sync_driver_totals() FROM PUBLIC;
+
+-- 2. Triggers (transition tables require one trigger per event)
+DO $$
+DECLARE
+    src RECORD;
+BEGIN
+    FOR src IN
+        SELECT * FROM (VALUES
+            ('efectivo_initial_balances', 'balance',        'saldo_inicial'),
+            ('efectivo_uber_records',     'cash_collected', 'uber_cash_collected'),
+            ('efectivo_vgd_records',      'cash_collected', 'vgd_cash_collected'),
+            ('efectivo_entrega_records',  'amount',         'cash_delivered'),
+            ('efectivo_expense_records',  'amount',         'gastos')
+        ) AS s(table_name, value_col, totals_col)
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trigger_%1$s_totals_ins ON public.%1$I;', src.table_name);
+        EXECUTE format('DROP TRIGGER IF EXISTS trigger_%1$s_totals_upd ON public.%1$I;', src.table_name);
+        EXECUTE format('DROP TRIGGER IF EXISTS trigger_%1$s_totals_del ON public.%1$I;', src.table_name);
+
+        EXECUTE format('CREATE TRIGGER trigger_%1$s_totals_ins AFTER INSERT ON public.%1$I
+                        REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION public.efectivo_sync_driver_totals(%2$L, %3$L);',
+                       src.table_name, src.value_col, src.totals_col);
+        EXECUTE format('CREATE TRIGGER trigger_%1$s_totals_upd AFTER UPDATE ON public.%1$I
+                        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION public.efectivo_sync_driver_totals(%2$L, %3$L);',
+                       src.table_name, src.value_col, src.totals_col);
+        EXECUTE format('CREATE TRIGGER trigger_%1$s_totals_del AFTER DELETE ON public.%1$I
+                        REFERENCING OLD TABLE AS old_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION public.efectivo_sync_driver_totals(%2$L, %3$L);',
+                       src.table_name, src.value_col, src.totals_col);
+    END LOOP;
+END $$;
+
+-- 3. Full recompute (used for backfill and by scripts/efectivo_totals.py)
+CREATE OR REPLACE FUNCTION public.efectivo_rebuild_driver_totals(p_cycle_id BIGINT DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    affected INTEGER;
+BEGIN
+    DELETE FROM public.efectivo_driver_totals
+     WHERE p_cycle_id IS NULL OR cycle_id = p_cycle_id;
+
+    INSERT INTO public.efectivo_driver_totals
+        (cycle_id, driver_name, saldo_inicial, uber_cash_collected, vgd_cash_collected, cash_delivered, gastos)
+    SELECT cycle_id, driver_name,
+           SUM(saldo_inicial), SUM(uber_cash_collected), SUM(vgd_cash_collected), SUM(cash_delivered), SUM(gastos)
+      FROM (
+        SELECT cycle_id, driver_name, COALESCE(balance, 0) AS saldo_inicial, 0 AS uber_cash_collected, 0 AS vgd_cash_collected, 0 AS cash_delivered, 0 AS gastos
+          FROM public.efectivo_initial_balances
+        UNION ALL
+        SELECT cycle_id, driver_name, 0, COALESCE(cash_collected, 0), 0, 0, 0 FROM public.efectivo_uber_records
+        UNION ALL
+        SELECT cycle_id, driver_name, 0, 0, COALESCE(cash_collected, 0), 0, 0 FROM public.efectivo_vgd_records
+        UNION ALL
+        SELECT cycle_id, driver_name, 0, 0, 0, COALESCE(amount, 0), 0 FROM public.efectivo_entrega_records
+        UNION ALL
+        SELECT cycle_id, driver_name, 0, 0, 0, 0, COALESCE(amount, 0) FROM public.efectivo_expense_records
+      ) records
+     WHERE cycle_id IS NOT NULL
+       AND (p_cycle_id IS NULL OR cycle_id = p_cycle_id)
+     GROUP BY cycle_id, driver_name;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- A full rebuild is for the service role only (scripts/efectivo_totals.py)
+REVOKE EXECUTE ON FUNCTION public.efectivo_rebuild_driver_totals(BIGINT) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.efectivo_rebuild_driver_totals(BIGINT) TO service_role;
+
+GRANT SELECT ON TABLE public.efectivo_driver_totals TO anon;
+GRANT SELECT, INSERT, UPDATE, DELETE ON TABLE public.efectivo_driver_totals TO authenticated, service_role;
+
+-- 4. Backfill existing cycles
+SELECT public.efectivo_rebuild_driver_totals();
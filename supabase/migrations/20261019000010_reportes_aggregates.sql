@@ -0,0 +1,94 @@
+-- Migration: Server-side aggregates for ReportesView
+-- Date: 2026-10-19
+-- ReportesView used to download the whole bookings, vehicle_expenses, vehicles and
+-- invoices tables and filter/reduce them in the browser for the current and the
+-- previous period. report_period_summary() does the same grouping in the database
+-- over indexed date ranges and returns only the aggregates.
+
+-- 1. Columns the report already reads from bookings
+ALTER TABLE public.bookings ADD COLUMN IF NOT EXISTS vehicle_id UUID REFERENCES public.vehicles(id) ON DELETE SET NULL;
+
+-- 2. Range indexes for the period filters
+CREATE INDEX IF NOT EXISTS idx_bookings_pickup_date ON public.bookings (pickup_date);
+CREATE INDEX IF NOT EXISTS idx_vehicle_expenses_date ON public.vehicle_expenses (date);
+CREATE INDEX IF NOT EXISTS idx_invoices_date_issued ON public.invoices (date_issued);
+
+-- 3. Expense categories, shared with the rollup refresh
+CREATE OR REPLACE FUNCTION public.report_expense_category(p_expense_type TEXT)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN p_expense_type IN ('Combustible', 'Electricidad') THEN 'fuel'
+        WHEN p_expense_type IN ('Taller / Mantenimiento', 'ITV') THEN 'maintenance'
+        ELSE 'other'
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 4. Period summary
+-- Dates are inclusive. Growth and percentages are derived client-side from the raw sums.
+CREATE OR REPLACE FUNCTION public.report_period_summary(
+    p_start DATE, p_end DATE, p_prev_start DATE, p_prev_end DATE
+)
+RETURNS JSONB AS $$
+    WITH cur_bookings AS (
+        SELECT vehicle_id, COALESCE(price, 0)::numeric AS price
+          FROM public.bookings
+         WHERE pickup_date >= p_start AND pickup_date < p_end + 1
+           AND status IS DISTINCT FROM 'Cancelled'
+    ),
+    cur_expenses AS (
+        SELECT e.*, public.report_expense_category(e.expense_type) AS category
+          FROM public.vehicle_expenses e
+         WHERE e.date BETWEEN p_start AND p_end
+    ),
+    per_vehicle AS (
+        SELECT v.id, v.model AS name, v.plate,
+               COALESCE(br.revenue, 0) AS revenue,
+               COALESCE(ec.cost, 0) AS cost
+          FROM public.vehicles v
+          LEFT JOIN (SELECT vehicle_id, SUM(price) AS revenue FROM cur_bookings GROUP BY vehicle_id) br ON br.vehicle_id = v.id
+          LEFT JOIN (SELECT vehicle_id, SUM(amount) AS cost FROM cur_expenses GROUP BY vehicle_id) ec ON ec.vehicle_id = v.id
+    )
+    SELECT jsonb_build_object(
+        'total_revenue', (SELECT COALESCE(SUM(price), 0) FROM cur_bookings),
+        'prev_revenue', (
+            SELECT COALESCE(SUM(COALESCE(price, 0)::numeric), 0)
+              FROM public.bookings
+             WHERE pickup_date >= p_prev_start AND pickup_date < p_prev_end + 1
+               AND status IS DISTINCT FROM 'Cancelled'
+        ),
+        'total_collected', (
+            SELECT COALESCE(SUM(total_amount), 0) FROM public.invoices
+             WHERE date_issued BETWEEN p_start AND p_end AND status = 'Paid'
+        ),
+        'total_pending', (
+            SELECT COALESCE(SUM(total_amount), 0) FROM public.invoices
+             WHERE date_issued BETWEEN p_start AND p_end AND status NOT IN ('Paid', 'Cancelled')
+        ),
+        'fuel_cost', (SELECT COALESCE(SUM(amount), 0) FROM cur_expenses WHERE category = 'fuel'),
+        'maintenance_cost', (SELECT COALESCE(SUM(amount), 0) FROM cur_expenses WHERE category = 'maintenance'),
+        'other_cost', (SELECT COALESCE(SUM(amount), 0) FROM cur_expenses WHERE category = 'other'),
+        'vehicles_in_shop', (SELECT COUNT(*) FROM public.vehicles WHERE status = 'Taller'),
+        'max_vehicle_revenue', (SELECT COALESCE(MAX(revenue), 0) FROM per_vehicle),
+        'recent_expenses', COALESCE((
+            SELECT jsonb_agg(r ORDER BY r.date DESC)
+              FROM (
+                SELECT e.id, e.date, e.description, e.expense_type, e.amount, v.plate, v.model
+                  FROM cur_expenses e
+                  LEFT JOIN public.vehicles v ON v.id = e.vehicle_id
+                 ORDER BY e.date DESC
+                 LIMIT 5
+              ) r
+        ), '[]'::jsonb),
+        'vehicle_profitability', COALESCE((
+            SELECT jsonb_agg(p ORDER BY p.profit DESC)
+              FROM (
+                SELECT id, name, plate, revenue, cost, revenue - cost AS profit
+                  FROM per_vehicle
+                 ORDER BY revenue - cost DESC
+                 LIMIT 3
+              ) p
+        ), '[]'::jsonb)
+    );
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION public.report_period_summary(DATE, DATE, DATE, DATE) TO authenticated, service_role;
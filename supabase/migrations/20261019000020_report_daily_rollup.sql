@@ -0,0 +1,236 @@
+-- Migration: Daily rollup store for ReportesView
+-- Date: 2026-10-19
+-- One row per (day, vehicle, client, status) holding the sums the reports need, kept
+-- up to date from bookings, invoices and vehicle_expenses by statement-level triggers.
+-- Any report window becomes a sum over at most a few hundred rows per day range
+-- instead of a scan of the raw history.
+-- `status` is the booking status for revenue/booking_count and the invoice status for
+-- invoiced_amount/invoice_count; expense rows carry a NULL status.
+-- scripts/report_rollup.py rebuilds the store from scratch and verifies it.
+
+CREATE TABLE IF NOT EXISTS public.report_daily_rollup (
+    day DATE NOT NULL,
+    vehicle_id UUID,
+    client_id UUID,
+    status TEXT,
+    revenue NUMERIC NOT NULL DEFAULT 0,
+    booking_count INTEGER NOT NULL DEFAULT 0,
+    invoiced_amount NUMERIC NOT NULL DEFAULT 0,
+    invoice_count INTEGER NOT NULL DEFAULT 0,
+    fuel_cost NUMERIC NOT NULL DEFAULT 0,
+    maintenance_cost NUMERIC NOT NULL DEFAULT 0,
+    other_cost NUMERIC NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    CONSTRAINT report_daily_rollup_key UNIQUE NULLS NOT DISTINCT (day, vehicle_id, client_id, status)
+);
+
+CREATE INDEX IF NOT EXISTS idx_report_daily_rollup_day ON public.report_daily_rollup (day);
+
+ALTER TABLE public.report_daily_rollup ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow authenticated access to report_daily_rollup" ON public.report_daily_rollup;
+CREATE POLICY "Allow authenticated access to report_daily_rollup" ON public.report_daily_rollup FOR ALL TO authenticated USING (true) WITH CHECK (true);
+
+-- 1. Per-source contribution queries
+-- Returns a SELECT producing rollup-shaped rows from `rel` (a table or transition table).
+CREATE OR REPLACE FUNCTION public.report_rollup_source_sql(p_source TEXT, p_rel TEXT)
+RETURNS TEXT AS $$
+BEGIN
+    RETURN CASE p_source
+        WHEN 'bookings' THEN format(
+            'SELECT pickup_date::date AS day, vehicle_id, client_id, status,
+                    COALESCE(price, 0)::numeric AS revenue, 1 AS booking_count,
+                    0::numeric AS invoiced_amount, 0 AS invoice_count,
+                    0::numeric AS fuel_cost, 0::numeric AS maintenance_cost, 0::numeric AS other_cost
+               FROM %s WHERE pickup_date IS NOT NULL', p_rel)
+        WHEN 'invoices' THEN format(
+            'SELECT date_issued AS day, NULL::uuid AS vehicle_id, client_id, status,
+                    0::numeric AS revenue, 0 AS booking_count,
+                    COALESCE(total_amount, 0)::numeric AS invoiced_amount, 1 AS invoice_count,
+                    0::numeric AS fuel_cost, 0::numeric AS maintenance_cost, 0::numeric AS other_cost
+               FROM %s WHERE date_issued IS NOT NULL', p_rel)
+        WHEN 'vehicle_expenses' THEN format(
+            'SELECT date AS day, vehicle_id, NULL::uuid AS client_id, NULL::text AS status,
+                    0::numeric AS revenue, 0 AS booking_count, 0::numeric AS invoiced_amount, 0 AS invoice_count,
+                    CASE WHEN public.report_expense_category(expense_type) = ''fuel'' THEN COALESCE(amount, 0) ELSE 0 END AS fuel_cost,
+                    CASE WHEN public.report_expense_category(expense_type) = ''maintenance'' THEN COALESCE(amount, 0) ELSE 0 END AS maintenance_cost,
+                    CASE WHEN public.report_expense_category(expense_type) = ''other'' THEN COALESCE(amount, 0) ELSE 0 END AS other_cost
+               FROM %s WHERE date IS NOT NULL', p_rel)
+    END;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Columns whose change moves a row between rollup buckets or changes its sums.
+CREATE OR REPLACE FUNCTION public.report_rollup_tracked_columns(p_source TEXT)
+RETURNS TEXT AS $$
+    SELECT CASE p_source
+        WHEN 'bookings' THEN 'pickup_date, vehicle_id, client_id, status, price'
+        WHEN 'invoices' THEN 'date_issued, client_id, status, total_amount'
+        WHEN 'vehicle_expenses' THEN 'date, vehicle_id, expense_type, amount'
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 2. Delta application (sign = -1 removes old contributions, +1 adds new ones)
+-- Returns the statement instead of running it: transition tables are only visible to
+-- SQL executed directly by the trigger function, not by functions it calls.
+CREATE OR REPLACE FUNCTION public.report_rollup_merge_sql(p_contrib_sql TEXT, p_sign INTEGER)
+RETURNS TEXT AS $$
+BEGIN
+    RETURN format(
+        'INSERT INTO public.report_daily_rollup AS t
+            (day, vehicle_id, client_id, status, revenue, booking_count, invoiced_amount, invoice_count,
+             fuel_cost, maintenance_cost, other_cost)
+         SELECT day, vehicle_id, client_id, status,
+                %1$s * SUM(revenue), %1$s * SUM(booking_count), %1$s * SUM(invoiced_amount), %1$s * SUM(invoice_count),
+                %1$s * SUM(fuel_cost), %1$s * SUM(maintenance_cost), %1$s * SUM(other_cost)
+           FROM (%2$s) c
+          GROUP BY day, vehicle_id, client_id, status
+         ON CONFLICT ON CONSTRAINT report_daily_rollup_key DO UPDATE SET
+            revenue = t.revenue + EXCLUDED.revenue,
+            booking_count = t.booking_count + EXCLUDED.booking_count,
+            invoiced_amount = t.invoiced_amount + EXCLUDED.invoiced_amount,
+            invoice_count = t.invoice_count + EXCLUDED.invoice_count,
+            fuel_cost = t.fuel_cost + EXCLUDED.fuel_cost,
+            maintenance_cost = t.maintenance_cost + EXCLUDED.maintenance_cost,
+            other_cost = t.other_cost + EXCLUDED.other_cost,
+            updated_at = NOW()',
+        p_sign, p_contrib_sql);
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION public.report_rollup_sync()
+RETURNS TRIGGER AS $$
+DECLARE
+    tracked TEXT := public.report_rollup_tracked_columns(TG_TABLE_NAME);
+    old_rel TEXT := 'old_rows';
+    new_rel TEXT := 'new_rows';
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        -- GPS, notes and status-timestamp writes are the bulk of booking updates;
+        -- only rows whose tracked columns changed are moved between buckets.
+        old_rel := format(
+            '(SELECT o.* FROM old_rows o JOIN new_rows n ON n.id = o.id
+               WHERE (%1$s) IS DISTINCT FROM (%2$s)) changed',
+            regexp_replace(tracked, '(\w+)', 'o.\1', 'g'), regexp_replace(tracked, '(\w+)', 'n.\1', 'g'));
+        new_rel := format(
+            '(SELECT n.* FROM new_rows n JOIN old_rows o ON o.id = n.id
+               WHERE (%1$s) IS DISTINCT FROM (%2$s)) changed',
+            regexp_replace(tracked, '(\w+)', 'o.\1', 'g'), regexp_replace(tracked, '(\w+)', 'n.\1', 'g'));
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        EXECUTE public.report_rollup_merge_sql(public.report_rollup_source_sql(TG_TABLE_NAME, old_rel), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE public.report_rollup_merge_sql(public.report_rollup_source_sql(TG_TABLE_NAME, new_rel), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.report_rollup_sync() FROM PUBLIC;
+
+-- 3. Triggers (transition tables require one trigger per event)
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['bookings', 'invoices', 'vehicle_expenses']
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trigger_%1$s_rollup_ins ON public.%1$I;', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS trigger_%1$s_rollup_upd ON public.%1$I;', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS trigger_%1$s_rollup_del ON public.%1$I;', t);
+
+        EXECUTE format('CREATE TRIGGER trigger_%1$s_rollup_ins AFTER INSERT ON public.%1$I
+                        REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION public.report_rollup_sync();', t);
+        EXECUTE format('CREATE TRIGGER trigger_%1$s_rollup_upd AFTER UPDATE ON public.%1$I
+                        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION public.report_rollup_sync();', t);
+        EXECUTE format('CREATE TRIGGER trigger_%1$s_rollup_del AFTER DELETE ON public.%1$I
+                        REFERENCING OLD TABLE AS old_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION public.report_rollup_sync();', t);
+    END LOOP;
+END $$;
+
+-- 4. Rebuild from scratch (backfill and scripts/report_rollup.py --rebuild)
+CREATE OR REPLACE FUNCTION public.report_rebuild_daily_rollup()
+RETURNS INTEGER AS $$
+DECLARE
+    affected INTEGER;
+BEGIN
+    DELETE FROM public.report_daily_rollup WHERE true;
+    EXECUTE public.report_rollup_merge_sql(public.report_rollup_source_sql('bookings', 'public.bookings'), 1);
+    EXECUTE public.report_rollup_merge_sql(public.report_rollup_source_sql('invoices', 'public.invoices'), 1);
+    EXECUTE public.report_rollup_merge_sql(public.report_rollup_source_sql('vehicle_expenses', 'public.vehicle_expenses'), 1);
+    SELECT COUNT(*) INTO affected FROM public.report_daily_rollup;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- A full rebuild is for the service role only (scripts/report_rollup.py)
+REVOKE EXECUTE ON FUNCTION public.report_rebuild_daily_rollup() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.report_rebuild_daily_rollup() TO service_role;
+
+-- 5. report_period_summary now sums rollup rows instead of scanning raw tables
+CREATE OR REPLACE FUNCTION public.report_period_summary(
+    p_start DATE, p_end DATE, p_prev_start DATE, p_prev_end DATE
+)
+RETURNS JSONB AS $$
+    WITH cur AS (
+        SELECT * FROM public.report_daily_rollup WHERE day BETWEEN p_start AND p_end
+    ),
+    per_vehicle AS (
+        SELECT v.id, v.model AS name, v.plate,
+               COALESCE(r.revenue, 0) AS revenue,
+               COALESCE(r.cost, 0) AS cost
+          FROM public.vehicles v
+          LEFT JOIN (
+              SELECT vehicle_id,
+                     SUM(revenue) FILTER (WHERE status IS DISTINCT FROM 'Cancelled') AS revenue,
+                     SUM(fuel_cost + maintenance_cost + other_cost) AS cost
+                FROM cur
+               GROUP BY vehicle_id
+          ) r ON r.vehicle_id = v.id
+    )
+    SELECT jsonb_build_object(
+        'total_revenue', (SELECT COALESCE(SUM(revenue), 0) FROM cur WHERE status IS DISTINCT FROM 'Cancelled'),
+        'prev_revenue', (
+            SELECT COALESCE(SUM(revenue), 0) FROM public.report_daily_rollup
+             WHERE day BETWEEN p_prev_start AND p_prev_end AND status IS DISTINCT FROM 'Cancelled'
+        ),
+        'total_collected', (SELECT COALESCE(SUM(invoiced_amount), 0) FROM cur WHERE status = 'Paid'),
+        'total_pending', (SELECT COALESCE(SUM(invoiced_amount), 0) FROM cur WHERE status NOT IN ('Paid', 'Cancelled')),
+        'fuel_cost', (SELECT COALESCE(SUM(fuel_cost), 0) FROM cur),
+        'maintenance_cost', (SELECT COALESCE(SUM(maintenance_cost), 0) FROM cur),
+        'other_cost', (SELECT COALESCE(SUM(other_cost), 0) FROM cur),
+        'vehicles_in_shop', (SELECT COUNT(*) FROM public.vehicles WHERE status = 'Taller'),
+        'max_vehicle_revenue', (SELECT COALESCE(MAX(revenue), 0) FROM per_vehicle),
+        'recent_expenses', COALESCE((
+            SELECT jsonb_agg(r ORDER BY r.date DESC)
+              FROM (
+                SELECT e.id, e.date, e.description, e.expense_type, e.amount, v.plate, v.model
+                  FROM public.vehicle_expenses e
+                  LEFT JOIN public.vehicles v ON v.id = e.vehicle_id
+                 WHERE e.date BETWEEN p_start AND p_end
+                 ORDER BY e.date DESC
+                 LIMIT 5
+              ) r
+        ), '[]'::jsonb),
+        'vehicle_profitability', COALESCE((
+            SELECT jsonb_agg(p ORDER BY p.profit DESC)
+              FROM (
+                SELECT id, name, plate, revenue, cost, revenue - cost AS profit
+                  FROM per_vehicle
+                 ORDER BY revenue - cost DESC
+                 LIMIT 3
+              ) p
+        ), '[]'::jsonb)
+    );
+$$ LANGUAGE sql STABLE;
+
+GRANT SELECT ON TABLE public.report_daily_rollup TO anon;
+GRANT SELECT, INSERT, UPDATE, DELETE ON TABLE public.report_daily_rollup TO authenticated, service_role;
+
+-- 6. Backfill
+SELECT public.report_rebuild_daily_rollup();
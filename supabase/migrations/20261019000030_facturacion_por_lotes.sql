@@ -0,0 +1,82 @@
+-- Migración: Facturación por lotes (cierre de mes)
+-- Fecha: 2026-10-19
+-- generate_invoices_batch() agrupa en una sola consulta todas las reservas sin facturar
+-- del período por cliente, calcula los totales, asigna números de factura correlativos
+-- y enlaza las reservas, todo dentro de una única transacción.
+-- useInvoices.generateInvoice (un cliente) y generateInvoicesBatch (todos) la usan.
+
+-- Columna heredada que la app sigue rellenando por compatibilidad
+ALTER TABLE public.invoices ADD COLUMN IF NOT EXISTS amount NUMERIC;
+
+-- Índice para localizar reservas pendientes de facturar por fecha
+CREATE INDEX IF NOT EXISTS idx_bookings_uninvoiced_pickup_date
+    ON public.bookings (pickup_date, client_id)
+    WHERE invoice_id IS NULL;
+
+CREATE OR REPLACE FUNCTION public.generate_invoices_batch(
+    p_start DATE,
+    p_end DATE,
+    p_client_ids UUID[] DEFAULT NULL,
+    p_tax_rate NUMERIC DEFAULT 10
+)
+RETURNS SETOF public.invoices AS $$
+DECLARE
+    v_year TEXT := to_char(CURRENT_DATE, 'YYYY');
+    v_last INTEGER;
+BEGIN
+    -- Serializa la numeración: dos cierres simultáneos no pueden repetir número
+    PERFORM pg_advisory_xact_lock(hashtext('invoice_number_' || v_year));
+
+    -- Máximo del sufijo numérico, no del texto: 'F-2026-9999' > 'F-2026-10000' como cadena
+    SELECT COALESCE(MAX(NULLIF(split_part(invoice_number, '-', 3), '')::INTEGER), 0)
+      INTO v_last
+      FROM public.invoices
+     WHERE invoice_number ~ ('^F-' || v_year || '-[0-9]+$');
+
+    RETURN QUERY
+    WITH pending AS (
+        SELECT b.id, b.client_id, COALESCE(b.price, 0)::numeric AS price
+          FROM public.bookings b
+         WHERE b.invoice_id IS NULL
+           AND b.client_id IS NOT NULL
+           AND b.status IS DISTINCT FROM 'Cancelled'
+           AND b.pickup_date >= p_start AND b.pickup_date < p_end + 1
+           AND (p_client_ids IS NULL OR b.client_id = ANY (p_client_ids))
+           FOR UPDATE OF b SKIP LOCKED
+    ),
+    per_client AS (
+        SELECT client_id,
+               ROUND(SUM(price), 2) AS subtotal,
+               ROW_NUMBER() OVER (ORDER BY client_id) AS seq
+          FROM pending
+         GROUP BY client_id
+    ),
+    created AS (
+        INSERT INTO public.invoices
+            (invoice_number, client_id, date_issued, subtotal, tax_rate, tax_amount, total_amount, amount, status)
+        -- lpad trunca lo que excede el ancho: a partir de 10000 se usa la longitud del número
+        SELECT 'F-' || v_year || '-' || lpad((v_last + seq)::TEXT, GREATEST(4, length((v_last + seq)::TEXT)), '0'),
+               client_id,
+               CURRENT_DATE,
+               subtotal,
+               p_tax_rate,
+               ROUND(subtotal * p_tax_rate / 100, 2),
+               ROUND(subtotal * (1 + p_tax_rate / 100), 2),
+               ROUND(subtotal * (1 + p_tax_rate / 100), 2),
+               'Draft'
+          FROM per_client
+        RETURNING *
+    ),
+    linked AS (
+        UPDATE public.bookings b
+           SET invoice_id = c.id
+          FROM pending p
+          JOIN created c ON c.client_id = p.client_id
+         WHERE b.id = p.id
+    )
+    -- Las CTE de escritura se ejecutan siempre, aunque `linked` no se lea aquí
+    SELECT c.* FROM created c ORDER BY split_part(c.invoice_number, '-', 3)::INTEGER;
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT EXECUTE ON FUNCTION public.generate_invoices_batch(DATE, DATE, UUID[], NUMERIC) TO authenticated, service_role;
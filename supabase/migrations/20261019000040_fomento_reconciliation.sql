@@ -0,0 +1,42 @@
+-- Migration: Fomento RVTC reconciliation report
+-- Date: 2026-10-19
+-- scripts/fomento_reconcile.py pages through the bookings of a date range that the app
+-- believes are communicated, asks the Registro VTC for each one (consulta, in batches
+-- through fomento-vtc) and records every disagreement here, one row per booking and run.
+
+-- Columns written by the Fomento flow (created from the dashboard on existing projects)
+ALTER TABLE public.bookings ADD COLUMN IF NOT EXISTS fomento_status TEXT;
+ALTER TABLE public.bookings ADD COLUMN IF NOT EXISTS fomento_idservicio TEXT;
+ALTER TABLE public.bookings ADD COLUMN IF NOT EXISTS fomento_idcomunica TEXT;
+ALTER TABLE public.bookings ADD COLUMN IF NOT EXISTS fomento_error TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_bookings_fomento_pickup_date
+    ON public.bookings (pickup_date)
+    WHERE fomento_status IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS public.fomento_reconciliation (
+    id BIGSERIAL PRIMARY KEY,
+    run_id UUID NOT NULL,
+    booking_id UUID NOT NULL REFERENCES public.bookings(id) ON DELETE CASCADE,
+    pickup_date DATE,
+    fomento_idservicio TEXT,
+    app_status TEXT,          -- bookings.fomento_status when checked
+    registry_estado TEXT,     -- estado returned by consulta (1 alta, 2 iniciado, 3 anulado)
+    resultado TEXT,           -- consulta result code
+    issue TEXT NOT NULL,      -- no_registrado | estado_distinto | cancelada_sin_anular | matricula_distinta | sin_idservicio | error_consulta
+    details JSONB,
+    checked_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE (run_id, booking_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_fomento_reconciliation_checked_at
+    ON public.fomento_reconciliation (checked_at DESC);
+
+ALTER TABLE public.fomento_reconciliation ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow auth access for fomento_reconciliation" ON public.fomento_reconciliation;
+CREATE POLICY "Allow auth access for fomento_reconciliation" ON public.fomento_reconciliation FOR ALL TO authenticated USING (true) WITH CHECK (true);
+
+GRANT SELECT ON TABLE public.fomento_reconciliation TO anon;
+GRANT SELECT, INSERT, UPDATE, DELETE ON TABLE public.fomento_reconciliation TO authenticated, service_role;
+GRANT USAGE, SELECT ON SEQUENCE public.fomento_reconciliation_id_seq TO authenticated, service_role;
@@ -0,0 +1,14 @@
+-- Migration: Adaptive polling schedule for sync-flights
+-- Date: 2026-10-19
+-- Each active flight carries the time it is next due for an AirLabs lookup. sync-flights
+-- (cron) takes the due flights earliest first and reschedules them from their ETA:
+-- hourly when the arrival is hours away, every few minutes in the final 45 minutes.
+-- NULL means "never polled" and is due immediately.
+
+ALTER TABLE public.flights ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE public.flights ADD COLUMN IF NOT EXISTS next_poll_at TIMESTAMPTZ;
+ALTER TABLE public.flights ADD COLUMN IF NOT EXISTS last_polled_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_flights_next_poll_at
+    ON public.flights (next_poll_at NULLS FIRST)
+    WHERE status IN ('Scheduled', 'En Route', 'Delayed', 'Taxiing', 'Final Approach');
@@ -0,0 +1,134 @@
+-- Migration: Due-time index for driver push reminders
+-- Date: 2026-10-19
+-- Every reminder a booking will need (240/120/60 min while Pending, 60/30/20/10 min once
+-- Confirmed) is precomputed here with the instant it becomes due and the instant it
+-- stops making sense (10 minutes later, the width of the old polling windows).
+-- A trigger on bookings keeps the rows in step with status, pickup and driver changes;
+-- check-and-send-push only reads the rows that are due, through a partial index.
+
+ALTER TABLE public.bookings ADD COLUMN IF NOT EXISTS push_notifications_sent JSONB;
+
+CREATE TABLE IF NOT EXISTS public.push_reminders (
+    booking_id UUID NOT NULL REFERENCES public.bookings(id) ON DELETE CASCADE,
+    slot TEXT NOT NULL,              -- key in bookings.push_notifications_sent
+    fire_at TIMESTAMPTZ NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+    sent_at TIMESTAMPTZ,
+    PRIMARY KEY (booking_id, slot)
+);
+
+CREATE INDEX IF NOT EXISTS idx_push_reminders_due
+    ON public.push_reminders (fire_at)
+    WHERE sent_at IS NULL;
+
+ALTER TABLE public.push_reminders ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow auth access for push_reminders" ON public.push_reminders;
+CREATE POLICY "Allow auth access for push_reminders" ON public.push_reminders FOR ALL TO authenticated USING (true) WITH CHECK (true);
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON TABLE public.push_reminders TO authenticated, service_role;
+
+-- 1. Reminder slots per booking status (minutes before pickup)
+CREATE OR REPLACE FUNCTION public.push_reminder_slots(p_status TEXT)
+RETURNS TABLE (slot TEXT, minutes INTEGER) AS $$
+    SELECT s.slot, s.minutes
+      FROM (VALUES
+            ('Pending', '240m_pending', 240),
+            ('Pending', '120m_pending', 120),
+            ('Pending', '60m_pending', 60),
+            ('Confirmed', '60m', 60),
+            ('Confirmed', '30m', 30),
+            ('Confirmed', '20m', 20),
+            ('Confirmed', '10m', 10)
+           ) AS s(status, slot, minutes)
+     WHERE s.status = p_status;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Pickup instant from the Madrid wall-clock date/time, NULL when unparseable
+CREATE OR REPLACE FUNCTION public.booking_pickup_at(p_date TEXT, p_time TEXT)
+RETURNS TIMESTAMPTZ AS $$
+BEGIN
+    IF p_date IS NULL OR p_time IS NULL OR p_time !~ '^\d{1,2}:\d{2}' THEN
+        RETURN NULL;
+    END IF;
+    RETURN (left(p_date, 10)::date + p_time::time) AT TIME ZONE 'Europe/Madrid';
+EXCEPTION WHEN invalid_datetime_format OR datetime_field_overflow OR invalid_text_representation THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- 2. Keep a booking's pending reminders in step with it
+CREATE OR REPLACE FUNCTION public.schedule_push_reminders()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_pickup TIMESTAMPTZ;
+BEGIN
+    DELETE FROM public.push_reminders WHERE booking_id = NEW.id AND sent_at IS NULL;
+
+    IF NEW.status IN ('Pending', 'Confirmed') AND NEW.driver_id IS NOT NULL THEN
+        v_pickup := public.booking_pickup_at(NEW.pickup_date::text, NEW.pickup_time::text);
+        IF v_pickup IS NOT NULL THEN
+            INSERT INTO public.push_reminders (booking_id, slot, fire_at, expires_at)
+            SELECT NEW.id, s.slot,
+                   v_pickup - make_interval(mins => s.minutes),
+                   v_pickup - make_interval(mins => s.minutes - 10)
+              FROM public.push_reminder_slots(NEW.status) s
+             WHERE NOT (COALESCE(NEW.push_notifications_sent, '{}'::jsonb) ? s.slot)
+               AND v_pickup - make_interval(mins => s.minutes - 10) > NOW()
+            ON CONFLICT (booking_id, slot) DO NOTHING;
+        END IF;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.schedule_push_reminders() FROM PUBLIC;
+
+DROP TRIGGER IF EXISTS trg_bookings_push_reminders ON public.bookings;
+CREATE TRIGGER trg_bookings_push_reminders
+    AFTER INSERT OR UPDATE OF status, pickup_date, pickup_time, driver_id ON public.bookings
+    FOR EACH ROW EXECUTE FUNCTION public.schedule_push_reminders();
+
+-- 3. Record delivered reminders (also in bookings.push_notifications_sent, as before)
+CREATE OR REPLACE FUNCTION public.mark_push_reminders_sent(p_booking_ids UUID[], p_slots TEXT[])
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    WITH sent AS (
+        UPDATE public.push_reminders r
+           SET sent_at = NOW()
+          FROM unnest(p_booking_ids, p_slots) AS s(booking_id, slot)
+         WHERE r.booking_id = s.booking_id AND r.slot = s.slot AND r.sent_at IS NULL
+     RETURNING r.booking_id, r.slot, r.sent_at
+    ), per_booking AS (
+        SELECT booking_id, jsonb_object_agg(slot, sent_at) AS slots FROM sent GROUP BY booking_id
+    )
+    UPDATE public.bookings b
+       SET push_notifications_sent = COALESCE(b.push_notifications_sent, '{}'::jsonb) || p.slots
+      FROM per_booking p
+     WHERE b.id = p.booking_id;
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Only check-and-send-push marks reminders: PUBLIC (anon included) could suppress pushes
+REVOKE EXECUTE ON FUNCTION public.mark_push_reminders_sent(UUID[], TEXT[]) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.mark_push_reminders_sent(UUID[], TEXT[]) TO service_role;
+
+-- 4. Backfill the bookings that are still ahead
+INSERT INTO public.push_reminders (booking_id, slot, fire_at, expires_at)
+SELECT b.id, s.slot,
+       p.pickup_at - make_interval(mins => s.minutes),
+       p.pickup_at - make_interval(mins => s.minutes - 10)
+  FROM public.bookings b
+ CROSS JOIN LATERAL (SELECT public.booking_pickup_at(b.pickup_date::text, b.pickup_time::text) AS pickup_at) p
+ CROSS JOIN LATERAL public.push_reminder_slots(b.status) s
+ WHERE b.status IN ('Pending', 'Confirmed')
+   AND b.driver_id IS NOT NULL
+   AND b.pickup_date::date >= CURRENT_DATE - 1
+   AND p.pickup_at IS NOT NULL
+   AND p.pickup_at - make_interval(mins => s.minutes - 10) > NOW()
+   AND NOT (COALESCE(b.push_notifications_sent, '{}'::jsonb) ? s.slot)
+ON CONFLICT (booking_id, slot) DO NOTHING;
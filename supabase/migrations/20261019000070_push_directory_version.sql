@@ -0,0 +1,43 @@
+-- Migration: Change counter for the push subscription directory
+-- Date: 2026-10-19
+-- notify-driver and check-and-send-push cache driver -> user -> push subscription
+-- lookups in memory (supabase/functions/_shared/push.ts). Any write to drivers or
+-- push_subscriptions bumps this single-row counter, and each request compares it with
+-- the version its cache was built from.
+
+-- Link to the driver's auth user (created from the dashboard on existing projects)
+ALTER TABLE public.drivers ADD COLUMN IF NOT EXISTS user_id UUID;
+
+CREATE TABLE IF NOT EXISTS public.push_directory_version (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+INSERT INTO public.push_directory_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+ALTER TABLE public.push_directory_version ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow auth access for push_directory_version" ON public.push_directory_version;
+CREATE POLICY "Allow auth access for push_directory_version" ON public.push_directory_version FOR SELECT TO authenticated USING (true);
+
+GRANT SELECT ON TABLE public.push_directory_version TO authenticated, service_role;
+
+CREATE OR REPLACE FUNCTION public.bump_push_directory_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE public.push_directory_version SET version = version + 1, updated_at = NOW() WHERE id = 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Statement-level: one bump per write, however many rows it touched
+DROP TRIGGER IF EXISTS trg_push_subscriptions_directory_version ON public.push_subscriptions;
+CREATE TRIGGER trg_push_subscriptions_directory_version
+    AFTER INSERT OR UPDATE OR DELETE ON public.push_subscriptions
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_push_directory_version();
+
+DROP TRIGGER IF EXISTS trg_drivers_directory_version ON public.drivers;
+CREATE TRIGGER trg_drivers_directory_version
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, name ON public.drivers
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_push_directory_version();
@@ -0,0 +1,23 @@
+-- Migration: Publish the tables the client follows live
+-- Date: 2026-10-19
+-- services/entityStore.ts opens one postgres_changes channel per table, and only for views
+-- that ask for `realtime` (FleetMap and OperationsHub: drivers, driver_locations, flights);
+-- services/capacityEngine.ts follows bookings, shifts and vehicles. Only those tables are
+-- published: every published table costs WAL decoding on each change, listened to or not
+-- (several were only added from the dashboard so far).
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'bookings', 'shifts', 'vehicles', 'drivers', 'driver_locations', 'flights'
+    ] LOOP
+        IF to_regclass('public.' || t) IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM pg_publication_tables
+             WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = t
+        ) THEN
+            EXECUTE format('ALTER PUBLICATION supabase_realtime ADD TABLE public.%I', t);
+        END IF;
+    END LOOP;
+END $$;
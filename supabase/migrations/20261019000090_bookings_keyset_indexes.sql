@@ -0,0 +1,17 @@
+-- Migration: Composite indexes for windowed booking queries
+-- Date: 2026-10-19
+-- ReservasView loads bookings through a windowed collection (services/entityStore.ts):
+-- a pickup_date range, optional status predicates, ORDER BY pickup_date, pickup_time, id
+-- and a keyset cursor on the same columns. These indexes serve the range scan and the
+-- cursor without sorting, with and without a status equality filter.
+
+CREATE INDEX IF NOT EXISTS idx_bookings_pickup_keyset
+    ON public.bookings (pickup_date, pickup_time, id);
+
+CREATE INDEX IF NOT EXISTS idx_bookings_status_pickup_keyset
+    ON public.bookings (status, pickup_date, pickup_time, id);
+
+-- A driver's bookings around a day, for the conflict check of a manual assignment
+CREATE INDEX IF NOT EXISTS idx_bookings_driver_pickup_date
+    ON public.bookings (driver_id, pickup_date)
+    WHERE driver_id IS NOT NULL;
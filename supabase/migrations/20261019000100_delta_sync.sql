@@ -0,0 +1,77 @@
+-- Migration: updated_at high-water marks and delete tombstones for client delta sync
+-- Date: 2026-10-19
+-- The entity store (services/entityStore.ts) keeps table snapshots in IndexedDB and,
+-- instead of reloading whole tables, asks for rows with updated_at >= its high-water
+-- mark and for the ids deleted since (sync_tombstones). Every synced table gets an
+-- updated_at set by the server on insert and update, an index on it, and a delete
+-- trigger that records a tombstone. Tombstones older than 30 days are pruned; clients
+-- whose snapshot is older than that reload the table in full.
+
+CREATE TABLE IF NOT EXISTS public.sync_tombstones (
+    table_name TEXT NOT NULL,
+    row_id TEXT NOT NULL,
+    deleted_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    PRIMARY KEY (table_name, row_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_table_deleted
+    ON public.sync_tombstones (table_name, deleted_at);
+
+ALTER TABLE public.sync_tombstones ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow auth access for sync_tombstones" ON public.sync_tombstones;
+CREATE POLICY "Allow auth access for sync_tombstones" ON public.sync_tombstones FOR SELECT TO authenticated USING (true);
+
+GRANT SELECT ON TABLE public.sync_tombstones TO authenticated, service_role;
+
+-- clock_timestamp() rather than NOW(): rows of one long transaction get increasing marks
+CREATE OR REPLACE FUNCTION public.touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.record_sync_tombstone()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.sync_tombstones (table_name, row_id, deleted_at)
+    VALUES (TG_TABLE_NAME, OLD.id::text, clock_timestamp())
+    ON CONFLICT (table_name, row_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+
+    -- Occasional cleanup keeps the table small without a scheduled job
+    IF random() < 0.01 THEN
+        DELETE FROM public.sync_tombstones WHERE deleted_at < NOW() - INTERVAL '30 days';
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'bookings', 'drivers', 'shifts', 'shift_types', 'vehicles', 'vehicle_expenses',
+        'vehicle_maintenance', 'clients', 'tariffs', 'service_extras', 'profiles',
+        'system_settings', 'municipalities', 'driver_logs', 'time_correction_requests'
+    ] LOOP
+        -- Only tables that exist and have an id (tombstones are keyed by it)
+        CONTINUE WHEN NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+             WHERE table_schema = 'public' AND table_name = t AND column_name = 'id'
+        );
+
+        EXECUTE format('ALTER TABLE public.%I ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW()', t);
+        EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON public.%I (updated_at)', 'idx_' || t || '_updated_at', t);
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', 'trg_' || t || '_touch_updated_at', t);
+        EXECUTE format('CREATE TRIGGER %I BEFORE INSERT OR UPDATE ON public.%I
+                        FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at()', 'trg_' || t || '_touch_updated_at', t);
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', 'trg_' || t || '_sync_tombstone', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON public.%I
+                        FOR EACH ROW EXECUTE FUNCTION public.record_sync_tombstone()', 'trg_' || t || '_sync_tombstone', t);
+    END LOOP;
+END $$;
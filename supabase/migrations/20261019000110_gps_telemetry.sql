@@ -0,0 +1,157 @@
+-- Migration: GPS telemetry time series with bulk ingestion
+-- Date: 2026-10-19
+-- The driver app used to upsert driver_locations every 30 s and, in the same callback,
+-- update every active booking whose max_speed was below the current speed: one request
+-- per booking, each rewriting the whole (wide, heavily indexed) bookings row.
+-- Points now go to a narrow append-only table, uploaded in batches by
+-- services/telemetryQueue.ts (which keeps them while the phone is offline), through
+-- ingest_gps_points(): one call inserts the batch and moves each driver's driver_locations
+-- row to its newest point. bookings.max_speed is aggregated from the points: during a trip
+-- it is raised in steps of at least 10 km/h (enough for the live view), and the exact
+-- maximum is written by the status change that ends the trip, a write that happens anyway.
+-- Points older than 30 days are thinned to one per minute.
+
+ALTER TABLE public.bookings ADD COLUMN IF NOT EXISTS max_speed INTEGER;
+
+CREATE TABLE IF NOT EXISTS public.gps_points (
+    driver_id UUID NOT NULL REFERENCES public.drivers(id) ON DELETE CASCADE,
+    recorded_at TIMESTAMPTZ NOT NULL,
+    lat REAL NOT NULL,               -- ~0.5 m resolution at these latitudes
+    lng REAL NOT NULL,
+    speed_kmh SMALLINT,              -- peak since the driver's previous point: MAX() over a trip is exact
+    booking_id UUID REFERENCES public.bookings(id) ON DELETE SET NULL,  -- trip in progress, if any
+    PRIMARY KEY (driver_id, recorded_at)
+);
+
+-- Appended in time order: a BRIN index covers range scans and pruning at a fraction of a b-tree
+CREATE INDEX IF NOT EXISTS idx_gps_points_recorded_brin
+    ON public.gps_points USING BRIN (recorded_at);
+
+CREATE INDEX IF NOT EXISTS idx_gps_points_booking
+    ON public.gps_points (booking_id, recorded_at)
+    WHERE booking_id IS NOT NULL;
+
+ALTER TABLE public.gps_points ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow auth access for gps_points" ON public.gps_points;
+CREATE POLICY "Allow auth access for gps_points" ON public.gps_points FOR SELECT TO authenticated USING (true);
+
+GRANT SELECT ON TABLE public.gps_points TO authenticated;
+GRANT SELECT, INSERT, UPDATE, DELETE ON TABLE public.gps_points TO service_role;
+
+-- 1. Points of an upload: [{driver_id, recorded_at, lat, lng, speed_kmh, booking_id}, ...]
+CREATE OR REPLACE FUNCTION public.gps_points_from_json(p_points JSONB)
+RETURNS SETOF public.gps_points AS $$
+    SELECT (p->>'driver_id')::uuid,
+           (p->>'recorded_at')::timestamptz,
+           (p->>'lat')::real,
+           (p->>'lng')::real,
+           LEAST(GREATEST((p->>'speed_kmh')::numeric, 0), 32767)::smallint,
+           NULLIF(p->>'booking_id', '')::uuid
+      FROM jsonb_array_elements(p_points) AS p
+     WHERE p->>'driver_id' IS NOT NULL AND p->>'recorded_at' IS NOT NULL
+       AND p->>'lat' IS NOT NULL AND p->>'lng' IS NOT NULL;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 2. Thin old points to the first one per driver and minute
+CREATE OR REPLACE FUNCTION public.downsample_gps_points(p_older_than INTERVAL DEFAULT INTERVAL '30 days')
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    DELETE FROM public.gps_points g
+     USING (
+        SELECT driver_id, recorded_at,
+               row_number() OVER (PARTITION BY driver_id, date_trunc('minute', recorded_at) ORDER BY recorded_at) AS n
+          FROM public.gps_points
+         WHERE recorded_at < NOW() - p_older_than
+     ) o
+     WHERE o.n > 1 AND g.driver_id = o.driver_id AND g.recorded_at = o.recorded_at;
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Called by ingest_gps_points (as its owner) and the service role, never by sessions
+REVOKE EXECUTE ON FUNCTION public.downsample_gps_points(INTERVAL) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.downsample_gps_points(INTERVAL) TO service_role;
+
+-- 3. Exact max_speed when a trip ends, from its points
+CREATE OR REPLACE FUNCTION public.trip_in_progress(p_status TEXT)
+RETURNS BOOLEAN AS $$
+    SELECT COALESCE(p_status IN ('En Route', 'At Origin', 'In Progress'), false);
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION public.finalize_trip_max_speed()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_max INTEGER;
+BEGIN
+    IF public.trip_in_progress(OLD.status) AND NOT public.trip_in_progress(NEW.status) THEN
+        SELECT MAX(speed_kmh) INTO v_max FROM public.gps_points WHERE booking_id = NEW.id;
+        IF v_max > COALESCE(NEW.max_speed, 0) THEN
+            NEW.max_speed := v_max;
+        END IF;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS trg_bookings_finalize_max_speed ON public.bookings;
+CREATE TRIGGER trg_bookings_finalize_max_speed
+    BEFORE UPDATE OF status ON public.bookings
+    FOR EACH ROW EXECUTE FUNCTION public.finalize_trip_max_speed();
+
+-- 4. Bulk ingestion; retried uploads are idempotent (same driver and instant)
+CREATE OR REPLACE FUNCTION public.ingest_gps_points(p_points JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    INSERT INTO public.gps_points (driver_id, recorded_at, lat, lng, speed_kmh, booking_id)
+    SELECT * FROM public.gps_points_from_json(p_points)
+    ON CONFLICT (driver_id, recorded_at) DO NOTHING;
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    -- Newest point per driver; a late offline batch never moves a driver back
+    WITH latest AS (
+        SELECT DISTINCT ON (driver_id) driver_id, lat, lng, recorded_at
+          FROM public.gps_points_from_json(p_points)
+         ORDER BY driver_id, recorded_at DESC
+    )
+    UPDATE public.driver_locations l
+       SET lat = x.lat, lng = x.lng, updated_at = x.recorded_at
+      FROM latest x
+     WHERE l.driver_id = x.driver_id
+       AND (l.updated_at IS NULL OR l.updated_at < x.recorded_at);
+
+    INSERT INTO public.driver_locations (driver_id, lat, lng, updated_at)
+    SELECT DISTINCT ON (driver_id) driver_id, lat, lng, recorded_at
+      FROM public.gps_points_from_json(p_points) x
+     WHERE NOT EXISTS (SELECT 1 FROM public.driver_locations l WHERE l.driver_id = x.driver_id)
+     ORDER BY driver_id, recorded_at DESC;
+
+    -- Bookings rows are wide and indexed on updated_at (never a HOT update): rewrite one
+    -- only for a 10 km/h step while the trip is on, or exactly for a late (offline) batch
+    UPDATE public.bookings b
+       SET max_speed = x.max_kmh
+      FROM (
+        SELECT booking_id, MAX(speed_kmh) AS max_kmh
+          FROM public.gps_points_from_json(p_points)
+         WHERE booking_id IS NOT NULL AND speed_kmh IS NOT NULL
+         GROUP BY booking_id
+      ) x
+     WHERE b.id = x.booking_id
+       AND x.max_kmh > COALESCE(b.max_speed, 0)
+       AND (x.max_kmh >= COALESCE(b.max_speed, 0) + 10 OR NOT public.trip_in_progress(b.status));
+
+    -- Opportunistic thinning, as sync_tombstones are pruned
+    IF random() < 0.001 THEN
+        PERFORM public.downsample_gps_points();
+    END IF;
+
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+GRANT EXECUTE ON FUNCTION public.ingest_gps_points(JSONB) TO authenticated, service_role;
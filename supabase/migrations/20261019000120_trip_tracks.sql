@@ -0,0 +1,178 @@
+-- Migration: Per-trip tracks as encoded polylines
+-- Date: 2026-10-19
+-- gps_points (migration 20261019000110) is a raw time series: a trip's distance or
+-- duration means scanning and summing its points. When a trip ends its points are packed
+-- into one trip_tracks row: the path as a Google encoded polyline (1e-5 degree steps,
+-- zigzag deltas in 5-bit varint chunks), the seconds between points with the same coding,
+-- and the distance, duration and top speed precomputed. HistoricoDriverView and the
+-- payroll report (scripts/trip_tracks.py) read these rows only. A track is rebuilt when
+-- late (offline) points arrive, and raw points of tracked trips are dropped after 30 days.
+
+CREATE TABLE IF NOT EXISTS public.trip_tracks (
+    booking_id UUID PRIMARY KEY REFERENCES public.bookings(id) ON DELETE CASCADE,
+    driver_id UUID REFERENCES public.drivers(id) ON DELETE SET NULL,
+    started_at TIMESTAMPTZ NOT NULL,
+    ended_at TIMESTAMPTZ NOT NULL,
+    point_count INTEGER NOT NULL,
+    distance_m INTEGER NOT NULL,
+    duration_s INTEGER NOT NULL,
+    max_speed_kmh SMALLINT,
+    polyline TEXT NOT NULL,          -- lat/lng of every point
+    time_deltas TEXT NOT NULL,       -- seconds since the previous point (0 for the first)
+    built_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_trip_tracks_driver_started
+    ON public.trip_tracks (driver_id, started_at);
+
+ALTER TABLE public.trip_tracks ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow auth access for trip_tracks" ON public.trip_tracks;
+CREATE POLICY "Allow auth access for trip_tracks" ON public.trip_tracks FOR SELECT TO authenticated USING (true);
+
+GRANT SELECT ON TABLE public.trip_tracks TO authenticated;
+GRANT SELECT, INSERT, UPDATE, DELETE ON TABLE public.trip_tracks TO service_role;
+
+-- 1. One signed value in polyline coding
+CREATE OR REPLACE FUNCTION public.polyline_chunk(p_value BIGINT)
+RETURNS TEXT AS $$
+DECLARE
+    v BIGINT := CASE WHEN p_value < 0 THEN ~(p_value << 1) ELSE p_value << 1 END;
+    v_out TEXT := '';
+BEGIN
+    WHILE v >= 32 LOOP
+        v_out := v_out || chr((32 | (v & 31))::int + 63);
+        v := v >> 5;
+    END LOOP;
+    RETURN v_out || chr(v::int + 63);
+END;
+$$ LANGUAGE plpgsql IMMUTABLE STRICT;
+
+CREATE OR REPLACE FUNCTION public.geo_distance_m(p_lat1 DOUBLE PRECISION, p_lng1 DOUBLE PRECISION,
+                                                 p_lat2 DOUBLE PRECISION, p_lng2 DOUBLE PRECISION)
+RETURNS DOUBLE PRECISION AS $$
+    SELECT 2 * 6371000 * asin(sqrt(
+        power(sin(radians(p_lat2 - p_lat1) / 2), 2) +
+        cos(radians(p_lat1)) * cos(radians(p_lat2)) * power(sin(radians(p_lng2 - p_lng1) / 2), 2)));
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+-- 2. Pack a trip's points; returns the number of points (0: no points, no track)
+CREATE OR REPLACE FUNCTION public.build_trip_track(p_booking_id UUID)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    WITH pts AS (
+        SELECT driver_id, recorded_at, lat::double precision AS lat, lng::double precision AS lng, speed_kmh,
+               round(lat::double precision * 100000)::bigint AS ilat,  -- not via numeric: REAL casts to 6 digits
+               round(lng::double precision * 100000)::bigint AS ilng,
+               floor(extract(epoch FROM recorded_at))::bigint AS ts
+          FROM public.gps_points
+         WHERE booking_id = p_booking_id
+    ), steps AS (
+        SELECT *,
+               ilat - lag(ilat, 1, 0::bigint) OVER w AS dlat,
+               ilng - lag(ilng, 1, 0::bigint) OVER w AS dlng,
+               ts - lag(ts, 1, ts) OVER w AS dt,
+               public.geo_distance_m(lag(lat) OVER w, lag(lng) OVER w, lat, lng) AS step_m
+          FROM pts
+        WINDOW w AS (ORDER BY recorded_at)
+    )
+    INSERT INTO public.trip_tracks AS t (booking_id, driver_id, started_at, ended_at, point_count, distance_m,
+                                         duration_s, max_speed_kmh, polyline, time_deltas, built_at)
+    SELECT p_booking_id,
+           (array_agg(driver_id ORDER BY recorded_at DESC))[1],
+           MIN(recorded_at), MAX(recorded_at), COUNT(*),
+           round(COALESCE(SUM(step_m), 0))::integer,
+           floor(extract(epoch FROM MAX(recorded_at) - MIN(recorded_at)))::integer,
+           MAX(speed_kmh),
+           string_agg(public.polyline_chunk(dlat) || public.polyline_chunk(dlng), '' ORDER BY recorded_at),
+           string_agg(public.polyline_chunk(dt), '' ORDER BY recorded_at),
+           NOW()
+      FROM steps
+    HAVING COUNT(*) > 0
+    ON CONFLICT (booking_id) DO UPDATE
+       SET driver_id = EXCLUDED.driver_id, started_at = EXCLUDED.started_at, ended_at = EXCLUDED.ended_at,
+           point_count = EXCLUDED.point_count, distance_m = EXCLUDED.distance_m,
+           duration_s = EXCLUDED.duration_s, max_speed_kmh = EXCLUDED.max_speed_kmh,
+           polyline = EXCLUDED.polyline, time_deltas = EXCLUDED.time_deltas, built_at = EXCLUDED.built_at;
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.build_trip_track(UUID) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.build_trip_track(UUID) TO service_role;
+
+-- 3. Build the track when the trip ends
+CREATE OR REPLACE FUNCTION public.build_track_on_trip_end()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF public.trip_in_progress(OLD.status) AND NOT public.trip_in_progress(NEW.status) THEN
+        PERFORM public.build_trip_track(NEW.id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS trg_bookings_build_track ON public.bookings;
+CREATE TRIGGER trg_bookings_build_track
+    AFTER UPDATE OF status ON public.bookings
+    FOR EACH ROW EXECUTE FUNCTION public.build_track_on_trip_end();
+
+-- 4. Late points: rebuild the tracks of trips that already ended
+CREATE OR REPLACE FUNCTION public.rebuild_tracks_after_ingest()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM public.build_trip_track(b.id)
+       FROM public.bookings b
+      WHERE b.id IN (SELECT DISTINCT booking_id FROM new_points WHERE booking_id IS NOT NULL)
+        AND NOT public.trip_in_progress(b.status)
+        AND EXISTS (SELECT 1 FROM public.trip_tracks t WHERE t.booking_id = b.id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS trg_gps_points_rebuild_tracks ON public.gps_points;
+CREATE TRIGGER trg_gps_points_rebuild_tracks
+    AFTER INSERT ON public.gps_points
+    REFERENCING NEW TABLE AS new_points
+    FOR EACH STATEMENT EXECUTE FUNCTION public.rebuild_tracks_after_ingest();
+
+REVOKE EXECUTE ON FUNCTION public.build_track_on_trip_end() FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION public.rebuild_tracks_after_ingest() FROM PUBLIC;
+
+-- 5. Old raw points of tracked trips are redundant; the rest is thinned as before
+CREATE OR REPLACE FUNCTION public.downsample_gps_points(p_older_than INTERVAL DEFAULT INTERVAL '30 days')
+RETURNS INTEGER AS $$
+DECLARE
+    v_tracked INTEGER;
+    v_count INTEGER;
+BEGIN
+    DELETE FROM public.gps_points g
+     USING public.trip_tracks t
+     WHERE g.booking_id = t.booking_id
+       AND g.recorded_at < NOW() - p_older_than;
+    GET DIAGNOSTICS v_tracked = ROW_COUNT;
+
+    DELETE FROM public.gps_points g
+     USING (
+        SELECT driver_id, recorded_at,
+               row_number() OVER (PARTITION BY driver_id, date_trunc('minute', recorded_at) ORDER BY recorded_at) AS n
+          FROM public.gps_points
+         WHERE recorded_at < NOW() - p_older_than
+     ) o
+     WHERE o.n > 1 AND g.driver_id = o.driver_id AND g.recorded_at = o.recorded_at;
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_tracked + v_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.downsample_gps_points(INTERVAL) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.downsample_gps_points(INTERVAL) TO service_role;
+
+-- 6. Backfill the trips that ended before this migration
+SELECT public.build_trip_track(b.id)
+  FROM public.bookings b
+ WHERE b.id IN (SELECT DISTINCT booking_id FROM public.gps_points WHERE booking_id IS NOT NULL)
+   AND NOT public.trip_in_progress(b.status);
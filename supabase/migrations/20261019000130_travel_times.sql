@@ -0,0 +1,30 @@
+-- Migration: Learned travel and wait times
+-- Date: 2026-10-19
+-- services/autoAssignment.ts reserved every driver for pickup + wait + travel with about
+-- 25 hand-entered routes, 60 minutes for any other pair and a substring guess for the wait.
+-- scripts/travel_time_model.py learns both from completed bookings (status_logs: At Origin,
+-- In Progress, Completed; arrival corrected with the trip_tracks polyline) and writes the
+-- result here: the 80th percentile in minutes per origin zone, destination zone and hour of
+-- the week. A zone is a municipality code (cod_prov || cod_mun), with the airport as 'ALC'
+-- and a station as '<code>:EST'. Wait rows have destination_zone '*'; hour_of_week -1 is a
+-- route's figure for any hour (0 = Monday 00:00, local time). The app loads the table once
+-- per session; pairs it does not list keep the hand-entered estimate.
+
+CREATE TABLE IF NOT EXISTS public.travel_times (
+    origin_zone TEXT NOT NULL,
+    destination_zone TEXT NOT NULL,          -- '*': wait at the origin
+    hour_of_week SMALLINT NOT NULL,          -- 0..167, -1: any hour
+    minutes SMALLINT NOT NULL,
+    samples INTEGER NOT NULL,
+    built_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (origin_zone, destination_zone, hour_of_week),
+    CHECK (hour_of_week BETWEEN -1 AND 167)
+);
+
+ALTER TABLE public.travel_times ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow auth access for travel_times" ON public.travel_times;
+CREATE POLICY "Allow auth access for travel_times" ON public.travel_times FOR SELECT TO authenticated USING (true);
+
+GRANT SELECT ON TABLE public.travel_times TO authenticated;
+GRANT SELECT, INSERT, UPDATE, DELETE ON TABLE public.travel_times TO service_role;
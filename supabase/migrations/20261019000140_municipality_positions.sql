@@ -0,0 +1,33 @@
+-- Migration: Municipality positions for nearest-driver dispatch
+-- Date: 2026-10-19
+-- OperationsHub ranks the drivers for a pickup in the next hours by straight-line distance
+-- from their driver_locations row (services/autoAssignment.ts nearestAvailableDrivers,
+-- over a grid index of the positions). A booking without coordinates is placed at its
+-- municipality: the median of where drivers actually picked up and dropped off there
+-- (status_logs and trip_tracks), computed by scripts/travel_time_model.py and written
+-- through set_municipality_positions().
+
+ALTER TABLE public.municipalities ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION;
+ALTER TABLE public.municipalities ADD COLUMN IF NOT EXISTS lng DOUBLE PRECISION;
+
+-- 1. [{cod_prov, cod_mun, lat, lng}, ...]; returns the number of municipalities updated
+CREATE OR REPLACE FUNCTION public.set_municipality_positions(p_rows JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    UPDATE public.municipalities m
+       SET lat = (r->>'lat')::double precision,
+           lng = (r->>'lng')::double precision
+      FROM jsonb_array_elements(p_rows) AS r
+     WHERE m.cod_prov = r->>'cod_prov'
+       AND m.cod_mun = r->>'cod_mun'
+       AND r->>'lat' IS NOT NULL AND r->>'lng' IS NOT NULL
+       AND (m.lat IS DISTINCT FROM (r->>'lat')::double precision OR m.lng IS DISTINCT FROM (r->>'lng')::double precision);
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.set_municipality_positions(JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.set_municipality_positions(JSONB) TO service_role;
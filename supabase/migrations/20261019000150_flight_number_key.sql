@@ -0,0 +1,12 @@
+-- Migration: Normalized flight number for sync-flights lookups
+-- Date: 2026-10-19
+-- When the Operations Hub asks for specific flights, sync-flights looks up the rows it
+-- already has for those numbers. It used to read the whole flights history for that and
+-- match in the function, which stops finding known flights once the table is larger than
+-- PostgREST's max rows (they were then inserted again). number_key is the number as
+-- normalizeFlightNumber writes it (no spaces, upper case), so the lookup is an indexed IN.
+
+ALTER TABLE public.flights ADD COLUMN IF NOT EXISTS number_key TEXT
+    GENERATED ALWAYS AS (upper(regexp_replace(number, '\s+', '', 'g'))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_flights_number_key ON public.flights (number_key, scheduled DESC NULLS LAST);
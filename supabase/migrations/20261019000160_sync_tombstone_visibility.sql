@@ -0,0 +1,59 @@
+-- Migration: sync_tombstones readable only where the role reads the rows
+-- Date: 2026-10-19
+-- Migration 20261019000100 let every authenticated user read every tombstone, i.e. the
+-- deleted ids of every synced table. A tombstone now records the driver the deleted row
+-- belonged to (its driver_id, or its id for drivers rows), and the SELECT policy follows
+-- what each role of the app (profiles.role) reads: staff roles every tombstone, drivers
+-- the tombstones of their own rows and of the shared reference tables (vehicles,
+-- tariffs, municipalities...), clients those of the reference tables only.
+
+ALTER TABLE public.sync_tombstones ADD COLUMN IF NOT EXISTS driver_id UUID;
+
+-- 1. Role helpers, also used by ingest_gps_points (App.tsx treats a missing profile as a client)
+CREATE OR REPLACE FUNCTION public.current_app_role()
+RETURNS TEXT AS $$
+    SELECT COALESCE((SELECT lower(role) FROM public.profiles WHERE id = auth.uid()), 'client');
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.is_staff()
+RETURNS BOOLEAN AS $$
+    SELECT public.current_app_role() NOT IN ('driver', 'client');
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.current_driver_id()
+RETURNS UUID AS $$
+    SELECT id FROM public.drivers WHERE user_id = auth.uid() LIMIT 1;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+GRANT EXECUTE ON FUNCTION public.current_app_role() TO authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.is_staff() TO authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.current_driver_id() TO authenticated, service_role;
+
+-- 2. Tombstones carry the owning driver
+CREATE OR REPLACE FUNCTION public.record_sync_tombstone()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_driver_id UUID;
+BEGIN
+    v_driver_id := CASE WHEN TG_TABLE_NAME = 'drivers' THEN (to_jsonb(OLD)->>'id')::uuid
+                        ELSE NULLIF(to_jsonb(OLD)->>'driver_id', '')::uuid END;
+
+    INSERT INTO public.sync_tombstones (table_name, row_id, deleted_at, driver_id)
+    VALUES (TG_TABLE_NAME, OLD.id::text, clock_timestamp(), v_driver_id)
+    ON CONFLICT (table_name, row_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at, driver_id = EXCLUDED.driver_id;
+
+    -- Occasional cleanup keeps the table small without a scheduled job
+    IF random() < 0.01 THEN
+        DELETE FROM public.sync_tombstones WHERE deleted_at < NOW() - INTERVAL '30 days';
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- 3. Per-role visibility
+DROP POLICY IF EXISTS "Allow auth access for sync_tombstones" ON public.sync_tombstones;
+CREATE POLICY "Allow auth access for sync_tombstones" ON public.sync_tombstones FOR SELECT TO authenticated USING (
+    public.is_staff()
+    OR table_name IN ('vehicles', 'shift_types', 'tariffs', 'service_extras', 'municipalities', 'system_settings')
+    OR (public.current_app_role() = 'driver' AND driver_id IS NOT NULL AND driver_id = public.current_driver_id())
+);
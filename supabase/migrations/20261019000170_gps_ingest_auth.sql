@@ -0,0 +1,95 @@
+-- Migration: ingest_gps_points only accepts the caller's own points
+-- Date: 2026-10-19
+-- ingest_gps_points (migration 20261019000110) runs SECURITY DEFINER for authenticated
+-- users and trusted the driver_id and booking_id of every point, so any session could
+-- write another driver's positions and raise any booking's max_speed. Points are now
+-- vetted first: a driver may only send points of their own drivers row (drivers.user_id),
+-- staff roles and the service role any driver's; a booking_id that is not assigned to the
+-- point's driver is dropped (the position is kept). gps_points_from_json is STABLE: its
+-- ::timestamptz cast depends on the session time zone.
+
+-- 1. Points of an upload: [{driver_id, recorded_at, lat, lng, speed_kmh, booking_id}, ...]
+CREATE OR REPLACE FUNCTION public.gps_points_from_json(p_points JSONB)
+RETURNS SETOF public.gps_points AS $$
+    SELECT (p->>'driver_id')::uuid,
+           (p->>'recorded_at')::timestamptz,
+           (p->>'lat')::real,
+           (p->>'lng')::real,
+           LEAST(GREATEST((p->>'speed_kmh')::numeric, 0), 32767)::smallint,
+           NULLIF(p->>'booking_id', '')::uuid
+      FROM jsonb_array_elements(p_points) AS p
+     WHERE p->>'driver_id' IS NOT NULL AND p->>'recorded_at' IS NOT NULL
+       AND p->>'lat' IS NOT NULL AND p->>'lng' IS NOT NULL;
+$$ LANGUAGE sql STABLE;
+
+-- 2. The points the caller may write (current_driver_id / is_staff: migration 20261019000160)
+CREATE OR REPLACE FUNCTION public.gps_points_for_caller(p_points JSONB)
+RETURNS SETOF public.gps_points AS $$
+    SELECT p.driver_id, p.recorded_at, p.lat, p.lng, p.speed_kmh,
+           CASE WHEN EXISTS (SELECT 1 FROM public.bookings b WHERE b.id = p.booking_id AND b.driver_id = p.driver_id)
+                THEN p.booking_id END
+      FROM public.gps_points_from_json(p_points) p
+     WHERE auth.role() = 'service_role'
+        OR public.is_staff()
+        OR p.driver_id = public.current_driver_id();
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.gps_points_for_caller(JSONB) FROM PUBLIC;
+
+-- 3. Bulk ingestion of the vetted points; retried uploads are idempotent (same driver and instant)
+CREATE OR REPLACE FUNCTION public.ingest_gps_points(p_points JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    v_points JSONB;
+    v_count INTEGER;
+BEGIN
+    SELECT COALESCE(jsonb_agg(to_jsonb(x)), '[]'::jsonb) INTO v_points
+      FROM public.gps_points_for_caller(p_points) x;
+
+    INSERT INTO public.gps_points (driver_id, recorded_at, lat, lng, speed_kmh, booking_id)
+    SELECT * FROM public.gps_points_from_json(v_points)
+    ON CONFLICT (driver_id, recorded_at) DO NOTHING;
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    -- Newest point per driver; a late offline batch never moves a driver back
+    WITH latest AS (
+        SELECT DISTINCT ON (driver_id) driver_id, lat, lng, recorded_at
+          FROM public.gps_points_from_json(v_points)
+         ORDER BY driver_id, recorded_at DESC
+    )
+    UPDATE public.driver_locations l
+       SET lat = x.lat, lng = x.lng, updated_at = x.recorded_at
+      FROM latest x
+     WHERE l.driver_id = x.driver_id
+       AND (l.updated_at IS NULL OR l.updated_at < x.recorded_at);
+
+    INSERT INTO public.driver_locations (driver_id, lat, lng, updated_at)
+    SELECT DISTINCT ON (driver_id) driver_id, lat, lng, recorded_at
+      FROM public.gps_points_from_json(v_points) x
+     WHERE NOT EXISTS (SELECT 1 FROM public.driver_locations l WHERE l.driver_id = x.driver_id)
+     ORDER BY driver_id, recorded_at DESC;
+
+    -- Bookings rows are wide and indexed on updated_at (never a HOT update): rewrite one
+    -- only for a 10 km/h step while the trip is on, or exactly for a late (offline) batch
+    UPDATE public.bookings b
+       SET max_speed = x.max_kmh
+      FROM (
+        SELECT booking_id, MAX(speed_kmh) AS max_kmh
+          FROM public.gps_points_from_json(v_points)
+         WHERE booking_id IS NOT NULL AND speed_kmh IS NOT NULL
+         GROUP BY booking_id
+      ) x
+     WHERE b.id = x.booking_id
+       AND x.max_kmh > COALESCE(b.max_speed, 0)
+       AND (x.max_kmh >= COALESCE(b.max_speed, 0) + 10 OR NOT public.trip_in_progress(b.status));
+
+    -- Opportunistic thinning, as sync_tombstones are pruned
+    IF random() < 0.001 THEN
+        PERFORM public.downsample_gps_points();
+    END IF;
+
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+GRANT EXECUTE ON FUNCTION public.ingest_gps_points(JSONB) TO authenticated, service_role;
@@ -0,0 +1,30 @@
+-- Migration: build trip tracks from late points even without an earlier track
+-- Date: 2026-10-19
+-- rebuild_tracks_after_ingest (migration 20261019000120) only rebuilt tracks that already
+-- existed. A trip driven offline end to end has no points when its status change ends it,
+-- so build_track_on_trip_end finds nothing and no trip_tracks row is written; when the
+-- queued points arrive afterwards the track was never built. Points carry a booking_id
+-- only while the trip is on, so any tagged point of a booking that is no longer in
+-- progress is late: build (or rebuild) its track.
+
+CREATE OR REPLACE FUNCTION public.rebuild_tracks_after_ingest()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM public.build_trip_track(b.id)
+       FROM public.bookings b
+      WHERE b.id IN (SELECT DISTINCT booking_id FROM new_points WHERE booking_id IS NOT NULL)
+        AND NOT public.trip_in_progress(b.status);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.rebuild_tracks_after_ingest() FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION public.build_trip_track(UUID) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION public.downsample_gps_points(INTERVAL) FROM PUBLIC;
+
+-- Trips whose points all arrived late before this migration
+SELECT public.build_trip_track(b.id)
+  FROM public.bookings b
+ WHERE b.id IN (SELECT DISTINCT booking_id FROM public.gps_points WHERE booking_id IS NOT NULL)
+   AND NOT public.trip_in_progress(b.status)
+   AND NOT EXISTS (SELECT 1 FROM public.trip_tracks t WHERE t.booking_id = b.id);
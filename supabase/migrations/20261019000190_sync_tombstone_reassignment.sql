@@ -0,0 +1,70 @@
+-- Migration: tombstones for rows that move to another driver
+-- Date: 2026-10-19
+-- The delta sync (migration 20261019000100) only evicts deleted rows. A row that stays in
+-- the table but leaves a driver's visibility, e.g. a booking reassigned to another driver
+-- or unassigned, was never returned to the old driver again and stayed in their IndexedDB
+-- snapshot. When driver_id changes, the old driver now gets a tombstone scoped to them
+-- (sync_tombstones.driver_id, migration 20261019000160), so their next delta drops the row.
+-- Sessions that still see the row (the new driver, staff) also get it in the same delta,
+-- with a newer updated_at, and the store keeps it: an upsert wins over a tombstone in one
+-- merge. A row can now have one tombstone per scope, so the key includes driver_id.
+
+-- 1. One tombstone per row and scope
+ALTER TABLE public.sync_tombstones DROP CONSTRAINT IF EXISTS sync_tombstones_pkey;
+ALTER TABLE public.sync_tombstones DROP CONSTRAINT IF EXISTS sync_tombstones_scope_key;
+ALTER TABLE public.sync_tombstones
+    ADD CONSTRAINT sync_tombstones_scope_key UNIQUE NULLS NOT DISTINCT (table_name, row_id, driver_id);
+
+CREATE OR REPLACE FUNCTION public.record_sync_tombstone()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_driver_id UUID;
+BEGIN
+    v_driver_id := CASE WHEN TG_TABLE_NAME = 'drivers' THEN (to_jsonb(OLD)->>'id')::uuid
+                        ELSE NULLIF(to_jsonb(OLD)->>'driver_id', '')::uuid END;
+
+    INSERT INTO public.sync_tombstones (table_name, row_id, deleted_at, driver_id)
+    VALUES (TG_TABLE_NAME, OLD.id::text, clock_timestamp(), v_driver_id)
+    ON CONFLICT (table_name, row_id, driver_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+
+    -- Occasional cleanup keeps the table small without a scheduled job
+    IF random() < 0.01 THEN
+        DELETE FROM public.sync_tombstones WHERE deleted_at < NOW() - INTERVAL '30 days';
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- 2. The previous driver's tombstone when a row changes hands
+CREATE OR REPLACE FUNCTION public.record_sync_reassignment()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.sync_tombstones (table_name, row_id, deleted_at, driver_id)
+    VALUES (TG_TABLE_NAME, OLD.id::text, clock_timestamp(), OLD.driver_id)
+    ON CONFLICT (table_name, row_id, driver_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.record_sync_tombstone() FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION public.record_sync_reassignment() FROM PUBLIC;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'bookings', 'shifts', 'vehicle_expenses', 'vehicle_maintenance', 'driver_logs', 'time_correction_requests'
+    ] LOOP
+        -- Only synced tables with an owning driver
+        CONTINUE WHEN NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+             WHERE table_schema = 'public' AND table_name = t AND column_name = 'driver_id'
+        );
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', 'trg_' || t || '_sync_reassignment', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER UPDATE OF driver_id ON public.%I
+                        FOR EACH ROW WHEN (OLD.driver_id IS NOT NULL AND OLD.driver_id IS DISTINCT FROM NEW.driver_id)
+                        EXECUTE FUNCTION public.record_sync_reassignment()', 'trg_' || t || '_sync_reassignment', t);
+    END LOOP;
+END $$;
@@ -1,3 +1,5 @@
+import { buildMunicipalityIndex, resolveMunicipalityCodes } from './municipalityResolver';
+
 export const buildFomentoPayload = (
     booking: any,
     shifts: any[],
@@ -31,71 +33,10 @@ export const buildFomentoPayload = (
         return null;
     };
 
-    const getCodes = (locName: string, muniName?: string, addressText?: string) => {
-        const upper = (locName || '').toUpperCase();
-        const upperMuni = (muniName || '').toUpperCase();
-        const upperAddress = (addressText || '').toUpperCase();
-        
-        // 0. Priority for Hubs
-        if (upper.includes('AEROPUERTO') || upper.includes('AIRPORT') || upperAddress.includes('AEROPUERTO') || upperAddress.includes('AIRPORT')) {
-           return { prov: '03', muni: '065' }; // Elche
-        }
-
-        // 1. Try to find by the specific municipality field if it exists
-        let match = (municipalities as any[])?.find(m => m.cod_mun && m.name.toUpperCase() === upperMuni);
-
-        // Helper to check word boundaries safely
-        const hasWord = (text: string, word: string) => {
-           if (!word) return false;
-           // Escape regex chars
-           const safeWord = word.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
-           return new RegExp(`(?:^|\\s|,|-|/)${safeWord}(?:$|\\s|,|-|/)`).test(text);
-        };
-
-        // 2. If no match, try to find by the location text
-        if (!match && upper) {
-           const matches = (municipalities as any[])?.filter(m => 
-              m.cod_mun && (hasWord(upper, m.name.toUpperCase()) || 
-              hasWord(m.name.toUpperCase(), upper))
-           ) || [];
-           if (matches.length > 0) {
-              matches.sort((a, b) => {
-                 if (a.name.toUpperCase() === upper) return -1;
-                 if (b.name.toUpperCase() === upper) return 1;
-                 return b.name.length - a.name.length; // Longest match wins
-              });
-              match = matches[0];
-           }
-        }
-
-        // 3. If still no match, try to find in the address text
-        if (!match && upperAddress) {
-           const matches = (municipalities as any[])?.filter(m => 
-              m.cod_mun && hasWord(upperAddress, m.name.toUpperCase())
-           ) || [];
-           if (matches.length > 0) {
-              matches.sort((a, b) => {
-                 if (a.name.toUpperCase() === upperAddress) return -1;
-                 if (b.name.toUpperCase() === upperAddress) return 1;
-                 return b.name.length - a.name.length; // Longest match wins
-              });
-              match = matches[0];
-           }
-        }
-
-        if (match) {
-           return { prov: match.cod_prov || '03', muni: match.cod_mun || '014' };
-        }
-
-        // Fallbacks for common cases if not found
-        if (upper.includes('ELCHE') || upper.includes('ELX') || upperAddress.includes('ELCHE') || upperAddress.includes('ELX')) return { prov: '03', muni: '065' };
-        if (upper.includes('CAMPELLO') || upperAddress.includes('CAMPELLO')) return { prov: '03', muni: '050' };
-        if (upper.includes('BENIDORM') || upperAddress.includes('BENIDORM')) return { prov: '03', muni: '031' };
-        if (upper.includes('ALTEA') || upperAddress.includes('ALTEA')) return { prov: '03', muni: '018' };
-        if (upper.includes('ALICANTE') || upper.includes('ALC') || upperAddress.includes('ALICANTE') || upperAddress.includes('ALC')) return { prov: '03', muni: '014' };
-        
-        return { prov: '03', muni: '014' }; 
-     };
+    // Municipality index is built once per municipalities list and shared across bookings
+    const muniIndex = buildMunicipalityIndex(municipalities || []);
+    const getCodes = (locName: string, muniName?: string, addressText?: string) =>
+        resolveMunicipalityCodes(muniIndex, locName, muniName, addressText);
 
     const assignedVehicle = getAssignedVehicle();
     const plate = assignedVehicle?.plate?.replace(/[-\s]/g, '-') || '2170-LVB';
@@ -0,0 +1,39 @@
+import { jsPDF } from 'jspdf';
+
+// Landscape pickup sign held by the driver at arrivals
+export const generateCartelPDF = (booking: any): jsPDF => {
+    const doc = new jsPDF({ orientation: 'landscape' });
+    const pageWidth = doc.internal.pageSize.getWidth();
+    const pageHeight = doc.internal.pageSize.getHeight();
+
+    // Background
+    doc.setFillColor(15, 15, 15); // brand-black
+    doc.rect(0, 0, pageWidth, pageHeight, 'F');
+
+    const drawBrandFallback = () => {
+        doc.setTextColor(197, 160, 89); // brand-gold
+        doc.setFontSize(24);
+        doc.text("PALLADIUM TRANSFERS", pageWidth / 2, 40, { align: 'center' });
+    };
+
+    if (booking.cartel_logo) {
+        try {
+            // Depending on image aspect ratio, width/height could be adjusted
+            doc.addImage(booking.cartel_logo, 'PNG', pageWidth / 2 - 25, 20, 50, 50, undefined, 'FAST');
+        } catch (e) {
+            console.error("Error adding image to PDF", e);
+            // Fallback to text if image fails
+            drawBrandFallback();
+        }
+    } else {
+        drawBrandFallback();
+    }
+
+    doc.setTextColor(255, 255, 255);
+    doc.setFontSize(48);
+    // Use cartel_text if present, otherwise fallback to passenger name
+    const mainText = booking.cartel_text || booking.passenger || '';
+    doc.text(mainText.toUpperCase(), pageWidth / 2, pageHeight / 2 + 10, { align: 'center' });
+
+    return doc;
+};
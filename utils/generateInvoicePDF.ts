@@ -1,7 +1,7 @@
 import { jsPDF } from 'jspdf';
 import autoTable from 'jspdf-autotable';
 import { supabase } from '../services/supabase';
-import { LOGO_BASE64 } from './assets';
+import { addLogo } from './pdfAssets';
 
 // Helper to fetch company settings
 const fetchCompanySettings = async () => {
@@ -15,27 +15,50 @@ const fetchCompanySettings = async () => {
     return settings;
 };
 
-// Helper to fetch invoice line items (bookings)
-const fetchInvoiceItems = async (invoiceId: string) => {
-    const { data } = await supabase
-        .from('bookings')
-        .select('*')
-        .eq('invoice_id', invoiceId)
-        .order('pickup_time', { ascending: true });
-    return data || [];
-};
+// Everything a set of invoice PDFs needs, fetched in three queries regardless of
+// how many invoices are rendered.
+export interface InvoicePDFContext {
+    settings: any;
+    clientsById: Record<string, any>;
+    itemsByInvoice: Record<string, any[]>;
+}
+
+export const loadInvoicePDFContext = async (invoices: any[]): Promise<InvoicePDFContext> => {
+    const invoiceIds = invoices.map(inv => inv.id);
+    const clientIds = Array.from(new Set(invoices.map(inv => inv.client_id).filter(Boolean)));
+
+    const [settings, { data: clients }, { data: items }] = await Promise.all([
+        fetchCompanySettings(),
+        supabase.from('clients').select('*').in('id', clientIds),
+        supabase
+            .from('bookings')
+            .select('*')
+            .in('invoice_id', invoiceIds)
+            .order('pickup_time', { ascending: true })
+    ]);
+
+    const clientsById: Record<string, any> = {};
+    (clients || []).forEach((c: any) => { clientsById[c.id] = c; });
 
-const fetchClient = async (clientId: string) => {
-    const { data } = await supabase.from('clients').select('*').eq('id', clientId).single();
-    return data;
+    const itemsByInvoice: Record<string, any[]> = {};
+    (items || []).forEach((b: any) => {
+        (itemsByInvoice[b.invoice_id] ||= []).push(b);
+    });
+
+    return { settings, clientsById, itemsByInvoice };
 };
 
-export const generateInvoicePDF = async (invoice: any, options: { download?: boolean; returnBase64?: boolean } = { download: true }) => {
+export const generateInvoicePDF = async (
+    invoice: any,
+    options: { download?: boolean; returnBase64?: boolean } = { download: true },
+    context?: InvoicePDFContext
+) => {
     try {
-        // 1. Fetch dependencies
-        const settings = await fetchCompanySettings();
-        const items = await fetchInvoiceItems(invoice.id);
-        const client = await fetchClient(invoice.client_id);
+        // 1. Fetch dependencies (skipped when rendering as part of a batch)
+        const ctx = context || await loadInvoicePDFContext([invoice]);
+        const settings = ctx.settings;
+        const items = ctx.itemsByInvoice[invoice.id] || [];
+        const client = ctx.clientsById[invoice.client_id];
 
         // 2. Initialize PDF
         const doc = new jsPDF() as any;
@@ -49,8 +72,7 @@ export const generateInvoicePDF = async (invoice: any, options: { download?: boo
         // Left: Actual Logo Image
         const yPos = 10;
         try {
-            const base64Data = LOGO_BASE64.split(',')[1] || LOGO_BASE64;
-            doc.addImage(base64Data, 'PNG', 20, yPos, 50, 20);
+            addLogo(doc, 20, yPos, 50, 20);
         } catch (e) {
             // Fallback to text if logo fails
             doc.setFontSize(22);
@@ -255,3 +277,19 @@ export const generateInvoicePDF = async (invoice: any, options: { download?: boo
         return { success: false };
     }
 };
+
+// Renders many invoices with a single context load. Yields to the event loop between
+// documents so the UI stays responsive during month-end runs.
+export const generateInvoicePDFBatch = async (
+    invoices: any[],
+    options: { download?: boolean; returnBase64?: boolean } = { download: true }
+) => {
+    const context = await loadInvoicePDFContext(invoices);
+    const results: { invoice: any; success: boolean; base64?: string }[] = [];
+    for (const invoice of invoices) {
+        const res = await generateInvoicePDF(invoice, options, context);
+        results.push({ invoice, ...res });
+        await new Promise(resolve => setTimeout(resolve, 0));
+    }
+    return results;
+};
@@ -1,5 +1,5 @@
 import { jsPDF } from 'jspdf';
-import { LOGO_BASE64 } from './assets';
+import { addLogo } from './pdfAssets';
 
 export const generateVoucherPDF = (bookings: any[]): jsPDF => {
     const doc = new jsPDF();
@@ -15,8 +15,7 @@ export const generateVoucherPDF = (bookings: any[]): jsPDF => {
 
         // Logo Image / Fallback text
         try {
-            const base64Data = LOGO_BASE64.split(',')[1] || LOGO_BASE64;
-            doc.addImage(base64Data, 'PNG', 75, 4, 60, 24);
+            addLogo(doc, 75, 4, 60, 24);
         } catch (e) {
             // Palladium Transfers Logo (Text Representation)
             doc.setTextColor(255, 255, 255);
@@ -0,0 +1,126 @@
+// Uniform latitude/longitude grid for nearest-neighbour queries.
+// Points are bucketed by cell (CELL_DEG on a side, ~2.2 km north-south and ~1.7 km east-west
+// on the Costa Blanca) through an entityStore index, so the buckets are rebuilt once per
+// change of the table. A query walks square rings of cells outward from the query cell and
+// stops as soon as the k-th accepted point is closer than anything an outer ring can hold,
+// so it reads a handful of cells instead of every point. scripts/nearest_driver_bench.py
+// mirrors this search and checks it against a full scan.
+
+export const CELL_DEG = 0.02;
+
+const EARTH_KM = 6371;
+const RAD = Math.PI / 180;
+
+export interface Neighbour<T> {
+    item: T;
+    distanceKm: number;
+}
+
+// Service region (Comunitat Valenciana and Murcia, with margin). Points outside it, such as
+// (0,0) from a phone without a fix, are left out of the grid: one of them would widen the
+// extent, and with it the number of rings a search may walk, by thousands of cells.
+export const SERVICE_AREA = { south: 37.0, north: 41.0, west: -2.5, east: 1.0 };
+
+export const inServiceArea = (lat: number, lng: number): boolean =>
+    Number.isFinite(lat) && Number.isFinite(lng) &&
+    lat >= SERVICE_AREA.south && lat <= SERVICE_AREA.north && lng >= SERVICE_AREA.west && lng <= SERVICE_AREA.east;
+
+export const geoCell = (lat: number, lng: number): string =>
+    `${Math.floor(lat / CELL_DEG)}:${Math.floor(lng / CELL_DEG)}`;
+
+/** Haversine distance in km. */
+export const distanceKm = (lat1: number, lng1: number, lat2: number, lng2: number): number => {
+    const a = Math.sin((lat2 - lat1) * RAD / 2) ** 2 +
+        Math.cos(lat1 * RAD) * Math.cos(lat2 * RAD) * Math.sin((lng2 - lng1) * RAD / 2) ** 2;
+    return 2 * EARTH_KM * Math.asin(Math.min(1, Math.sqrt(a)));
+};
+
+interface GridExtent {
+    minRow: number;
+    maxRow: number;
+    minCol: number;
+    maxCol: number;
+    maxLat: number; // largest |latitude| in the grid, for the narrowest cell width
+}
+
+const extentCache = new WeakMap<Map<string, any[]>, GridExtent | null>();
+
+function extentOf(grid: Map<string, any[]>): GridExtent | null {
+    if (extentCache.has(grid)) return extentCache.get(grid)!;
+    let extent: GridExtent | null = null;
+    grid.forEach((_, key) => {
+        const [row, col] = key.split(':').map(Number);
+        if (!extent) {
+            extent = { minRow: row, maxRow: row, minCol: col, maxCol: col, maxLat: 0 };
+        } else {
+            extent.minRow = Math.min(extent.minRow, row);
+            extent.maxRow = Math.max(extent.maxRow, row);
+            extent.minCol = Math.min(extent.minCol, col);
+            extent.maxCol = Math.max(extent.maxCol, col);
+        }
+        extent.maxLat = Math.max(extent.maxLat, Math.abs(row * CELL_DEG), Math.abs((row + 1) * CELL_DEG));
+    });
+    extentCache.set(grid, extent);
+    return extent;
+}
+
+/**
+ * The k points of `grid` (cell key -> items) nearest to (lat, lng) for which `accept` holds,
+ * nearest first. `accept` is only called on candidates in distance order, and only until k
+ * are found, so an expensive check (a driver's schedule) runs on a few items.
+ */
+export function nearestInGrid<T>(
+    grid: Map<string, T[]>,
+    lat: number,
+    lng: number,
+    k: number,
+    position: (item: T) => [number, number] | null,
+    accept: (item: T) => boolean = () => true
+): Neighbour<T>[] {
+    const extent = extentOf(grid);
+    const found: Neighbour<T>[] = [];
+    if (!extent || k <= 0) return found;
+
+    const row0 = Math.floor(lat / CELL_DEG);
+    const col0 = Math.floor(lng / CELL_DEG);
+    const maxRing = Math.max(
+        Math.abs(row0 - extent.minRow), Math.abs(row0 - extent.maxRow),
+        Math.abs(col0 - extent.minCol), Math.abs(col0 - extent.maxCol)
+    );
+    // A point outside rings 0..r is at least r cells away along one axis
+    const cellKm = CELL_DEG * RAD * EARTH_KM * Math.min(1, Math.cos(Math.max(Math.abs(lat), extent.maxLat) * RAD));
+
+    let pending: Neighbour<T>[] = []; // seen, not yet tested, sorted by distance
+    const visit = (row: number, col: number) => {
+        const items = grid.get(`${row}:${col}`);
+        if (!items) return;
+        for (const item of items) {
+            const p = position(item);
+            if (p) pending.push({ item, distanceKm: distanceKm(lat, lng, p[0], p[1]) });
+        }
+    };
+
+    for (let ring = 0; ring <= maxRing && found.length < k; ring++) {
+        if (ring === 0) {
+            visit(row0, col0);
+        } else {
+            for (let col = col0 - ring; col <= col0 + ring; col++) {
+                visit(row0 - ring, col);
+                visit(row0 + ring, col);
+            }
+            for (let row = row0 - ring + 1; row <= row0 + ring - 1; row++) {
+                visit(row, col0 - ring);
+                visit(row, col0 + ring);
+            }
+        }
+        pending.sort((a, b) => a.distanceKm - b.distanceKm);
+        const bound = ring === maxRing ? Infinity : ring * cellKm;
+        let taken = 0;
+        while (taken < pending.length && found.length < k && pending[taken].distanceKm <= bound) {
+            if (accept(pending[taken].item)) found.push(pending[taken]);
+            taken++;
+        }
+        pending = pending.slice(taken);
+    }
+    return found;
+}
@@ -0,0 +1,203 @@
+// Precompiled municipality lookup for Fomento payloads.
+// Built once per municipalities array (cached by reference) and reused for the origin
+// and destination of every booking, instead of compiling two RegExps per municipality
+// per lookup. scripts/municipality_index.py mirrors this logic and benchmarks it.
+
+export interface MunicipalityCodes {
+    prov: string;
+    muni: string;
+}
+
+interface Entry {
+    name: string; // uppercased
+    municipality: any;
+}
+
+interface AcNode {
+    next: Map<string, number>;
+    fail: number;
+    out: number[]; // entry indexes whose name ends at this node
+}
+
+export interface MunicipalityIndex {
+    entries: Entry[];
+    byName: Map<string, Entry>;
+    byToken: Map<string, number[]>;
+    nodes: AcNode[];
+}
+
+// Same word delimiters as the original `(?:^|\s|,|-|/)` boundary regex
+const isDelimiter = (ch: string | undefined) => ch === undefined || ch === ',' || ch === '-' || ch === '/' || /\s/.test(ch);
+const TOKEN_SPLIT = /[\s,\-/]+/;
+
+const isWordAt = (text: string, start: number, length: number) =>
+    isDelimiter(start > 0 ? text[start - 1] : undefined) && isDelimiter(text[start + length]);
+
+const indexCache = new WeakMap<any[], MunicipalityIndex>();
+
+export const buildMunicipalityIndex = (municipalities: any[]): MunicipalityIndex => {
+    const cached = indexCache.get(municipalities);
+    if (cached) return cached;
+
+    const entries: Entry[] = (municipalities || [])
+        .filter(m => m && m.cod_mun && m.name)
+        .map(m => ({ name: String(m.name).toUpperCase(), municipality: m }));
+
+    const byName = new Map<string, Entry>();
+    const byToken = new Map<string, number[]>();
+    const nodes: AcNode[] = [{ next: new Map(), fail: 0, out: [] }];
+
+    entries.forEach((entry, i) => {
+        if (!byName.has(entry.name)) byName.set(entry.name, entry);
+
+        new Set(entry.name.split(TOKEN_SPLIT).filter(Boolean)).forEach(token => {
+            const list = byToken.get(token);
+            if (list) list.push(i); else byToken.set(token, [i]);
+        });
+
+        // Aho-Corasick trie
+        let node = 0;
+        for (const ch of entry.name) {
+            let child = nodes[node].next.get(ch);
+            if (child === undefined) {
+                child = nodes.length;
+                nodes.push({ next: new Map(), fail: 0, out: [] });
+                nodes[node].next.set(ch, child);
+            }
+            node = child;
+        }
+        nodes[node].out.push(i);
+    });
+
+    // Failure links (BFS)
+    const queue: number[] = [];
+    nodes[0].next.forEach(child => queue.push(child));
+    for (let q = 0; q < queue.length; q++) {
+        const current = queue[q];
+        nodes[current].next.forEach((child, ch) => {
+            let f = nodes[current].fail;
+            while (f !== 0 && !nodes[f].next.has(ch)) f = nodes[f].fail;
+            const target = nodes[f].next.get(ch);
+            nodes[child].fail = target !== undefined && target !== child ? target : 0;
+            nodes[child].out = nodes[child].out.concat(nodes[nodes[child].fail].out);
+            queue.push(child);
+        });
+    }
+
+    const index = { entries, byName, byToken, nodes };
+    indexCache.set(municipalities, index);
+    return index;
+};
+
+// Municipalities whose name appears in `text` as a whole word (single pass over text)
+const findNamesInText = (index: MunicipalityIndex, text: string): Set<number> => {
+    const found = new Set<number>();
+    const { nodes, entries } = index;
+    let node = 0;
+    for (let pos = 0; pos < text.length; pos++) {
+        const ch = text[pos];
+        while (node !== 0 && !nodes[node].next.has(ch)) node = nodes[node].fail;
+        node = nodes[node].next.get(ch) ?? 0;
+        for (const i of nodes[node].out) {
+            const length = entries[i].name.length;
+            if (isWordAt(text, pos - length + 1, length)) found.add(i);
+        }
+    }
+    return found;
+};
+
+// Municipalities whose name contains `text` as a whole word (token index intersection)
+const findNamesContainingText = (index: MunicipalityIndex, text: string): Set<number> => {
+    const found = new Set<number>();
+    const tokens = text.split(TOKEN_SPLIT).filter(Boolean);
+    if (tokens.length === 0) return found;
+
+    let candidates = index.byToken.get(tokens[0]) || [];
+    for (const token of tokens.slice(1)) {
+        const other = new Set(index.byToken.get(token) || []);
+        candidates = candidates.filter(i => other.has(i));
+    }
+    for (const i of candidates) {
+        const name = index.entries[i].name;
+        for (let at = name.indexOf(text); at !== -1; at = name.indexOf(text, at + 1)) {
+            if (isWordAt(name, at, text.length)) {
+                found.add(i);
+                break;
+            }
+        }
+    }
+    return found;
+};
+
+// Exact match wins, then longest name; ties keep the table order like the old stable sort
+const pickBest = (index: MunicipalityIndex, matches: Set<number>, exact: string) => {
+    let best = -1;
+    for (const i of Array.from(matches).sort((a, b) => a - b)) {
+        const name = index.entries[i].name;
+        if (name === exact) return index.entries[i];
+        if (best === -1 || name.length > index.entries[best].name.length) best = i;
+    }
+    return best === -1 ? null : index.entries[best];
+};
+
+/**
+ * The municipality named by a location (its municipality field first, then the location
+ * text, then the address), or null. Hubs and fallbacks are left to the caller.
+ */
+export const matchMunicipality = (
+    index: MunicipalityIndex,
+    locName: string,
+    muniName?: string,
+    addressText?: string
+): any | null => {
+    const upper = (locName || '').toUpperCase();
+    const upperMuni = (muniName || '').toUpperCase();
+    const upperAddress = (addressText || '').toUpperCase();
+
+    // 1. Try to find by the specific municipality field if it exists
+    let match = index.byName.get(upperMuni) || null;
+
+    // 2. If no match, try to find by the location text (in either direction)
+    if (!match && upper) {
+        const matches = findNamesInText(index, upper);
+        findNamesContainingText(index, upper).forEach(i => matches.add(i));
+        match = pickBest(index, matches, upper);
+    }
+
+    // 3. If still no match, try to find in the address text
+    if (!match && upperAddress) {
+        match = pickBest(index, findNamesInText(index, upperAddress), upperAddress);
+    }
+
+    return match ? match.municipality : null;
+};
+
+export const resolveMunicipalityCodes = (
+    index: MunicipalityIndex,
+    locName: string,
+    muniName?: string,
+    addressText?: string
+): MunicipalityCodes => {
+    const upper = (locName || '').toUpperCase();
+    const upperAddress = (addressText || '').toUpperCase();
+
+    // 0. Priority for Hubs
+    if (upper.includes('AEROPUERTO') || upper.includes('AIRPORT') || upperAddress.includes('AEROPUERTO') || upperAddress.includes('AIRPORT')) {
+        return { prov: '03', muni: '065' }; // Elche
+    }
+
+    const match = matchMunicipality(index, locName, muniName, addressText);
+
+    if (match) {
+        return { prov: match.cod_prov || '03', muni: match.cod_mun || '014' };
+    }
+
+    // Fallbacks for common cases if not found
+    if (upper.includes('ELCHE') || upper.includes('ELX') || upperAddress.includes('ELCHE') || upperAddress.includes('ELX')) return { prov: '03', muni: '065' };
+    if (upper.includes('CAMPELLO') || upperAddress.includes('CAMPELLO')) return { prov: '03', muni: '050' };
+    if (upper.includes('BENIDORM') || upperAddress.includes('BENIDORM')) return { prov: '03', muni: '031' };
+    if (upper.includes('ALTEA') || upperAddress.includes('ALTEA')) return { prov: '03', muni: '018' };
+    if (upper.includes('ALICANTE') || upper.includes('ALC') || upperAddress.includes('ALICANTE') || upperAddress.includes('ALC')) return { prov: '03', muni: '014' };
+
+    return { prov: '03', muni: '014' };
+};
@@ -0,0 +1,13 @@
+import { jsPDF } from 'jspdf';
+import { LOGO_BASE64 } from './assets';
+
+// Decoded once per session instead of once per document/page
+export const LOGO_DATA = LOGO_BASE64.split(',')[1] || LOGO_BASE64;
+
+// jsPDF stores an image once per document and references it by alias, so a
+// multi-page voucher run embeds the logo a single time instead of once per page.
+const LOGO_ALIAS = 'palladium-logo';
+
+export const addLogo = (doc: jsPDF, x: number, y: number, width: number, height: number) => {
+    doc.addImage(LOGO_DATA, 'PNG', x, y, width, height, LOGO_ALIAS, 'FAST');
+};
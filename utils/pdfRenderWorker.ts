@@ -0,0 +1,14 @@
+// Renders voucher/cartel PDFs off the main thread for renderPDFBatch.
+import { generateVoucherPDF } from './generateVoucherPDF';
+import { generateCartelPDF } from './generateCartelPDF';
+
+self.onmessage = (e: MessageEvent) => {
+    const { id, kind, bookings } = e.data;
+    try {
+        const doc = kind === 'cartel' ? generateCartelPDF(bookings[0]) : generateVoucherPDF(bookings);
+        const buffer: ArrayBuffer = doc.output('arraybuffer');
+        (self as any).postMessage({ id, buffer }, [buffer]);
+    } catch (err: any) {
+        (self as any).postMessage({ id, error: err?.message || String(err) });
+    }
+};
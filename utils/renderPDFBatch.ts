@@ -0,0 +1,84 @@
+import { generateVoucherPDF } from './generateVoucherPDF';
+import { generateCartelPDF } from './generateCartelPDF';
+import { createZip, ZipEntry } from './zip';
+
+export interface PDFJob {
+    kind: 'voucher' | 'cartel';
+    bookings: any[];
+    fileName: string;
+}
+
+const MAX_WORKERS = 4;
+
+const renderInline = (job: PDFJob): Uint8Array => {
+    const doc = job.kind === 'cartel' ? generateCartelPDF(job.bookings[0]) : generateVoucherPDF(job.bookings);
+    return new Uint8Array(doc.output('arraybuffer'));
+};
+
+// Renders many PDFs across a small pool of Web Workers and packs them into one ZIP.
+// Each worker keeps its jsPDF module and decoded logo warm for every job it takes.
+// Falls back to the main thread where workers are unavailable.
+export const renderPDFBatch = async (
+    jobs: PDFJob[],
+    onProgress?: (done: number, total: number) => void
+): Promise<Blob> => {
+    const outputs: (Uint8Array | null)[] = new Array(jobs.length).fill(null);
+    let done = 0;
+    const markDone = () => { done++; onProgress?.(done, jobs.length); };
+
+    if (typeof Worker === 'undefined') {
+        for (let i = 0; i < jobs.length; i++) {
+            outputs[i] = renderInline(jobs[i]);
+            markDone();
+            await new Promise(resolve => setTimeout(resolve, 0));
+        }
+    } else {
+        const poolSize = Math.max(1, Math.min(navigator.hardwareConcurrency || 2, MAX_WORKERS, jobs.length));
+        let next = 0;
+
+        const runWorker = () => new Promise<void>((resolve) => {
+            const worker = new Worker(new URL('./pdfRenderWorker.ts', import.meta.url), { type: 'module' });
+            let current: number | null = null;
+            const dispatch = () => {
+                if (next >= jobs.length) {
+                    worker.terminate();
+                    return resolve();
+                }
+                current = next++;
+                worker.postMessage({ id: current, kind: jobs[current].kind, bookings: jobs[current].bookings });
+            };
+            // A worker that fails to load hands its share back to the main thread
+            worker.onerror = (err) => {
+                console.error('PDF worker failed, rendering inline:', err);
+                worker.terminate();
+                if (current !== null && !outputs[current]) {
+                    outputs[current] = renderInline(jobs[current]);
+                    markDone();
+                }
+                while (next < jobs.length) {
+                    const id = next++;
+                    outputs[id] = renderInline(jobs[id]);
+                    markDone();
+                }
+                resolve();
+            };
+            worker.onmessage = (e: MessageEvent) => {
+                const { id, buffer, error } = e.data;
+                if (error) {
+                    console.error(`Error rendering ${jobs[id].fileName}:`, error);
+                    outputs[id] = renderInline(jobs[id]);
+                } else {
+                    outputs[id] = new Uint8Array(buffer);
+                }
+                markDone();
+                dispatch();
+            };
+            dispatch();
+        });
+
+        await Promise.all(Array.from({ length: poolSize }, runWorker));
+    }
+
+    const entries: ZipEntry[] = jobs.map((job, i) => ({ name: job.fileName, data: outputs[i]! }));
+    return createZip(entries);
+};
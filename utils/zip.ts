@@ -0,0 +1,84 @@
+// Minimal store-only (uncompressed) ZIP writer. PDFs are already deflated internally,
+// so compressing them again costs CPU for almost no size gain.
+
+export interface ZipEntry {
+    name: string;
+    data: Uint8Array;
+}
+
+let crcTable: Uint32Array | null = null;
+
+const crc32 = (data: Uint8Array) => {
+    if (!crcTable) {
+        crcTable = new Uint32Array(256);
+        for (let n = 0; n < 256; n++) {
+            let c = n;
+            for (let k = 0; k < 8; k++) c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+            crcTable[n] = c >>> 0;
+        }
+    }
+    let crc = 0xFFFFFFFF;
+    for (let i = 0; i < data.length; i++) crc = crcTable[(crc ^ data[i]) & 0xFF] ^ (crc >>> 8);
+    return (crc ^ 0xFFFFFFFF) >>> 0;
+};
+
+const dosDateTime = (d: Date) => ({
+    time: (d.getHours() << 11) | (d.getMinutes() << 5) | (d.getSeconds() >> 1),
+    date: ((d.getFullYear() - 1980) << 9) | ((d.getMonth() + 1) << 5) | d.getDate()
+});
+
+// Entries are referenced, not copied, into the resulting Blob.
+export const createZip = (entries: ZipEntry[]): Blob => {
+    const encoder = new TextEncoder();
+    const { time, date } = dosDateTime(new Date());
+    const parts: BlobPart[] = [];
+    const central: Uint8Array[] = [];
+    let offset = 0;
+
+    entries.forEach(entry => {
+        const name = encoder.encode(entry.name);
+        const crc = crc32(entry.data);
+        const size = entry.data.length;
+
+        const local = new DataView(new ArrayBuffer(30));
+        local.setUint32(0, 0x04034B50, true);
+        local.setUint16(4, 20, true);
+        local.setUint16(6, 0x0800, true); // UTF-8 names
+        local.setUint16(8, 0, true); // stored
+        local.setUint16(10, time, true);
+        local.setUint16(12, date, true);
+        local.setUint32(14, crc, true);
+        local.setUint32(18, size, true);
+        local.setUint32(22, size, true);
+        local.setUint16(26, name.length, true);
+        local.setUint16(28, 0, true);
+        parts.push(local.buffer, name, entry.data);
+
+        const header = new DataView(new ArrayBuffer(46));
+        header.setUint32(0, 0x02014B50, true);
+        header.setUint16(4, 20, true);
+        header.setUint16(6, 20, true);
+        header.setUint16(8, 0x0800, true);
+        header.setUint16(10, 0, true);
+        header.setUint16(12, time, true);
+        header.setUint16(14, date, true);
+        header.setUint32(16, crc, true);
+        header.setUint32(20, size, true);
+        header.setUint32(24, size, true);
+        header.setUint16(28, name.length, true);
+        header.setUint32(42, offset, true);
+        central.push(new Uint8Array(header.buffer), name);
+
+        offset += 30 + name.length + size;
+    });
+
+    const centralSize = central.reduce((sum, part) => sum + part.length, 0);
+    const end = new DataView(new ArrayBuffer(22));
+    end.setUint32(0, 0x06054B50, true);
+    end.setUint16(8, entries.length, true);
+    end.setUint16(10, entries.length, true);
+    end.setUint32(12, centralSize, true);
+    end.setUint32(16, offset, true);
+
+    return new Blob([...parts, ...central, end.buffer], { type: 'application/zip' });
+};
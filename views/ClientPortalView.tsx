@@ -4,6 +4,7 @@ import { Session } from '@supabase/supabase-js';
 import { useToast } from '../components/ui/Toast';
 import { ViewState, Language } from '../types';
 import { sendCancellationEmail, sendChangeRequestEmail } from '../services/emailService';
+import { AvailabilityHeatmap } from '../components/AvailabilityHeatmap';
 
 interface ClientPortalProps {
     session: Session | null;
@@ -49,6 +50,8 @@ export const ClientPortalView: React.FC<ClientPortalProps> = ({ session, onNewBo
             changeRequestPlaceholder: { es: 'Ej: Necesito cambiar la dirección de recogida a...', en: 'Ex: I need to change the pickup address to...' },
             changeNotice: { es: 'Nota Importante: Los cambios de hora solo están permitidos con más de 24 horas de antelación. Si su recogida es en menos de 24 horas, por favor contacte directamente a reservas@palladiumtransfers.com.', en: 'Important Note: Time changes are only allowed with more than 24 hours notice. If your pickup is in less than 24 hours, please contact reservas@palladiumtransfers.com directly.' },
             changeErrorTime: { es: 'Esta reserva es en menos de 24h. Para cambiar la hora, contacte a reservas@palladiumtransfers.com', en: 'This booking is in less than 24h. To change the time, contact reservas@palladiumtransfers.com' },
+            availabilityTitle: { es: 'Disponibilidad (toca un hueco libre para proponerlo)', en: 'Availability (tap a free slot to propose it)' },
+            proposedTime: { es: 'Nueva hora propuesta:', en: 'Proposed new time:' },
             changeSuccess: { es: 'Solicitud de cambio enviada. Nuestro equipo la revisará en breve.', en: 'Change request sent. Our team will review it shortly.' },
             changeError: { es: 'Error al enviar la solicitud.', en: 'Error sending request.' },
             sendRequest: { es: 'Enviar Solicitud', en: 'Send Request' },
@@ -342,6 +345,19 @@ export const ClientPortalView: React.FC<ClientPortalProps> = ({ session, onNewBo
                                 </p>
                             </div>
 
+                            <div className="mb-6 space-y-2">
+                                <p className="text-[10px] uppercase font-bold tracking-widest text-brand-platinum/50">{t('availabilityTitle')}</p>
+                                <AvailabilityHeatmap
+                                    startDate={String(selectedBookingForChange.pickup_date).split('T')[0]}
+                                    origin={selectedBookingForChange.origin || ''}
+                                    selectedDate={String(selectedBookingForChange.pickup_date).split('T')[0]}
+                                    selectedTime={selectedBookingForChange.pickup_time}
+                                    excludeBookingId={selectedBookingForChange.id}
+                                    onSelect={(date, time) => setChangeRequestText(prev => `${prev ? prev.trim() + '\n' : ''}${t('proposedTime')} ${date} ${time}`)}
+                                    language={language}
+                                />
+                            </div>
+
                             <textarea
                                 value={changeRequestText}
                                 onChange={(e) => setChangeRequestText(e.target.value)}
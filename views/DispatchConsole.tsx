@@ -1,5 +1,5 @@
 import React, { useState, useMemo, useRef, useEffect } from 'react';
-import { useSupabaseData } from '../hooks/useSupabaseData';
+import { useSupabaseData, useEntityIndex } from '../hooks/useSupabaseData';
 import { supabase } from '../services/supabase';
 import { isDriverAvailable, getAssignedVehicleForBooking } from '../services/autoAssignment';
 
@@ -9,6 +9,8 @@ export const DispatchConsole: React.FC = () => {
    const { data: drivers, loading: loadingDrivers } = useSupabaseData('drivers');
    const { data: vehicles } = useSupabaseData('vehicles');
    const { data: shifts } = useSupabaseData('shifts');
+   const bookingsByDate = useEntityIndex('bookingsByDate');
+   const shiftsByDriverDate = useEntityIndex('shiftsByDriverDate');
    const [selectedBooking, setSelectedBooking] = useState<any>(null);
    const [searchQuery, setSearchQuery] = useState('');
    const [draggedBookingId, setDraggedBookingId] = useState<string | null>(null);
@@ -57,33 +59,24 @@ export const DispatchConsole: React.FC = () => {
       }
    }, [selectedDate]);
 
-   const filteredBookings = useMemo(() => {
-      if (!bookings) return [];
-      return bookings.filter((b: any) => {
-         if (!b.pickup_date) return false;
-         const bookingDate = b.pickup_date.split(' ')[0].split('T')[0];
-         return bookingDate === selectedDate;
-      });
-   }, [bookings, selectedDate]);
+   const filteredBookings = useMemo(() => bookingsByDate.get(selectedDate) || [], [bookingsByDate, selectedDate]);
 
    const filteredDrivers = useMemo(() => {
-      if (!drivers || !shifts) return [];
+      if (!drivers) return [];
 
-      const driversWithShift = drivers.filter((d: any) => {
-         return shifts.some((s: any) => s.driver_id === d.id && s.date === selectedDate);
-      });
+      const driversWithShift = drivers.filter((d: any) => shiftsByDriverDate.has(`${d.id}|${selectedDate}`));
 
       if (!searchQuery) return driversWithShift;
 
       return driversWithShift.filter((d: any) => {
-         const shift = shifts.find((s: any) => s.driver_id === d.id && s.date === selectedDate);
+         const shift = shiftsByDriverDate.get(`${d.id}|${selectedDate}`)?.[0];
          const assignedVehicle = shift && vehicles ? vehicles.find((v: any) => v.id === shift.vehicle_id) : null;
          const vehicleStr = assignedVehicle ? `${assignedVehicle.plate} ${assignedVehicle.model}`.toLowerCase() : '';
 
          return d.name.toLowerCase().includes(searchQuery.toLowerCase()) ||
             vehicleStr.includes(searchQuery.toLowerCase());
       });
-   }, [drivers, shifts, selectedDate, searchQuery, vehicles]);
+   }, [drivers, shiftsByDriverDate, selectedDate, searchQuery, vehicles]);
 
    const handleReassign = async (bookingId: string, newDriverId: string) => {
       const newDriver = drivers?.find((d: any) => d.id === newDriverId);
@@ -210,7 +203,7 @@ export const DispatchConsole: React.FC = () => {
                         <p className="text-xs text-brand-platinum/30 font-bold uppercase tracking-tighter">Sin servicios asignados</p>
                      </div>
                   ) : filteredDrivers.map((d: any) => {
-                     const shift = shifts?.find((s: any) => s.driver_id === d.id && s.date === selectedDate);
+                     const shift = shiftsByDriverDate.get(`${d.id}|${selectedDate}`)?.[0];
                      const assignedVehicle = shift && vehicles ? vehicles.find((v: any) => v.id === shift.vehicle_id) : null;
 
                      return (
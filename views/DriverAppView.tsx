@@ -1,11 +1,13 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { supabase } from '../services/supabase';
 import { useSupabaseData } from '../hooks/useSupabaseData';
 import { GananciasDriverView } from './GananciasDriverView';
 import { HistoricoDriverView } from './HistoricoDriverView';
 import { DriverCalendarView } from './DriverCalendarView';
 import { buildFomentoPayload } from '../utils/fomentoHelper';
-import { jsPDF } from 'jspdf';
+import { callFomento } from '../services/fomentoQueue';
+import { recordPosition, startTelemetry } from '../services/telemetryQueue';
+import { generateCartelPDF } from '../utils/generateCartelPDF';
 
 const VAPID_PUBLIC_KEY = 'BIkf8Kxpm3nN7n1ShQhbTS6TKWLummppl6-hXos65jNkvi7BL0Rm8z2fYhKBKBvroSy9GIub9D6pDaGLcAgvi44';
 
@@ -329,38 +331,29 @@ export const DriverAppView: React.FC = () => {
    }, [selectedDriverId, allBookings]);
 
    // GEOLOCATION
-   useEffect(() => {
-      if (selectedDriverId && activeDriver?.current_status === 'Working') {
-         const interval = setInterval(() => {
-            navigator.geolocation.getCurrentPosition((pos) => {
-               const { latitude, longitude, speed } = pos.coords;
-               supabase.from('driver_locations').upsert({
-                  driver_id: selectedDriverId,
-                  lat: latitude,
-                  lng: longitude,
-                  updated_at: new Date().toISOString()
-               }).then();
-
-               // Track max speed for active bookings
-               if (speed !== null && speed > 0 && allBookings) {
-                  const speedKmh = Math.round(speed * 3.6);
-                  const activeBookings = allBookings.filter((b: any) =>
-                     b.driver_id === selectedDriverId &&
-                     (b.status === 'En Route' || b.status === 'At Origin' || b.status === 'In Progress')
-                  );
+   // Fixes are thinned and uploaded in batches by services/telemetryQueue.ts; the server
+   // moves driver_locations and raises max_speed of the trip in progress
+   const activeTripId = allBookings?.find((b: any) =>
+      b.driver_id === selectedDriverId &&
+      (b.status === 'En Route' || b.status === 'At Origin' || b.status === 'In Progress')
+   )?.id ?? null;
+   const activeTripRef = useRef<string | null>(activeTripId);
+   activeTripRef.current = activeTripId;
 
-                  activeBookings.forEach((b: any) => {
-                     const currentMax = Number(b.max_speed) || 0;
-                     if (speedKmh > currentMax) {
-                        updateBooking(b.id, { max_speed: speedKmh });
-                     }
-                  });
-               }
-            });
-         }, 30000);
-         return () => clearInterval(interval);
+   useEffect(() => {
+      if (selectedDriverId && activeDriver?.current_status === 'Working' && navigator.geolocation) {
+         const stopTelemetry = startTelemetry();
+         const watchId = navigator.geolocation.watchPosition(
+            (pos) => recordPosition(selectedDriverId, pos.coords, pos.timestamp, activeTripRef.current),
+            (err) => console.error('Error de geolocalización:', err),
+            { maximumAge: 5000 }
+         );
+         return () => {
+            navigator.geolocation.clearWatch(watchId);
+            stopTelemetry();
+         };
       }
-   }, [selectedDriverId, activeDriver?.current_status, allBookings]);
+   }, [selectedDriverId, activeDriver?.current_status]);
 
    // CHECK FOR FORGOTTEN TRANSFERS
    useEffect(() => {
@@ -617,29 +610,12 @@ export const DriverAppView: React.FC = () => {
          if (isAutoSyncEnabled && bookingToUpdate.fomento_status !== 'COMUNICADO' && bookingToUpdate.fomento_status !== 'INICIADO') {
             try {
                const payload = buildFomentoPayload(bookingToUpdate, shifts || [], vehicles || [], drivers || [], municipalities || []);
-               const { data: sessionData } = await supabase.auth.getSession();
-               const token = sessionData?.session?.access_token;
-               
-               const supabaseUrl = import.meta.env.VITE_SUPABASE_URL || (window as any)._env_?.VITE_SUPABASE_URL;
-               const supabaseAnonKey = import.meta.env.VITE_SUPABASE_ANON_KEY || (window as any)._env_?.VITE_SUPABASE_ANON_KEY;
-               
                // Read global env from database settings (defaults to test mode unless explicitly 'production')
                const fomentoEnvSetting = settings?.find((s: any) => s.key === 'fomento_env');
                const isTestMode = fomentoEnvSetting ? fomentoEnvSetting.value === 'test' : false;
                
                if (!fomentoAltaLocks[bookingId]) {
-                  fomentoAltaLocks[bookingId] = fetch(`${supabaseUrl}/functions/v1/fomento-vtc`, {
-                     method: 'POST',
-                     headers: {
-                        'Content-Type': 'application/json',
-                        'Authorization': `Bearer ${token || supabaseAnonKey}`,
-                        'apikey': supabaseAnonKey
-                     },
-                     body: JSON.stringify({
-                        action: 'alta',
-                        payload: { ...payload, is_test: isTestMode }
-                     })
-                  }).then(res => res.json());
+                  fomentoAltaLocks[bookingId] = callFomento('alta', { ...payload, is_test: isTestMode });
                }
 
                const data = await fomentoAltaLocks[bookingId];
@@ -653,19 +629,7 @@ export const DriverAppView: React.FC = () => {
 
                   // If the status is In Progress, also send inicio immediately after alta
                   if (status === 'In Progress') {
-                     fetch(`${supabaseUrl}/functions/v1/fomento-vtc`, {
-                        method: 'POST',
-                        headers: {
-                           'Content-Type': 'application/json',
-                           'Authorization': `Bearer ${token || supabaseAnonKey}`,
-                           'apikey': supabaseAnonKey
-                        },
-                        body: JSON.stringify({
-                           action: 'inicio',
-                           payload: { idservicio: data.idservicio, is_test: isTestMode }
-                        })
-                     }).then(async iniRes => {
-                        const iniData = await iniRes.json();
+                     callFomento('inicio', { idservicio: data.idservicio, is_test: isTestMode }).then(async iniData => {
                         if (iniData.success) {
                            await updateBooking(bookingId, { fomento_status: 'INICIADO' });
                         }
@@ -706,28 +670,10 @@ export const DriverAppView: React.FC = () => {
                
                if (!idservicio) return;
 
-               const { data: sessionData } = await supabase.auth.getSession();
-               const token = sessionData?.session?.access_token;
-               
-               const supabaseUrl = import.meta.env.VITE_SUPABASE_URL || (window as any)._env_?.VITE_SUPABASE_URL;
-               const supabaseAnonKey = import.meta.env.VITE_SUPABASE_ANON_KEY || (window as any)._env_?.VITE_SUPABASE_ANON_KEY;
-               
                const fomentoEnvSetting = settings?.find((s: any) => s.key === 'fomento_env');
                const isTestMode = fomentoEnvSetting ? fomentoEnvSetting.value === 'test' : false;
 
-               fetch(`${supabaseUrl}/functions/v1/fomento-vtc`, {
-                  method: 'POST',
-                  headers: {
-                     'Content-Type': 'application/json',
-                     'Authorization': `Bearer ${token || supabaseAnonKey}`,
-                     'apikey': supabaseAnonKey
-                  },
-                  body: JSON.stringify({
-                     action: 'inicio',
-                     payload: { idservicio, is_test: isTestMode }
-                  })
-               }).then(async res => {
-                  const data = await res.json();
+               callFomento('inicio', { idservicio, is_test: isTestMode }).then(async data => {
                   if (data.success) {
                      await updateBooking(bookingId, {
                         fomento_status: 'INICIADO',
@@ -766,28 +712,10 @@ export const DriverAppView: React.FC = () => {
    const consultFomento = async (booking: any) => {
       if (!booking.fomento_idservicio) return;
       try {
-         const { data: sessionData } = await supabase.auth.getSession();
-         const token = sessionData?.session?.access_token;
-         
-         const supabaseUrl = import.meta.env.VITE_SUPABASE_URL || (window as any)._env_?.VITE_SUPABASE_URL;
-         const supabaseAnonKey = import.meta.env.VITE_SUPABASE_ANON_KEY || (window as any)._env_?.VITE_SUPABASE_ANON_KEY;
-         
          const fomentoEnvSetting = settings?.find((s: any) => s.key === 'fomento_env');
          const isTestMode = fomentoEnvSetting ? fomentoEnvSetting.value === 'test' : false;
 
-         const res = await fetch(`${supabaseUrl}/functions/v1/fomento-vtc`, {
-            method: 'POST',
-            headers: {
-               'Content-Type': 'application/json',
-               'Authorization': `Bearer ${token || supabaseAnonKey}`,
-               'apikey': supabaseAnonKey
-            },
-            body: JSON.stringify({
-               action: 'consulta',
-               payload: { idservicio: booking.fomento_idservicio, is_test: isTestMode }
-            })
-         });
-         const data = await res.json();
+         const data = await callFomento('consulta', { idservicio: booking.fomento_idservicio, is_test: isTestMode });
          if (data.success && data.rawResponse) {
             // Helper function to match XML elements with or without namespace prefixes
             const getXmlVal = (tag) => {
@@ -898,40 +826,7 @@ export const DriverAppView: React.FC = () => {
 
    
    const generatePDF = (booking: any) => {
-      const doc = new jsPDF({ orientation: 'landscape' });
-      const pageWidth = doc.internal.pageSize.getWidth();
-      const pageHeight = doc.internal.pageSize.getHeight();
-
-      // Background
-      doc.setFillColor(15, 15, 15); // brand-black
-      doc.rect(0, 0, pageWidth, pageHeight, 'F');
-
-      if (booking.cartel_logo) {
-         try {
-            // Depending on image aspect ratio, width/height could be adjusted
-            doc.addImage(booking.cartel_logo, 'PNG', pageWidth / 2 - 25, 20, 50, 50);
-         } catch(e) {
-            console.error("Error adding image to PDF", e);
-            // Fallback to text if image fails
-            doc.setTextColor(197, 160, 89); // brand-gold
-            doc.setFontSize(24);
-            doc.text("PALLADIUM TRANSFERS", pageWidth / 2, 40, { align: 'center' });
-         }
-      } else {
-         doc.setTextColor(197, 160, 89); // brand-gold
-         doc.setFontSize(24);
-         doc.text("PALLADIUM TRANSFERS", pageWidth / 2, 40, { align: 'center' });
-      }
-
-      doc.setTextColor(255, 255, 255);
-      doc.setFontSize(48);
-      // Use cartel_text if present, otherwise fallback to passenger name
-      const mainText = booking.cartel_text || booking.passenger;
-      doc.text(mainText.toUpperCase(), pageWidth / 2, pageHeight / 2 + 10, { align: 'center' });
-
-      // We can use the notes as subtitle or just omit it if the cartel text overrides it.
-      // We will only render subtitle if they provided custom text AND a separate passenger name, but to keep it simple, we just print the main text.
-
+      const doc = generateCartelPDF(booking);
       window.open(doc.output('bloburl'), '_blank');
    };
 
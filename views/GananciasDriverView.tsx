@@ -1,12 +1,13 @@
 import React, { useState, useMemo } from 'react';
-import { useSupabaseData } from '../hooks/useSupabaseData';
+import { useSupabaseData, useEntityIndex } from '../hooks/useSupabaseData';
 
 interface GananciasDriverViewProps {
     driverId: string;
 }
 
 export const GananciasDriverView: React.FC<GananciasDriverViewProps> = ({ driverId }) => {
-    const { data: allBookings, loading } = useSupabaseData('bookings');
+    const { loading } = useSupabaseData('bookings');
+    const bookingsByDriver = useEntityIndex('bookingsByDriver');
 
     // Date range filters
     const [startDate, setStartDate] = useState(() => {
@@ -17,14 +18,13 @@ export const GananciasDriverView: React.FC<GananciasDriverViewProps> = ({ driver
     const [endDate, setEndDate] = useState(new Date().toISOString().split('T')[0]);
 
     const filteredEarnings = useMemo(() => {
-        if (!allBookings) return [];
-        return allBookings.filter((b: any) => {
-            if (b.driver_id !== driverId || b.status !== 'Completed') return false;
+        return (bookingsByDriver.get(driverId) || []).filter((b: any) => {
+            if (b.status !== 'Completed') return false;
             // Normalize pickup_date to comparison date (handle timestamps)
             const bDate = b.pickup_date ? b.pickup_date.split('T')[0] : '';
             return bDate >= startDate && bDate <= endDate;
         }).sort((a: any, b: any) => b.pickup_date.localeCompare(a.pickup_date));
-    }, [allBookings, driverId, startDate, endDate]);
+    }, [bookingsByDriver, driverId, startDate, endDate]);
 
     const totalAmount = useMemo(() => {
         return filteredEarnings.reduce((acc: number, b: any) => acc + (Number(b.collaborator_price || 0)), 0);
@@ -1,12 +1,26 @@
-import React, { useState, useMemo } from 'react';
-import { useSupabaseData } from '../hooks/useSupabaseData';
+import React, { useState, useMemo, useEffect } from 'react';
+import { supabase } from '../services/supabase';
+import { useSupabaseData, useEntityIndex } from '../hooks/useSupabaseData';
+
+interface TripTrack {
+    booking_id: string;
+    distance_m: number;
+    duration_s: number;
+}
+
+const shiftDay = (day: string, days: number) => {
+    const d = new Date(`${day}T12:00:00Z`);
+    d.setUTCDate(d.getUTCDate() + days);
+    return d.toISOString().split('T')[0];
+};
 
 interface HistoricoDriverViewProps {
     driverId: string;
 }
 
 export const HistoricoDriverView: React.FC<HistoricoDriverViewProps> = ({ driverId }) => {
-    const { data: allBookings, loading } = useSupabaseData('bookings');
+    const { loading } = useSupabaseData('bookings');
+    const bookingsByDriver = useEntityIndex('bookingsByDriver');
 
     // Date range filters
     const [startDate, setStartDate] = useState(() => {
@@ -16,13 +30,30 @@ export const HistoricoDriverView: React.FC<HistoricoDriverViewProps> = ({ driver
     });
     const [endDate, setEndDate] = useState(new Date().toISOString().split('T')[0]);
     const [hideCancelled, setHideCancelled] = useState(true);
+    const [tracks, setTracks] = useState<Map<string, TripTrack>>(new Map());
 
-    const filteredHistory = useMemo(() => {
-        if (!allBookings) return [];
-        return allBookings.filter((b: any) => {
-            // Show all services (Completed, Cancelled, etc.) that were assigned to this driver
-            if (b.driver_id !== driverId) return false;
+    // Distance and duration per service from the packed trip tracks (migration 20261019000120),
+    // one small row per trip instead of the raw GPS points. A day of margin on each side:
+    // a trip can start the evening before its pickup date.
+    useEffect(() => {
+        let cancelled = false;
+        supabase
+            .from('trip_tracks')
+            .select('booking_id, distance_m, duration_s')
+            .eq('driver_id', driverId)
+            .gte('started_at', shiftDay(startDate, -1))
+            .lt('started_at', shiftDay(endDate, 2))
+            .then(({ data, error }) => {
+                if (cancelled) return;
+                if (error) console.error('Error fetching trip tracks:', error);
+                setTracks(new Map(((data || []) as TripTrack[]).map(t => [t.booking_id, t])));
+            });
+        return () => { cancelled = true; };
+    }, [driverId, startDate, endDate]);
 
+    const filteredHistory = useMemo(() => {
+        // Show all services (Completed, Cancelled, etc.) that were assigned to this driver
+        return (bookingsByDriver.get(driverId) || []).filter((b: any) => {
             // Date range filter
             // Normalize pickup_date to comparison date (handle timestamps)
             const bDate = b.pickup_date ? b.pickup_date.split('T')[0] : '';
@@ -33,7 +64,11 @@ export const HistoricoDriverView: React.FC<HistoricoDriverViewProps> = ({ driver
 
             return true;
         }).sort((a: any, b: any) => b.pickup_date.localeCompare(a.pickup_date) || b.pickup_time.localeCompare(a.pickup_time));
-    }, [allBookings, driverId, startDate, endDate, hideCancelled]);
+    }, [bookingsByDriver, driverId, startDate, endDate, hideCancelled]);
+
+    const tracked = filteredHistory.map((b: any) => tracks.get(b.id)).filter(Boolean) as TripTrack[];
+    const totalKm = tracked.reduce((sum, t) => sum + t.distance_m, 0) / 1000;
+    const totalHours = tracked.reduce((sum, t) => sum + t.duration_s, 0) / 3600;
 
     if (loading) return <div className="p-8 text-center text-brand-platinum/50 uppercase tracking-widest text-xs">Cargando historial...</div>;
 
@@ -52,6 +87,11 @@ export const HistoricoDriverView: React.FC<HistoricoDriverViewProps> = ({ driver
             <div className="mb-8">
                 <h2 className="text-2xl font-light text-white tracking-tight mb-2">Histórico de <span className="font-black text-brand-platinum">Servicios</span></h2>
                 <p className="text-[10px] text-brand-platinum/50 uppercase tracking-[0.2em] font-bold">Registro completo de todos tus trayectos</p>
+                {tracked.length > 0 && (
+                    <p className="text-[10px] text-brand-gold uppercase tracking-[0.2em] font-bold mt-2">
+                        {tracked.length} con recorrido · {totalKm.toFixed(1)} km · {totalHours.toFixed(1)} h
+                    </p>
+                )}
             </div>
 
             {/* Filters */}
@@ -131,6 +171,11 @@ export const HistoricoDriverView: React.FC<HistoricoDriverViewProps> = ({ driver
                                 <div className="flex items-center gap-2">
                                     <span className="material-icons-round text-brand-platinum/30 text-sm">person</span>
                                     <span className="text-[10px] text-brand-platinum/50 font-bold uppercase tracking-widest">{b.passenger}</span>
+                                    {tracks.has(b.id) && (
+                                        <span className="text-[10px] text-brand-platinum/50 font-bold uppercase tracking-widest">
+                                            · {(tracks.get(b.id)!.distance_m / 1000).toFixed(1)} km · {Math.round(tracks.get(b.id)!.duration_s / 60)} min
+                                        </span>
+                                    )}
                                 </div>
                                 {b.status === 'Completed' && (
                                     <p className="text-sm font-black text-brand-gold tracking-tighter">+{Number(b.collaborator_price || 0).toFixed(2)}€</p>
@@ -5,7 +5,8 @@ import { useSupabaseData } from '../hooks/useSupabaseData';
 import { DataEntryModal } from '../components/DataEntryModal';
 import { useToast } from '../components/ui/Toast';
 import { useInvoices } from '../hooks/useInvoices';
-import { generateInvoicePDF } from '../utils/generateInvoicePDF';
+import { generateInvoicePDF, generateInvoicePDFBatch } from '../utils/generateInvoicePDF';
+import { createZip } from '../utils/zip';
 import { sendInvoiceEmail } from '../services/emailService';
 
 const GenericListView = ({ title, subtitle, columns, data, renderRow, actions, loading }: any) => {
@@ -1257,7 +1258,7 @@ export const UsuariosView = () => {
 };
 
 export const FacturasView = () => {
-   const { invoices, loading, generateInvoice, updateInvoiceStatus, deleteInvoice } = useInvoices();
+   const { invoices, loading, generateInvoice, generateInvoicesBatch, updateInvoiceStatus, deleteInvoice } = useInvoices();
    const { data: clients } = useSupabaseData('clients');
    const { addToast } = useToast();
    
@@ -1293,6 +1294,42 @@ export const FacturasView = () => {
       setIsModalOpen(false);
    };
 
+   // One PDF per client invoice, downloaded together as a single ZIP (browsers block a
+   // download per file after the first)
+   const handleGenerateAll = async () => {
+      if (!confirm('Se generará una factura por cada cliente con reservas sin facturar en el período. ¿Continuar?')) return;
+      setIsGenerating(true);
+      try {
+         const created = await generateInvoicesBatch(startDate, endDate);
+         if (created.length > 0) {
+            const results = await generateInvoicePDFBatch(created, { download: false, returnBase64: true });
+            const entries = results
+               .filter(r => r.success && r.base64)
+               .map(r => ({
+                  name: `Factura_${r.invoice.invoice_number}.pdf`,
+                  data: Uint8Array.from(atob(r.base64!), c => c.charCodeAt(0))
+               }));
+            if (entries.length > 0) {
+               const url = URL.createObjectURL(createZip(entries));
+               const link = document.createElement("a");
+               link.setAttribute("href", url);
+               link.setAttribute("download", `facturas_${startDate}_${endDate}.zip`);
+               document.body.appendChild(link);
+               link.click();
+               document.body.removeChild(link);
+               setTimeout(() => URL.revokeObjectURL(url), 10000);
+            }
+            const failed = results.length - entries.length;
+            if (failed > 0) addToast({ title: 'Aviso', description: `${failed} PDF no se pudieron generar.`, type: 'warning' });
+         }
+         setIsModalOpen(false);
+      } catch (error: any) {
+         addToast({ title: 'Error', description: error.message || 'Error al generar las facturas', type: 'error' });
+      } finally {
+         setIsGenerating(false);
+      }
+   };
+
    const handleSendEmail = async (f: any) => {
        try {
            setIsGenerating(true);
@@ -1516,6 +1553,9 @@ export const FacturasView = () => {
                   </div>
                   <div className="mt-8 flex justify-end gap-3 border-t border-white/5 pt-4">
                      <button onClick={() => setIsModalOpen(false)} className="px-5 py-2.5 rounded-lg text-sm font-bold text-slate-400 hover:text-white hover:bg-slate-800 transition-colors">Cancelar</button>
+                     <button onClick={handleGenerateAll} disabled={isGenerating} title="Una factura por cliente con reservas pendientes en el período" className="px-5 py-2.5 rounded-lg text-sm font-bold text-brand-gold border border-brand-gold/30 hover:bg-brand-gold/10 transition-colors disabled:opacity-50">
+                        Facturar Todos
+                     </button>
                      <button onClick={handleGenerate} disabled={isGenerating || !selectedClient} className="px-5 py-2.5 bg-brand-gold hover:bg-[#B3932F] text-black font-black rounded-lg text-sm shadow-[0_0_15px_rgba(179,147,47,0.3)] transition-all disabled:opacity-50 disabled:shadow-none min-w-[140px]">
                         {isGenerating ? 'Generando...' : 'Crear Factura'}
                      </button>
@@ -1,9 +1,9 @@
 import React, { useState } from 'react';
 import { supabase } from '../services/supabase';
-import { useSupabaseData } from '../hooks/useSupabaseData';
+import { useSupabaseData, useEntityIndex } from '../hooks/useSupabaseData';
 import { Flight, Driver } from '../types';
 import { FleetMap } from '../components/FleetMap';
-import { suggestDriver } from '../services/autoAssignment';
+import { suggestDriver, nearestAvailableDrivers } from '../services/autoAssignment';
 import { useToast } from '../components/ui/Toast';
 import { Modal } from '../components/ui/Modal';
 
@@ -14,6 +14,8 @@ export const OperationsHub: React.FC = () => {
   const { data: vehicles } = useSupabaseData('vehicles');
   const { data: maintenance } = useSupabaseData('vehicle_maintenance');
   const { data: shifts } = useSupabaseData('shifts');
+  const locationsByCell = useEntityIndex('driverLocationsByCell', { realtime: true });
+  const bookingsByDriver = useEntityIndex('bookingsByDriver');
 
   const { showToast } = useToast();
   const [dispatchQuery, setDispatchQuery] = React.useState('');
@@ -152,6 +154,23 @@ export const OperationsHub: React.FC = () => {
   };
 
   const handleAutoAssign = (booking: any) => {
+    // Pickups in the next hours: the free drivers nearest to the origin right now
+    const nearest = nearestAvailableDrivers(booking, locationsByCell, {
+      drivers: drivers || [], bookingsByDriver, vehicles: vehicles || [], shifts: shifts || []
+    });
+    if (nearest.length > 0) {
+      const [best, ...others] = nearest;
+      const alternatives = others.map(n => `${n.driver.name} (${n.distanceKm.toFixed(1)} km, ~${n.etaMinutes} min)`).join(', ');
+      openConfirmation(
+        'Sugerencia de Asignación',
+        `${best.driver.name} es el conductor disponible más cercano: ${best.distanceKm.toFixed(1)} km, ~${best.etaMinutes} min hasta el origen.` +
+        (alternatives ? ` Alternativas: ${alternatives}.` : '') + ' ¿Confirmar?',
+        () => handleReassign(booking.id, best.driver.id),
+        'success'
+      );
+      return;
+    }
+
     const suggestion = suggestDriver(booking, drivers || [], bookings || [], vehicles || [], shifts || []);
     if (suggestion) {
       openConfirmation(
@@ -168,12 +187,6 @@ export const OperationsHub: React.FC = () => {
   const syncFlightsWithAirLabs = async () => {
     try {
       showToast('Sincronizando vuelos con AirLabs...', 'info');
-      const airlabsKey = import.meta.env.VITE_AIRLABS_API_KEY;
-
-      if (!airlabsKey) {
-        showToast('Falta la API Key de AirLabs.', 'error');
-        return;
-      }
 
       // 1. Obtener todos los números de vuelo ÚNICOS de las reservas visibles
       const bookingFlightNumbers = Array.from(new Set(
@@ -188,129 +201,19 @@ export const OperationsHub: React.FC = () => {
         return;
       }
 
-      let syncCount = 0;
-      let updates = [];
-
-      for (const flightIata of bookingFlightNumbers) {
-        let flightData: any = null;
-        let dataSource = 'radar';
-
-        // Intentar primero con el Radar (Live Flights) - Filtrado por destino ALC
-        try {
-          const res = await fetch(`https://airlabs.co/api/v9/flights?api_key=${airlabsKey}&flight_iata=${flightIata}&arr_iata=ALC`);
-          const data = await res.json();
-          if (data && data.response && data.response.length > 0) {
-            flightData = data.response[0];
-          }
-        } catch (e) {
-          console.error(`Error en radar para ${flightIata}:`, e);
-        }
-
-        // Si no hay datos en radar O faltan tiempos críticos, intentar con el Schedule (Horarios)
-        const missingTimes = !flightData || (!flightData.arr_time_utc && !flightData.arr_time);
-        if (missingTimes) {
-          try {
-            const res = await fetch(`https://airlabs.co/api/v9/schedules?api_key=${airlabsKey}&flight_iata=${flightIata}&arr_iata=ALC`);
-            const data = await res.json();
-            if (data && data.response && data.response.length > 0) {
-              const scheduleData = data.response[0];
-              if (!flightData) {
-                flightData = scheduleData;
-                dataSource = 'schedule';
-              } else {
-                // Mezclar: usar radar para estado real y schedule para tiempos programados
-                flightData = { ...scheduleData, ...flightData };
-                dataSource = 'mixed';
-              }
-            }
-          } catch (e) {
-            console.error(`Error en schedule para ${flightIata}:`, e);
-          }
-        }
-
-        if (flightData) {
-          // Mapear estado
-          let newStatus: Flight['status'] = 'Scheduled';
-          const airlabsStatus = (flightData.status || '').toLowerCase();
-          
-          if (airlabsStatus === 'en-route' || airlabsStatus === 'active') {
-            newStatus = flightData.delayed ? 'Delayed' : 'En Route';
-          } else if (airlabsStatus === 'landed') {
-            newStatus = 'Landed';
-          } else if (airlabsStatus === 'cancelled') {
-            newStatus = 'Cancelled';
-          } else if (airlabsStatus === 'scheduled') {
-            newStatus = flightData.delayed ? 'Delayed' : 'Scheduled';
-          }
-
-          // Calcular delay y ETA
-          // Nota: El endpoint de schedules usa arr_time y arr_estimated (sin _utc a veces, dependiendo de la versión)
-          const scheduledStr = flightData.arr_time_utc || flightData.arr_time;
-          const estimatedStr = flightData.arr_estimated_utc || flightData.arr_estimated || scheduledStr;
-          
-          let finalDelay = flightData.delayed || 0;
-          
-          if (scheduledStr && estimatedStr) {
-            const scheduled = new Date(scheduledStr).getTime();
-            const estimated = new Date(estimatedStr).getTime();
-            if (estimated < scheduled) {
-              // Adelanto: delay negativo
-              finalDelay = -Math.round((scheduled - estimated) / 60000);
-            } else if (estimated > scheduled) {
-              // Retraso: delay positivo
-              finalDelay = Math.round((estimated - scheduled) / 60000);
-            }
-          }
-
-          console.log(`[AirLabs ${dataSource}] Vuelo ${flightIata}: Status=${newStatus}, Delay=${finalDelay}, ETA=${estimatedStr}`);
-
-          // 2. Buscar si el vuelo ya existe en la tabla 'flights'
-          const existingFlight = flights?.find(f => f.number.replace(/\s+/g, '').toUpperCase() === flightIata);
-
-          if (existingFlight) {
-            const hasStatusChange = newStatus !== existingFlight.status;
-            const hasDelayChange = finalDelay !== (existingFlight.delay || 0);
-            const hasEtaChange = (estimatedStr || '') !== (existingFlight.estimated || '');
-
-            if (hasStatusChange || hasDelayChange || hasEtaChange) {
-              const { error: updateError } = await supabase
-                .from('flights')
-                .update({
-                  status: newStatus,
-                  delay: finalDelay,
-                  estimated: estimatedStr,
-                  updated_at: new Date().toISOString()
-                })
-                .eq('id', existingFlight.id);
-
-              if (!updateError) {
-                syncCount++;
-                updates.push(`${flightIata}${finalDelay < 0 ? ' (EARLY)' : ''}`);
-              }
-            }
-          } else {
-            // 3. AUTO-REGISTRO
-            const { error: insertError } = await supabase
-              .from('flights')
-              .insert({
-                number: flightIata,
-                status: newStatus,
-                delay: finalDelay,
-                scheduled: scheduledStr,
-                estimated: estimatedStr,
-                origin: flightData.dep_iata || 'Sincronizado',
-                updated_at: new Date().toISOString()
-              });
-
-            if (!insertError) {
-              syncCount++;
-              updates.push(`${flightIata} (Nuevo)`);
-            }
-          }
-        }
-      }
+      // 2. sync-flights consulta AirLabs en paralelo (con caché compartida), actualiza los
+      //    vuelos existentes y auto-registra los nuevos en una sola escritura
+      const { data, error } = await supabase.functions.invoke('sync-flights', {
+        body: { flight_numbers: bookingFlightNumbers }
+      });
+      if (error) throw error;
+      if (data?.error) throw new Error(data.error);
+
+      const updates = (data?.updated || []).map((u: any) =>
+        u.created ? `${u.flight} (Nuevo)` : `${u.flight}${u.delay < 0 ? ' (EARLY)' : ''}`
+      );
 
-      if (syncCount > 0) {
+      if (updates.length > 0) {
         showToast(`Sincronizados: ${updates.join(', ')}`, 'success');
       } else {
         showToast('Los vuelos ya están al día.', 'success');
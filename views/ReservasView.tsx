@@ -1,5 +1,5 @@
-import React, { useState, useMemo } from 'react';
-import { useSupabaseData } from '../hooks/useSupabaseData';
+import React, { useState, useMemo, useEffect } from 'react';
+import { useSupabaseData, useEntityIndex } from '../hooks/useSupabaseData';
 import { DataEntryModal } from '../components/DataEntryModal';
 
 const getTodayLocal = () => {
@@ -19,18 +19,29 @@ const getTomorrowLocal = () => {
    return date.toLocaleDateString('sv-SE', { timeZone: 'Europe/Madrid' });
 };
 
+const addDays = (day: string, days: number) => {
+   const date = new Date(`${day}T12:00:00Z`);
+   date.setUTCDate(date.getUTCDate() + days);
+   return date.toISOString().split('T')[0];
+};
+
+const dayOfBooking = (b: any) => (b.pickup_date ? String(b.pickup_date).split('T')[0] : '');
+
 import { suggestDriver, detectScheduleConflicts, getAssignedVehicleForBooking, calculateAvailableAt } from '../services/autoAssignment';
 import { supabase } from '../services/supabase';
+import { fetchPages } from '../services/entityStore';
 import { sendCancellationEmail, sendVoucherEmail, sendInfoRequestEmail } from '../services/emailService';
+import { callFomento } from '../services/fomentoQueue';
 import { generateVoucherPDF } from '../utils/generateVoucherPDF';
+import { renderPDFBatch } from '../utils/renderPDFBatch';
 
 export const ReservasView: React.FC = () => {
    const [activeTab, setActiveTab] = useState<'list' | 'availability'>('list');
-   const { data: bookings, loading, addItem, updateItem, deleteItem } = useSupabaseData('bookings');
    const { data: drivers } = useSupabaseData('drivers');
    const { data: tariffs } = useSupabaseData('tariffs');
    const { data: vehicles } = useSupabaseData('vehicles');
    const { data: shifts } = useSupabaseData('shifts');
+   const shiftsByDriverDate = useEntityIndex('shiftsByDriverDate');
    const { data: clients } = useSupabaseData('clients');
    // Fetch municipalities for type lookup
    const { data: municipalities } = useSupabaseData('municipalities');
@@ -49,6 +60,48 @@ export const ReservasView: React.FC = () => {
    const [vehicleIdFilter, setVehicleIdFilter] = useState('Todos'); // Filter by specific vehicle (plate)
    const [showInactive, setShowInactive] = useState(false); // Toggle for old bookings (> 1 day)
 
+   // Only the visible date range / statuses are loaded, in keyset pages (see migration 20261019000090)
+   const bookingWindow = useMemo(() => {
+      const oneDayAgo = new Date();
+      oneDayAgo.setDate(oneDayAgo.getDate() - 1);
+      const oneDayAgoStr = oneDayAgo.toISOString().split('T')[0];
+      const listing = activeTab === 'list';
+      return {
+         column: 'pickup_date',
+         from: listing && !showInactive && (!startDate || startDate < oneDayAgoStr) ? oneDayAgoStr : (startDate || undefined),
+         to: endDate || undefined,
+         statusIn: listing && statusFilter !== 'Todos' ? [statusFilter] : undefined,
+         statusNotIn: listing ? [...(hideCompleted ? ['Completed'] : []), ...(hideCancelled ? ['Cancelled'] : [])] : undefined,
+         keyset: ['pickup_date', 'pickup_time', 'id'],
+         pageSize: 500,
+      };
+   }, [activeTab, startDate, endDate, showInactive, statusFilter, hideCompleted, hideCancelled]);
+   const { data: bookings, loading, addItem, updateItem, deleteItem, loadMore, hasMore } = useSupabaseData('bookings', { window: bookingWindow });
+
+   // Assigned bookings from the day before the first of `days` to the day after the last (services
+   // past midnight), optionally of one driver: what the conflict and availability checks compare
+   // against, whatever the list window. Fetched when an assignment runs, not kept loaded.
+   const fetchAssignedBookings = async (days: string[], driverId?: string): Promise<any[]> => {
+      const sorted = days.filter(Boolean).sort();
+      if (!sorted.length) return [];
+      const { data, error } = await fetchPages(() => {
+         let query = supabase.from('bookings').select('*')
+            .not('driver_id', 'is', null)
+            .gte('pickup_date', addDays(sorted[0], -1))
+            .lt('pickup_date', addDays(sorted[sorted.length - 1], 2));
+         if (driverId) query = query.eq('driver_id', driverId);
+         return query.order('id');
+      });
+      if (error) throw error;
+      return data;
+   };
+
+   // Search, driver, client and vehicle are matched on the client, so they need the whole window loaded
+   const hasClientFilter = !!searchQuery || driverFilter !== 'Todos' || clientFilter !== 'Todos' || vehicleIdFilter !== 'Todos';
+   useEffect(() => {
+      if (hasClientFilter && hasMore && !loading) loadMore();
+   }, [hasClientFilter, hasMore, loading, bookings]);
+
    const handleViewVoucher = (booking: any) => {
       try {
          const doc = generateVoucherPDF([booking]);
@@ -306,7 +359,7 @@ export const ReservasView: React.FC = () => {
             // Check if the booking's driver_id had this vehicle assigned on the pickup_date
             if (shifts && b.pickup_date) {
                const bDate = b.pickup_date.split('T')[0];
-               const serviceShift = shifts.find((s: any) => s.driver_id === b.driver_id && s.date === bDate);
+               const serviceShift = shiftsByDriverDate.get(`${b.driver_id}|${bDate}`)?.[0];
                matchesVehicle = serviceShift?.vehicle_id === vehicleIdFilter;
             } else {
                matchesVehicle = false;
@@ -328,7 +381,7 @@ export const ReservasView: React.FC = () => {
          const timeB = b.pickup_time || '';
          return timeA.localeCompare(timeB);
       });
-   }, [bookings, searchQuery, statusFilter, hideCompleted, hideCancelled, showInactive, startDate, endDate, driverFilter, clientFilter, vehicleIdFilter, vehicles]);
+   }, [bookings, searchQuery, statusFilter, hideCompleted, hideCancelled, showInactive, startDate, endDate, driverFilter, clientFilter, vehicleIdFilter, vehicles, shiftsByDriverDate]);
 
    const handleAssignDriver = async (bookingId: string, driverId: string) => {
       // Handle unassignment
@@ -349,12 +402,20 @@ export const ReservasView: React.FC = () => {
       const selectedDriver = drivers.find((d: any) => d.id === driverId);
       if (!selectedDriver) return;
 
-      // Conflict Check for manual assignment
-      const updatedBookings = bookings.map(b =>
-         b.id === bookingId
-            ? { ...b, driver_id: driverId, assigned_driver_name: (selectedDriver as any).name }
-            : b
-      );
+      // Conflict Check for manual assignment, against the driver's services around that day (not only the loaded window)
+      const target = bookings.find(b => b.id === bookingId);
+      let driverBookings: any[];
+      try {
+         driverBookings = target ? await fetchAssignedBookings([dayOfBooking(target)], driverId) : [];
+      } catch (error) {
+         console.error('Error loading driver schedule:', error);
+         alert('Error al comprobar conflictos del conductor');
+         return;
+      }
+      const updatedBookings = [
+         ...driverBookings.filter(b => b.id !== bookingId),
+         ...(target ? [{ ...target, driver_id: driverId, assigned_driver_name: (selectedDriver as any).name }] : [])
+      ];
 
       const { messages } = detectScheduleConflicts(updatedBookings);
       if (messages.length > 0) {
@@ -461,8 +522,17 @@ export const ReservasView: React.FC = () => {
    const handleAutoAssign = async () => {
       if (!bookings || !drivers) return;
 
-      // 0. Detect existing conflicts
-      const { messages, conflictIds } = detectScheduleConflicts(filteredBookings);
+      // 0. Detect existing conflicts, against every assigned booking on the days in view (not only the filtered ones)
+      const daysInView = new Set(filteredBookings.map(dayOfBooking));
+      let assignedBookings: any[];
+      try {
+         assignedBookings = await fetchAssignedBookings([...daysInView]);
+      } catch (error) {
+         console.error('Error loading assigned bookings:', error);
+         alert('Error al cargar las reservas asignadas');
+         return;
+      }
+      const { messages, conflictIds } = detectScheduleConflicts(assignedBookings.filter(b => daysInView.has(dayOfBooking(b))));
 
       if (messages.length > 0) {
          let msg = "";
@@ -510,8 +580,8 @@ export const ReservasView: React.FC = () => {
       const currentUnassigned = filteredBookings.filter(b => !b.driver_id && b.status !== 'Cancelled');
 
       // Add the ones we just unassigned (conflictIds) to the list of candidates manually to ensure they are processed
-      // We find them in filteredBookings
-      const justFreed = filteredBookings.filter(b => conflictIds.includes(b.id));
+      // We find them among the assigned bookings, which may lie outside the current filters
+      const justFreed = assignedBookings.filter(b => conflictIds.includes(b.id));
 
       const candidates = [...currentUnassigned, ...justFreed];
       // Remove duplicates just in case
@@ -525,8 +595,9 @@ export const ReservasView: React.FC = () => {
 
       let assignedCount = 0;
       // create a local copy of bookings that we can update in real-time as we assign
-      // this ensures that the next iteration sees the driver's new workload/schedule
-      let workingBookings = [...(bookings || [])];
+      // this ensures that the next iteration sees the driver's new workload/schedule.
+      // It starts from every assigned booking around the days in view, not the filtered page, minus the ones just freed.
+      let workingBookings = assignedBookings.filter(b => !conflictIds.includes(b.id));
 
       for (const booking of uniqueCandidates) {
          // Force status to Pending for the logic if it was Confirmed
@@ -552,11 +623,10 @@ export const ReservasView: React.FC = () => {
                await updateItem(booking.id, updates);
 
                // Update our local working copy so the next iteration knows this driver is busy/has +1 load
-               workingBookings = workingBookings.map(b =>
-                  b.id === booking.id
-                     ? { ...b, driver_id: suggestion.id, assigned_driver_name: suggestion.name, status: 'Pending' }
-                     : b
-               );
+               workingBookings = [
+                  ...workingBookings.filter(b => b.id !== booking.id),
+                  { ...booking, driver_id: suggestion.id, assigned_driver_name: suggestion.name, status: 'Pending' }
+               ];
 
                assignedCount++;
 
@@ -645,6 +715,38 @@ export const ReservasView: React.FC = () => {
       document.body.removeChild(link);
    };
 
+   const [voucherProgress, setVoucherProgress] = useState<string | null>(null);
+
+   // One voucher PDF per visible booking, rendered in parallel and downloaded as a ZIP
+   const exportVouchersZip = async () => {
+      const targets = filteredBookings.filter((b: any) => b.status !== 'Cancelled');
+      if (!targets.length || voucherProgress) return;
+      try {
+         setVoucherProgress(`0/${targets.length}`);
+         const zip = await renderPDFBatch(
+            targets.map((b: any) => ({
+               kind: 'voucher',
+               bookings: [b],
+               fileName: `voucher_${b.pickup_date ? b.pickup_date.split('T')[0] : 'sin-fecha'}_${b.display_id || b.id.slice(0, 8)}.pdf`
+            })),
+            (done, total) => setVoucherProgress(`${done}/${total}`)
+         );
+         const url = URL.createObjectURL(zip);
+         const link = document.createElement("a");
+         link.setAttribute("href", url);
+         link.setAttribute("download", `vouchers_${startDate}_${endDate}.zip`);
+         document.body.appendChild(link);
+         link.click();
+         document.body.removeChild(link);
+         setTimeout(() => URL.revokeObjectURL(url), 10000);
+      } catch (err) {
+         console.error("Error generating vouchers ZIP:", err);
+         alert("Error al generar los vouchers.");
+      } finally {
+         setVoucherProgress(null);
+      }
+   };
+
    const handleCreateTestBooking = async () => {
       try {
          // Check availability for today at 12:00 (Local Spanish Time)
@@ -936,49 +1038,17 @@ export const ReservasView: React.FC = () => {
             }
          }
 
-         // Get current session for Authorization (with timeout to prevent hanging)
-         console.log("[FOMENTO DEBUG] Fetching session...");
-         const sessionPromise = supabase.auth.getSession();
-         const timeoutPromise = new Promise<{data: any}>((resolve) => setTimeout(() => resolve({ data: { session: null } }), 3000));
-         const { data: sessionData } = await Promise.race([sessionPromise, timeoutPromise]);
-         const token = sessionData?.session?.access_token;
-         console.log("[FOMENTO DEBUG] Session fetch complete, token attached:", !!token);
-         
-         const supabaseUrl = import.meta.env.VITE_SUPABASE_URL || (window as any)._env_?.VITE_SUPABASE_URL;
-         const supabaseAnonKey = import.meta.env.VITE_SUPABASE_ANON_KEY || (window as any)._env_?.VITE_SUPABASE_ANON_KEY;
-
          const fomentoEnvSetting = settings?.find((s: any) => s.key === 'fomento_env');
          const isTestMode = fomentoEnvSetting ? fomentoEnvSetting.value === 'test' : false;
          
          console.log("[FOMENTO DEBUG] Enviando petición a Edge Function...");
-         const controller = new AbortController();
-         const timeoutId = setTimeout(() => controller.abort(), 20000); // 20s timeout
-         
-         const response = await fetch(`${supabaseUrl}/functions/v1/fomento-vtc`, {
-            method: 'POST',
-            signal: controller.signal,
-            headers: {
-               'Content-Type': 'application/json',
-               'Authorization': `Bearer ${token || supabaseAnonKey}`,
-               'apikey': supabaseAnonKey
-            },
-            body: JSON.stringify({ 
-               action: 'alta', 
-               payload: {
-                  ...payload,
-                  is_test: isTestMode
-               }
-            })
-         });
-         clearTimeout(timeoutId);
-
-         const data = await response.json();
+         const data = await callFomento('alta', { ...payload, is_test: isTestMode });
          console.log("[FOMENTO DEBUG] Respuesta completa:", data);
          if (data.signedXml) {
             console.log("[FOMENTO DEBUG] XML ENVIADO:", data.signedXml);
          }
 
-         if (!response.ok || !data.success) {
+         if (!data.success) {
             const errorDetail = data.body || data.error || data.resultado || "Error desconocido";
             console.error("📄 [FOMENTO ERROR DATA]", data);
             console.error("📄 [FOMENTO RAW XML RESPUESTA]", data.rawResponse || "(vacío)");
@@ -1020,43 +1090,14 @@ export const ReservasView: React.FC = () => {
       }
 
       try {
-         // Get current session for Authorization (with timeout to prevent hanging)
-         console.log("[FOMENTO DEBUG] Fetching session...");
-         const sessionPromise = supabase.auth.getSession();
-         const timeoutPromise = new Promise<{data: any}>((resolve) => setTimeout(() => resolve({ data: { session: null } }), 3000));
-         const { data: sessionData } = await Promise.race([sessionPromise, timeoutPromise]);
-         const token = sessionData?.session?.access_token;
-         console.log("[FOMENTO DEBUG] Session fetch complete, token attached:", !!token);
-         
-         const supabaseUrl = import.meta.env.VITE_SUPABASE_URL || (window as any)._env_?.VITE_SUPABASE_URL;
-         const supabaseAnonKey = import.meta.env.VITE_SUPABASE_ANON_KEY || (window as any)._env_?.VITE_SUPABASE_ANON_KEY;
-
          const fomentoEnvSetting = settings?.find((s: any) => s.key === 'fomento_env');
          const isTestMode = fomentoEnvSetting ? fomentoEnvSetting.value === 'test' : false;
          
          console.log("[FOMENTO DEBUG] Enviando petición de anulación a Edge Function...");
-         const controller = new AbortController();
-         const timeoutId = setTimeout(() => controller.abort(), 20000); // 20s timeout
-         
-         const response = await fetch(`${supabaseUrl}/functions/v1/fomento-vtc`, {
-            method: 'POST',
-            signal: controller.signal,
-            headers: {
-               'Content-Type': 'application/json',
-               'Authorization': `Bearer ${token || supabaseAnonKey}`,
-               'apikey': supabaseAnonKey
-            },
-            body: JSON.stringify({ 
-               action: 'anulacion', 
-               payload: { 
-                  idservicio: booking.fomento_idservicio,
-                  is_test: isTestMode
-               } 
-            })
+         const data = await callFomento('anulacion', {
+            idservicio: booking.fomento_idservicio,
+            is_test: isTestMode
          });
-         clearTimeout(timeoutId);
-
-         const data = await response.json();
 
          if (data.success) {
             await updateItem(booking.id, {
@@ -1462,6 +1503,13 @@ export const ReservasView: React.FC = () => {
                         >
                            <span className="material-icons-round text-sm">download</span> Excel
                         </button>
+                        <button
+                           onClick={exportVouchersZip}
+                           disabled={!!voucherProgress}
+                           className="flex-1 sm:flex-none h-10 px-4 bg-slate-800 hover:bg-slate-700 text-brand-platinum/80 rounded-xl text-xs font-bold flex items-center justify-center gap-2 transition-all border border-white/5 disabled:opacity-50"
+                        >
+                           <span className="material-icons-round text-sm">folder_zip</span> {voucherProgress ? `Vouchers ${voucherProgress}` : 'Vouchers'}
+                        </button>
                         <button
                            onClick={handleAutoAssign}
                            className="flex-1 sm:flex-none h-10 px-4 bg-brand-gold/10 hover:bg-brand-gold/20 text-brand-gold rounded-xl text-xs font-bold flex items-center justify-center gap-2 transition-all border border-blue-500/20"
@@ -1940,6 +1988,15 @@ export const ReservasView: React.FC = () => {
                                     )) : (
                                        <tr><td colSpan={8} className="p-20 text-center text-brand-platinum/30 font-medium">No se encontraron reservas con los filtros actuales</td></tr>
                                     )}
+                                    {hasMore && (
+                                       <tr>
+                                          <td colSpan={8} className="p-6 text-center">
+                                             <button onClick={() => loadMore()} className="px-6 py-2 rounded-xl border border-brand-gold/30 text-brand-gold text-[10px] font-black uppercase tracking-widest hover:bg-brand-gold/10 transition-colors">
+                                                Cargar más reservas
+                                             </button>
+                                          </td>
+                                       </tr>
+                                    )}
                                  </tbody>
                               </table>
                            </div>